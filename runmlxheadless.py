@@ -0,0 +1,6 @@
+# Script to run the logger without the GUI
+
+if __name__ == "__main__":
+    import sys
+    import mlx.headless
+    sys.exit(mlx.headless.main())
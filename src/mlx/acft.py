@@ -5,6 +5,7 @@ from . import checks
 from . import fs
 from .i18n import xstr
 from . import util
+from .profiler import CheckerProfiler
 
 import sys
 import time
@@ -30,6 +31,14 @@ from collections import deque
 # also the \ref mlx.acft.SmoothedValue "smoothed values" of the IAS and the VS
 # and set these values in the \ref mlx.fs.AircraftState "aircraft state" when
 # it is received from the simulator.
+#
+# For each state only those checkers are called which are interested in the
+# current stage of the flight and in whether the aircraft is on the ground
+# (see \ref mlx.checks.StateChecker.isActive "StateChecker.isActive"). The
+# table of these checkers is rebuilt whenever the stage changes. All
+# checkers are called with the first state after a change of the stage or
+# of the on-the-ground flag, so each of them sees the change just as if it
+# were called all the time.
 
 #---------------------------------------------------------------------------------------
 
@@ -63,21 +72,29 @@ DERATE_B462 = 4
 #---------------------------------------------------------------------------------------
 
 class SmoothedValue(object):
-    """A smoothed value."""
+    """A smoothed value.
+
+    The values are averaged over a period of time, so that the result does
+    not depend on how frequently the aircraft is monitored."""
     def __init__(self):
         """Construct the value."""
         self._deque = deque()
         self._sum = 0
 
-    def add(self, length, value):
-        """Add the given value and smooth with the given length."""
-        dequeLength = len(self._deque)
-        while dequeLength>=length:
-            self._sum -= self._deque.popleft()
-            dequeLength -= 1
+    def add(self, length, value, timestamp):
+        """Add the given value with the given timestamp and smooth over the
+        given length in seconds.
+
+        The values older than length seconds are dropped (as well as those
+        'newer' than the current one, if the time has gone backwards)."""
+        minTimestamp = timestamp - length
+        while self._deque and \
+              (self._deque[0][0]<=minTimestamp or
+               self._deque[0][0]>timestamp):
+            self._sum -= self._deque.popleft()[1]
 
         self._sum += value
-        self._deque.append(value)
+        self._deque.append((timestamp, value))
 
     def get(self):
         """Get the average."""
@@ -149,6 +166,8 @@ class Aircraft(object):
         self._checkers = []
 
         config = flight.config
+        self._profiler = CheckerProfiler(config.checkerTimeBudget)
+
         # Loggers
 
         self._checkers.append(checks.StageChecker())
@@ -233,6 +252,10 @@ class Aircraft(object):
         self._smoothedIAS = SmoothedValue()
         self._smoothedVS = SmoothedValue()
 
+        self._dispatchByStage = True
+        self._lastDispatchKey = None
+        self._buildDispatchTable(flight.stage)
+
     @property
     def type(self):
         """Get the type of the aircraft."""
@@ -258,6 +281,26 @@ class Aircraft(object):
         """Get the logger to use for the aircraft."""
         return self._flight.logger
 
+    @property
+    def profiler(self):
+        """Get the profiler of the checkers (see mlx.profiler)."""
+        return self._profiler
+
+    @property
+    def dispatchByStage(self):
+        """Indicate if only the checkers interested in the current stage are
+        called."""
+        return self._dispatchByStage
+
+    @dispatchByStage.setter
+    def dispatchByStage(self, dispatchByStage):
+        """Set whether only the checkers interested in the current stage are
+        called.
+
+        If not, all checkers are called with each state, which is slower,
+        but should produce the same results."""
+        self._dispatchByStage = dispatchByStage
+
     @property
     def state(self):
         """Get the current aircraft state."""
@@ -356,30 +399,114 @@ class Aircraft(object):
         try:
             config = self._flight.config
 
-            self._smoothedIAS.add(config.realIASSmoothingLength, aircraftState.ias)
+            self._smoothedIAS.add(config.realIASSmoothingLength,
+                                  aircraftState.ias, aircraftState.timestamp)
             aircraftState.smoothedIAS = self._smoothedIAS.get()
 
-            self._smoothedVS.add(config.realVSSmoothingLength, aircraftState.vs)
+            self._smoothedVS.add(config.realVSSmoothingLength,
+                                 aircraftState.vs, aircraftState.timestamp)
             aircraftState.smoothedVS = self._smoothedVS.get()
 
-            for checker in self._checkers:
-                try:
-                    checker.check(self._flight, self, self._flight.logger,
-                                  self._aircraftState, aircraftState)
-                except:
-                    print("Checker", checker, "failed", file=sys.stderr)
-                    traceback.print_exc()
+            flight = self._flight
+            profiler = self._profiler
+            sampled = profiler.beginTick()
+
+            # All checkers are called if the stage or the on-the-ground flag
+            # has changed since the previous state, otherwise only the ones
+            # interested in them
+            stage = flight.stage
+            onTheGround = bool(aircraftState.onTheGround)
+            dispatchKey = (stage, onTheGround)
+            if dispatchKey==self._lastDispatchKey and self._dispatchByStage:
+                segments = self._dispatchTable[onTheGround]
+            else:
+                segments = [(self._checkers, len(self._checkers))]
+                if stage!=self._dispatchStage:
+                    self._buildDispatchTable(stage)
+            self._lastDispatchKey = dispatchKey
+
+            for (checkers, end) in segments:
+                self._runCheckers(checkers, sampled, aircraftState)
+                if flight.stage!=stage:
+                    # The stage has been changed by the last checker, so the
+                    # rest of them are called as if they were interested in
+                    # the new stage, and all of them with the next state
+                    self._runCheckers(self._checkers[end:], sampled,
+                                      aircraftState)
+                    self._lastDispatchKey = None
+                    break
 
             self._flight.handleState(self._aircraftState, aircraftState)
 
             self._maxVS = max(self._maxVS, aircraftState.vs)
             self._minVS = min(self._minVS, aircraftState.vs)
+
+            profiler.endTick(aircraftState.timestamp)
         except:
             print("Failed to handle the state", file=sys.stderr)
             traceback.print_exc()
         finally:
             self._aircraftState = aircraftState
 
+    def _buildDispatchTable(self, stage):
+        """Build the table of the checkers to call in the given stage.
+
+        The table contains a list of segments for the aircraft being in the
+        air and another one for it being on the ground. A segment is a tuple
+        of the list of the checkers to call and the index of the checker
+        following the last one of them in the list of all checkers. Each
+        checker that may change the stage ends a segment."""
+        table = []
+        for onTheGround in [False, True]:
+            segments = []
+            checkers = []
+            for (index, checker) in enumerate(self._checkers):
+                if stage is None or checker.isActive(stage, onTheGround):
+                    checkers.append(checker)
+                    if checker.changesStage:
+                        segments.append((checkers, index + 1))
+                        checkers = []
+            segments.append((checkers, len(self._checkers)))
+            table.append(segments)
+
+        self._dispatchStage = stage
+        self._dispatchTable = table
+
+    def _runCheckers(self, checkers, sampled, aircraftState):
+        """Call the given checkers with the given new state.
+
+        If the tick is sampled, the checkers are timed, otherwise the loop is
+        kept free of any profiling overhead."""
+        flight = self._flight
+        logger = flight.logger
+        oldState = self._aircraftState
+        if sampled:
+            profiler = self._profiler
+            for checker in checkers:
+                start = time.perf_counter_ns()
+                try:
+                    checker.check(flight, self, logger, oldState,
+                                  aircraftState)
+                except:
+                    self._checkerFailed(checker)
+                profiler.addCall(checker, time.perf_counter_ns() - start)
+        else:
+            for checker in checkers:
+                try:
+                    checker.check(flight, self, logger, oldState,
+                                  aircraftState)
+                except:
+                    self._checkerFailed(checker)
+
+    def _checkerFailed(self, checker):
+        """Called when the given checker has thrown the exception being
+        handled.
+
+        The exception is logged and counted by the profiler."""
+        self._profiler.addException(checker, sys.exc_info()[1])
+        print("Checker", checker, "failed", file=sys.stderr)
+        traceback.print_exc()
+
     def setStage(self, aircraftState, newStage):
         """Set the given stage as the new one and do whatever should be
         done."""
@@ -389,6 +516,7 @@ class Aircraft(object):
         oldStage = self._flight.stage
 
         if self._flight.setStage(aircraftState.timestamp, newStage):
+            self._buildDispatchTable(newStage)
             if newStage==const.STAGE_PUSHANDTAXI:
                 self.logger.message(aircraftState.timestamp, "Block time start")
                 self._flight.logFuel(aircraftState)
@@ -472,6 +600,8 @@ class Aircraft(object):
                 self.logger.message(aircraftState.timestamp,
                                     "Block time: " +
                                     util.getTimeIntervalString(blockLength))
+                print("Aircraft.setStage: checker profile of the flight:\n" +
+                      self._profiler.format())
 
     def prepareFlare(self):
         """Called when it is detected that we will soon flare.
@@ -1359,48 +1489,48 @@ def getClass(aircraftType):
 if __name__ == "__main__":
     value = SmoothedValue()
 
-    print("Adding 1, 12.0")
-    value.add(1, 12.0)
+    print("Adding 1, 12.0 at 1")
+    value.add(1, 12.0, 1)
     print(value.get())
 
-    print("Adding 1, 15.0")
-    value.add(1, 15.0)
+    print("Adding 1, 15.0 at 2")
+    value.add(1, 15.0, 2)
     print(value.get())
 
-    print("Adding 2, 18.0")
-    value.add(2, 18.0)
+    print("Adding 2, 18.0 at 3")
+    value.add(2, 18.0, 3)
     print(value.get())
 
-    print("Adding 2, 20.0")
-    value.add(2, 20.0)
+    print("Adding 2, 20.0 at 4")
+    value.add(2, 20.0, 4)
     print(value.get())
 
-    print("Adding 5, 22.0")
-    value.add(5, 22.0)
+    print("Adding 5, 22.0 at 5")
+    value.add(5, 22.0, 5)
     print(value.get())
 
-    print("Adding 5, 25.0")
-    value.add(5, 25.0)
+    print("Adding 5, 25.0 at 6")
+    value.add(5, 25.0, 6)
     print(value.get())
 
-    print("Adding 5, 29.0")
-    value.add(5, 29.0)
+    print("Adding 5, 29.0 at 7")
+    value.add(5, 29.0, 7)
     print(value.get())
 
-    print("Adding 5, 21.0")
-    value.add(5, 21.0)
+    print("Adding 5, 21.0 at 8")
+    value.add(5, 21.0, 8)
     print(value.get())
 
-    print("Adding 5, 26.0")
-    value.add(5, 26.0)
+    print("Adding 5, 26.0 at 9")
+    value.add(5, 26.0, 9)
     print(value.get())
 
-    print("Adding 2, 30.0")
-    value.add(2, 30.0)
+    print("Adding 2, 30.0 at 10")
+    value.add(2, 30.0, 10)
     print(value.get())
 
-    print("Adding 2, 55.0")
-    value.add(2, 55.0)
+    print("Adding 2, 55.0 at 11")
+    value.add(2, 55.0, 11)
     print(value.get())
 
 #---------------------------------------------------------------------------------------
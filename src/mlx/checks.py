@@ -4,8 +4,7 @@ from . import const
 from . import util
 from .acars import ACARS
 from .sound import startSound
-
-import time
+from .clock import getClock
 
 #---------------------------------------------------------------------------------------
 
@@ -24,6 +23,13 @@ import time
 # \ref mlx.checks.StageChecker "StageChecker" which computes the
 # transitions from one stage of the flight to the next one. Or
 # \ref mlx.checks.ACARSSender "ACARSSender" which sends the ACARS periodically
+#
+# A checker may declare the flight stages in which it may do anything (and
+# whether only on the ground or in the air), so that the aircraft does not
+# call it in the other ones. A checker called in such a stage must not log
+# anything, and if it changes its own state, calling it again in the same
+# stage must not change it any more, since the aircraft still calls each
+# checker when the stage or the on-the-ground flag has changed.
 
 #---------------------------------------------------------------------------------------
 
@@ -32,6 +38,30 @@ class StateChecker(object):
     from some aspect.
 
     As a result of the check they may log something, or notify of some fault, etc."""
+    ## The stages in which the checker may do anything, or None if it may do
+    ## so in any stage
+    stages = None
+
+    ## If not None, the checker may do anything only if the value of the
+    ## aircraft's onTheGround attribute is the same as this
+    onTheGround = None
+
+    ## Indicate if the checker may change the stage of the flight
+    changesStage = False
+
+    @staticmethod
+    def getStagesExcept(excludedStages):
+        """Get the list of the stages except the given ones."""
+        return [stage for stage in range(const.STAGE_BOARDING,
+                                         const.STAGE_END + 1)
+                if stage not in excludedStages]
+
+    def isActive(self, stage, onTheGround):
+        """Determine if the checker may do anything in the given stage with
+        the given value of the onTheGround flag."""
+        return (self.stages is None or stage in self.stages) and \
+               (self.onTheGround is None or self.onTheGround==onTheGround)
+
     def check(self, flight, aircraft, logger, oldState, state):
         """Perform the check and do whatever is needed.
 
@@ -42,6 +72,8 @@ class StateChecker(object):
 
 class StageChecker(StateChecker):
     """Check the flight stage transitions."""
+    changesStage = True
+
     def __init__(self):
         """Construct the stage checker."""
         self._flareStarted = False
@@ -117,7 +149,7 @@ class ACARSSender(StateChecker):
         if self._sending:
             return
 
-        now = time.time()
+        now = getClock().time()
 
         if self._lastSent is not None and \
            (self._lastSent + ACARSSender.INTERVAL)>now:
@@ -131,7 +163,7 @@ class ACARSSender(StateChecker):
         """Callback for ACARS sending."""
         if returned:
             print("Sent online ACARS")
-            self._lastSent = time.time() if self._lastSent is None \
+            self._lastSent = getClock().time() if self._lastSent is None \
                              else self._lastSent + ACARSSender.INTERVAL
         else:
             print("Failed to send the ACARS")
@@ -141,6 +173,8 @@ class ACARSSender(StateChecker):
 
 class TakeOffLogger(StateChecker):
     """Logger for the cruise speed."""
+    stages = [const.STAGE_TAKEOFF]
+
     def __init__(self):
         """Construct the logger."""
         self._onTheGround = True
@@ -176,6 +210,8 @@ class TakeOffLogger(StateChecker):
 
 class InitialClimbSpeedLogger(StateChecker):
     """Logger for the initial climb speed."""
+    stages = [const.STAGE_TAKEOFF, const.STAGE_CLIMB]
+
     def __init__(self):
         """Construct the logger."""
         self._logged = False
@@ -197,6 +233,8 @@ class InitialClimbSpeedLogger(StateChecker):
 
 class CruiseSpeedLogger(StateChecker):
     """Logger for the cruise speed."""
+    stages = [const.STAGE_CRUISE]
+
     def __init__(self):
         """Construct the logger."""
         self._lastTime = None
@@ -249,6 +287,8 @@ class SpoilerLogger(StateChecker):
 class VisibilityChecker(StateChecker):
     """Inform the pilot of the visibility once when descending below 2000 ft,
     then when descending below 1000 ft."""
+    stages = [const.STAGE_DESCENT, const.STAGE_LANDING]
+
     def __init__(self):
         """Construct the visibility checker."""
         self._informedBelow2000 = False
@@ -278,6 +318,8 @@ class ApproachCalloutsPlayer(StateChecker):
     It tracks the altitude during the descent and landing phases and
     if the altitude crosses one that has a callout associated with and
     the vertical speed is negative, that callout will be played."""
+    stages = [const.STAGE_DESCENT, const.STAGE_LANDING]
+
     def __init__(self, approachCallouts):
         """Construct the approach callouts player."""
         self._approachCallouts = approachCallouts
@@ -317,6 +359,8 @@ class StateChangeLogger(StateChecker):
         """
         self._logInitial = logInitial
         self._excludedStages = [] if excludedStages is None else excludedStages
+        if self._excludedStages:
+            self.stages = StateChecker.getStagesExcept(self._excludedStages)
 
     def _getLogTimestamp(self, state, forced):
         """Get the log timestamp."""
@@ -350,8 +394,17 @@ class SimpleChangeMixin(object):
 
     Child classes should define the following function:
     - _getValue(state): get the value we are interested in."""
+    def _mayHaveChanged(self, state):
+        """Determine if the value may have changed according to the change
+        mask of the given state.
+
+        This default implementation returns True."""
+        return True
+
     def _changed(self, oldState, state):
         """Determine if the value has changed."""
+        if not self._mayHaveChanged(state):
+            return False
         currentValue = self._getValue(state)
         return currentValue is not None and self._getValue(oldState)!=currentValue
 
@@ -368,6 +421,11 @@ class SingleValueMixin(object):
         """Get the value of the attribute from the state."""
         return getattr(state, self._attrName)
 
+    def _mayHaveChanged(self, state):
+        """Determine if the value of the attribute may have changed according
+        to the change mask of the given state."""
+        return state.hasChanged(self._attrName)
+
 #---------------------------------------------------------------------------------------
 
 class DelayedChangeMixin(object):
@@ -384,6 +442,7 @@ class DelayedChangeMixin(object):
         self._firstChange = None
         self._lastChangeState = None
         self._lastLoggedValue = None
+        self._lastCheckedState = None
 
         self._logState = lambda flight, logger, state, forced = False: \
             StateChangeLogger.logState(self, flight, logger, state,
@@ -392,8 +451,25 @@ class DelayedChangeMixin(object):
             DelayedChangeMixin.logState(self, flight, logger, state,
                                         forced = forced)
 
+    def _mayHaveChanged(self, state):
+        """Determine if the value may have changed according to the change
+        mask of the given state.
+
+        This default implementation returns True."""
+        return True
+
     def _changed(self, oldState, state):
-        """Determine if the value has changed."""
+        """Determine if the value has changed.
+
+        If the previous state has also been checked, no change is pending and
+        the value has not changed according to the change mask of the state,
+        it is not queried at all."""
+        lastCheckedState = self._lastCheckedState
+        self._lastCheckedState = state
+        if lastCheckedState is oldState and self._firstChange is None and \
+           not self._mayHaveChanged(state):
+            return False
+
         if self._oldValue is None:
             self._oldValue = self._getValue(oldState)
 
@@ -545,6 +621,13 @@ class NAVLogger(StateChangeLogger, DelayedChangeMixin, ForceableLoggerMixin):
         manual = getattr(state, self._attrName + "_manual")
         return (frequency, obs, manual)
 
+    def _mayHaveChanged(self, state):
+        """Determine if the value may have changed according to the change
+        mask of the given state."""
+        attrName = self._attrName
+        return state.hasChanged(attrName, attrName + "_obs",
+                                attrName + "_manual")
+
     def _getMessage(self, flight, state, forced):
         """Get the message."""
         (frequency, obs, manual) = self._getValue(state)
@@ -797,6 +880,12 @@ class APLogger(StateChangeLogger, DelayedChangeMixin):
                 state.apHeadingHold, state.apHeading,
                 state.apAltitudeHold, state.apAltitude)
 
+    def _mayHaveChanged(self, state):
+        """Determine if the value may have changed according to the change
+        mask of the given state."""
+        return state.hasChanged("apMaster", "apHeadingHold", "apHeading",
+                                "apAltitudeHold", "apAltitude")
+
     def _isDifferent(self, oldValue, newValue):
         """Determine if the given old and new values are different (enough) to
         be logged."""
@@ -1027,6 +1116,9 @@ class TupolevLandingLightsChecker(PatientFaultChecker):
 
 class BankChecker(SimpleFaultChecker):
     """Check for the bank is within limits."""
+    stages = [const.STAGE_TAKEOFF, const.STAGE_CLIMB, const.STAGE_CRUISE,
+              const.STAGE_DESCENT, const.STAGE_LANDING]
+
     def isCondition(self, flight, aircraft, oldState, state):
         """Check if the fault condition holds."""
         isXPlane = (flight.aircraftType==const.AIRCRAFT_DH8D or
@@ -1056,6 +1148,8 @@ class BankChecker(SimpleFaultChecker):
 
 class FlapsRetractChecker(SimpleFaultChecker):
     """Check if the flaps are not retracted too early."""
+    stages = [const.STAGE_TAKEOFF, const.STAGE_LANDING]
+
     def __init__(self):
         """Construct the flaps checker."""
         self._timeStart = None
@@ -1111,6 +1205,8 @@ class FlapsPositionSpeedLimitChecker(FlapsSpeedLimitChecker):
 
 class GearsDownChecker(SimpleFaultChecker):
     """Check if the gears are down at low altitudes."""
+    stages = StateChecker.getStagesExcept([const.STAGE_TAKEOFF])
+
     def isCondition(self, flight, aircraft, oldState, state):
         """Check if the fault condition holds."""
         return state.radioAltitude<10 and not state.gearsDown and \
@@ -1141,6 +1237,8 @@ class GearSpeedLimitChecker(PatientFaultChecker):
 
 class GLoadChecker(SimpleFaultChecker):
     """Check if the G-load does not exceed 2 except during flare."""
+    onTheGround = False
+
     def isCondition(self, flight, aircraft, oldState, state):
         """Check if the fault condition holds."""
         return state.gLoad>2.0 and not state.onTheGround and \
@@ -1156,6 +1254,10 @@ class GLoadChecker(SimpleFaultChecker):
 
 class LandingLightsChecker(PatientFaultChecker):
     """Check if the landing lights are used properly."""
+    stages = [const.STAGE_BOARDING, const.STAGE_TAKEOFF, const.STAGE_CLIMB,
+              const.STAGE_CRUISE, const.STAGE_DESCENT, const.STAGE_LANDING,
+              const.STAGE_PARKING]
+
     def getTimeout(self, flight, aircraft, oldState, state):
         """Get the timeout.
 
@@ -1192,7 +1294,13 @@ class LandingLightsChecker(PatientFaultChecker):
 #---------------------------------------------------------------------------------------
 
 class TransponderChecker(PatientFaultChecker):
-    """Check if the transponder is used properly."""
+    """Check if the transponder is used properly.
+
+    The time of the lift-off is maintained in the other stages too, but it
+    is set only once after leaving the ground."""
+    stages = [const.STAGE_TAKEOFF, const.STAGE_CLIMB, const.STAGE_CRUISE,
+              const.STAGE_DESCENT, const.STAGE_LANDING, const.STAGE_GOAROUND]
+
     def __init__(self):
         """Construct the transponder checker."""
         super(TransponderChecker, self).__init__()
@@ -1266,6 +1374,8 @@ class WeightChecker(PatientFaultChecker):
 
 class MLWChecker(WeightChecker):
     """Checks if the MLW is not exceeded on landing."""
+    stages = [const.STAGE_LANDING]
+
     def __init__(self):
         """Construct the checker."""
         super(MLWChecker, self).__init__("LW")
@@ -1280,6 +1390,8 @@ class MLWChecker(WeightChecker):
 
 class MTOWChecker(WeightChecker):
     """Checks if the MTOW is not exceeded on landing."""
+    stages = [const.STAGE_TAKEOFF]
+
     def __init__(self):
         """Construct the checker."""
         super(MTOWChecker, self).__init__("TOW")
@@ -1309,6 +1421,9 @@ class MZFWChecker(WeightChecker):
 
 class NavLightsChecker(PatientFaultChecker):
     """Check if the navigational lights are used properly."""
+    stages = StateChecker.getStagesExcept([const.STAGE_BOARDING,
+                                           const.STAGE_PARKING])
+
     def __init__(self):
         """Construct the NAV lights checker."""
         super(NavLightsChecker, self).__init__(timeout = 5.0)
@@ -1436,6 +1551,8 @@ class PayloadChecker(SimpleFaultChecker):
     """Check if the payload matches the specification."""
     TOLERANCE=550
 
+    stages = [const.STAGE_PUSHANDTAXI]
+
     @staticmethod
     def isZFWFaulty(aircraftZFW, flightZFW):
         """Check if the given aircraft's ZFW is outside of the limits."""
@@ -1494,6 +1611,9 @@ class ReverserLogger(StateChecker):
 class ReverserChecker(SimpleFaultChecker):
     """Check if the reverser is not used below the speed prescribed for the
     aircraft."""
+    stages = [const.STAGE_DESCENT, const.STAGE_LANDING,
+              const.STAGE_TAXIAFTERLAND]
+
     def isCondition(self, flight, aircraft, oldState, state):
         """Check if the fault condition holds."""
         return flight.stage in [const.STAGE_DESCENT, const.STAGE_LANDING,
@@ -1525,6 +1645,11 @@ class SpeedChecker(StateChecker):
 
     During the TAXIAFTERLAND stage, if the speed goes above 50 knots, a fault
     is logged based on the actual speed."""
+    stages = [const.STAGE_PUSHANDTAXI, const.STAGE_RTO,
+              const.STAGE_TAXIAFTERLAND]
+
+    changesStage = True
+
     @staticmethod
     def logSpeedFault(flight, state, stage = None, updateID = None):
         """Log the speed fault."""
@@ -1581,6 +1706,9 @@ class SpeedChecker(StateChecker):
 
 class StrobeLightsChecker(PatientFaultChecker):
     """Check if the strobe lights are used properly."""
+    stages = [const.STAGE_BOARDING, const.STAGE_TAKEOFF, const.STAGE_CLIMB,
+              const.STAGE_CRUISE, const.STAGE_DESCENT, const.STAGE_PARKING]
+
     def __init__(self):
         """Construct the Strobe lights checker."""
         super(StrobeLightsChecker, self).__init__(timeout = 5.0)
@@ -1611,6 +1739,8 @@ class ThrustChecker(SimpleFaultChecker):
     """Check if the thrust setting is not too high during takeoff.
 
     FIXME: is this really so general, for all aircraft?"""
+    stages = [const.STAGE_TAKEOFF]
+
     def isCondition(self, flight, aircraft, oldState, state):
         """Check if the fault condition holds."""
         if flight.stage==const.STAGE_TAKEOFF and state.n1 is not None:
@@ -0,0 +1,165 @@
+# Clocks the time of the simulator handling is taken from
+
+#-----------------------------------------------------------------------------
+
+import time
+import threading
+
+#-----------------------------------------------------------------------------
+
+## @package mlx.clock
+#
+# The clocks the simulator handlers take their time from.
+#
+# The simulator handlers, the message thread, the watchdog and the checkers
+# take the current time from the clock returned by getClock(), and they sleep
+# and wait for their conditions via that clock. By default it is the \ref
+# mlx.clock.Clock "real clock", but another one can be installed by
+# setClock() before the simulator is connected:
+# - a \ref mlx.clock.VirtualClock "virtual clock" is stepped by the waits of
+# the thread driving it, i.e. it jumps to the end of any such wait
+# immediately, so that a flight can be processed as fast as the data is
+# available. It is used when the flight is replayed from a recording.
+# - a \ref mlx.clock.ScaledClock "scaled clock" runs a given number of times
+# faster than the real one.
+
+#-----------------------------------------------------------------------------
+
+class Clock(object):
+    """The real clock."""
+    def time(self):
+        """Get the current time in seconds since the epoch."""
+        return time.time()
+
+    def sleep(self, duration):
+        """Sleep for the given number of seconds."""
+        time.sleep(duration)
+
+    def wait(self, condition, timeout = None):
+        """Wait for the given condition at most for the given number of
+        seconds.
+
+        It should be called with the condition's lock held. If timeout is
+        None, the wait is not limited."""
+        condition.wait(timeout)
+
+#-----------------------------------------------------------------------------
+
+class VirtualClock(Clock):
+    """A clock whose time advances only when the driving thread is waiting
+    or sleeping.
+
+    A sleep or a wait with a timeout of the driving thread returns
+    immediately with the time advanced by the given duration. A wait without
+    a timeout is a real wait for the condition, since there is nothing to
+    advance the time to.
+
+    The other threads cannot advance the time, so their sleeps and waits
+    with a timeout last for at most a short real interval, after which they
+    return as if woken up spuriously. If no driving thread is set, any
+    thread advances the time."""
+    ## The maximal real duration of the sleeps and waits of the threads not
+    ## driving the clock
+    POLL_INTERVAL = 0.01
+
+    def __init__(self, startTime = 0.0):
+        """Construct the clock starting at the given time."""
+        self._time = startTime
+        self._driver = None
+
+    def time(self):
+        """Get the current time."""
+        return self._time
+
+    def setTime(self, t):
+        """Set the current time."""
+        self._time = t
+
+    def setDriver(self, thread = None):
+        """Set the thread driving the clock.
+
+        If thread is None, the current thread becomes the driver."""
+        self._driver = threading.current_thread() if thread is None \
+                       else thread
+
+    def sleep(self, duration):
+        """Advance the time by the given duration."""
+        if self._isDriver():
+            if duration>0.0:
+                self._time += duration
+        else:
+            time.sleep(min(duration, self.POLL_INTERVAL))
+
+    def wait(self, condition, timeout = None):
+        """Wait for the given condition.
+
+        If there is a timeout, the time is advanced by it and the function
+        returns immediately."""
+        if timeout is None:
+            condition.wait()
+        elif self._isDriver():
+            if timeout>0.0:
+                self._time += timeout
+        else:
+            condition.wait(min(timeout, self.POLL_INTERVAL))
+
+    def _isDriver(self):
+        """Determine if the current thread may advance the time."""
+        return self._driver is None or \
+            self._driver is threading.current_thread()
+
+#-----------------------------------------------------------------------------
+
+class ScaledClock(Clock):
+    """A clock running a given number of times faster than the real one.
+
+    Its time starts at the given time or at the current real time, and the
+    real durations of the sleeps and waits are divided by the scale."""
+    def __init__(self, scale, startTime = None):
+        """Construct the clock with the given scale."""
+        assert scale>0.0
+        self._scale = float(scale)
+        self._realStartTime = time.time()
+        self._startTime = self._realStartTime if startTime is None \
+                          else startTime
+
+    @property
+    def scale(self):
+        """Get the scale of the clock."""
+        return self._scale
+
+    def time(self):
+        """Get the current time."""
+        return self._startTime + \
+            (time.time() - self._realStartTime) * self._scale
+
+    def sleep(self, duration):
+        """Sleep for the given number of seconds of the clock."""
+        if duration>0.0:
+            time.sleep(duration / self._scale)
+
+    def wait(self, condition, timeout = None):
+        """Wait for the given condition at most for the given number of
+        seconds of the clock."""
+        condition.wait(None if timeout is None else
+                       max(0.0, timeout / self._scale))
+
+#-----------------------------------------------------------------------------
+
+## The clock currently in use
+_clock = Clock()
+
+#-----------------------------------------------------------------------------
+
+def getClock():
+    """Get the clock currently in use."""
+    return _clock
+
+#-----------------------------------------------------------------------------
+
+def setClock(clock):
+    """Set the clock to use."""
+    global _clock
+    _clock = clock
+
+#-----------------------------------------------------------------------------
@@ -14,10 +14,6 @@ MAVA_BASE_URL = os.environ.get("MAVA_BASE_URL", "https://virtualairlines.hu")
 
 #-------------------------------------------------------------------------------
 
-from gi.repository import GObject
-
-#-------------------------------------------------------------------------------
-
 def fixUnpickledValue(value):
     """Fix the given unpickled value.
 
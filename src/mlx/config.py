@@ -234,6 +234,10 @@ class Config(object):
         self._usingFS2Crew = False
         self._iasSmoothingLength = -2
         self._vsSmoothingLength = -2
+        self._checkerTimeBudget = 0
+        self._debugLogMaxLines = 10000
+        self._debugLogFile = ""
+        self._monitorUpdateRate = 5
 
         self._useSimBrief = False
         self._useInternalBrowserForSimBrief = False
@@ -244,6 +248,8 @@ class Config(object):
         self._pirepDirectory = None
         self._pirepAutoSave = False
 
+        self._telemetryDirectory = None
+
         self._defaultMSFS = os.name=="nt"
 
         self._enableSounds = not secondaryInstallation
@@ -484,6 +490,62 @@ class Config(object):
             self._vsSmoothingLength = vsSmoothingLength
             self._modified = True
 
+    @property
+    def checkerTimeBudget(self):
+        """Get the number of milliseconds the handling of an aircraft state
+        by the checkers may take before a warning is logged into the debug
+        log. If it is 0, no warnings are logged."""
+        return self._checkerTimeBudget
+
+    @checkerTimeBudget.setter
+    def checkerTimeBudget(self, checkerTimeBudget):
+        """Set the number of milliseconds the handling of an aircraft state
+        by the checkers may take."""
+        if checkerTimeBudget!=self._checkerTimeBudget:
+            self._checkerTimeBudget = checkerTimeBudget
+            self._modified = True
+
+    @property
+    def debugLogMaxLines(self):
+        """Get the maximal number of lines of the debug log kept in
+        memory."""
+        return self._debugLogMaxLines
+
+    @debugLogMaxLines.setter
+    def debugLogMaxLines(self, debugLogMaxLines):
+        """Set the maximal number of lines of the debug log kept in
+        memory."""
+        if debugLogMaxLines!=self._debugLogMaxLines:
+            self._debugLogMaxLines = debugLogMaxLines
+            self._modified = True
+
+    @property
+    def debugLogFile(self):
+        """Get the path of the file the whole debug log is written into. If
+        it is empty, the debug log is not written into a file."""
+        return self._debugLogFile
+
+    @debugLogFile.setter
+    def debugLogFile(self, debugLogFile):
+        """Set the path of the file the whole debug log is written into."""
+        if debugLogFile!=self._debugLogFile:
+            self._debugLogFile = debugLogFile
+            self._modified = True
+
+    @property
+    def monitorUpdateRate(self):
+        """Get the maximal number of times per second the monitor window is
+        updated. If it is 0, the updates are not limited."""
+        return self._monitorUpdateRate
+
+    @monitorUpdateRate.setter
+    def monitorUpdateRate(self, monitorUpdateRate):
+        """Set the maximal number of times per second the monitor window is
+        updated."""
+        if monitorUpdateRate!=self._monitorUpdateRate:
+            self._monitorUpdateRate = monitorUpdateRate
+            self._modified = True
+
     @property
     def useSimBrief(self):
         """Check if SimBrief should be used."""
@@ -575,6 +637,24 @@ class Config(object):
             self._pirepAutoSave = pirepAutoSave
             self._modified = True
 
+    @property
+    def telemetryDirectory(self):
+        """Get the directory into which the raw telemetry read from the
+        simulator is recorded.
+
+        If it is None, the telemetry is not recorded."""
+        return self._telemetryDirectory
+
+    @telemetryDirectory.setter
+    def telemetryDirectory(self, telemetryDirectory):
+        """Set the directory into which the raw telemetry read from the
+        simulator is recorded."""
+        if telemetryDirectory=="":
+            telemetryDirectory = None
+        if telemetryDirectory!=self._telemetryDirectory:
+            self._telemetryDirectory = telemetryDirectory
+            self._modified = True
+
     @property
     def defaultMSFS(self):
         """Get if the default simulator type is MS FS."""
@@ -869,6 +949,13 @@ class Config(object):
         self._vsSmoothingLength = int(self._get(config, "general",
                                                 "vsSmoothingLength",
                                                 -2))
+        self._checkerTimeBudget = self._getInteger(config, "general",
+                                                   "checkerTimeBudget", 0)
+        self._debugLogMaxLines = self._getInteger(config, "general",
+                                                  "debugLogMaxLines", 10000)
+        self._debugLogFile = self._get(config, "general", "debugLogFile", "")
+        self._monitorUpdateRate = self._getInteger(config, "general",
+                                                   "monitorUpdateRate", 5)
 
         self._useSimBrief = self._getBoolean(config, "simbrief",
                                              "use", False)
@@ -891,6 +978,9 @@ class Config(object):
         if self._pirepDirectory is None:
             self._pirepAutoSave = False
 
+        self._telemetryDirectory = self._get(config, "general",
+                                             "telemetryDirectory", None)
+
         self._messageTypeLevels = {}
         for messageType in const.messageTypes:
             self._messageTypeLevels[messageType] = \
@@ -982,6 +1072,13 @@ class Config(object):
                    str(self._iasSmoothingLength))
         config.set("general", "vsSmoothingLength",
                    str(self._vsSmoothingLength))
+        config.set("general", "checkerTimeBudget",
+                   str(self._checkerTimeBudget))
+        config.set("general", "debugLogMaxLines",
+                   str(self._debugLogMaxLines))
+        config.set("general", "debugLogFile", self._debugLogFile)
+        config.set("general", "monitorUpdateRate",
+                   str(self._monitorUpdateRate))
 
         config.add_section("simbrief")
         config.set("simbrief", "use",
@@ -998,6 +1095,10 @@ class Config(object):
         config.set("general", "pirepAutoSave",
                    "yes" if self._pirepAutoSave else "no")
 
+        if self._telemetryDirectory is not None:
+            config.set("general", "telemetryDirectory",
+                       self._telemetryDirectory)
+
         config.set("general", "defaultMSFS",
                    "yes" if self._defaultMSFS else "no")
 
@@ -1172,6 +1273,10 @@ class Config(object):
 
         print("  iasSmoothingLength:", self._iasSmoothingLength)
         print("  vsSmoothingLength:", self._vsSmoothingLength)
+        print("  checkerTimeBudget:", self._checkerTimeBudget)
+        print("  debugLogMaxLines:", self._debugLogMaxLines)
+        print("  debugLogFile:", self._debugLogFile)
+        print("  monitorUpdateRate:", self._monitorUpdateRate)
 
         print("  useSimBrief:", self._useSimBrief)
         print("  useInternalBrowserForSimBrief:", self._useInternalBrowserForSimBrief)
@@ -1181,6 +1286,8 @@ class Config(object):
         print("  pirepDirectory:", self._pirepDirectory)
         print("  pirepAutoSave:", self._pirepAutoSave)
 
+        print("  telemetryDirectory:", self._telemetryDirectory)
+
         print("  defaultMSFS:", self._defaultMSFS)
         print("  xplaneRemote:", self._xplaneRemote)
         print("  xplaneAddress:", self._xplaneAddress)
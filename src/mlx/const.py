@@ -294,6 +294,23 @@ def stage2string(stage):
 
 #-------------------------------------------------------------------------------
 
+## Tier of the monitoring data items that may change quickly, e.g. the
+## attitude or the speed. They are read with the monitoring period.
+MONITORING_TIER_FAST = 1
+
+## Tier of the monitoring data items that change rarely or that are not
+## critical to be up-to-date, e.g. the radios, the autopilot settings or the
+## weather. They are read with fs.MONITORING_PERIOD_SLOW, or with the
+## monitoring period if that is longer.
+MONITORING_TIER_SLOW = 2
+
+## Tier of the monitoring data items that do not change for a given aircraft
+## model, e.g. the capacities of the fuel tanks. They are read only once when
+## the monitoring starts.
+MONITORING_TIER_STATIC = 3
+
+#-------------------------------------------------------------------------------
+
 ## Plane status: unknown
 PLANE_UNKNOWN = 0
 
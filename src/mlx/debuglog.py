@@ -0,0 +1,209 @@
+# The debug log of the program
+
+#------------------------------------------------------------------------------
+
+import os
+import datetime
+import threading
+import collections
+
+#------------------------------------------------------------------------------
+
+## @package mlx.debuglog
+#
+# The debug log of the program.
+#
+# Everything printed to the standard output or error by the GUI version of
+# the logger is collected into the \ref mlx.debuglog.DebugLog "debug log".
+# Writing is cheap and can be done from any thread: the text is only
+# appended to a list of chunks. The chunks are processed periodically,
+# usually from the main loop of the GUI. Processing splits the text into
+# lines, prefixes each line with the time it was started at, and appends
+# the complete lines to a ring buffer of a maximal number of lines, so a
+# long session does not make the log grow without bound. The lines dropped
+# from the ring buffer are not lost if a file is given: all the text
+# processed is also written into that file, which is rotated when it grows
+# too large.
+
+#------------------------------------------------------------------------------
+
+class DebugLog(object):
+    """The debug log.
+
+    The text can be written from any thread, but the processing and the
+    querying of the lines should be done in one thread, usually the one of
+    the main loop of the GUI."""
+    ## The default maximal number of lines kept in memory
+    DEFAULT_MAX_LINES = 10000
+
+    ## The size of the file in bytes above which it is rotated
+    MAX_FILE_SIZE = 16 * 1024 * 1024
+
+    ## The number of the rotated files kept besides the current one
+    NUM_BACKUP_FILES = 3
+
+    def __init__(self, maxLines = DEFAULT_MAX_LINES, path = None,
+                 maxFileSize = MAX_FILE_SIZE,
+                 numBackupFiles = NUM_BACKUP_FILES):
+        """Construct the debug log keeping at most the given number of lines
+        in memory.
+
+        If a path is given, the text processed is written into the file
+        with that path. If the file grows larger than maxFileSize bytes, it
+        is renamed by appending '.1' to its name (and the earlier rotated
+        files are renamed similarly up to numBackupFiles), and a new file is
+        started."""
+        self._lock = threading.Lock()
+        self._chunks = []
+
+        self._lines = collections.deque(maxlen = max(1, maxLines))
+        self._partialLine = None
+
+        self._path = path
+        self._maxFileSize = maxFileSize
+        self._numBackupFiles = numBackupFiles
+        self._file = None
+        self._fileSize = 0
+
+    @property
+    def maxLines(self):
+        """Get the maximal number of lines kept in memory."""
+        return self._lines.maxlen
+
+    @property
+    def lines(self):
+        """Get the complete lines kept in memory, each with its newline."""
+        return list(self._lines)
+
+    @property
+    def text(self):
+        """Get the text of the lines kept in memory, including the last,
+        incomplete one."""
+        text = "".join(self._lines)
+        if self._partialLine is not None:
+            text += self._partialLine
+        return text
+
+    def write(self, text):
+        """Write the given text into the log.
+
+        Returns whether there was no text waiting to be processed before,
+        i.e. if the processing should be scheduled."""
+        with self._lock:
+            self._chunks.append(text)
+            return len(self._chunks)==1
+
+    def process(self):
+        """Process the text written since the last processing.
+
+        Returns a tuple of the following items:
+        - the text appended to the log, i.e. the text written with the time
+        inserted at the beginning of each line,
+        - the number of complete lines dropped from the beginning of the log
+        (after the text has been appended) to keep at most the maximal
+        number of lines."""
+        with self._lock:
+            chunks = self._chunks
+            self._chunks = []
+        if not chunks:
+            return ("", 0)
+
+        now = datetime.datetime.now()
+        timeStr = "%02d:%02d:%02d: " % (now.hour, now.minute, now.second)
+
+        (text, numDroppedLines) = self._append("".join(chunks), timeStr)
+        if self._path is not None:
+            error = self._spill(text)
+            if error is not None:
+                (errorText, numErrorDroppedLines) = \
+                    self._append(error, timeStr)
+                text += errorText
+                numDroppedLines += numErrorDroppedLines
+
+        return (text, numDroppedLines)
+
+    def close(self):
+        """Close the file of the log, if any."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _append(self, text, timeStr):
+        """Append the given text to the lines, inserting the given time
+        string at the beginning of each new line.
+
+        Returns a tuple of the text appended and the number of complete lines
+        dropped from the beginning of the log (see process())."""
+        parts = text.split("\n")
+        lines = self._lines
+        maxLines = lines.maxlen
+        appended = []
+        numDroppedLines = 0
+
+        for part in parts[:-1]:
+            partialLine = self._partialLine
+            if partialLine is None:
+                text = timeStr + part + "\n"
+                line = text
+            else:
+                text = part + "\n"
+                line = partialLine + text
+                self._partialLine = None
+            appended.append(text)
+            if len(lines)==maxLines:
+                numDroppedLines += 1
+            lines.append(line)
+
+        part = parts[-1]
+        if part:
+            if self._partialLine is None:
+                part = timeStr + part
+                self._partialLine = part
+            else:
+                self._partialLine += part
+            appended.append(part)
+
+        return ("".join(appended), numDroppedLines)
+
+    def _spill(self, text):
+        """Write the given text into the file of the log, rotating the file
+        if needed.
+
+        If the file cannot be written, the writing of the file is stopped,
+        and a note about the error is returned, which the caller should
+        append to the log. Otherwise None is returned."""
+        data = text.encode("utf-8")
+        try:
+            if self._file is None:
+                self._file = open(self._path, "ab")
+                self._fileSize = self._file.tell()
+            if self._fileSize>0 and \
+               self._fileSize + len(data)>self._maxFileSize:
+                self._rotate()
+            self._file.write(data)
+            self._file.flush()
+            self._fileSize += len(data)
+            return None
+        except Exception as e:
+            error = "DebugLog: could not write the file '%s': %s\n" % \
+                (self._path, str(e))
+            self.close()
+            self._path = None
+            return error
+
+    def _rotate(self):
+        """Rotate the file of the log."""
+        self.close()
+
+        path = self._path
+        for index in range(self._numBackupFiles - 1, 0, -1):
+            backupPath = "%s.%d" % (path, index)
+            if os.path.exists(backupPath):
+                os.replace(backupPath, "%s.%d" % (path, index + 1))
+        if self._numBackupFiles>0:
+            os.replace(path, path + ".1")
+
+        self._file = open(path, "wb")
+        self._fileSize = 0
+
+#------------------------------------------------------------------------------
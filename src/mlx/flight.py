@@ -456,17 +456,20 @@ class Flight(object):
         faultID as a unique ID for the given kind of fault. If another fault of
         this ID has been reported earlier, it will be reported again only if
         the score is greater than last time. This ID can be, e.g. the checker
-        the report comes from."""
-        id = self.logger.fault(faultID, timestamp, what, score,
-                               updatePrevious = updatePrevious,
-                               updateID = updateID)
-        self._gui.setRating(self.logger.getRating())
-        return id
+        the report comes from.
+
+        The logger notifies the GUI if the rating changes."""
+        return self.logger.fault(faultID, timestamp, what, score,
+                                 updatePrevious = updatePrevious,
+                                 updateID = updateID)
 
     def handleNoGo(self, faultID, timestamp, what, shortReason):
-        """Handle a No-Go fault."""
-        self.logger.noGo(faultID, timestamp, what)
+        """Handle a No-Go fault.
+
+        The GUI is notified of the No-Go condition before the logger notifies
+        it of the rating changing due to the fault."""
         self._gui.setNoGo(shortReason)
+        self.logger.noGo(faultID, timestamp, what)
 
     def setRTOState(self, state):
         """Set the state that might be used as the RTO state.
@@ -490,7 +493,6 @@ class Flight(object):
                 self.logger.clearFault(self._rtoLogEntryID,
                                        "RTO at %d knots" %
                                        (self._rtoState.groundSpeed,))
-                self._gui.setRating(self.logger.getRating())
                 if self._stage == const.STAGE_PUSHANDTAXI:
                     self.setStage(self.aircraft.state.timestamp,
                                   const.STAGE_RTO)
@@ -1,6 +1,7 @@
 
 from . import const
 from .sound import startSound
+from .clock import getClock
 
 import os
 
@@ -8,7 +9,6 @@ from . import fsuipc
 from . import xplane
 
 import threading
-import time
 
 #-------------------------------------------------------------------------------
 
@@ -123,13 +123,13 @@ class MessageThread(threading.Thread):
         while True:
             (messageType, text, duration, disconnect) = (None, None, None, None)
             with self._requestCondition:
-                now = time.time()
+                now = getClock().time()
                 while not self._toQuit and \
                       ((self._nextMessageTime is not None and \
                         self._nextMessageTime>now) or \
                        not self._messages):
-                    self._requestCondition.wait(1)
-                    now = time.time()
+                    getClock().wait(self._requestCondition, 1)
+                    now = getClock().time()
 
                 if self._toQuit: return
                 if self._nextMessageTime is None or \
@@ -162,7 +162,7 @@ class MessageThread(threading.Thread):
                                             duration = duration)
         elif disconnect:
             self._simulator.disconnect()
-        self._nextMessageTime = time.time() + duration
+        self._nextMessageTime = getClock().time() + duration
 
 #-------------------------------------------------------------------------------
 
@@ -189,6 +189,114 @@ def sendMessage(messageType, text, duration = 3, disconnect = False):
 
 #-------------------------------------------------------------------------------
 
+## The monitoring period in seconds on the ground while not moving and in
+## the air, when not in one of the more specific situations below
+MONITORING_PERIOD_DEFAULT = 1.0
+
+## The monitoring period in seconds in a stable cruise
+MONITORING_PERIOD_CRUISE = 4.0
+
+## The monitoring period in seconds during taxiing
+MONITORING_PERIOD_TAXI = 0.25
+
+## The monitoring period in seconds during takeoff, as well as during the
+## landing and go-around stages below MONITORING_FAST_ALTITUDE
+MONITORING_PERIOD_FAST = 0.1
+
+## The radio altitude in feet below which the monitoring period is
+## MONITORING_PERIOD_FAST during landing and go-around
+MONITORING_FAST_ALTITUDE = 2000.0
+
+## The maximal vertical speed in feet/min for the cruise to be considered
+## stable
+MONITORING_CRUISE_MAX_VS = 500.0
+
+def getMonitoringPeriod(stage, aircraftState):
+    """Get the period of the monitoring of the aircraft for the given flight
+    stage and aircraft state.
+
+    The aircraft is monitored more frequently in the stages where the scoring
+    depends on the finer details, and less frequently in a stable cruise. The
+    checkers work with the timestamps of the aircraft states, so they are not
+    affected by the actual period."""
+    if stage==const.STAGE_TAKEOFF:
+        return MONITORING_PERIOD_FAST
+    elif stage in [const.STAGE_LANDING, const.STAGE_GOAROUND]:
+        return MONITORING_PERIOD_FAST \
+               if aircraftState.onTheGround or \
+                  aircraftState.radioAltitude<MONITORING_FAST_ALTITUDE \
+               else MONITORING_PERIOD_DEFAULT
+    elif stage in [const.STAGE_PUSHANDTAXI, const.STAGE_RTO,
+                   const.STAGE_TAXIAFTERLAND]:
+        return MONITORING_PERIOD_TAXI
+    elif stage==const.STAGE_CRUISE and not aircraftState.onTheGround and \
+         abs(aircraftState.vs)<MONITORING_CRUISE_MAX_VS:
+        return MONITORING_PERIOD_CRUISE
+    else:
+        return MONITORING_PERIOD_DEFAULT
+
+#-------------------------------------------------------------------------------
+
+## The minimal period in seconds of reading the slow monitoring data, see
+## const.MONITORING_TIER_SLOW
+MONITORING_PERIOD_SLOW = 2.0
+
+#-------------------------------------------------------------------------------
+
+class MonitoringData(object):
+    """The monitoring data of an aircraft model merged from the results of
+    the reads of the different tiers.
+
+    It can be indexed (and sliced) like the result of a single read of all
+    the monitoring data, and it returns the latest value of each item."""
+    def __init__(self, data, tiers):
+        """Construct the monitoring data for the given data specification and
+        the list of the tiers of the individual items."""
+        self._locations = []
+        self._tierData = {}
+        for (item, tier) in zip(data, tiers):
+            tierData = self._tierData.setdefault(tier, [])
+            self._locations.append((tier, len(tierData)))
+            tierData.append(item)
+
+        self._values = {}
+
+    @property
+    def tierData(self):
+        """Get a dictionary of the data specifications of the individual
+        tiers."""
+        return self._tierData
+
+    @property
+    def complete(self):
+        """Determine if the values have been received for all tiers."""
+        return len(self._values)==len(self._tierData)
+
+    def update(self, tier, values):
+        """Update the values of the given tier with the given result of a
+        read."""
+        self._values[tier] = values
+
+    def getString(self, index):
+        """Get the item with the given index as a string, if the values
+        support that."""
+        (tier, tierIndex) = self._locations[index]
+        return self._values[tier].getString(tierIndex)
+
+    def __len__(self):
+        """Get the number of the items."""
+        return len(self._locations)
+
+    def __getitem__(self, index):
+        """Get the item(s) with the given index or slice."""
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        (tier, tierIndex) = self._locations[index]
+        return self._values[tier][tierIndex]
+
+#-------------------------------------------------------------------------------
+
 class AircraftState(object):
     """Base class for the aircraft state produced by the aircraft model based
     on readings from the simulator.
@@ -302,4 +410,36 @@ class AircraftState(object):
     - antiIceOn: a boolean value indicating if some anti-ice system is turned
       on. It may be None, if the state of the anti-ice system cannot be read
       reliably
+
+    The following data member is set by the aircraft models:
+    - changeMask: a set of the names of the data members the values of
+      which differ from those in the previous state produced by the same
+      aircraft model, or None, if this is not known (e.g. for the first
+      state). The checkers may skip their work if the values they are
+      interested in have not changed, see hasChanged().
     """
+    ## The default change mask indicating that anything may have changed
+    changeMask = None
+
+    def computeChangeMask(self, previousState):
+        """Compute the change mask of this state with respect to the given
+        previous state, which may be None."""
+        if previousState is None:
+            self.changeMask = None
+        else:
+            previousValues = previousState.__dict__
+            changeMask = {name for (name, value) in self.__dict__.items()
+                          if previousValues.get(name)!=value}
+            changeMask.discard("timestamp")
+            self.changeMask = changeMask
+
+    def hasChanged(self, *attrNames):
+        """Determine if any of the data members with the given names may
+        have changed since the previous state."""
+        changeMask = self.changeMask
+        if changeMask is None:
+            return True
+        for attrName in attrNames:
+            if attrName in changeMask:
+                return True
+        return False
@@ -3,7 +3,10 @@ from . import fs
 from . import const
 from . import util
 from . import acft
+from . import telemetry
 from .watchdog import Watchdog
+from .scheduler import Scheduler, getNextFire
+from .clock import getClock
 
 import threading
 import os
@@ -12,9 +15,13 @@ import calendar
 import sys
 import codecs
 import math
+import re
 from functools import total_ordering
 
-if os.name == "nt" and "FORCE_PYUIPC_SIM" not in os.environ:
+if "FORCE_PYUIPC_REPLAY" in os.environ:
+    from . import pyuipc_replay as pyuipc
+    pyuipc.load(os.environ["FORCE_PYUIPC_REPLAY"])
+elif os.name == "nt" and "FORCE_PYUIPC_SIM" not in os.environ:
     import pyuipc
 else:
     from . import pyuipc_sim as pyuipc
@@ -120,13 +127,19 @@ class Handler(threading.Thread):
     CONNECT_INTERVAL = 0.25
 
     @staticmethod
-    def _performRead(data, callback, extra, validator, unimportant = False):
+    def _performRead(data, callback, extra, validator, unimportant = False,
+                     preparedData = None, recorder = None):
         """Perform a read request.
 
         If there is a validator, that will be called with the return values,
         and if the values are wrong, the request is retried at most a certain
         number of times.
 
+        If preparedData is not None, it is the result of preparing data,
+        which is then read instead of data.
+
+        If recorder is not None, the values read are recorded by it.
+
         Return True if the request has succeeded, False if validation has
         failed during all attempts. An exception may also be thrown if there is
         some lower-level communication problem."""
@@ -134,16 +147,16 @@ class Handler(threading.Thread):
         while attemptsLeft>0:
             exception = None
             try:
-                values = pyuipc.read(data)
+                values = pyuipc.read(data if preparedData is None
+                                     else preparedData)
+                if recorder is not None:
+                    recorder.record(data, values)
             except TypeError as e:
                 exception = e
 
-            failed = True
-            if (exception is None or unimportant) and \
-               (validator is None or \
-                Handler._callSafe(lambda: validator(values, extra))):
-                Handler._callSafe(lambda: callback(values, extra))
-                failed = False
+            failed = not ((exception is None or unimportant) and
+                          Handler._handleValues(values, callback, extra,
+                                                validator))
 
             if exception is not None:
                 raise exception
@@ -154,6 +167,19 @@ class Handler(threading.Thread):
                 return True
         return False
 
+    @staticmethod
+    def _handleValues(values, callback, extra, validator):
+        """Validate the given values read and if they are OK, call the
+        callback with them.
+
+        Return a boolean indicating if the values were valid."""
+        if validator is None or \
+           Handler._callSafe(lambda: validator(values, extra)):
+            Handler._callSafe(lambda: callback(values, extra))
+            return True
+        else:
+            return False
+
     class Request(object):
         """A simple, one-shot request."""
         def __init__(self, forWrite, data, callback, extra,
@@ -166,9 +192,36 @@ class Handler(threading.Thread):
             self._validator = validator
             self.unimportant = unimportant
 
-        def process(self, time):
+        @property
+        def forWrite(self):
+            """Determine if the request is for writing."""
+            return self._forWrite
+
+        @property
+        def data(self):
+            """Get the data of the request."""
+            return self._data
+
+        @property
+        def requeued(self):
+            """Get the list of requests to put back into the queue if the
+            connection is to be re-established after this request has
+            failed."""
+            return [self]
+
+        def handleValues(self, values, time):
+            """Handle the given values read for this request as part of a
+            batch.
+
+            Return a boolean indicating if the values were valid."""
+            return Handler._handleValues(values, self._callback,
+                                         self._extra, self._validator)
+
+        def process(self, time, recorder):
             """Process the request.
 
+            If recorder is not None, the values read are recorded by it.
+
             Return True if the request has succeeded, False if data validation
             has failed for a reading request. An exception may also be thrown
             if there is some lower-level communication problem."""
@@ -190,7 +243,8 @@ class Handler(threading.Thread):
             else:
                 return Handler._performRead(self._data, self._callback,
                                             self._extra, self._validator,
-                                            self.unimportant)
+                                            self.unimportant,
+                                            recorder = recorder)
 
         def fail(self):
             """Handle the failure of this request."""
@@ -206,7 +260,8 @@ class Handler(threading.Thread):
             """Construct the periodic request."""
             self._id = id
             self._period = period
-            self._nextFire = time.time()
+            self._firstFire = getClock().time()
+            self._nextFire = self._firstFire
             self._data = data
             self._preparedData = None
             self._callback = callback
@@ -223,13 +278,42 @@ class Handler(threading.Thread):
             """Get the next firing time."""
             return self._nextFire
 
-        def process(self, time):
+        @property
+        def data(self):
+            """Get the data of the request."""
+            return self._data
+
+        @property
+        def requeued(self):
+            """Get the list of requests to put back into the queue if the
+            connection is to be re-established after this request has
+            failed.
+
+            Periodic requests are never put into the queue."""
+            return []
+
+        def handleValues(self, values, time):
+            """Handle the given values read for this request as part of a
+            batch.
+
+            If the values are valid, the request is rescheduled.
+
+            Return a boolean indicating if the values were valid."""
+            isOK = Handler._handleValues(values, self._callback,
+                                         self._extra, self._validator)
+            if isOK:
+                self._reschedule(time)
+            return isOK
+
+        def process(self, time, recorder):
             """Check if this request should be executed, and if so, do so.
 
             time is the time at which the request is being executed. If this
             function is called too early, nothing is done, and True is
             returned.
 
+            If recorder is not None, the values read are recorded by it.
+
             Return True if the request has succeeded, False if data validation
             has failed. An exception may also be thrown if there is some
             lower-level communication problem."""
@@ -238,14 +322,14 @@ class Handler(threading.Thread):
 
             if self._preparedData is None:
                 self._preparedData = pyuipc.prepare_data(self._data)
-                self._data = None
 
-            isOK = Handler._performRead(self._preparedData, self._callback,
-                                        self._extra, self._validator)
+            isOK = Handler._performRead(self._data, self._callback,
+                                        self._extra, self._validator,
+                                        preparedData = self._preparedData,
+                                        recorder = recorder)
 
             if isOK:
-                while self._nextFire <= time:
-                    self._nextFire += self._period
+                self._reschedule(time)
 
             return isOK
 
@@ -253,6 +337,20 @@ class Handler(threading.Thread):
             """Handle the failure of this request."""
             pass
 
+        def setPeriod(self, period):
+            """Set the period of the request.
+
+            The new period takes effect from the next firing of the
+            request."""
+            self._firstFire = self._nextFire
+            self._period = period
+
+        def _reschedule(self, time):
+            """Calculate the next firing time after the given time."""
+            if self._nextFire <= time:
+                self._nextFire = getNextFire(self._firstFire, self._period,
+                                             time)
+
         def __eq__(self, other):
             """Equality comparison by the firing times"""
             return self._nextFire == other._nextFire
@@ -265,6 +363,105 @@ class Handler(threading.Thread):
             """Less-than comparison by the firing times"""
             return self._nextFire < other._nextFire
 
+    class BatchRequest(object):
+        """A batch of read requests executed by a single read.
+
+        The data of the requests are concatenated and read at once, then the
+        values are distributed among the requests, which validate them and
+        call their callbacks."""
+        def __init__(self, requests, preparedBatches):
+            """Construct the batch of the given requests.
+
+            preparedBatches is a dictionary of the prepared data of batches
+            consisting of periodic requests only. It is keyed by the tuple of
+            the IDs of the requests."""
+            self._requests = requests
+            self._preparedBatches = preparedBatches
+            self.unimportant = False
+
+        @property
+        def requeued(self):
+            """Get the list of requests to put back into the queue if the
+            connection is to be re-established after this batch has
+            failed.
+
+            These are the one-shot requests that have not succeeded yet."""
+            requeued = []
+            for request in self._requests:
+                requeued += request.requeued
+            return requeued
+
+        def process(self, time, recorder):
+            """Process the requests.
+
+            If the values of some of the requests are invalid, only those
+            requests are read again, at most a certain number of times.
+
+            If recorder is not None, the values read are recorded by it.
+
+            Return True if all requests have succeeded, False if data
+            validation has failed for some of them during all attempts. An
+            exception may also be thrown if there is some lower-level
+            communication problem."""
+            (data, preparedData) = self._getPreparedData()
+
+            attemptsLeft = Handler.NUM_READATTEMPTS
+            while self._requests and attemptsLeft>0:
+                if data is None:
+                    data = preparedData = self._getData()
+
+                values = pyuipc.read(preparedData)
+                if recorder is not None:
+                    recorder.record(data, values)
+                data = preparedData = None
+
+                failedRequests = []
+                index = 0
+                for request in self._requests:
+                    length = len(request.data)
+                    if not request.handleValues(values[index:index+length],
+                                                time):
+                        failedRequests.append(request)
+                    index += length
+
+                self._requests = failedRequests
+                if failedRequests:
+                    attemptsLeft -= 1
+
+            return not self._requests
+
+        def fail(self):
+            """Handle the failure of this batch."""
+            for request in self._requests:
+                request.fail()
+
+        def _getData(self):
+            """Get the concatenated data of the requests."""
+            data = []
+            for request in self._requests:
+                data += request.data
+            return data
+
+        def _getPreparedData(self):
+            """Get the data and the prepared data for the batch, if it
+            consists of periodic requests only.
+
+            Return a tuple of the data and of the prepared data, or
+            (None, None), if the batch contains other requests too."""
+            for request in self._requests:
+                if not isinstance(request, Handler.PeriodicRequest):
+                    return (None, None)
+
+            self._requests.sort(key = lambda request: request.id)
+            key = tuple([request.id for request in self._requests])
+
+            preparedBatch = self._preparedBatches.get(key)
+            if preparedBatch is None:
+                data = self._getData()
+                preparedBatch = (data, pyuipc.prepare_data(data))
+                self._preparedBatches[key] = preparedBatch
+            return preparedBatch
+
     def __init__(self, connectionListener,
                  connectAttempts = -1, connectInterval = 0.2):
         """Construct the handler with the given connection listener."""
@@ -280,12 +477,27 @@ class Handler(threading.Thread):
 
         self._requests = []
         self._nextPeriodicID = 1
-        self._periodicRequests = []
+        self._scheduler = Scheduler()
+        self._preparedBatches = {}
+
+        self._recorder = None
 
         self._watchdogClient = Watchdog.get().addClient(2.0, "fsuipc.Handler")
 
         self.daemon = True
 
+    @property
+    def recorder(self):
+        """Get the recorder of the values read, if any."""
+        return self._recorder
+
+    @recorder.setter
+    def recorder(self, recorder):
+        """Set the recorder of the values read.
+
+        If it is None, the values are not recorded."""
+        self._recorder = recorder
+
     def requestRead(self, data, callback, extra = None, validator = None):
         """Request the reading of some data.
 
@@ -344,17 +556,29 @@ class Handler(threading.Thread):
             self._nextPeriodicID += 1
             request = Handler.PeriodicRequest(id, period, data, callback,
                                               extra, validator)
-            self._periodicRequests.append(request)
+            self._scheduler.add(request)
+            self._preparedBatches = {}
             self._requestCondition.notify()
             return id
 
     def clearPeriodic(self, id):
         """Clear the periodic request with the given ID."""
         with self._requestCondition:
-            for i in range(0, len(self._periodicRequests)):
-                if self._periodicRequests[i].id==id:
-                    del self._periodicRequests[i]
-                    return True
+            if self._scheduler.remove(id):
+                self._preparedBatches = {}
+                return True
+        return False
+
+    def setPeriod(self, id, period):
+        """Set the period of the periodic request with the given ID.
+
+        The new period takes effect from the next execution of the
+        request."""
+        with self._requestCondition:
+            request = self._scheduler.get(id)
+            if request is not None:
+                request.setPeriod(period)
+                return True
         return False
 
     def connect(self):
@@ -416,6 +640,11 @@ class Handler(threading.Thread):
                 description = "(FSUIPC version: 0x%04x, library version: 0x%04x, FS version: %d)" % \
                     (pyuipc.fsuipc_version, pyuipc.lib_version,
                      pyuipc.fs_version)
+                recorder = self._recorder
+                if recorder is not None:
+                    recorder.setInfo({"fsuipcVersion": pyuipc.fsuipc_version,
+                                      "libVersion": pyuipc.lib_version,
+                                      "fsVersion": pyuipc.fs_version})
                 if not autoReconnection:
                     fsType = const.SIM_MSFS2020 \
                              if (pyuipc.fs_version == pyuipc.SIM_FS2020) \
@@ -437,7 +666,7 @@ class Handler(threading.Thread):
                       util.utf2unicode(str(e)) + \
                       " (attempts: %d)" % (attempts,))
                 if attempts<self.NUM_CONNECTATTEMPTS:
-                    time.sleep(self.CONNECT_INTERVAL)
+                    getClock().sleep(self.CONNECT_INTERVAL)
 
     def _handleConnection(self):
         """Handle a living connection."""
@@ -454,15 +683,15 @@ class Handler(threading.Thread):
         Should be called with the request condition lock held."""
         while self._connectionRequested:
             timeout = None
-            if self._periodicRequests:
-                self._periodicRequests.sort()
-                timeout = self._periodicRequests[0].nextFire - time.time()
+            nextFire = self._scheduler.nextFire
+            if nextFire is not None:
+                timeout = nextFire - getClock().time()
 
             if self._requests or \
                (timeout is not None and timeout <= 0.0):
                 return
 
-            self._requestCondition.wait(timeout)
+            getClock().wait(self._requestCondition, timeout)
 
     def _disconnect(self):
         """Disconnect from the flight simulator."""
@@ -490,7 +719,7 @@ class Handler(threading.Thread):
         try:
             self._watchdogClient.set()
             try:
-                if not request.process(time):
+                if not request.process(time, self._recorder):
                     print("fsuipc.Handler._processRequest: FSUIPC returned invalid data too many times, reconnecting")
                     needReconnect = True
             except TypeError as e:
@@ -506,9 +735,10 @@ class Handler(threading.Thread):
                 needReconnect = True
 
             if needReconnect:
-                if time is None:
+                requeued = request.requeued
+                if requeued:
                     with self._requestCondition:
-                        self._requests.insert(0, request)
+                        self._requests[0:0] = requeued
                 self._disconnect()
                 return self._connect(autoReconnection = True, attempts = attempts)
             else:
@@ -520,25 +750,36 @@ class Handler(threading.Thread):
     def _processRequests(self):
         """Process any pending requests.
 
+        The periodic requests that are due and the one-shot read requests
+        preceding the first write request are merged into a batch, so that
+        they are executed by a single read.
+
         Will be called with the request lock held."""
         attempts = 0
-        while self._connectionRequested and self._periodicRequests:
-            self._periodicRequests.sort()
-            request = self._periodicRequests[0]
-
-            t = time.time()
-
-            if request.nextFire>t:
+        while self._connectionRequested:
+            t = getClock().time()
+
+            periodicRequests = self._scheduler.popDue(t)
+            requests = periodicRequests[:]
+            while self._requests and not self._requests[0].forWrite:
+                requests.append(self._requests[0])
+                del self._requests[0]
+
+            if requests:
+                request = requests[0] if len(requests)==1 else \
+                          Handler.BatchRequest(requests,
+                                               self._preparedBatches)
+                attempts = self._processRequest(request, t, attempts)
+                for request in periodicRequests:
+                    self._scheduler.reschedule(request)
+            elif self._requests:
+                request = self._requests[0]
+                del self._requests[0]
+
+                attempts = self._processRequest(request, None, attempts)
+            else:
                 break
 
-            attempts = self._processRequest(request, t, attempts)
-
-        while self._connectionRequested and self._requests:
-            request = self._requests[0]
-            del self._requests[0]
-
-            attempts = self._processRequest(request, None, attempts)
-
         return self._connectionRequested
 
 #------------------------------------------------------------------------------
@@ -642,9 +883,11 @@ class Simulator(object):
         self._nextSyncTime = -1
 
         self._normalRequestID = None
+        self._slowRequestID = None
 
         self._monitoringRequested = False
         self._monitoring = False
+        self._monitoringPeriod = fs.MONITORING_PERIOD_DEFAULT
 
         self._aircraftName = None
         self._aircraftModel = None
@@ -686,6 +929,22 @@ class Simulator(object):
         handler."""
         self._handler.connect()
 
+    def startRecording(self, path):
+        """Start recording the raw data read from the simulator into the
+        telemetry file with the given path.
+
+        If a recording is in progress, it is stopped first."""
+        self.stopRecording()
+        self._handler.recorder = telemetry.Recorder(path, "fsuipc")
+
+    def stopRecording(self):
+        """Stop recording the raw data read from the simulator, if a recording
+        is in progress."""
+        recorder = self._handler.recorder
+        if recorder is not None:
+            self._handler.recorder = None
+            recorder.close()
+
     def requestZFW(self, callback):
         """Send a request for the ZFW."""
         self._handler.requestRead([(0x3bfc, "d")], self._handleZFW, extra = callback)
@@ -879,6 +1138,7 @@ class Simulator(object):
     def _startDefaultNormal(self):
         """Start the default normal periodic request."""
         assert self._normalRequestID is None
+        self._monitoringPeriod = fs.MONITORING_PERIOD_DEFAULT
         self._normalRequestID = \
              self._handler.requestPeriodicRead(1.0,
                                                Simulator.normalData,
@@ -890,6 +1150,9 @@ class Simulator(object):
         assert self._normalRequestID is not None
         self._handler.clearPeriodic(self._normalRequestID)
         self._normalRequestID = None
+        if self._slowRequestID is not None:
+            self._handler.clearPeriodic(self._slowRequestID)
+            self._slowRequestID = None
         self._monitoring = False
 
     def _validateNormal(self, data, extra):
@@ -901,10 +1164,18 @@ class Simulator(object):
 
         At the beginning the result consists the data for normalData. When
         monitoring is started, it contains the result also for the
-        aircraft-specific values.
+        fast aircraft-specific values, and extra is the fs.MonitoringData
+        object the values of the other tiers are merged with.
         """
+        if extra is not None:
+            extra.update(const.MONITORING_TIER_FAST, data)
+
         timestamp = Simulator._getTimestamp(data)
 
+        recorder = self._handler.recorder
+        if recorder is not None:
+            recorder.simTime = timestamp
+
         aircraftName = str(data[5], "iso-8859-1")
         aircraftPath = str(data[6], "iso-8859-1")
 
@@ -922,14 +1193,29 @@ class Simulator(object):
             self._stopNormal()
             self._startDefaultNormal()
         elif self._monitoring and self._aircraftModel is not None and \
-             not createdNewModel:
-            aircraftState = self._aircraftModel.getAircraftState(self._aircraft,
-                                                                 timestamp, data)
+             not createdNewModel and extra is not None and extra.complete:
+            aircraftState = \
+                self._aircraftModel.getNextAircraftState(self._aircraft,
+                                                         timestamp, extra)
 
             self._checkTimeSync(aircraftState)
 
             self._aircraft.handleState(aircraftState)
 
+            self._updateMonitoringPeriod(aircraftState)
+
+    def _updateMonitoringPeriod(self, aircraftState):
+        """Update the period of the monitoring request according to the
+        current flight stage and the given aircraft state."""
+        period = fs.getMonitoringPeriod(self._aircraft.flight.stage,
+                                        aircraftState)
+        if period!=self._monitoringPeriod:
+            self._monitoringPeriod = period
+            self._handler.setPeriod(self._normalRequestID, period)
+            if self._slowRequestID is not None:
+                self._handler.setPeriod(self._slowRequestID,
+                                        max(fs.MONITORING_PERIOD_SLOW, period))
+
     def _checkTimeSync(self, aircraftState):
         """Check if we need to synchronize the FS time."""
         if not self._syncTime or aircraftState.paused or \
@@ -937,7 +1223,7 @@ class Simulator(object):
             self._nextSyncTime = -1
             return
 
-        now = time.time()
+        now = getClock().time()
         seconds = time.gmtime(now).tm_sec
 
         if seconds>30 and seconds<59:
@@ -1004,16 +1290,61 @@ class Simulator(object):
             self._startMonitoring()
 
     def _startMonitoring(self):
-        """Start monitoring with the current aircraft model."""
+        """Start monitoring with the current aircraft model.
+
+        The fast tier of the monitoring data is read with the normal request,
+        the slow tier with a separate, less frequent periodic request, while
+        the static tier is read only once."""
         data = Simulator.normalData[:]
         self._aircraftModel.addMonitoringData(data, self._fsType)
+        self._aircraftModel.compileStateDecoder()
+
+        monitoringData = \
+            fs.MonitoringData(data,
+                              [self._aircraftModel.getMonitoringTier(i)
+                               for i in range(0, len(data))])
+        tierData = monitoringData.tierData
 
         self._normalRequestID = \
-            self._handler.requestPeriodicRead(1.0, data,
+            self._handler.requestPeriodicRead(self._monitoringPeriod,
+                                              tierData[const.MONITORING_TIER_FAST],
                                               self._handleNormal,
+                                              extra = monitoringData,
                                               validator = self._validateNormal)
+
+        if const.MONITORING_TIER_SLOW in tierData:
+            self._slowRequestID = \
+                self._handler.requestPeriodicRead(
+                    max(fs.MONITORING_PERIOD_SLOW, self._monitoringPeriod),
+                    tierData[const.MONITORING_TIER_SLOW],
+                    self._handleMonitoringTier,
+                    extra = (const.MONITORING_TIER_SLOW, monitoringData))
+
+        if const.MONITORING_TIER_STATIC in tierData:
+            self._requestStaticMonitoringData(monitoringData)
+
         self._monitoring = True
 
+    def _requestStaticMonitoringData(self, monitoringData):
+        """Request the reading of the static tier of the given monitoring
+        data."""
+        self._handler.requestRead(
+            monitoringData.tierData[const.MONITORING_TIER_STATIC],
+            self._handleMonitoringTier,
+            extra = (const.MONITORING_TIER_STATIC, monitoringData))
+
+    def _handleMonitoringTier(self, data, extra):
+        """Handle the reply to the request of a non-fast tier of the
+        monitoring data.
+
+        If the reading of the static tier has failed, it is requested
+        again."""
+        (tier, monitoringData) = extra
+        if data is not None:
+            monitoringData.update(tier, data)
+        elif tier==const.MONITORING_TIER_STATIC:
+            self._requestStaticMonitoringData(monitoringData)
+
     def _addFlareRate(self, data):
         """Append a flare rate to the list of last rates."""
         if len(self._flareRates)>=3:
@@ -1024,7 +1355,7 @@ class Simulator(object):
         """Handle the first stage of flare monitoring."""
         #self._aircraft.logger.debug("handleFlare1: " + str(data))
         if Handler.fsuipc2radioAltitude(data[1])<=50.0:
-            self._flareStart = time.time()
+            self._flareStart = getClock().time()
             self._flareStartFS = data[0]
             self._handler.clearPeriodic(self._flareRequestID)
             self._flareRequestID = \
@@ -1051,7 +1382,7 @@ class Simulator(object):
         """Handle the first stage of flare monitoring."""
         #self._aircraft.logger.debug("handleFlare2: " + str(data))
         if data[1]!=0:
-            flareEnd = time.time()
+            flareEnd = getClock().time()
             self._handler.clearPeriodic(self._flareRequestID)
             self._flareRequestID = None
 
@@ -1223,7 +1554,11 @@ class AircraftModel(object):
     """Base class for the aircraft models.
 
     Aircraft models handle the data arriving from FSUIPC and turn it into an
-    object describing the aircraft's state."""
+    object describing the aircraft's state.
+
+    The monitoring data items belong to one of the tiers (see
+    const.MONITORING_TIER_XXX), which are read with different periods. The
+    items are in the fast tier, unless specified otherwise."""
     monitoringData = [("paused", 0x0264, "H"),
                       ("latitude", 0x0560, "l"),
                       ("longitude", 0x0568, "l"),
@@ -1233,8 +1568,9 @@ class AircraftModel(object):
                       ("overspeed", 0x036d, "b"),
                       ("stalled", 0x036c, "b"),
                       ("onTheGround", 0x0366, "H"),
-                      ("zfw", 0x3bfc, "d"),
-                      ("grossWeight", 0x30c0, "f"),
+                      ("zfw", 0x3bfc, "d", const.MONITORING_TIER_SLOW),
+                      ("grossWeight", 0x30c0, "f",
+                       const.MONITORING_TIER_SLOW),
                       ("heading", 0x0580, "d"),
                       ("pitch", 0x0578, "d"),
                       ("bank", 0x057c, "d"),
@@ -1250,7 +1586,8 @@ class AircraftModel(object):
                       ("flapsLeft", 0x0be0, "d"),
                       ("flapsRight", 0x0be4, "d"),
                       ("flapsAxis", 0x3414, "H"),
-                      ("flapsIncrement", 0x3bfa, "H"),
+                      ("flapsIncrement", 0x3bfa, "H",
+                       const.MONITORING_TIER_STATIC),
                       ("lights", 0x0d0c, "H"),
                       ("pitot", 0x029c, "b"),
                       ("parking", 0x0bc8, "H"),
@@ -1258,32 +1595,40 @@ class AircraftModel(object):
                       ("noseGear", 0x0bec, "d"),
                       ("spoilersArmed", 0x0bcc, "d"),
                       ("spoilers", 0x0bd0, "d"),
-                      ("altimeter", 0x0330, "H"),
-                      ("qnh", 0x0ec6, "H"),
-                      ("nav1", 0x0350, "H"),
-                      ("nav1_obs", 0x0c4e, "H"),
-                      ("nav2", 0x0352, "H"),
-                      ("nav2_obs", 0x0c5e, "H"),
-                      ("adf1_main", 0x034c, "H"),
-                      ("adf1_ext", 0x0356, "H"),
-                      ("adf2_main", 0x02d4, "H"),
-                      ("adf2_ext", 0x02d6, "H"),
-                      ("squawk", 0x0354, "H"),
-                      ("windSpeed", 0x0e90, "H"),
-                      ("windDirection", 0x0e92, "H"),
-                      ("visibility", 0x0e8a, "H"),
-                      ("cog", 0x2ef8, "f"),
-                      ("xpdrC", 0x7b91, "b"),
-                      ("apMaster", 0x07bc, "d"),
-                      ("apHeadingHold", 0x07c8, "d"),
-                      ("apHeading", 0x07cc, "H"),
-                      ("apAltitudeHold", 0x07d0, "d"),
-                      ("apAltitude", 0x07d4, "u"),
+                      ("altimeter", 0x0330, "H", const.MONITORING_TIER_SLOW),
+                      ("qnh", 0x0ec6, "H", const.MONITORING_TIER_SLOW),
+                      ("nav1", 0x0350, "H", const.MONITORING_TIER_SLOW),
+                      ("nav1_obs", 0x0c4e, "H", const.MONITORING_TIER_SLOW),
+                      ("nav2", 0x0352, "H", const.MONITORING_TIER_SLOW),
+                      ("nav2_obs", 0x0c5e, "H", const.MONITORING_TIER_SLOW),
+                      ("adf1_main", 0x034c, "H", const.MONITORING_TIER_SLOW),
+                      ("adf1_ext", 0x0356, "H", const.MONITORING_TIER_SLOW),
+                      ("adf2_main", 0x02d4, "H", const.MONITORING_TIER_SLOW),
+                      ("adf2_ext", 0x02d6, "H", const.MONITORING_TIER_SLOW),
+                      ("squawk", 0x0354, "H", const.MONITORING_TIER_SLOW),
+                      ("windSpeed", 0x0e90, "H", const.MONITORING_TIER_SLOW),
+                      ("windDirection", 0x0e92, "H",
+                       const.MONITORING_TIER_SLOW),
+                      ("visibility", 0x0e8a, "H", const.MONITORING_TIER_SLOW),
+                      ("cog", 0x2ef8, "f", const.MONITORING_TIER_SLOW),
+                      ("xpdrC", 0x7b91, "b", const.MONITORING_TIER_SLOW),
+                      ("apMaster", 0x07bc, "d", const.MONITORING_TIER_SLOW),
+                      ("apHeadingHold", 0x07c8, "d",
+                       const.MONITORING_TIER_SLOW),
+                      ("apHeading", 0x07cc, "H", const.MONITORING_TIER_SLOW),
+                      ("apAltitudeHold", 0x07d0, "d",
+                       const.MONITORING_TIER_SLOW),
+                      ("apAltitude", 0x07d4, "u", const.MONITORING_TIER_SLOW),
                       ("elevatorTrim", 0x2ea0, "f"),
-                      ("eng1DeIce", 0x08b2, "H"),
-                      ("eng2DeIce", 0x094a, "H"),
-                      ("propDeIce", 0x337c, "b"),
-                      ("structDeIce", 0x337d, "b")]
+                      ("eng1DeIce", 0x08b2, "H", const.MONITORING_TIER_SLOW),
+                      ("eng2DeIce", 0x094a, "H", const.MONITORING_TIER_SLOW),
+                      ("propDeIce", 0x337c, "b", const.MONITORING_TIER_SLOW),
+                      ("structDeIce", 0x337d, "b",
+                       const.MONITORING_TIER_SLOW)]
+
+    ## The pattern of the references to the monitoring data items in the
+    ## expressions of the state fields
+    _stateFieldItemPattern = re.compile(r"\{(\w+)\}")
 
     specialModels = []
 
@@ -1345,6 +1690,12 @@ class AircraftModel(object):
         self._xpdrReliable = False
         self._flapsSet = -1
         self._fsType = None
+        self._monitoringTiers = {}
+        self._values = None
+        self._lastValues = None
+        self._lastState = None
+        self._decodedValues = {}
+        self._decodeState = None
 
     @property
     def name(self):
@@ -1361,12 +1712,22 @@ class AircraftModel(object):
         This default implementation returns False."""
         return False
 
-    def _addOffsetWithIndexMember(self, dest, offset, type, attrName = None):
+    def getMonitoringTier(self, index):
+        """Get the tier of the monitoring data item with the given index."""
+        return self._monitoringTiers.get(index, const.MONITORING_TIER_FAST)
+
+    def _addOffsetWithIndexMember(self, dest, offset, type, attrName = None,
+                                  tier = const.MONITORING_TIER_FAST):
         """Add the given FSUIPC offset and type to the given array and a member
-        attribute with the given name."""
+        attribute with the given name.
+
+        If the offset is added to the monitoring data, tier is the monitoring
+        tier it belongs to."""
         dest.append((offset, type))
         if attrName is not None:
             setattr(self, attrName, len(dest)-1)
+        if tier!=const.MONITORING_TIER_FAST:
+            self._monitoringTiers[len(dest)-1] = tier
 
     def _addDataWithIndexMembers(self, dest, prefix, data):
         """Add FSUIPC data to the given array and also corresponding index
@@ -1378,151 +1739,239 @@ class AircraftModel(object):
         - the FSUIPC offset
         - the FSUIPC type
 
-        The latter two items will be appended to dest."""
-        for (name, offset, type) in data:
-            self._addOffsetWithIndexMember(dest, offset, type, prefix + name)
+        The latter two items will be appended to dest. A fourth item may also
+        be given, which is the monitoring tier of the data item."""
+        for item in data:
+            (name, offset, type) = item[:3]
+            tier = item[3] if len(item)>3 else const.MONITORING_TIER_FAST
+            self._addOffsetWithIndexMember(dest, offset, type, prefix + name,
+                                           tier = tier)
 
     def addMonitoringData(self, data, fsType):
         """Add the model-specific monitoring data to the given array."""
+        self._monitoringTiers = {}
+        self._lastValues = None
+        self._lastState = None
+        self._decodedValues = {}
+        self._decodeState = None
         self._addDataWithIndexMembers(data, "_monidx_",
                                       AircraftModel.monitoringData)
 
-    def getAircraftState(self, aircraft, timestamp, data):
-        """Get an aircraft state object for the given monitoring data."""
-        state = fs.AircraftState()
-
-        state.timestamp = timestamp
-
-        state.latitude = data[self._monidx_latitude] * \
-                         90.0 / 10001750.0 / 65536.0 / 65536.0
-
-        state.longitude = data[self._monidx_longitude] * \
-                          360.0 / 65536.0 / 65536.0 / 65536.0 / 65536.0
-        if state.longitude>180.0: state.longitude = 360.0 - state.longitude
-
-        state.paused = data[self._monidx_paused]!=0 or \
-            data[self._monidx_frozen]!=0 or \
-            data[self._monidx_replay]!=0
-        state.trickMode = data[self._monidx_slew]!=0
-
-        state.overspeed = data[self._monidx_overspeed]!=0
-        state.stalled = data[self._monidx_stalled]!=0
-        state.onTheGround = data[self._monidx_onTheGround]!=0
-
-        state.zfw = data[self._monidx_zfw] * const.LBSTOKG / 256.0
-        state.grossWeight = data[self._monidx_grossWeight] * const.LBSTOKG
+    def getNextAircraftState(self, aircraft, timestamp, data):
+        """Get the aircraft state for the given monitoring data following the
+        state returned by the previous call.
 
-        state.heading = Handler.fsuipc2PositiveDegrees(data[self._monidx_heading])
+        The data items the decoding of which is expensive are compared to
+        those of the previous call, and if they are unchanged, the values
+        decoded from them are reused by getAircraftState() (see
+        _getStateFields()). The change mask of the state is also set."""
+        self._values = values = data[:]
+        try:
+            state = self.getAircraftState(aircraft, timestamp, data)
+        finally:
+            self._values = None
 
-        state.pitch = Handler.fsuipc2Degrees(data[self._monidx_pitch])
-        state.bank = Handler.fsuipc2Degrees(data[self._monidx_bank])
+        state.computeChangeMask(self._lastState)
 
-        state.ias = Handler.fsuipc2IAS(data[self._monidx_ias])
-        state.mach = data[self._monidx_mach] / 20480.0
-        state.groundSpeed = data[self._monidx_groundSpeed]* 3600.0/65536.0/1852.0
-        state.vs = Handler.fsuipc2VS(data[self._monidx_vs])
+        self._lastValues = values
+        self._lastState = state
 
-        state.radioAltitude = \
-            Handler.fsuipc2radioAltitude(data[self._monidx_radioAltitude])
-        if self._fsType==const.SIM_MSFS2020:
-            state.altitude = data[self._monidx_msfs2020Altitude]
-        else:
-            state.altitude = data[self._monidx_altitude]/const.FEETTOMETRES/65536.0/65536.0
-
-        state.gLoad = data[self._monidx_gLoad] / 625.0
+        return state
 
+    def compileStateDecoder(self):
+        """Compile the decoder of the aircraft state from the descriptions of
+        the fields returned by _getStateFields().
+
+        The decoder is a function, in which the monitoring data items are
+        accessed with the indices they have with the current monitoring
+        data, so it should be compiled after the monitoring data is added."""
+        lines = ["def decodeState(self, aircraft, state, data):",
+                 "    values = self._values",
+                 "    lastValues = self._lastValues",
+                 "    decodedValues = self._decodedValues",
+                 "    decodeAll = values is None or lastValues is None"]
+
+        for field in self._getStateFields():
+            (attrName, expression) = field[:2]
+            cached = len(field)>2 and field[2]
+
+            indices = []
+            def substituteIndex(match):
+                name = match.group(1)
+                index = getattr(self, name if name.startswith("_")
+                                else "_monidx_" + name)
+                indices.append(index)
+                return "data[%d]" % (index,)
+            expression = AircraftModel._stateFieldItemPattern. \
+                         sub(substituteIndex, expression)
+
+            if isinstance(attrName, tuple):
+                target = "(" + ", ".join(["state." + name
+                                          for name in attrName]) + ")"
+            else:
+                target = "state." + attrName
+
+            if cached:
+                key = repr(attrName)
+                lines.append("    if decodeAll or " +
+                             " or ".join(["values[%d]!=lastValues[%d]" %
+                                          (index, index)
+                                          for index in indices]) + ":")
+                lines.append("        decodedValues[%s] = %s" %
+                             (key, expression))
+                lines.append("    %s = decodedValues[%s]" % (target, key))
+            else:
+                lines.append("    %s = %s" % (target, expression))
+
+        namespace = { "const" : const, "math" : math,
+                      "Handler" : Handler, "AircraftModel" : AircraftModel }
+        exec(compile("\n".join(lines) + "\n",
+                     "<state decoder of %s>" % (self.name,), "exec"),
+             namespace)
+        self._decodeState = namespace["decodeState"]
+
+    def _getStateFields(self):
+        """Get the descriptions of the fields of the aircraft state decoded
+        from the monitoring data.
+
+        It is a list of tuples of the following items:
+        - the name of the attribute of the state, or a tuple of such names, if
+        the value is a tuple to be unpacked into several attributes,
+        - a Python expression of the value. The monitoring data items can be
+        referred to by the names of their index member variables enclosed in
+        braces, where the _monidx_ prefix may be omitted. The expression may
+        also refer to the data, the state containing the attributes of the
+        preceding fields, the aircraft, the model as self, and const, math,
+        Handler and AircraftModel,
+        - optionally a boolean indicating if the value should be cached, i.e.
+        decoded only if some of the data items referred to have changed. It
+        is worth setting only for the expensive conversions.
+
+        The fields are decoded in the order of the list, so a child class can
+        override an attribute by appending a field for it, possibly referring
+        to its value set earlier."""
+        return [("latitude",
+                 "{latitude} * 90.0 / 10001750.0 / 65536.0 / 65536.0"),
+                ("longitude",
+                 "{longitude} * 360.0 / 65536.0 / 65536.0 / 65536.0 / 65536.0"),
+                ("longitude",
+                 "360.0 - state.longitude if state.longitude>180.0 "
+                 "else state.longitude"),
+                ("paused", "{paused}!=0 or {frozen}!=0 or {replay}!=0"),
+                ("trickMode", "{slew}!=0"),
+                ("overspeed", "{overspeed}!=0"),
+                ("stalled", "{stalled}!=0"),
+                ("onTheGround", "{onTheGround}!=0"),
+                ("zfw", "{zfw} * const.LBSTOKG / 256.0"),
+                ("grossWeight", "{grossWeight} * const.LBSTOKG"),
+                ("heading", "Handler.fsuipc2PositiveDegrees({heading})"),
+                ("pitch", "Handler.fsuipc2Degrees({pitch})"),
+                ("bank", "Handler.fsuipc2Degrees({bank})"),
+                ("ias", "Handler.fsuipc2IAS({ias})"),
+                ("mach", "{mach} / 20480.0"),
+                ("groundSpeed", "{groundSpeed}* 3600.0/65536.0/1852.0"),
+                ("vs", "Handler.fsuipc2VS({vs})"),
+                ("radioAltitude",
+                 "Handler.fsuipc2radioAltitude({radioAltitude})"),
+                ("altitude",
+                 "{msfs2020Altitude}" if self._fsType==const.SIM_MSFS2020
+                 else "{altitude}/const.FEETTOMETRES/65536.0/65536.0"),
+                ("gLoad", "{gLoad} / 625.0"),
+                ("flapsSet", "self._getFlapsSet({flapsControl})", True),
+                ("flaps", "self._flapsNotches[-1]*{flapsLeft}/16383.0"),
+                ("navLightsOn", "({lights}&0x01) != 0"),
+                ("antiCollisionLightsOn", "({lights}&0x02) != 0"),
+                ("landingLightsOn", "({lights}&0x04) != 0"),
+                ("strobeLightsOn", "({lights}&0x10) != 0"),
+                ("pitotHeatOn", "{pitot}!=0"),
+                ("parking", "{parking}!=0"),
+                ("gearControlDown", "{gearControl}==16383"),
+                ("gearsDown", "{noseGear}==16383"),
+                ("spoilersArmed", "{spoilersArmed}!=0"),
+                ("spoilersExtension",
+                 "0.0 if {spoilers}<=4800 "
+                 "else ({spoilers} - 4800) * 100.0 / (16383 - 4800)"),
+                ("altimeter", "{altimeter} / 16.0"),
+                ("altimeterReliable", "True"),
+                ("qnh", "{qnh} / 16.0"),
+                ("ils", "None"),
+                ("ils_obs", "None"),
+                ("ils_manual", "False"),
+                ("nav1", "AircraftModel.convertFrequency({nav1})", True),
+                ("nav1_obs", "{nav1_obs}"),
+                ("nav1_manual", "True"),
+                ("nav2", "AircraftModel.convertFrequency({nav2})", True),
+                ("nav2_obs", "{nav2_obs}"),
+                ("nav2_manual", "True"),
+                ("adf1",
+                 "AircraftModel.convertADFFrequency({adf1_main}, {adf1_ext})",
+                 True),
+                ("adf2",
+                 "AircraftModel.convertADFFrequency({adf2_main}, {adf2_ext})",
+                 True),
+                ("squawk", "AircraftModel.convertBCD({squawk}, 4)", True),
+                ("windSpeed", "{windSpeed}"),
+                ("windDirection", "{windDirection}*360.0/65536.0"),
+                ("windDirection",
+                 "state.windDirection + 360.0 if state.windDirection<0.0 "
+                 "else state.windDirection"),
+                ("visibility", "{visibility}*1609.344/100.0"),
+                ("cog", "{cog}"),
+                ("xpdrC", "self._getXPDRC({xpdrC})"),
+                ("autoXPDR", "False"),
+                ("apMaster", "{apMaster}!=0"),
+                ("apHeadingHold", "{apHeadingHold}!=0"),
+                ("apHeading", "{apHeading} * 360.0 / 65536.0"),
+                ("apAltitudeHold", "{apAltitudeHold}!=0"),
+                ("apAltitude", "{apAltitude} / const.FEETTOMETRES / 65536.0"),
+                ("elevatorTrim", "{elevatorTrim} * 180.0 / math.pi"),
+                ("antiIceOn",
+                 "{eng1DeIce}!=0 or {eng2DeIce}!=0 or "
+                 "{propDeIce}!=0 or {structDeIce}!=0")]
+
+    def _getFlapsSet(self, flapsControl):
+        """Get the flaps setting for the given flaps control value."""
         numNotchesM1 = len(self._flapsNotches) - 1
         flapsIncrement = 16383 // numNotchesM1
-        flapsControl = data[self._monidx_flapsControl]
         flapsIndex = flapsControl // flapsIncrement
         if flapsIndex < numNotchesM1:
             if (flapsControl - (flapsIndex*flapsIncrement) >
                 (flapsIndex+1)*flapsIncrement - flapsControl):
                 flapsIndex += 1
-        state.flapsSet = self._flapsNotches[flapsIndex]
-        if state.flapsSet != self._flapsSet:
-            print("flapsControl: %d, flapsLeft: %d, flapsRight: %d, flapsAxis: %d, flapsIncrement: %d, flapsSet: %d, numNotchesM1: %d" % \
-                  (flapsControl, data[self._monidx_flapsLeft],
-                   data[self._monidx_flapsRight], data[self._monidx_flapsAxis],
-                   data[self._monidx_flapsIncrement], state.flapsSet, numNotchesM1))
-            self._flapsSet = state.flapsSet
+        return self._flapsNotches[flapsIndex]
 
-        flapsLeft = data[self._monidx_flapsLeft]
-        state.flaps = self._flapsNotches[-1]*flapsLeft/16383.0
+    def _getXPDRC(self, xpdrC):
+        """Get whether the transponder is in mode C for the given value.
 
-        lights = data[self._monidx_lights]
-
-        state.navLightsOn = (lights&0x01) != 0
-        state.antiCollisionLightsOn = (lights&0x02) != 0
-        state.landingLightsOn = (lights&0x04) != 0
-        state.strobeLightsOn = (lights&0x10) != 0
-
-        state.pitotHeatOn = data[self._monidx_pitot]!=0
-
-        state.parking = data[self._monidx_parking]!=0
-
-        state.gearControlDown = data[self._monidx_gearControl]==16383
-        state.gearsDown = data[self._monidx_noseGear]==16383
+        The value is considered reliable only after it has once been
+        different from 0."""
+        if not self._xpdrReliable:
+            self._xpdrReliable = xpdrC!=0
 
-        state.spoilersArmed = data[self._monidx_spoilersArmed]!=0
+        return xpdrC!=1 if self._xpdrReliable else None
 
-        spoilers = data[self._monidx_spoilers]
-        if spoilers<=4800:
-            state.spoilersExtension = 0.0
-        else:
-            state.spoilersExtension = (spoilers - 4800) * 100.0 / (16383 - 4800)
-
-        state.altimeter = data[self._monidx_altimeter] / 16.0
-        state.altimeterReliable = True
-        state.qnh = data[self._monidx_qnh] / 16.0
-
-        state.ils = None
-        state.ils_obs = None
-        state.ils_manual = False
-        state.nav1 = AircraftModel.convertFrequency(data[self._monidx_nav1])
-        state.nav1_obs = data[self._monidx_nav1_obs]
-        state.nav1_manual = True
-        state.nav2 = AircraftModel.convertFrequency(data[self._monidx_nav2])
-        state.nav2_obs = data[self._monidx_nav2_obs]
-        state.nav2_manual = True
-        state.adf1 = \
-            AircraftModel.convertADFFrequency(data[self._monidx_adf1_main],
-                                              data[self._monidx_adf1_ext])
-        state.adf2 = \
-            AircraftModel.convertADFFrequency(data[self._monidx_adf2_main],
-                                              data[self._monidx_adf2_ext])
-
-        state.squawk = AircraftModel.convertBCD(data[self._monidx_squawk], 4)
-
-        state.windSpeed = data[self._monidx_windSpeed]
-        state.windDirection = data[self._monidx_windDirection]*360.0/65536.0
-        if state.windDirection<0.0: state.windDirection += 360.0
-
-        state.visibility = data[self._monidx_visibility]*1609.344/100.0
-
-        state.cog = data[self._monidx_cog]
-
-        if not self._xpdrReliable:
-            self._xpdrReliable = data[self._monidx_xpdrC]!=0
+    def getAircraftState(self, aircraft, timestamp, data):
+        """Get an aircraft state object for the given monitoring data.
 
-        state.xpdrC = data[self._monidx_xpdrC]!=1 \
-                      if self._xpdrReliable else None
-        state.autoXPDR = False
+        The state is decoded by the decoder compiled by
+        compileStateDecoder(). It is compiled now, if it has not been
+        compiled yet."""
+        if self._decodeState is None:
+            self.compileStateDecoder()
 
-        state.apMaster = data[self._monidx_apMaster]!=0
-        state.apHeadingHold = data[self._monidx_apHeadingHold]!=0
-        state.apHeading = data[self._monidx_apHeading] * 360.0 / 65536.0
-        state.apAltitudeHold = data[self._monidx_apAltitudeHold]!=0
-        state.apAltitude = data[self._monidx_apAltitude] / \
-                           const.FEETTOMETRES / 65536.0
+        state = fs.AircraftState()
 
+        state.timestamp = timestamp
 
-        state.elevatorTrim = data[self._monidx_elevatorTrim] * 180.0 / math.pi
+        self._decodeState(self, aircraft, state, data)
 
-        state.antiIceOn = data[self._monidx_eng1DeIce]!=0 or \
-                          data[self._monidx_eng2DeIce]!=0 or \
-                          data[self._monidx_propDeIce]!=0 or \
-                          data[self._monidx_structDeIce]!=0
+        if state.flapsSet != self._flapsSet:
+            print("flapsControl: %d, flapsLeft: %d, flapsRight: %d, flapsAxis: %d, flapsIncrement: %d, flapsSet: %d, numNotchesM1: %d" % \
+                  (data[self._monidx_flapsControl], data[self._monidx_flapsLeft],
+                   data[self._monidx_flapsRight], data[self._monidx_flapsAxis],
+                   data[self._monidx_flapsIncrement], state.flapsSet,
+                   len(self._flapsNotches) - 1))
+            self._flapsSet = state.flapsSet
 
         return state
 
@@ -1563,7 +2012,8 @@ class GenericAircraftModel(AircraftModel):
         """Add the model-specific monitoring data to the given array."""
         super(GenericAircraftModel, self).addMonitoringData(data, fsType)
 
-        self._fuelStartIndex = self._addFuelOffsets(data, "_monidx_fuelWeight")
+        self._fuelStartIndex = self._addFuelOffsets(data, "_monidx_fuelWeight",
+                                                    forMonitoring = True)
 
         self._engineStartIndex = len(data)
         for i in range(0, self._numEngines):
@@ -1574,34 +2024,36 @@ class GenericAircraftModel(AircraftModel):
                 self._addOffsetWithIndexMember(data, 0x0898 + i * 0x98, "H")  # RPM
                 self._addOffsetWithIndexMember(data, 0x08c8 + i * 0x98, "H")  # RPM scaler
 
-    def getAircraftState(self, aircraft, timestamp, data):
-        """Get the aircraft state.
-
-        Get it from the parent, and then add the data about the fuel levels and
-        the engine parameters."""
-        state = super(GenericAircraftModel, self).getAircraftState(aircraft,
-                                                                   timestamp,
-                                                                   data)
-
-        (state.fuel, state.totalFuel) = \
-            self._convertFuelData(data, index = self._monidx_fuelWeight)
+    def _getStateFields(self):
+        """Get the descriptions of the fields of the aircraft state.
 
-        state.n1 = [] if self._isN1 else None
-        state.rpm = None if self._isN1 else []
+        Get them from the parent, and then add the fields of the fuel levels
+        and of the engine parameters."""
         itemsPerEngine = 2 if self._isN1 else 3
+        engineIndices = range(self._engineStartIndex,
+                              self._engineStartIndex +
+                              itemsPerEngine*self._numEngines,
+                              itemsPerEngine)
+
+        fields = [(("fuel", "totalFuel"),
+                   "self._convertFuelData(data, index = %d)" %
+                   (self._monidx_fuelWeight,))]
+        if self._isN1:
+            fields.append(("n1", "[" + ", ".join(["data[%d]" % (i+1,)
+                                                  for i in engineIndices]) +
+                           "]"))
+            fields.append(("rpm", "None"))
+        else:
+            fields.append(("n1", "None"))
+            fields.append(("rpm",
+                           "[" + ", ".join(["data[%d] * data[%d]/65536.0" %
+                                            (i+1, i+2)
+                                            for i in engineIndices]) + "]"))
+        fields.append(("reverser", "[" + ", ".join(["data[%d]<0" % (i,)
+                                                    for i in engineIndices]) +
+                       "]"))
 
-        state.reverser = []
-        for i in range(self._engineStartIndex,
-                       self._engineStartIndex +
-                       itemsPerEngine*self._numEngines,
-                       itemsPerEngine):
-            state.reverser.append(data[i]<0)
-            if self._isN1:
-                state.n1.append(data[i+1])
-            else:
-                state.rpm.append(data[i+1] * data[i+2]/65536.0)
-
-        return state
+        return super(GenericAircraftModel, self)._getStateFields() + fields
 
     def getFuel(self, handler, callback):
         """Get the fuel information for this model.
@@ -1628,20 +2080,33 @@ class GenericAircraftModel(AircraftModel):
 
         handler.requestWrite(data, self._handleFuelWritten)
 
-    def _addFuelOffsets(self, data, weightIndexName = None):
+    def _addFuelOffsets(self, data, weightIndexName = None,
+                        forMonitoring = False):
         """Add the fuel offsets to the given data array.
 
         If weightIndexName is not None, it will be the name of the
         fuel weight index.
 
+        If forMonitoring is True, the offsets are added to the monitoring
+        data, and so their tiers are set: the levels are slow, the fuel weight
+        and the capacities are static.
+
         Returns the index of the first fuel tank's data."""
-        self._addOffsetWithIndexMember(data, 0x0af4, "H", weightIndexName)
+        (levelTier, staticTier) = \
+            (const.MONITORING_TIER_SLOW, const.MONITORING_TIER_STATIC) \
+            if forMonitoring else \
+            (const.MONITORING_TIER_FAST, const.MONITORING_TIER_FAST)
+
+        self._addOffsetWithIndexMember(data, 0x0af4, "H", weightIndexName,
+                                       tier = staticTier)
 
         fuelStartIndex = len(data)
         for tank in self._fuelTanks:
             offset = _tank2offset[tank]
-            self._addOffsetWithIndexMember(data, offset, "u")    # tank level
-            self._addOffsetWithIndexMember(data, offset+4, "u")  # tank capacity
+            self._addOffsetWithIndexMember(data, offset, "u",    # tank level
+                                           tier = levelTier)
+            self._addOffsetWithIndexMember(data, offset+4, "u",  # tank capacity
+                                           tier = staticTier)
 
         return fuelStartIndex
 
@@ -1763,82 +2228,109 @@ class PMDGBoeing737NGModel(B737Model):
         """Add the model-specific monitoring data to the given array."""
         super(PMDGBoeing737NGModel, self).addMonitoringData(data, fsType)
 
+        slow = const.MONITORING_TIER_SLOW
+
         if fsType==const.SIM_MSFSX or fsType==const.SIM_P3D or fsType==const.SIM_MSFS2020:
             print("%s detected, adding PMDG 737 NGX-specific offsets" % \
                   ("FSX" if fsType==const.SIM_MSFSX else
                    "P3D" if fsType==const.SIM_P3D else "MSFS 2020",))
             self._addOffsetWithIndexMember(data, 0x6500, "b",
-                                           "_pmdgidx_lts_positionsw")
-            self._addOffsetWithIndexMember(data, 0x6545, "b", "_pmdgidx_cmda")
-            self._addOffsetWithIndexMember(data, 0x653f, "b", "_pmdgidx_aphdgsel")
-            self._addOffsetWithIndexMember(data, 0x6543, "b", "_pmdgidx_apalthold")
-            self._addOffsetWithIndexMember(data, 0x652c, "H", "_pmdgidx_aphdg")
-            self._addOffsetWithIndexMember(data, 0x652e, "H", "_pmdgidx_apalt")
+                                           "_pmdgidx_lts_positionsw",
+                                           tier = slow)
+            self._addOffsetWithIndexMember(data, 0x6545, "b", "_pmdgidx_cmda",
+                                           tier = slow)
+            self._addOffsetWithIndexMember(data, 0x653f, "b", "_pmdgidx_aphdgsel",
+                                           tier = slow)
+            self._addOffsetWithIndexMember(data, 0x6543, "b", "_pmdgidx_apalthold",
+                                           tier = slow)
+            self._addOffsetWithIndexMember(data, 0x652c, "H", "_pmdgidx_aphdg",
+                                           tier = slow)
+            self._addOffsetWithIndexMember(data, 0x652e, "H", "_pmdgidx_apalt",
+                                           tier = slow)
             if fsType==const.SIM_MSFS2020:
-                self._addOffsetWithIndexMember(data, 0x0b46, "b", "_pmdgidx_xpdr")
+                self._addOffsetWithIndexMember(data, 0x0b46, "b",
+                                               "_pmdgidx_xpdr", tier = slow)
             else:
-                self._addOffsetWithIndexMember(data, 0x65cd, "b", "_pmdgidx_xpdr")
+                self._addOffsetWithIndexMember(data, 0x65cd, "b",
+                                               "_pmdgidx_xpdr", tier = slow)
         else:
             print("FS9 detected, adding PMDG 737 NG-specific offsets")
-            self._addOffsetWithIndexMember(data, 0x6202, "b", "_pmdgidx_switches")
-            self._addOffsetWithIndexMember(data, 0x6216, "b", "_pmdgidx_xpdr")
-            self._addOffsetWithIndexMember(data, 0x6227, "b", "_pmdgidx_ap")
-            self._addOffsetWithIndexMember(data, 0x6228, "b", "_pmdgidx_aphdgsel")
-            self._addOffsetWithIndexMember(data, 0x622a, "b", "_pmdgidx_apalthold")
-            self._addOffsetWithIndexMember(data, 0x622c, "H", "_pmdgidx_aphdg")
-            self._addOffsetWithIndexMember(data, 0x622e, "H", "_pmdgidx_apalt")
+            self._addOffsetWithIndexMember(data, 0x6202, "b", "_pmdgidx_switches",
+                                           tier = slow)
+            self._addOffsetWithIndexMember(data, 0x6216, "b", "_pmdgidx_xpdr",
+                                           tier = slow)
+            self._addOffsetWithIndexMember(data, 0x6227, "b", "_pmdgidx_ap",
+                                           tier = slow)
+            self._addOffsetWithIndexMember(data, 0x6228, "b", "_pmdgidx_aphdgsel",
+                                           tier = slow)
+            self._addOffsetWithIndexMember(data, 0x622a, "b", "_pmdgidx_apalthold",
+                                           tier = slow)
+            self._addOffsetWithIndexMember(data, 0x622c, "H", "_pmdgidx_aphdg",
+                                           tier = slow)
+            self._addOffsetWithIndexMember(data, 0x622e, "H", "_pmdgidx_apalt",
+                                           tier = slow)
 
     def getAircraftState(self, aircraft, timestamp, data):
         """Get the aircraft state.
 
-        Get it from the parent, and then check some PMDG-specific stuff."""
+        Get it from the parent, and then log the changes of the gear
+        values."""
         state = super(PMDGBoeing737NGModel, self).getAircraftState(aircraft,
                                                                    timestamp,
                                                                    data)
 
+        gearControl = data[self._monidx_gearControl]
+        noseGear = data[self._monidx_noseGear]
+
+        if gearControl!=self._lastGearControl or noseGear!=self._lastNoseGear:
+            print("gearControl:", gearControl, " noseGear:", noseGear)
+            self._lastGearControl = gearControl
+            self._lastNoseGear = noseGear
+
+        return state
+
+    def _getStateFields(self):
+        """Get the descriptions of the fields of the aircraft state.
+
+        Get them from the parent, and then add some PMDG-specific stuff."""
+        fields = []
+
         fsType = self._fsType
         if fsType==const.SIM_MSFSX or fsType==const.SIM_P3D or \
            fsType==const.SIM_MSFS2020:
-            state.apMaster = data[self._pmdgidx_cmda]!=0
-            state.apHeadingHold = data[self._pmdgidx_aphdgsel]!=0
-            state.apAltitudeHold = data[self._pmdgidx_apalthold]!=0
+            fields += [("apMaster", "{_pmdgidx_cmda}!=0"),
+                       ("apHeadingHold", "{_pmdgidx_aphdgsel}!=0"),
+                       ("apAltitudeHold", "{_pmdgidx_apalthold}!=0")]
 
-            # state.strobeLightsOn = data[self._pmdgidx_lts_positionsw]==0x02
-            # state.xpdrC = data[self._pmdgidx_xpdr]==4
+            # fields += [("strobeLightsOn", "{_pmdgidx_lts_positionsw}==0x02"),
+            #            ("xpdrC", "{_pmdgidx_xpdr}==4")]
             if fsType==const.SIM_MSFS2020:
-                state.xpdrC = data[self._pmdgidx_xpdr]==4
+                fields.append(("xpdrC", "{_pmdgidx_xpdr}==4"))
             else:
-                state.strobeLightsOn = None
-                state.xpdrC = None
+                fields += [("strobeLightsOn", "None"),
+                           ("xpdrC", "None")]
         else:
-            if data[self._pmdgidx_switches]&0x01==0x01:
-                state.altimeter = 1013.25
-            state.apMaster = data[self._pmdgidx_ap]&0x02==0x02
-            state.apHeadingHold = data[self._pmdgidx_aphdgsel]==2
-            apalthold = data[self._pmdgidx_apalthold]
-            state.apAltitudeHold = apalthold>=3 and apalthold<=6
-            state.xpdrC = data[self._pmdgidx_xpdr]==4
+            fields += [("altimeter",
+                        "1013.25 if {_pmdgidx_switches}&0x01==0x01 "
+                        "else state.altimeter"),
+                       ("apMaster", "{_pmdgidx_ap}&0x02==0x02"),
+                       ("apHeadingHold", "{_pmdgidx_aphdgsel}==2"),
+                       ("apAltitudeHold",
+                        "{_pmdgidx_apalthold}>=3 and {_pmdgidx_apalthold}<=6"),
+                       ("xpdrC", "{_pmdgidx_xpdr}==4")]
 
             # Uncomment the following to test the speed-based takeoff
-            # state.strobeLightsOn = None
-            # state.xpdrC = None
-
-        state.apHeading = data[self._pmdgidx_aphdg]
-        state.apAltitude = data[self._pmdgidx_apalt]
-
-        gearControl = data[self._monidx_gearControl]
-        noseGear = data[self._monidx_noseGear]
+            # fields += [("strobeLightsOn", "None"),
+            #            ("xpdrC", "None")]
 
-        if gearControl!=self._lastGearControl or noseGear!=self._lastNoseGear:
-            print("gearControl:", gearControl, " noseGear:", noseGear)
-            self._lastGearControl = gearControl
-            self._lastNoseGear = noseGear
+        fields += [("apHeading", "{_pmdgidx_aphdg}"),
+                   ("apAltitude", "{_pmdgidx_apalt}")]
 
         if fsType==const.SIM_MSFS2020:
             # N1 goes down very slowly, so we hasten it a bit
-            state.n1 = [0 if n1<4.0 else n1 for n1 in state.n1]
+            fields.append(("n1", "[0 if n1<4.0 else n1 for n1 in state.n1]"))
 
-        return state
+        return super(PMDGBoeing737NGModel, self)._getStateFields() + fields
 
 #------------------------------------------------------------------------------
 
@@ -1900,19 +2392,16 @@ class DreamwingsDH8DModel(DH8DModel):
         """Add the model-specific monitoring data to the given array."""
         super(DreamwingsDH8DModel, self).addMonitoringData(data, fsType)
 
-        self._addOffsetWithIndexMember(data, 0x132c, "d", "_dwdh8d_navgps")
+        self._addOffsetWithIndexMember(data, 0x132c, "d", "_dwdh8d_navgps",
+                                       tier = const.MONITORING_TIER_SLOW)
 
-    def getAircraftState(self, aircraft, timestamp, data):
-        """Get the aircraft state.
-
-        Get it from the parent, and then invert the pitot heat state."""
-        state = super(DreamwingsDH8DModel, self).getAircraftState(aircraft,
-                                                                  timestamp,
-                                                                  data)
-        if data[self._dwdh8d_navgps]==1:
-            state.apHeading = None
+    def _getStateFields(self):
+        """Get the descriptions of the fields of the aircraft state.
 
-        return state
+        Get them from the parent, and then clear the AP heading if the
+        navigation is controlled by the GPS."""
+        return super(DreamwingsDH8DModel, self)._getStateFields() + \
+            [("apHeading", "None if {_dwdh8d_navgps}==1 else state.apHeading")]
 
 #------------------------------------------------------------------------------
 
@@ -1933,29 +2422,22 @@ class MajesticDH8DModel(DH8DModel):
         """Get the name for this aircraft model."""
         return "FSUIPC/Majestic Bombardier Dash 8-Q400"
 
-    def getAircraftState(self, aircraft, timestamp, data):
-        """Get the aircraft state.
-
-        Get it from the parent, and then clear the anti-collision and landing
-        lights."""
-        state = super(MajesticDH8DModel, self).getAircraftState(aircraft,
-                                                                timestamp,
-                                                                data)
-        state.antiCollisionLightsOn = None
-        state.strobeLightsOn = None
-        state.pitotHeatOn = None
-
-        # G-load seems to be offset by -1.0 (i.e a value of 0 seem to mean
-        # a G-load of 1.0)
-        state.gLoad += 1.0
-
-        # None of the gear values seem to work correctly
-        state.gearsDown = state.gearControlDown
-
-        # Th N1 values cannot be read either
-        state.n1 = [None, None]
-
-        return state
+    def _getStateFields(self):
+        """Get the descriptions of the fields of the aircraft state.
+
+        Get them from the parent, and then clear the anti-collision and
+        landing lights."""
+        return super(MajesticDH8DModel, self)._getStateFields() + \
+            [("antiCollisionLightsOn", "None"),
+             ("strobeLightsOn", "None"),
+             ("pitotHeatOn", "None"),
+             # G-load seems to be offset by -1.0 (i.e a value of 0 seem to
+             # mean a G-load of 1.0)
+             ("gLoad", "state.gLoad + 1.0"),
+             # None of the gear values seem to work correctly
+             ("gearsDown", "state.gearControlDown"),
+             # Th N1 values cannot be read either
+             ("n1", "[None, None]")]
 
 #------------------------------------------------------------------------------
 
@@ -2012,33 +2494,25 @@ class DAF70Model(F70Model):
         """Get the name for this aircraft model."""
         return "FSUIPC/Digital Aviation Fokker 70"
 
-    def getAircraftState(self, aircraft, timestamp, data):
-        """Get the aircraft state.
-
-        Get it from the parent, and then invert the pitot heat state."""
-        state = super(DAF70Model, self).getAircraftState(aircraft,
-                                                         timestamp,
-                                                         data)
-        state.navLightsOn = None
-        state.landingLightsOn = None
-
-        state.altimeterReliable = False
-
-        state.ils = state.nav1
-        state.ils_obs = state.nav1_obs
-        state.ils_manual = state.nav1_manual
-
-        state.nav1 = state.nav2
-        state.nav1_obs = state.nav2_obs
-        state.nav1_manual = aircraft.flight.stage!=const.STAGE_CRUISE
-
-        state.nav2 = None
-        state.nav2_obs = None
-        state.nav2_manual = False
-
-        state.autoXPDR = True
-
-        return state
+    def _getStateFields(self):
+        """Get the descriptions of the fields of the aircraft state.
+
+        Get them from the parent, and then move the NAV1 radio to ILS and the
+        NAV2 radio to NAV1."""
+        return super(DAF70Model, self)._getStateFields() + \
+            [("navLightsOn", "None"),
+             ("landingLightsOn", "None"),
+             ("altimeterReliable", "False"),
+             ("ils", "state.nav1"),
+             ("ils_obs", "state.nav1_obs"),
+             ("ils_manual", "state.nav1_manual"),
+             ("nav1", "state.nav2"),
+             ("nav1_obs", "state.nav2_obs"),
+             ("nav1_manual", "aircraft.flight.stage!=const.STAGE_CRUISE"),
+             ("nav2", "None"),
+             ("nav2_obs", "None"),
+             ("nav2_manual", "False"),
+             ("autoXPDR", "True")]
 
 #------------------------------------------------------------------------------
 
@@ -2175,13 +2649,12 @@ class T154Model(GenericAircraftModel):
         """Get the name for this aircraft model."""
         return "FSUIPC/Generic Tupolev Tu-154"
 
-    def getAircraftState(self, aircraft, timestamp, data):
-        """Get an aircraft state object for the given monitoring data.
+    def _getStateFields(self):
+        """Get the descriptions of the fields of the aircraft state.
 
         This removes the reverser value for the middle engine."""
-        state = super(T154Model, self).getAircraftState(aircraft, timestamp, data)
-        del state.reverser[1]
-        return state
+        return super(T154Model, self)._getStateFields() + \
+            [("reverser", "state.reverser[:1] + state.reverser[2:]")]
 
 #------------------------------------------------------------------------------
 
@@ -2212,16 +2685,16 @@ class PTT154Model(T154Model):
         It only stores the flight simulator type."""
         super(PTT154Model, self).addMonitoringData(data, fsType)
 
-    def getAircraftState(self, aircraft, timestamp, data):
-        """Get an aircraft state object for the given monitoring data.
+    def _getStateFields(self):
+        """Get the descriptions of the fields of the aircraft state.
 
-        This removes the reverser value for the middle engine."""
-        state = super(PTT154Model, self).getAircraftState(aircraft, timestamp, data)
+        This clears the transponder mode C state in FSX and P3D."""
+        fields = super(PTT154Model, self)._getStateFields()
 
         if self._fsType==const.SIM_MSFSX or self._fsType==const.SIM_P3D:
-            state.xpdrC = None
+            fields.append(("xpdrC", "None"))
 
-        return state
+        return fields
 
 
 #------------------------------------------------------------------------------
@@ -2261,13 +2734,12 @@ class B462Model(GenericAircraftModel):
         """Get the name for this aircraft model."""
         return "FSUIPC/Generic British Aerospace 146"
 
-    def getAircraftState(self, aircraft, timestamp, data):
-        """Get an aircraft state object for the given monitoring data.
+    def _getStateFields(self):
+        """Get the descriptions of the fields of the aircraft state.
 
-        This removes the reverser value for the middle engine."""
-        state = super(B462Model, self).getAircraftState(aircraft, timestamp, data)
-        state.reverser = []
-        return state
+        This removes the reverser values."""
+        return super(B462Model, self)._getStateFields() + \
+            [("reverser", "[]")]
 
 #------------------------------------------------------------------------------
 
@@ -38,6 +38,7 @@ from gi.repository import Pango
 gi.require_version("PangoCairo", "1.0")
 from gi.repository import PangoCairo
 from gi.repository import GLib
+from gi.repository import GObject
 
 import codecs
 _utf8Decoder = codecs.getdecoder("utf-8")
@@ -491,6 +492,27 @@ def insertTextBuffer(buffer, iter, text, isFault = False):
 
 #------------------------------------------------------------------------------
 
+def insertTextBufferLines(buffer, iter, lines):
+    """Insert the given lines into the given text buffer at the given iterator.
+
+    The lines are tuples of the text and a boolean indicating if the line is
+    a fault. The text is inserted at once, then the tag named 'fault' is
+    applied to the fault lines, while the tags are removed from the
+    others."""
+    line = iter.get_line()
+
+    buffer.insert(iter, "".join([text for (text, isFault) in lines]))
+
+    buffer.remove_all_tags(buffer.get_iter_at_line(line),
+                           buffer.get_iter_at_line(line + len(lines)))
+    for (index, (text, isFault)) in enumerate(lines):
+        if isFault:
+            buffer.apply_tag_by_name("fault",
+                                     buffer.get_iter_at_line(line + index),
+                                     buffer.get_iter_at_line(line + index + 1))
+
+#------------------------------------------------------------------------------
+
 def askYesNo(question, parent = None, title = WINDOW_TITLE_BASE):
     """Ask a Yes/No question.
 
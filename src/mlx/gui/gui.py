@@ -7,6 +7,7 @@ from .update import Updater
 from mlx.gui.common import *
 from mlx.gui.flight import Wizard
 from mlx.gui.monitor import MonitorWindow
+from mlx.gui.updatequeue import UpdateQueue
 from mlx.gui.weighthelp import WeightHelp
 from mlx.gui.gates import FleetGateStatus
 from mlx.gui.prefs import Preferences
@@ -27,9 +28,11 @@ import mlx.acft as acft
 import mlx.web as web
 import mlx.singleton as singleton
 import mlx.airports as airports
+from mlx.debuglog import DebugLog
 from  mlx.i18n import xstr, getLanguage
 from mlx.pirep import PIREP
 
+import os
 import time
 import threading
 import sys
@@ -75,6 +78,9 @@ class GUI(fs.ConnectionListener):
         self._reconnecting = False
         self._connected = False
         self._logger = logger.Logger(self)
+        self._updateQueue = UpdateQueue(self._applyUpdates,
+                                        GObject.idle_add,
+                                        GObject.timeout_add)
         self._flight = None
         self._simulator = None
         self._fsType = None
@@ -89,9 +95,10 @@ class GUI(fs.ConnectionListener):
         self._updatePlaneStatus = None
         self._updatePlaneGateNumber = None
 
-        self._stdioLock = threading.Lock()
-        self._stdioText = ""
-        self._stdioStartingLine = True
+        self._debugLog = DebugLog(config.debugLogMaxLines,
+                                  config.debugLogFile
+                                  if config.debugLogFile else None)
+        self._debugLogShown = False
 
         self._sendPIREPCallback = None
         self._sendBugReportCallback = None
@@ -659,6 +666,7 @@ class GUI(fs.ConnectionListener):
         self._weightHelp.disable()
         self._notebook.set_current_page(0)
 
+        self._updateQueue.clear()
         self._logView.get_buffer().set_text("")
 
         if self.loggedIn:
@@ -675,6 +683,9 @@ class GUI(fs.ConnectionListener):
         self.stopMonitoring()
         self._clearHotkeys()
 
+        if self._flight is not None and self._flight.simulator is not None:
+            self._flight.simulator.stopRecording()
+
         if self._connected:
             if closingMessage is None:
                 self._flight.simulator.disconnect()
@@ -693,49 +704,60 @@ class GUI(fs.ConnectionListener):
 
     def insertFlightLogLine(self, index, timestampString, text, isFault):
         """Insert the flight log line with the given data."""
-        GObject.idle_add(self._insertFlightLogLine, index,
-                         formatFlightLogLine(timestampString, text),
-                         isFault)
-
-    def _insertFlightLogLine(self, index, line, isFault):
-        """Perform the real insertion.
-
-        To be called from the event loop."""
-        buffer = self._logView.get_buffer()
-        lineIter = buffer.get_iter_at_line(index)
-        insertTextBuffer(buffer, lineIter, line, isFault = isFault)
-        self._logView.scroll_mark_onscreen(buffer.get_insert())
+        self._updateQueue.insertLine(index,
+                                     formatFlightLogLine(timestampString,
+                                                         text),
+                                     isFault)
 
     def removeFlightLogLine(self, index):
         """Remove the flight log line with the given index."""
-        GObject.idle_add(self._removeFlightLogLine, index)
+        self._updateQueue.removeLine(index)
 
     def addFault(self, id, timestampString, text):
         """Add a fault to the list of faults."""
         faultText = formatFlightLogLine(timestampString, text).strip()
-        GObject.idle_add(self._flightInfo.addFault, id, faultText)
+        self._updateQueue.addFault(id, faultText)
 
     def updateFault(self, id, timestampString, text):
         """Update a fault in the list of faults."""
         faultText = formatFlightLogLine(timestampString, text).strip()
-        GObject.idle_add(self._flightInfo.updateFault, id, faultText)
+        self._updateQueue.updateFault(id, faultText)
 
     def clearFault(self, id):
         """Clear a fault in the list of faults."""
-        GObject.idle_add(self._flightInfo.clearFault, id)
-
-    def _removeFlightLogLine(self, index):
-        """Perform the real removal."""
-        buffer = self._logView.get_buffer()
-        startIter = buffer.get_iter_at_line(index)
-        endIter = buffer.get_iter_at_line(index+1)
-        buffer.delete(startIter, endIter)
-        self._logView.scroll_mark_onscreen(buffer.get_insert())
+        self._updateQueue.clearFault(id)
 
     def check(self, flight, aircraft, logger, oldState, state):
         """Update the data."""
-        GObject.idle_add(self._monitorWindow.setData, state)
-        GObject.idle_add(self._statusbar.updateTime, state.timestamp)
+        self._updateQueue.setAircraftState(state)
+
+    def _applyUpdates(self, lineChanges, faultChanges, aircraftState):
+        """Apply the updates drained from the update queue.
+
+        To be called from the event loop."""
+        if lineChanges:
+            buffer = self._logView.get_buffer()
+            for (kind, index, data) in lineChanges:
+                if kind==UpdateQueue.INSERT_LINES:
+                    insertTextBufferLines(buffer,
+                                          buffer.get_iter_at_line(index),
+                                          data)
+                else:
+                    buffer.delete(buffer.get_iter_at_line(index),
+                                  buffer.get_iter_at_line(index + data))
+            self._logView.scroll_mark_onscreen(buffer.get_insert())
+
+        for (kind, id, faultText) in faultChanges:
+            if kind==UpdateQueue.ADD_FAULT:
+                self._flightInfo.addFault(id, faultText)
+            elif kind==UpdateQueue.UPDATE_FAULT:
+                self._flightInfo.updateFault(id, faultText)
+            else:
+                self._flightInfo.clearFault(id)
+
+        if aircraftState is not None:
+            self._monitorWindow.setData(aircraftState)
+            self._statusbar.updateTime(aircraftState.timestamp)
 
     def resetFlightStatus(self):
         """Reset the status of the flight."""
@@ -881,15 +903,15 @@ class GUI(fs.ConnectionListener):
 
     def flushStdIO(self):
         """Flush any text to the standard error that could not be logged."""
-        if self._stdioText and sys.__stderr__ is not None:
-            sys.__stderr__.write(self._stdioText)
+        (text, _) = self._debugLog.process()
+        self._debugLog.close()
+        if text and sys.__stderr__ is not None:
+            sys.__stderr__.write(text)
 
     def writeStdIO(self, text):
         """Write the given text into standard I/O log."""
-        with self._stdioLock:
-            self._stdioText += text
-
-        GObject.idle_add(self._writeStdIO)
+        if self._debugLog.write(text):
+            GObject.idle_add(self._writeStdIO)
 
     def beginBusy(self, message):
         """Begin a period of background processing."""
@@ -1032,35 +1054,20 @@ class GUI(fs.ConnectionListener):
             callback(success)
 
     def _writeStdIO(self):
-        """Perform the real writing."""
-        with self._stdioLock:
-            text = self._stdioText
-            self._stdioText = ""
-        if not text: return
-
-        lines = text.splitlines()
-        if text[-1]=="\n":
-            text = ""
-        else:
-            text = lines[-1]
-            lines = lines[:-1]
-
-        now = datetime.datetime.now()
-        timeStr = "%02d:%02d:%02d: " % (now.hour, now.minute, now.second)
-
-        for line in lines:
-            #print >> sys.__stdout__, line
-            if self._stdioStartingLine:
-                self._writeLog(timeStr, self._debugLogView)
-            self._writeLog(line + "\n", self._debugLogView)
-            self._stdioStartingLine = True
-
-        if text:
-            #print >> sys.__stdout__, text,
-            if self._stdioStartingLine:
-                self._writeLog(timeStr, self._debugLogView)
-            self._writeLog(text, self._debugLogView)
-            self._stdioStartingLine = False
+        """Perform the real writing.
+
+        The text written is processed by the debug log. If the debug log is
+        shown, the new text is appended to its view and the lines dropped
+        from the debug log are removed from the view as well, so the view
+        contains only the lines kept by the debug log."""
+        (text, numDroppedLines) = self._debugLog.process()
+        if not text or not self._debugLogShown: return
+
+        self._writeLog(text, self._debugLogView)
+        if numDroppedLines>0:
+            buffer = self._debugLogView.get_buffer()
+            buffer.delete(buffer.get_start_iter(),
+                          buffer.get_iter_at_line(numDroppedLines))
 
     def connectSimulator(self, bookedFlight, simulatorType):
         """Connect to the simulator for the first time."""
@@ -1087,6 +1094,18 @@ class GUI(fs.ConnectionListener):
         self.beginBusy(xstr("connect_busy"))
         self._statusbar.updateConnection(self._connecting, self._connected)
 
+        telemetryDirectory = self.config.telemetryDirectory
+        if telemetryDirectory is not None:
+            path = os.path.join(telemetryDirectory,
+                                "%s-%s.mlxtlm" %
+                                (bookedFlight.callsign,
+                                 time.strftime("%Y%m%d-%H%M%S")))
+            try:
+                self._simulator.startRecording(path)
+            except Exception as e:
+                print("Failed to start recording the telemetry to %s: %s" %
+                      (path, str(e)), file=sys.stderr)
+
         self._connecting = True
         self._simulator.connect(self._flight.aircraft)
 
@@ -1278,6 +1297,12 @@ class GUI(fs.ConnectionListener):
     def _toggleDebugLog(self, menuItem):
         """Toggle the debug log."""
         if menuItem.get_active():
+            self._debugLog.process()
+            buffer = self._debugLogView.get_buffer()
+            buffer.set_text(self._debugLog.text)
+            self._debugLogView.scroll_mark_onscreen(buffer.get_insert())
+            self._debugLogShown = True
+
             label = Gtk.Label(xstr("tab_debug_log"))
             label.set_use_underline(True)
             label.set_tooltip_text(xstr("tab_debug_log_tooltip"))
@@ -1285,6 +1310,8 @@ class GUI(fs.ConnectionListener):
             self._notebook.set_current_page(self._debugLogPage)
         else:
             self._notebook.remove_page(self._debugLogPage)
+            self._debugLogShown = False
+            self._debugLogView.get_buffer().set_text("")
 
     def _buildLogWidget(self):
         """Build the widget for the log."""
@@ -1775,9 +1802,8 @@ class GUI(fs.ConnectionListener):
         for (timestampString, text) in self._logger.lines:
             flightLog += str(formatFlightLogLine(timestampString, text))
 
-        buffer = self._debugLogView.get_buffer()
-        debugLog = buffer.get_text(buffer.get_start_iter(),
-                                   buffer.get_end_iter(), True)
+        self._writeStdIO()
+        debugLog = self._debugLog.text
 
         self.beginBusy(xstr("sendBugReport_busy"))
         self._sendBugReportCallback = callback
@@ -1,10 +1,8 @@
 
 from mlx.gui.common import *
+from mlx.gui.monitorupdater import MonitorUpdater
 
 import mlx.const as const
-import mlx.util as util
-
-import time
 
 #------------------------------------------------------------------------------
 
@@ -13,7 +11,9 @@ import time
 # The monitoring window
 #
 # The \ref mlx.gui.monitor.MonitorWindow "MonitorWindow" class is a window
-# containing the data received from the simulator by the logger.
+# containing the data received from the simulator by the logger. The widgets
+# are updated through a \ref mlx.gui.monitorupdater.MonitorUpdater
+# "MonitorUpdater".
 
 #------------------------------------------------------------------------------
 
@@ -250,7 +250,20 @@ class MonitorWindow(Gtk.Window):
 
         self.add(alignment)
 
-        self._previousState = None
+        self._setters = []
+        for (name, kind) in MonitorUpdater.FIELDS:
+            widget = getattr(self, "_" + name)
+            self._setters.append(widget.set_text
+                                 if kind==MonitorUpdater.TEXT else
+                                 widget.set_sensitive
+                                 if kind==MonitorUpdater.SENSITIVE else
+                                 widget.set_markup)
+
+        self._updater = MonitorUpdater(self._applyChanges,
+                                       GObject.timeout_add,
+                                       gui.config.monitorUpdateRate)
+        self.connect("map", self._mapped)
+        self.connect("unmap", self._unmapped)
 
         self.setData()
 
@@ -277,166 +290,26 @@ class MonitorWindow(Gtk.Window):
     def setData(self, aircraftState = None):
         """Set the data.
 
-        If aircraftState is None, everything will be set to its default."""
-        if aircraftState is None:
-            self._timestamp.set_text("--:--:--")
-            self._paused.set_sensitive(False)
-            self._trickMode.set_sensitive(False)
-            self._overspeed.set_sensitive(False)
-            self._stalled.set_sensitive(False)
-            self._onTheGround.set_sensitive(False)
-            self._antiIceOn.set_sensitive(False)
-            self._zfw.set_text("-")
-            self._grossWeight.set_text("-")
-            self._heading.set_text("-")
-            self._pitch.set_text("-")
-            self._bank.set_text("-")
-            self._vs.set_text("-")
-            self._ias.set_text("-")
-            self._mach.set_text("-")
-            self._groundSpeed.set_text("-")
-            self._radioAltitude.set_text("-")
-            self._altitude.set_text("-")
-            self._gLoad.set_text("-")
-            self._flapsSet.set_text("-")
-            self._flaps.set_text("-")
-            self._altimeter.set_text("-")
-            self._squawk.set_text("-")
-            self._nav1.set_text("-")
-            self._nav2.set_text("-")
-            self._fuel.set_text("-")
-            self._n1.set_text("-")
-            self._reverser.set_text("-")
-            self._navLightsOn.set_sensitive(False)
-            self._antiCollisionLightsOn.set_sensitive(False)
-            self._strobeLightsOn.set_sensitive(False)
-            self._landingLightsOn.set_text("LANDING")
-            self._landingLightsOn.set_sensitive(False)
-            self._pitotHeatOn.set_sensitive(False)
-            self._parking.set_sensitive(False)
-            self._gearControlDown.set_sensitive(False)
-            self._gearsDown.set_sensitive(False)
-            self._spoilersArmed.set_sensitive(False)
-            self._spoilersExtension.set_text("-")
-            self._windSpeed.set_text("-")
-            self._windDirection.set_text("-")
-            self._position.set_text("-")
-            self._elevatorTrim.set_text("-")
-            self._apMaster.set_sensitive(False)
-            self._apHeadingHold.set_sensitive(False)
-            self._apHeading.set_text("-")
-            self._xpdrC.set_sensitive(False)
-            self._apAltitudeHold.set_sensitive(False)
-            self._apAltitude.set_text("-")
-            self._adf1.set_text("-")
-            self._adf2.set_text("-")
-            self._qnh.set_text("-")
-            self._cog.set_text("-")
-            self._ils.set_text("-")
-            self._crs1.set_text("-")
-            self._crs2.set_text("-")
-            self._crsi.set_text("-")
-        else:
-            self._timestamp.set_text(time.strftime("%H:%M:%S",
-                                                   time.gmtime(aircraftState.timestamp)))
-            self._paused.set_sensitive(aircraftState.paused)
-            self._trickMode.set_sensitive(aircraftState.trickMode)
-            self._overspeed.set_sensitive(aircraftState.overspeed)
-            self._stalled.set_sensitive(aircraftState.stalled)
-            self._onTheGround.set_sensitive(aircraftState.onTheGround)
-            self._antiIceOn.set_sensitive(aircraftState.antiIceOn is True)
-            self._zfw.set_text("%.0f" % (aircraftState.zfw,))
-            self._grossWeight.set_text("%.0f" % (aircraftState.grossWeight,))
-            self._heading.set_text("%03.0f" % (aircraftState.heading,))
-            self._pitch.set_text("%.0f" % (aircraftState.pitch,))
-            self._bank.set_text("%.0f" % (aircraftState.bank,))
-            self._vs.set_text("%.0f (%.0f)" % (aircraftState.vs,
-                                               aircraftState.smoothedVS))
-            self._ias.set_text("%.0f (%.0f)" % (aircraftState.ias,
-                                                aircraftState.smoothedIAS))
-            self._mach.set_text("%.2f" % (aircraftState.mach,))
-            self._groundSpeed.set_text("%.0f" % (aircraftState.groundSpeed,))
-            self._radioAltitude.set_text("%.0f" % (aircraftState.radioAltitude,))
-            self._altitude.set_text("%.0f" % (aircraftState.altitude,))
-            self._gLoad.set_text("%.2f" % (aircraftState.gLoad,))
-            self._flapsSet.set_text("%.0f" % (aircraftState.flapsSet,))
-            self._flaps.set_text("%.0f" % (aircraftState.flaps,))
-            self._altimeter.set_text("%.0f" % (aircraftState.altimeter,))
-            self._squawk.set_text(aircraftState.squawk)
-            self._nav1.set_text("-" if aircraftState.nav1 is None else aircraftState.nav1)
-            self._nav2.set_text("-" if aircraftState.nav2 is None else aircraftState.nav2)
-            self._qnh.set_text("%.0f" % (aircraftState.qnh,))
-
-            fuelStr = ""
-            for (_tank, fuel) in aircraftState.fuel:
-                if fuelStr: fuelStr += ", "
-                fuelStr += "%.0f" % (fuel,)
-            self._fuel.set_text(fuelStr)
-
-            if aircraftState.n1 is not None:
-                n1Str = ""
-                for n1 in aircraftState.n1:
-                    if n1Str: n1Str += ", "
-                    if n1 is None:
-                        n1Str += "?"
-                    else:
-                        n1Str += "%.0f" % (n1,)
-            elif aircraftState.rpm is not None:
-                n1Str = ""
-                for rpm in aircraftState.rpm:
-                    if n1Str: n1Str += ", "
-                    n1Str += "%.0f" % (rpm,)
-            else:
-                n1Str = "-"
-            self._n1.set_text(n1Str)
-
-            reverserStr = ""
-            for reverser in aircraftState.reverser:
-                if reverserStr: reverserStr += ", "
-                reverserStr += "ON" if reverser else "OFF"
-            self._reverser.set_text(reverserStr)
-
-            self._navLightsOn.set_sensitive(aircraftState.navLightsOn is True)
-            self._antiCollisionLightsOn.set_sensitive(aircraftState.antiCollisionLightsOn is True)
-            self._strobeLightsOn.set_sensitive(aircraftState.strobeLightsOn is True)
-
-            if self._previousState is None or \
-               ((self._previousState.landingLightsOn is None)!=
-                (aircraftState.landingLightsOn is None)):
-                if aircraftState.landingLightsOn is None:
-                    self._landingLightsOn.set_markup('<span strikethrough="true">LANDING</span>')
-                else:
-                    self._landingLightsOn.set_text("LANDING")
-            self._landingLightsOn.set_sensitive(aircraftState.landingLightsOn is True)
-
-            self._pitotHeatOn.set_sensitive(aircraftState.pitotHeatOn is True)
-            self._parking.set_sensitive(aircraftState.parking)
-            self._gearControlDown.set_sensitive(aircraftState.gearControlDown)
-            self._gearsDown.set_sensitive(aircraftState.gearsDown)
-            self._spoilersArmed.set_sensitive(aircraftState.spoilersArmed is True)
-            self._spoilersExtension.set_text("%.0f" % (aircraftState.spoilersExtension,))
-            self._windSpeed.set_text("%.0f" % (aircraftState.windSpeed,))
-            self._windDirection.set_text("%03.0f" % (aircraftState.windDirection,))
-            self._position.set_text(util.getCoordinateString((aircraftState.latitude,
-                                                              aircraftState.longitude)))
-            self._elevatorTrim.set_text("%.2f" % (aircraftState.elevatorTrim,))
-            self._apMaster.set_sensitive(aircraftState.apMaster is True)
-            self._apHeadingHold.set_sensitive(aircraftState.apHeadingHold is True)
-            self._apHeading.set_text("-" if aircraftState.apHeading is None
-                                     else "%03.0f" % (aircraftState.apHeading,))
-            self._xpdrC.set_sensitive(aircraftState.xpdrC is True)
-            self._apAltitudeHold.set_sensitive(aircraftState.apAltitudeHold is True)
-            self._apAltitude.set_text("-" if aircraftState.apAltitude is None
-                                      else "%5.0f" % (aircraftState.apAltitude,))
-
-            self._adf1.set_text("-" if aircraftState.adf1 is None else aircraftState.adf1)
-            self._adf2.set_text("-" if aircraftState.adf2 is None else aircraftState.adf2)
-            self._cog.set_text("%.2f%%" % (aircraftState.cog*100.0,))
-
-            self._ils.set_text("-" if aircraftState.ils is None else aircraftState.ils)
-
-            self._crs1.set_text("-" if aircraftState.nav1_obs is None else str(aircraftState.nav1_obs))
-            self._crs2.set_text("-" if aircraftState.nav2_obs is None else str(aircraftState.nav2_obs))
-            self._crsi.set_text("-" if aircraftState.ils_obs is None else str(aircraftState.ils_obs))
+        If aircraftState is None, everything will be set to its default. Only
+        the widgets whose values have changed are updated, and only while
+        the window is visible, at most the configured number of times per
+        second."""
+        self._updater.setData(aircraftState)
+
+    def _mapped(self, window):
+        """Called when the window has been mapped, i.e. it has become
+        visible."""
+        self._updater.setVisible(True)
+
+    def _unmapped(self, window):
+        """Called when the window has been unmapped, i.e. it has been hidden
+        or iconified."""
+        self._updater.setVisible(False)
+
+    def _applyChanges(self, changes):
+        """Apply the given changed values to the widgets."""
+        setters = self._setters
+        for (index, value) in changes:
+            setters[index](value)
 
 #------------------------------------------------------------------------------
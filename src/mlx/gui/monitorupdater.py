@@ -0,0 +1,354 @@
+# The updating of the widgets of the monitor window
+
+#------------------------------------------------------------------------------
+
+import mlx.util as util
+
+import time
+
+#------------------------------------------------------------------------------
+
+## @package mlx.gui.monitorupdater
+#
+# The updating of the widgets of the monitor window.
+#
+# The monitor window displays about 60 values of the aircraft state. Setting
+# the text or the sensitivity of a widget makes the toolkit lay out and
+# redraw it, even if the value has not changed, so the \ref
+# mlx.gui.monitorupdater.MonitorUpdater "MonitorUpdater" keeps the values
+# last rendered and passes only the ones that differ from them to the
+# window. Most of the values (the lights, the autopilot, the radios, the
+# weights) change rarely, so usually only a handful of widgets is touched.
+#
+# The updater renders only while the window is visible: the states received
+# while it is hidden are not rendered, only the latest one is kept and
+# rendered when the window is shown again. The rendering is also throttled to
+# a given number of updates per second: a state received too early after the
+# previous rendering is kept and rendered by a timeout, replaced by any
+# later state received in the meantime. So the work of the toolkit does not
+# grow with the rate at which the states are produced.
+#
+# The updater does not depend on the toolkit: it is given the function to
+# schedule a callback after a timeout, and the function to apply the changed
+# values to the widgets.
+
+#------------------------------------------------------------------------------
+
+class MonitorUpdater(object):
+    """The updater of the widgets of the monitor window.
+
+    The widgets are described by FIELDS, a list of tuples of the name of the
+    widget (the attribute of the window without the leading underscore) and
+    the kind of the value (TEXT, SENSITIVE or MARKUP). The changed values are
+    applied by calling the apply function with a list of tuples of the index
+    of the field in FIELDS and the new value."""
+    ## Kind of a field: the text of the widget
+    TEXT = 1
+
+    ## Kind of a field: the sensitivity of the widget
+    SENSITIVE = 2
+
+    ## Kind of a field: the markup of a label
+    MARKUP = 3
+
+    ## The default maximal number of updates per second
+    DEFAULT_RATE = 5
+
+    ## The markup of the landing lights label if the state of the landing
+    ## lights is not known
+    LANDING_LIGHTS_UNKNOWN = '<span strikethrough="true">LANDING</span>'
+
+    ## The fields of the monitor window
+    FIELDS = [("timestamp", TEXT),
+              ("paused", SENSITIVE),
+              ("trickMode", SENSITIVE),
+              ("overspeed", SENSITIVE),
+              ("stalled", SENSITIVE),
+              ("onTheGround", SENSITIVE),
+              ("antiIceOn", SENSITIVE),
+              ("zfw", TEXT),
+              ("grossWeight", TEXT),
+              ("heading", TEXT),
+              ("pitch", TEXT),
+              ("bank", TEXT),
+              ("vs", TEXT),
+              ("ias", TEXT),
+              ("mach", TEXT),
+              ("groundSpeed", TEXT),
+              ("radioAltitude", TEXT),
+              ("altitude", TEXT),
+              ("gLoad", TEXT),
+              ("flapsSet", TEXT),
+              ("flaps", TEXT),
+              ("altimeter", TEXT),
+              ("squawk", TEXT),
+              ("nav1", TEXT),
+              ("nav2", TEXT),
+              ("qnh", TEXT),
+              ("fuel", TEXT),
+              ("n1", TEXT),
+              ("reverser", TEXT),
+              ("navLightsOn", SENSITIVE),
+              ("antiCollisionLightsOn", SENSITIVE),
+              ("strobeLightsOn", SENSITIVE),
+              ("landingLightsOn", MARKUP),
+              ("landingLightsOn", SENSITIVE),
+              ("pitotHeatOn", SENSITIVE),
+              ("parking", SENSITIVE),
+              ("gearControlDown", SENSITIVE),
+              ("gearsDown", SENSITIVE),
+              ("spoilersArmed", SENSITIVE),
+              ("spoilersExtension", TEXT),
+              ("windSpeed", TEXT),
+              ("windDirection", TEXT),
+              ("position", TEXT),
+              ("elevatorTrim", TEXT),
+              ("apMaster", SENSITIVE),
+              ("apHeadingHold", SENSITIVE),
+              ("apHeading", TEXT),
+              ("xpdrC", SENSITIVE),
+              ("apAltitudeHold", SENSITIVE),
+              ("apAltitude", TEXT),
+              ("adf1", TEXT),
+              ("adf2", TEXT),
+              ("cog", TEXT),
+              ("ils", TEXT),
+              ("crs1", TEXT),
+              ("crs2", TEXT),
+              ("crsi", TEXT)]
+
+    @staticmethod
+    def getDefaultValues():
+        """Get the values of the fields displayed when there is no aircraft
+        state."""
+        values = []
+        for (name, kind) in MonitorUpdater.FIELDS:
+            if kind==MonitorUpdater.TEXT:
+                values.append("--:--:--" if name=="timestamp" else "-")
+            elif kind==MonitorUpdater.MARKUP:
+                values.append("LANDING")
+            else:
+                values.append(False)
+        return values
+
+    @staticmethod
+    def getValues(aircraftState):
+        """Get the values of the fields for the given aircraft state.
+
+        If aircraftState is None, the default values are returned. The values
+        are in the order of FIELDS."""
+        if aircraftState is None:
+            return MonitorUpdater.getDefaultValues()
+
+        fuelStr = ""
+        for (_tank, fuel) in aircraftState.fuel:
+            if fuelStr: fuelStr += ", "
+            fuelStr += "%.0f" % (fuel,)
+
+        if aircraftState.n1 is not None:
+            n1Str = ""
+            for n1 in aircraftState.n1:
+                if n1Str: n1Str += ", "
+                if n1 is None:
+                    n1Str += "?"
+                else:
+                    n1Str += "%.0f" % (n1,)
+        elif aircraftState.rpm is not None:
+            n1Str = ""
+            for rpm in aircraftState.rpm:
+                if n1Str: n1Str += ", "
+                n1Str += "%.0f" % (rpm,)
+        else:
+            n1Str = "-"
+
+        reverserStr = ""
+        for reverser in aircraftState.reverser:
+            if reverserStr: reverserStr += ", "
+            reverserStr += "ON" if reverser else "OFF"
+
+        return [time.strftime("%H:%M:%S",
+                              time.gmtime(aircraftState.timestamp)),
+                aircraftState.paused,
+                aircraftState.trickMode,
+                aircraftState.overspeed,
+                aircraftState.stalled,
+                aircraftState.onTheGround,
+                aircraftState.antiIceOn is True,
+                "%.0f" % (aircraftState.zfw,),
+                "%.0f" % (aircraftState.grossWeight,),
+                "%03.0f" % (aircraftState.heading,),
+                "%.0f" % (aircraftState.pitch,),
+                "%.0f" % (aircraftState.bank,),
+                "%.0f (%.0f)" % (aircraftState.vs, aircraftState.smoothedVS),
+                "%.0f (%.0f)" % (aircraftState.ias,
+                                 aircraftState.smoothedIAS),
+                "%.2f" % (aircraftState.mach,),
+                "%.0f" % (aircraftState.groundSpeed,),
+                "%.0f" % (aircraftState.radioAltitude,),
+                "%.0f" % (aircraftState.altitude,),
+                "%.2f" % (aircraftState.gLoad,),
+                "%.0f" % (aircraftState.flapsSet,),
+                "%.0f" % (aircraftState.flaps,),
+                "%.0f" % (aircraftState.altimeter,),
+                aircraftState.squawk,
+                "-" if aircraftState.nav1 is None else aircraftState.nav1,
+                "-" if aircraftState.nav2 is None else aircraftState.nav2,
+                "%.0f" % (aircraftState.qnh,),
+                fuelStr,
+                n1Str,
+                reverserStr,
+                aircraftState.navLightsOn is True,
+                aircraftState.antiCollisionLightsOn is True,
+                aircraftState.strobeLightsOn is True,
+                MonitorUpdater.LANDING_LIGHTS_UNKNOWN
+                if aircraftState.landingLightsOn is None else "LANDING",
+                aircraftState.landingLightsOn is True,
+                aircraftState.pitotHeatOn is True,
+                aircraftState.parking,
+                aircraftState.gearControlDown,
+                aircraftState.gearsDown,
+                aircraftState.spoilersArmed is True,
+                "%.0f" % (aircraftState.spoilersExtension,),
+                "%.0f" % (aircraftState.windSpeed,),
+                "%03.0f" % (aircraftState.windDirection,),
+                util.getCoordinateString((aircraftState.latitude,
+                                          aircraftState.longitude)),
+                "%.2f" % (aircraftState.elevatorTrim,),
+                aircraftState.apMaster is True,
+                aircraftState.apHeadingHold is True,
+                "-" if aircraftState.apHeading is None
+                else "%03.0f" % (aircraftState.apHeading,),
+                aircraftState.xpdrC is True,
+                aircraftState.apAltitudeHold is True,
+                "-" if aircraftState.apAltitude is None
+                else "%5.0f" % (aircraftState.apAltitude,),
+                "-" if aircraftState.adf1 is None else aircraftState.adf1,
+                "-" if aircraftState.adf2 is None else aircraftState.adf2,
+                "%.2f%%" % (aircraftState.cog*100.0,),
+                "-" if aircraftState.ils is None else aircraftState.ils,
+                "-" if aircraftState.nav1_obs is None
+                else str(aircraftState.nav1_obs),
+                "-" if aircraftState.nav2_obs is None
+                else str(aircraftState.nav2_obs),
+                "-" if aircraftState.ils_obs is None
+                else str(aircraftState.ils_obs)]
+
+    def __init__(self, apply, timeoutAdd, rate = DEFAULT_RATE):
+        """Construct the updater.
+
+        apply is the function applying the changed values (see the class
+        documentation), timeoutAdd is the one scheduling a function to be
+        called after the given number of milliseconds (e.g.
+        GObject.timeout_add). rate is the maximal number of updates per
+        second, if it is 0, the updates are not throttled.
+
+        The window is assumed to be hidden initially."""
+        self._apply = apply
+        self._timeoutAdd = timeoutAdd
+        self._rate = rate
+
+        self._visible = False
+        self._renderedValues = None
+        self._pendingState = None
+        self._hasPendingState = False
+        self._scheduled = False
+        self._lastRenderTime = None
+
+        self._numRenders = 0
+        self._numChanges = 0
+
+    @property
+    def numRenders(self):
+        """Get the number of times the values have been rendered."""
+        return self._numRenders
+
+    @property
+    def numChanges(self):
+        """Get the number of the changed values applied."""
+        return self._numChanges
+
+    @property
+    def renderedValues(self):
+        """Get the values last rendered, or None if nothing has been rendered
+        yet."""
+        return self._renderedValues
+
+    @property
+    def visible(self):
+        """Get whether the window is visible."""
+        return self._visible
+
+    @property
+    def rate(self):
+        """Get the maximal number of updates per second."""
+        return self._rate
+
+    @rate.setter
+    def rate(self, rate):
+        """Set the maximal number of updates per second."""
+        self._rate = rate
+
+    def setVisible(self, visible):
+        """Set whether the window is visible.
+
+        When the window becomes visible, the latest state received while it
+        was hidden is rendered."""
+        if visible==self._visible:
+            return
+        self._visible = visible
+        if visible and self._hasPendingState and not self._scheduled:
+            self._render()
+
+    def setData(self, aircraftState = None):
+        """Set the aircraft state to display.
+
+        If aircraftState is None, the default values will be displayed. The
+        state is rendered immediately only if the window is visible and the
+        previous rendering is at least 1/rate seconds earlier, otherwise it is
+        kept for later."""
+        self._pendingState = aircraftState
+        self._hasPendingState = True
+        if not self._visible or self._scheduled:
+            return
+
+        delay = 0.0 if self._rate<=0 or self._lastRenderTime is None else \
+            self._lastRenderTime + 1.0 / self._rate - time.monotonic()
+        if delay>0.0:
+            self._scheduled = True
+            self._timeoutAdd(max(1, int(delay * 1000.0)), self._renderLater)
+        else:
+            self._render()
+
+    def _renderLater(self):
+        """Render the latest state, if the window is still visible.
+
+        Called by the timeout scheduled by setData()."""
+        self._scheduled = False
+        if self._visible and self._hasPendingState:
+            self._render()
+        return False
+
+    def _render(self):
+        """Render the latest state by applying the values that differ from
+        the ones rendered previously."""
+        values = MonitorUpdater.getValues(self._pendingState)
+        self._pendingState = None
+        self._hasPendingState = False
+        self._lastRenderTime = time.monotonic()
+        self._numRenders += 1
+
+        renderedValues = self._renderedValues
+        if renderedValues is None:
+            changes = list(enumerate(values))
+        else:
+            changes = [(index, value)
+                       for (index, (value, renderedValue))
+                       in enumerate(zip(values, renderedValues))
+                       if value!=renderedValue]
+        self._renderedValues = values
+
+        if changes:
+            self._numChanges += len(changes)
+            self._apply(changes)
+
+#------------------------------------------------------------------------------
@@ -0,0 +1,213 @@
+# The queue of the updates of the GUI coming from other threads
+
+#------------------------------------------------------------------------------
+
+import threading
+import time
+
+#------------------------------------------------------------------------------
+
+## @package mlx.gui.updatequeue
+#
+# The queue of the updates of the GUI.
+#
+# The log lines, the faults and the aircraft states are produced by the
+# threads handling the simulator, while the widgets may be updated only from
+# the main loop. Instead of scheduling a main loop callback for each change,
+# the changes are put into an \ref mlx.gui.updatequeue.UpdateQueue
+# "UpdateQueue", which is drained by a single callback at most once in every
+# frame (INTERVAL seconds). If the queue has not been drained for at least a
+# frame, the callback is scheduled to run when the main loop is idle, so a
+# single change is displayed without any further delay.
+#
+# While the changes are queued, they are merged: consecutive insertions of
+# lines into the log become one insertion of several lines, a line removed
+# after having been inserted in the same frame is not inserted at all,
+# consecutive removals become one removal of several lines, and a fault
+# updated in the same frame is added or updated only with its latest text.
+# Of the aircraft states only the latest one is kept.
+#
+# The queue does not depend on the toolkit: it is given the functions to
+# schedule a callback when the main loop is idle and after a timeout, and
+# the function to apply the updates to the widgets.
+
+#------------------------------------------------------------------------------
+
+class UpdateQueue(object):
+    """A queue of the updates of the GUI.
+
+    The updates are applied by calling the apply function with three
+    arguments:
+    - the list of the changes of the log lines, each of them a list of three
+    items: INSERT_LINES, the index of the first line and the list of the
+    inserted lines, each a tuple of the text and a boolean indicating if it
+    is a fault, or REMOVE_LINES, the index of the first line and the number
+    of the lines removed,
+    - the list of the changes of the faults, each of them a list of the kind
+    (ADD_FAULT, UPDATE_FAULT or CLEAR_FAULT), the ID of the fault and the
+    text of the fault (None for CLEAR_FAULT),
+    - the latest aircraft state, or None if there was no new state."""
+    ## The minimal number of seconds between two drains of the queue
+    INTERVAL = 1.0 / 30
+
+    ## Kind of a log line change: lines inserted
+    INSERT_LINES = 1
+
+    ## Kind of a log line change: lines removed
+    REMOVE_LINES = 2
+
+    ## Kind of a fault change: a fault added
+    ADD_FAULT = 1
+
+    ## Kind of a fault change: a fault updated
+    UPDATE_FAULT = 2
+
+    ## Kind of a fault change: a fault cleared
+    CLEAR_FAULT = 3
+
+    def __init__(self, apply, idleAdd, timeoutAdd, interval = INTERVAL):
+        """Construct the queue.
+
+        apply is the function applying the updates (see the class
+        documentation), idleAdd is the function scheduling a function to be
+        called when the main loop is idle, and timeoutAdd is the one
+        scheduling a function to be called after the given number of
+        milliseconds (e.g. GObject.idle_add and GObject.timeout_add)."""
+        self._apply = apply
+        self._idleAdd = idleAdd
+        self._timeoutAdd = timeoutAdd
+        self._interval = interval
+
+        self._lock = threading.Lock()
+        self._lineChanges = []
+        self._faultChanges = []
+        self._aircraftState = None
+        self._scheduled = False
+        self._lastDrainTime = None
+
+        self._numDrains = 0
+
+    @property
+    def numDrains(self):
+        """Get the number of times the queue has been drained."""
+        return self._numDrains
+
+    def insertLine(self, index, text, isFault):
+        """Queue the insertion of a log line with the given text before the
+        line with the given index."""
+        with self._lock:
+            changes = self._lineChanges
+            if changes:
+                change = changes[-1]
+                (kind, firstIndex, lines) = change
+                if kind==UpdateQueue.INSERT_LINES and \
+                   index>=firstIndex and index<=firstIndex + len(lines):
+                    lines.insert(index - firstIndex, (text, isFault))
+                    return
+            changes.append([UpdateQueue.INSERT_LINES, index,
+                            [(text, isFault)]])
+            self._schedule()
+
+    def removeLine(self, index):
+        """Queue the removal of the log line with the given index."""
+        with self._lock:
+            changes = self._lineChanges
+            if changes:
+                change = changes[-1]
+                (kind, firstIndex, lines) = change
+                if kind==UpdateQueue.INSERT_LINES:
+                    if index>=firstIndex and index<firstIndex + len(lines):
+                        del lines[index - firstIndex]
+                        if not lines:
+                            del changes[-1]
+                        return
+                elif index==firstIndex:
+                    change[2] += 1
+                    return
+                elif index==firstIndex - 1:
+                    change[1] = index
+                    change[2] += 1
+                    return
+            changes.append([UpdateQueue.REMOVE_LINES, index, 1])
+            self._schedule()
+
+    def addFault(self, id, text):
+        """Queue the addition of the fault with the given ID and text."""
+        with self._lock:
+            self._faultChanges.append([UpdateQueue.ADD_FAULT, id, text])
+            self._schedule()
+
+    def updateFault(self, id, text):
+        """Queue the update of the fault with the given ID to the given
+        text.
+
+        If the fault has been added or updated since the last drain, only
+        the text of that change is replaced."""
+        with self._lock:
+            for change in reversed(self._faultChanges):
+                if change[1]==id:
+                    if change[0]!=UpdateQueue.CLEAR_FAULT:
+                        change[2] = text
+                        return
+                    break
+            self._faultChanges.append([UpdateQueue.UPDATE_FAULT, id, text])
+            self._schedule()
+
+    def clearFault(self, id):
+        """Queue the clearing of the fault with the given ID."""
+        with self._lock:
+            self._faultChanges.append([UpdateQueue.CLEAR_FAULT, id, None])
+            self._schedule()
+
+    def setAircraftState(self, aircraftState):
+        """Queue the given aircraft state, replacing the one queued earlier,
+        if any."""
+        with self._lock:
+            self._aircraftState = aircraftState
+            self._schedule()
+
+    def clear(self):
+        """Clear the queue, dropping the updates not yet applied.
+
+        To be called from the main loop, e.g. when the widgets are reset."""
+        with self._lock:
+            self._lineChanges = []
+            self._faultChanges = []
+            self._aircraftState = None
+
+    def _schedule(self):
+        """Schedule the draining of the queue, if it is not scheduled yet.
+
+        Must be called with the lock held."""
+        if self._scheduled:
+            return
+        self._scheduled = True
+
+        delay = 0.0 if self._lastDrainTime is None else \
+            self._lastDrainTime + self._interval - time.monotonic()
+        if delay>0.0:
+            self._timeoutAdd(max(1, int(delay * 1000.0)), self._drain)
+        else:
+            self._idleAdd(self._drain)
+
+    def _drain(self):
+        """Drain the queue by applying the updates.
+
+        Called from the main loop."""
+        with self._lock:
+            lineChanges = self._lineChanges
+            faultChanges = self._faultChanges
+            aircraftState = self._aircraftState
+            self._lineChanges = []
+            self._faultChanges = []
+            self._aircraftState = None
+            self._scheduled = False
+            self._lastDrainTime = time.monotonic()
+            self._numDrains += 1
+
+        if lineChanges or faultChanges or aircraftState is not None:
+            self._apply(lineChanges, faultChanges, aircraftState)
+
+        return False
+
+#------------------------------------------------------------------------------
@@ -0,0 +1,484 @@
+# Running the logger without the GUI
+
+from . import const
+from . import fs
+from . import acft
+from . import flight
+from . import logger
+from .config import Config
+from .pirep import PIREP
+from .rpc import BookedFlight
+from .rpccommon import Fleet
+from .watchdog import Watchdog
+from .clock import ScaledClock, setClock
+
+import os
+import sys
+import time
+import json
+import argparse
+import threading
+
+#------------------------------------------------------------------------------
+
+## @package mlx.headless
+#
+# Headless operation of the logger.
+#
+# The logger can also be run without the GUI, e.g. in a container for batch
+# processing or benchmarking. The \ref mlx.headless.Engine "engine" performs
+# what the GUI does when connecting to the simulator: it creates the flight
+# and the aircraft with all its checkers, connects the simulator and starts
+# monitoring. The GUI is replaced by a thin \ref mlx.headless.Output "output"
+# object, which provides the data the pilot would enter into the GUI, and
+# which prints the stage changes and the faults as they happen. When the
+# flight has ended, the log, the faults and the PIREP are written into
+# files.
+#
+# The data of the flight is read from a flight file (as saved by the
+# website), and the rest of the data normally entered by the pilot can be
+# given on the command line.
+
+#------------------------------------------------------------------------------
+
+## The simulator types that can be given on the command line
+simulatorTypes = { "fs9" : const.SIM_MSFS9,
+                   "fsx" : const.SIM_MSFSX,
+                   "xplane9" : const.SIM_XPLANE9,
+                   "xplane10" : const.SIM_XPLANE10,
+                   "xplane11" : const.SIM_XPLANE11,
+                   "xplane12" : const.SIM_XPLANE12 }
+
+#------------------------------------------------------------------------------
+
+class Output(object):
+    """The output of the headless logger replacing the GUI.
+
+    It provides the data of the flight that would be entered by the pilot,
+    it is the output of the logger and the connection listener of the
+    simulator. The stage changes, the faults and the connection events are
+    printed to the given stream."""
+    def __init__(self, config, bookedFlight, stream = None):
+        """Construct the output for the given configuration and booked
+        flight."""
+        self.config = config
+        self.bookedFlight = bookedFlight
+        self.fsType = None
+        self.loggedIn = False
+        self.entranceExam = False
+
+        self.numCockpitCrew = bookedFlight.numCockpitCrew
+        self.numCabinCrew = bookedFlight.numCabinCrew
+        self.numPassengers = bookedFlight.numPassengers
+        self.numChildren = bookedFlight.numChildren
+        self.numInfants = bookedFlight.numInfants
+        self.bagWeight = bookedFlight.bagWeight
+        self.cargoWeight = bookedFlight.cargoWeight
+        self.mailWeight = bookedFlight.mailWeight
+        self.route = bookedFlight.route
+        self.flightType = bookedFlight.flightType
+
+        self.zfw = 0
+        self.filedCruiseAltitude = 0
+        self.cruiseAltitude = 0
+        self.departureMETAR = ""
+        self.arrivalMETAR = ""
+        self.departureRunway = ""
+        self.sid = ""
+        self.v1 = None
+        self.vr = None
+        self.v2 = None
+        self.takeoffAntiIceOn = False
+        self.derate = None
+        self.star = ""
+        self.transition = ""
+        self.approachType = ""
+        self.arrivalRunway = ""
+        self.vref = None
+        self.landingAntiIceOn = False
+        self.online = True
+        self.comments = ""
+        self.flightDefects = ""
+        self.delayCodes = []
+
+        self._stream = stream
+        self._condition = threading.Condition()
+        self._stages = []
+        self._rating = 100
+        self._noGoReason = None
+        self._failed = False
+        self._disconnected = False
+
+    @property
+    def loggableCruiseAltitude(self):
+        """Get the cruise altitude to log."""
+        return self.cruiseAltitude
+
+    @property
+    def stages(self):
+        """Get the list of the stages the flight has gone through."""
+        return self._stages
+
+    @property
+    def rating(self):
+        """Get the current rating of the flight."""
+        return self._rating
+
+    @property
+    def noGoReason(self):
+        """Get the reason of the flight being No-Go, if it is."""
+        return self._noGoReason
+
+    @property
+    def failed(self):
+        """Determine if the connection to the simulator has failed."""
+        return self._failed
+
+    @property
+    def connectionLost(self):
+        """Determine if the connection to the simulator has been lost."""
+        return self._disconnected
+
+    @property
+    def finished(self):
+        """Determine if the flight has finished, either by reaching its end,
+        or due to a failure of the connection."""
+        return self._failed or self._disconnected or \
+            (self._stages and self._stages[-1]==const.STAGE_END)
+
+    def setFlightData(self, data):
+        """Set the flight data from the given dictionary.
+
+        The keys are the names of the attributes holding the data normally
+        entered into the GUI by the pilot, e.g. zfw, cruiseAltitude or v1."""
+        for (name, value) in data.items():
+            if name.startswith("_") or not hasattr(self, name):
+                raise ValueError("Unknown flight data: " + name)
+            setattr(self, name, value)
+        if "cruiseAltitude" in data and "filedCruiseAltitude" not in data:
+            self.filedCruiseAltitude = self.cruiseAltitude
+
+    def wait(self, timeout = None):
+        """Wait for the flight to finish or for the given number of seconds
+        to elapse.
+
+        Returns whether the flight has finished."""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._condition:
+            while not self.finished:
+                if deadline is None:
+                    self._condition.wait(1.0)
+                else:
+                    remaining = deadline - time.time()
+                    if remaining<=0.0:
+                        break
+                    self._condition.wait(min(1.0, remaining))
+            return self.finished
+
+    def connected(self, fsType, descriptor):
+        """Called when we have connected to the simulator."""
+        self.fsType = fsType
+        self._print("Connected to the simulator %s" % (descriptor,))
+
+    def connectionFailed(self):
+        """Called when the connection to the simulator failed."""
+        self._print("Connection to the simulator failed")
+        with self._condition:
+            self._failed = True
+            self._condition.notify_all()
+
+    def disconnected(self):
+        """Called when we have disconnected from the simulator."""
+        self._print("Disconnected from the simulator")
+        with self._condition:
+            self._disconnected = True
+            self._condition.notify_all()
+
+    def resetFlightStatus(self):
+        """Reset the status of the flight."""
+        with self._condition:
+            self._stages = []
+            self._rating = 100
+            self._noGoReason = None
+
+    def setStage(self, stage):
+        """Set the stage of the flight."""
+        self._print("Stage: %s" % (const.stage2string(stage),))
+        with self._condition:
+            self._stages.append(stage)
+            self._condition.notify_all()
+
+    def setRating(self, rating):
+        """Set the rating of the flight."""
+        self._rating = rating
+
+    def setNoGo(self, reason):
+        """Set the rating of the flight to No-Go with the given reason."""
+        self._noGoReason = reason
+
+    def updateRTO(self):
+        """Called when the pilot may indicate an RTO.
+
+        The RTO cannot be indicated in the headless mode."""
+        pass
+
+    def getFleetAsync(self, callback = None, force = None):
+        """Get the fleet.
+
+        The fleet is queried only if the pilot is logged in, which is never
+        the case in the headless mode."""
+        pass
+
+    def insertFlightLogLine(self, index, timestampString, text, isFault):
+        """Insert the flight log line with the given data."""
+        pass
+
+    def removeFlightLogLine(self, index):
+        """Remove the flight log line with the given index."""
+        pass
+
+    def addFault(self, id, timestampString, text):
+        """Add a fault to the list of faults."""
+        self._print("Fault: " + formatLogLine(timestampString, text))
+
+    def updateFault(self, id, timestampString, text):
+        """Update a fault in the list of faults."""
+        self._print("Fault: " + formatLogLine(timestampString, text))
+
+    def clearFault(self, id):
+        """Clear a fault in the list of faults."""
+        pass
+
+    def _print(self, text):
+        """Print the given text to the stream, if any."""
+        if self._stream is not None:
+            print(text, file=self._stream)
+
+#------------------------------------------------------------------------------
+
+class Engine(object):
+    """The engine of the headless logger.
+
+    It performs the flight via the given output object in place of the
+    GUI."""
+    def __init__(self, config, output):
+        """Construct the engine."""
+        self._config = config
+        self._output = output
+        self._logger = logger.Logger(output)
+        self._flight = None
+        self._simulator = None
+
+    @property
+    def flight(self):
+        """Get the flight being performed."""
+        return self._flight
+
+    @property
+    def logger(self):
+        """Get the logger."""
+        return self._logger
+
+    @property
+    def simulator(self):
+        """Get the simulator."""
+        return self._simulator
+
+    def createFlight(self):
+        """Create the flight and its aircraft.
+
+        It is called by connectSimulator(), unless the flight has been
+        created before, e.g. to set up the aircraft before the first state
+        is handled."""
+        bookedFlight = self._output.bookedFlight
+
+        self._logger.reset()
+
+        self._flight = flight.Flight(self._logger, self._output)
+        self._flight.flareTimeFromFS = self._config.flareTimeFromFS
+        self._flight.aircraftType = bookedFlight.aircraftType
+        self._flight.aircraft = acft.Aircraft.create(self._flight,
+                                                     bookedFlight)
+        self._simulator = None
+
+    def connectSimulator(self, simulatorType, recordingPath = None):
+        """Connect to the simulator of the given type to start monitoring
+        it.
+
+        The flight is created first, unless it has been created by
+        createFlight() and not connected yet. If a recording path is given,
+        the telemetry is recorded into that file."""
+        if self._flight is None or self._simulator is not None:
+            self.createFlight()
+
+        self._simulator = fs.createSimulator(simulatorType, self._output)
+        fs.setupMessageSending(self._config, self._simulator)
+        self._flight.simulator = self._simulator
+
+        if recordingPath is not None:
+            try:
+                self._simulator.startRecording(recordingPath)
+            except Exception as e:
+                print("Failed to start recording the telemetry to %s: %s" %
+                      (recordingPath, str(e)), file=sys.stderr)
+
+        self._simulator.connect(self._flight.aircraft)
+        self._simulator.startMonitoring()
+
+    def disconnect(self):
+        """Stop monitoring and disconnect from the simulator."""
+        if self._simulator is not None:
+            self._simulator.stopMonitoring()
+            self._simulator.disconnect()
+            self._simulator.stopRecording()
+
+    def writeLog(self, path):
+        """Write the log of the flight into the file with the given path."""
+        with open(path, "wt") as f:
+            for (timestampString, text) in self._logger.lines:
+                print(formatLogLine(timestampString, text), file=f)
+
+    def writeFaults(self, path):
+        """Write the faults of the flight and the rating into the file with
+        the given path."""
+        lines = self._logger.lines
+        with open(path, "wt") as f:
+            for index in self._logger.faultLineIndexes:
+                (timestampString, text) = lines[index]
+                print(formatLogLine(timestampString, text), file=f)
+            print("Rating: %.1f" % (self._logger.getRating(),), file=f)
+
+    def savePIREP(self, path):
+        """Save the PIREP of the flight into the file with the given path.
+
+        Returns None on success or the error message on failure."""
+        return PIREP(self._flight).save(path)
+
+#------------------------------------------------------------------------------
+
+def formatLogLine(timestampString, text):
+    """Format the given log line."""
+    return text if timestampString is None else timestampString + ": " + text
+
+#------------------------------------------------------------------------------
+
+def loadBookedFlight(path, fleetPath = None):
+    """Load the booked flight from the flight file with the given path.
+
+    The DOW and the like are taken from the fleet in the given JSON file, if
+    any."""
+    fleet = Fleet()
+    if fleetPath is not None and os.path.exists(fleetPath):
+        with open(fleetPath, "rt") as f:
+            fleet = Fleet.fromJSON(json.load(f))
+
+    bookedFlight = BookedFlight()
+    with open(path, "rt") as f:
+        bookedFlight.readFromFile(f, fleet)
+    return bookedFlight
+
+#------------------------------------------------------------------------------
+
+def main():
+    """The main operation of the headless logger."""
+    programDirectory = os.path.dirname(sys.argv[0])
+
+    parser = argparse.ArgumentParser(description =
+                                     "Run the logger without the GUI")
+    parser.add_argument("flightFile",
+                        help = "the flight file of the booked flight")
+    parser.add_argument("-s", "--simulator", choices = sorted(simulatorTypes),
+                        default = "fsx",
+                        help = "the type of the simulator (default: fsx)")
+    parser.add_argument("-o", "--output-directory", default = ".",
+                        help = "the directory of the log, the faults and "
+                        "the PIREP (default: the current directory)")
+    parser.add_argument("--fleet",
+                        default = os.path.join(programDirectory,
+                                               "fleet.json"),
+                        help = "the JSON file containing the fleet")
+    parser.add_argument("--zfw", type = float, help = "the ZFW in kgs")
+    parser.add_argument("--cruise-altitude", type = int,
+                        help = "the cruise altitude in feet")
+    parser.add_argument("--v1", type = int, help = "the V1 speed")
+    parser.add_argument("--vr", type = int, help = "the VR speed")
+    parser.add_argument("--v2", type = int, help = "the V2 speed")
+    parser.add_argument("--vref", type = int, help = "the VRef speed")
+    parser.add_argument("--record", metavar = "PATH",
+                        help = "record the telemetry into the given file")
+    parser.add_argument("--timeout", type = float,
+                        help = "the maximal duration of the flight in "
+                        "seconds")
+    parser.add_argument("--clock-scale", type = float,
+                        help = "run the clock the given number of times "
+                        "faster than the real one (for simulated flights)")
+    parser.add_argument("--checker-budget", type = int, metavar = "MS",
+                        help = "warn if the checkers take more than the "
+                        "given number of milliseconds to handle a state")
+    parser.add_argument("--profile", action = "store_true",
+                        help = "print the profile of the checkers at the "
+                        "end")
+    args = parser.parse_args()
+
+    config = Config()
+    config.load()
+    if args.checker_budget is not None:
+        config.checkerTimeBudget = args.checker_budget
+
+    bookedFlight = loadBookedFlight(args.flightFile, args.fleet)
+
+    output = Output(config, bookedFlight, stream = sys.stdout)
+    flightData = {}
+    for (name, value) in [("zfw", args.zfw),
+                          ("cruiseAltitude", args.cruise_altitude),
+                          ("v1", args.v1), ("vr", args.vr), ("v2", args.v2),
+                          ("vref", args.vref)]:
+        if value is not None:
+            flightData[name] = value
+    output.setFlightData(flightData)
+
+    if args.clock_scale is not None:
+        setClock(ScaledClock(args.clock_scale))
+
+    Watchdog().start()
+
+    engine = Engine(config, output)
+    engine.connectSimulator(simulatorTypes[args.simulator],
+                            recordingPath = args.record)
+    try:
+        output.wait(args.timeout)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.disconnect()
+
+    if output.failed:
+        return 1
+
+    baseName = "%s %s-%s" % (str(bookedFlight.departureTime.date()),
+                             bookedFlight.departureICAO,
+                             bookedFlight.arrivalICAO)
+    basePath = os.path.join(args.output_directory, baseName)
+    engine.writeLog(basePath + ".log")
+    engine.writeFaults(basePath + ".faults")
+
+    result = 0
+    if engine.flight.stage==const.STAGE_END:
+        error = engine.savePIREP(basePath + ".pirep")
+        if error:
+            result = 1
+    else:
+        print("The flight has not ended, no PIREP is saved", file=sys.stderr)
+        result = 1
+
+    print("Rating: %.1f" % (engine.logger.getRating(),))
+
+    if args.profile and engine.flight.aircraft is not None:
+        print(engine.flight.aircraft.profiler.format())
+
+    return result
+
+#------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -25,6 +25,215 @@ from functools import total_ordering
 # The logger object also maintains a separate set of faults and ensures that
 # one fault type has only one score, even if that fault has been reported
 # multiple times.
+#
+# The lines and the fault lines are kept in \ref mlx.logger.SortedList
+# "sorted lists" that can find the position of a line and insert or remove a
+# line in logarithmic time, so that even a long log with many faults updated
+# repeatedly can be maintained quickly.
+#
+# The rating of the flight is maintained as the faults change. The faults are
+# kept in the order they were first logged along with the rating calculated
+# from the faults preceding each of them, so only the ratings from a changed
+# fault onwards have to be recalculated, which is usually only the last one,
+# and the rating is the same as if it was calculated from all the faults.
+# When the rating changes, the output is notified by calling its setRating()
+# function.
+
+#--------------------------------------------------------------------------------------
+
+class SortedList(object):
+    """A list of items kept in ascending order of their distinct keys.
+
+    An item can be added or removed, its position can be found and the item
+    at a given position can be retrieved in logarithmic time. The items and
+    their keys are stored in blocks of at most 2*LOAD items, and the number
+    of the items in the blocks is maintained in a binary indexed tree, so
+    that the number of the items preceding a block can be calculated
+    quickly. The keys are compared instead of the items, so they should be
+    of built-in types (e.g. tuples of numbers) for the comparisons to be
+    fast."""
+    ## The number of the items a block is split to when it grows too large
+    LOAD = 256
+
+    def __init__(self, key):
+        """Construct the empty list with the given function returning the
+        key of an item."""
+        self._key = key
+        self._blocks = []
+        self._keyBlocks = []
+        self._maxes = []
+        self._tree = [0]
+        self._length = 0
+
+    def __len__(self):
+        """Get the number of the items."""
+        return self._length
+
+    def __iter__(self):
+        """Iterate over the items in ascending order."""
+        for block in self._blocks:
+            for item in block:
+                yield item
+
+    def __getitem__(self, position):
+        """Get the item at the given position, which may also be negative to
+        count from the end."""
+        if position<0:
+            position += self._length
+        if position<0 or position>=self._length:
+            raise IndexError("SortedList index out of range")
+
+        tree = self._tree
+        blockIndex = 0
+        bit = 1 << (len(tree) - 1).bit_length()
+        while bit:
+            next = blockIndex + bit
+            if next<len(tree) and tree[next]<=position:
+                blockIndex = next
+                position -= tree[next]
+            bit >>= 1
+        return self._blocks[blockIndex][position]
+
+    def add(self, item):
+        """Add the given item.
+
+        Returns the position of the item."""
+        key = self._key(item)
+        blocks = self._blocks
+        keyBlocks = self._keyBlocks
+        maxes = self._maxes
+        self._length += 1
+        if not blocks:
+            blocks.append([item])
+            keyBlocks.append([key])
+            maxes.append(key)
+            self._rebuildTree()
+            return 0
+
+        blockIndex = bisect.bisect_left(maxes, key)
+        if blockIndex==len(blocks):
+            blockIndex -= 1
+            block = blocks[blockIndex]
+            keyBlock = keyBlocks[blockIndex]
+            block.append(item)
+            keyBlock.append(key)
+            maxes[blockIndex] = key
+            position = self._length - 1
+        else:
+            block = blocks[blockIndex]
+            keyBlock = keyBlocks[blockIndex]
+            index = bisect.bisect_left(keyBlock, key)
+            block.insert(index, item)
+            keyBlock.insert(index, key)
+            position = self._getPrecedingCount(blockIndex) + index
+
+        load = SortedList.LOAD
+        if len(block)>2*load:
+            blocks[blockIndex:blockIndex+1] = [block[:load], block[load:]]
+            keyBlocks[blockIndex:blockIndex+1] = [keyBlock[:load],
+                                                  keyBlock[load:]]
+            maxes[blockIndex:blockIndex+1] = [keyBlock[load-1], keyBlock[-1]]
+            self._rebuildTree()
+        else:
+            self._addToTree(blockIndex, 1)
+
+        return position
+
+    def remove(self, item):
+        """Remove the given item.
+
+        Returns the position the item was at."""
+        (blockIndex, index) = self._find(item)
+        position = self._getPrecedingCount(blockIndex) + index
+
+        block = self._blocks[blockIndex]
+        keyBlock = self._keyBlocks[blockIndex]
+        del block[index]
+        del keyBlock[index]
+        self._length -= 1
+        if block:
+            if index==len(block):
+                self._maxes[blockIndex] = keyBlock[-1]
+            self._addToTree(blockIndex, -1)
+        else:
+            del self._blocks[blockIndex]
+            del self._keyBlocks[blockIndex]
+            del self._maxes[blockIndex]
+            self._rebuildTree()
+
+        return position
+
+    def index(self, item):
+        """Get the position of the given item."""
+        (blockIndex, index) = self._find(item)
+        return self._getPrecedingCount(blockIndex) + index
+
+    def getPositions(self, items):
+        """Get the positions of the given items, which are in this list and
+        are given in ascending order, e.g. in another sorted list with the
+        same keys.
+
+        The blocks are walked only once, so this is faster than getting the
+        position of each item separately."""
+        key = self._key
+        maxes = self._maxes
+        keyBlocks = self._keyBlocks
+        positions = []
+        blockIndex = 0
+        precedingCount = 0
+        index = 0
+        for item in items:
+            itemKey = key(item)
+            while maxes[blockIndex]<itemKey:
+                precedingCount += len(keyBlocks[blockIndex])
+                blockIndex += 1
+                index = 0
+            index = bisect.bisect_left(keyBlocks[blockIndex], itemKey, index)
+            positions.append(precedingCount + index)
+        return positions
+
+    def _find(self, item):
+        """Find the given item.
+
+        Returns a tuple of the index of its block and its index within the
+        block. If the item is not in the list, ValueError is raised."""
+        key = self._key(item)
+        blockIndex = bisect.bisect_left(self._maxes, key)
+        if blockIndex<len(self._blocks):
+            keyBlock = self._keyBlocks[blockIndex]
+            index = bisect.bisect_left(keyBlock, key)
+            if index<len(keyBlock) and keyBlock[index]==key:
+                return (blockIndex, index)
+        raise ValueError("SortedList: item not in the list")
+
+    def _getPrecedingCount(self, blockIndex):
+        """Get the number of the items in the blocks preceding the block with
+        the given index."""
+        tree = self._tree
+        count = 0
+        while blockIndex>0:
+            count += tree[blockIndex]
+            blockIndex &= blockIndex - 1
+        return count
+
+    def _addToTree(self, blockIndex, delta):
+        """Add the given value to the number of the items in the block with
+        the given index."""
+        tree = self._tree
+        index = blockIndex + 1
+        while index<len(tree):
+            tree[index] += delta
+            index += index & -index
+
+    def _rebuildTree(self):
+        """Rebuild the binary indexed tree of the number of the items in the
+        blocks after the blocks have changed."""
+        tree = [0] + [len(block) for block in self._blocks]
+        for index in range(1, len(tree)):
+            parent = index + (index & -index)
+            if parent<len(tree):
+                tree[parent] += tree[index]
+        self._tree = tree
 
 #--------------------------------------------------------------------------------------
 
@@ -67,6 +276,11 @@ class Logger(object):
             """Get the timestamp of this entry."""
             return self._timestamp
 
+        @property
+        def key(self):
+            """Get the key of the entry by which the entries are ordered."""
+            return (self._timestamp, self._id)
+
         @property
         def timestampString(self):
             """Get the timestamp string of this entry.
@@ -141,11 +355,15 @@ class Logger(object):
 
         It contains the list of log entries that belong to this fault. The list
         is ordered so that the first element contains the entry with the
-        highest score, so that it should be easy to find the actual score."""
+        highest score, so that it should be easy to find the actual score.
+        Entries with the same score are in the order they were added. The
+        negated scores of the entries are kept in a separate list to find
+        the position of an entry by bisection."""
         def __init__(self, entry):
             """Construct the fault info with the given log entry as its only
             one."""
             self._entries = [entry]
+            self._keys = [-entry.faultScore]
 
         @property
         def score(self):
@@ -156,19 +374,24 @@ class Logger(object):
         def addEntry(self, entry):
             """Add an entry to this fault.
 
-            The entries will be sorted."""
-            entries = self._entries
-            entries.append(entry)
-            entries.sort(key = lambda entry: entry.faultScore, reverse = True)
+            It is inserted after the entries with a higher or the same
+            score."""
+            key = -entry.faultScore
+            index = bisect.bisect_right(self._keys, key)
+            self._keys.insert(index, key)
+            self._entries.insert(index, entry)
 
         def removeEntry(self, entry):
             """Remove the given entry.
 
             Returns True if at least one entry remains, False otherwise."""
             entries = self._entries
-            for index in range(0, len(entries)):
+            for index in range(bisect.bisect_left(self._keys,
+                                                  -entry.faultScore),
+                               len(entries)):
                 if entry is entries[index]:
                     del entries[index]
+                    del self._keys[index]
                     break
 
             return len(entries)>0
@@ -195,12 +418,22 @@ class Logger(object):
 
     NO_SCORE = 9999
 
+    @staticmethod
+    def _getEntryKey(entry):
+        """Get the key of the given entry for the sorted lists."""
+        return entry.key
+
     def __init__(self, output):
         """Construct the logger."""
         self._entries = {}
-        self._lines = []
+        self._lines = SortedList(Logger._getEntryKey)
+        self._faultLines = SortedList(Logger._getEntryKey)
 
         self._faults = {}
+        self._ratedFaults = []
+        self._ratings = [100]
+        self._numNoGoFaults = 0
+        self._reportedRating = 100
 
         self._output = output
 
@@ -213,20 +446,26 @@ class Logger(object):
     def faultLineIndexes(self):
         """Get the sorted array of the indexes of those log lines that contain
         a fault."""
-        faultLineIndexes = []
-        lines = self._lines
-        for index in range(0, len(lines)):
-            if lines[index].isFault:
-                faultLineIndexes.append(index)
-        return faultLineIndexes
+        return self._lines.getPositions(self._faultLines)
 
     def reset(self):
         """Reset the logger.
 
-        The faults logged so far will be cleared."""
+        The faults logged so far will be cleared, and the rating becomes 100
+        again without the output being notified."""
         self._entries = {}
-        self._lines = []
+        self._lines = SortedList(Logger._getEntryKey)
+        self._faultLines = SortedList(Logger._getEntryKey)
         self._faults = {}
+        self._ratedFaults = []
+        self._ratings = [100]
+        self._numNoGoFaults = 0
+        self._reportedRating = 100
+
+    @property
+    def isNoGo(self):
+        """Determine if a No-Go fault has been logged."""
+        return self._numNoGoFaults>0
 
     def message(self, timestamp, msg):
         """Put a simple textual message into the log with the given timestamp.
@@ -324,6 +563,8 @@ class Logger(object):
                                       else (const.MESSAGETYPE_FAULT, 5)
             sendMessage(messageType, text, duration)
 
+        self._reportRating()
+
         return id
 
     def noGo(self, faultID, timestamp, what):
@@ -331,21 +572,20 @@ class Logger(object):
         return self.fault(faultID, timestamp, what, Logger.NO_GO_SCORE)
 
     def getRating(self):
-        """Get the rating of the flight so far."""
-        totalScore = 100
-        for fault in self._faults.values():
-            score = fault.score
-            if score==Logger.NO_GO_SCORE:
-                return -score
-            else:
-                totalScore -= score
-        return totalScore
+        """Get the rating of the flight so far.
+
+        It is 100 minus the sum of the scores of the faults in the order they
+        were logged, or the negative of NO_GO_SCORE if there is a No-Go
+        fault."""
+        return -Logger.NO_GO_SCORE if self._numNoGoFaults>0 \
+            else self._ratings[-1]
 
     def updateLine(self, id, line):
         """Update the line with the given ID with the given string.
 
         Note, that it does not change the status of the line as a fault!"""
         self._updateEntry(id, self._entries[id].copy(text = line))
+        self._reportRating()
 
     def clearFault(self, id, text):
         """Update the line with the given ID to contain the given string,
@@ -353,6 +593,7 @@ class Logger(object):
         newEntry = self._entries[id].copy(text = text, clearFault = True)
         self._updateEntry(id, newEntry)
         self._output.clearFault(id)
+        self._reportRating()
 
     def _addEntry(self, entry):
         """Add the given entry to the log.
@@ -362,14 +603,10 @@ class Logger(object):
 
         self._entries[entry.id] = entry
 
-        if not self._lines or entry>self._lines[-1]:
-            index = len(self._lines)
-            self._lines.append(entry)
-        else:
-            index = bisect.bisect_left(self._lines, entry)
-            self._lines.insert(index, entry)
+        index = self._lines.add(entry)
 
         if entry.isFault:
+            self._faultLines.add(entry)
             self._addFault(entry)
 
         self._output.insertFlightLogLine(index, entry.timestampString,
@@ -389,16 +626,23 @@ class Logger(object):
         entry = self._entries[id]
         del self._entries[id]
 
-        for index in range(len(self._lines)-1, -1, -1):
-            if self._lines[index] is entry:
-                break
-        del self._lines[index]
+        index = self._lines.remove(entry)
 
         if entry.isFault:
+            self._faultLines.remove(entry)
             faultID = entry.faultID
             fault = self._faults[faultID]
-            if not fault.removeEntry(entry):
+            oldScore = fault.score
+            if fault.removeEntry(entry):
+                if fault.score!=oldScore:
+                    self._changeFaultScore(fault, oldScore)
+            else:
                 del self._faults[faultID]
+                faultIndex = self._getRatedFaultIndex(fault)
+                del self._ratedFaults[faultIndex]
+                if oldScore==Logger.NO_GO_SCORE:
+                    self._numNoGoFaults -= 1
+                self._updateRatings(faultIndex)
 
         self._output.removeFlightLogLine(index)
 
@@ -406,8 +650,59 @@ class Logger(object):
         """Add the given fault entry to the fault with the given ID."""
         faultID = entry.faultID
         if faultID in self._faults:
-            self._faults[faultID].addEntry(entry)
+            fault = self._faults[faultID]
+            oldScore = fault.score
+            fault.addEntry(entry)
+            if fault.score!=oldScore:
+                self._changeFaultScore(fault, oldScore)
         else:
-            self._faults[faultID] = Logger.Fault(entry)
+            fault = self._faults[faultID] = Logger.Fault(entry)
+            self._ratedFaults.append(fault)
+            if fault.score==Logger.NO_GO_SCORE:
+                self._numNoGoFaults += 1
+            self._updateRatings(len(self._ratedFaults) - 1)
+
+    def _changeFaultScore(self, fault, oldScore):
+        """Update the ratings after the score of the given fault has changed
+        from the given old one."""
+        if oldScore==Logger.NO_GO_SCORE:
+            self._numNoGoFaults -= 1
+        if fault.score==Logger.NO_GO_SCORE:
+            self._numNoGoFaults += 1
+        self._updateRatings(self._getRatedFaultIndex(fault))
+
+    def _getRatedFaultIndex(self, fault):
+        """Get the index of the given fault among the rated faults.
+
+        The search starts from the end, since usually the fault changed last
+        is the one changing again."""
+        ratedFaults = self._ratedFaults
+        index = len(ratedFaults) - 1
+        while ratedFaults[index] is not fault:
+            index -= 1
+        return index
+
+    def _updateRatings(self, index):
+        """Recalculate the ratings from the rated fault with the given index
+        onwards.
+
+        The No-Go faults are skipped, since the rating does not depend on the
+        other faults if there is a No-Go one."""
+        ratings = self._ratings
+        del ratings[index+1:]
+        rating = ratings[index]
+        for fault in self._ratedFaults[index:]:
+            score = fault.score
+            if score!=Logger.NO_GO_SCORE:
+                rating -= score
+            ratings.append(rating)
+
+    def _reportRating(self):
+        """Notify the output of the rating, if it has changed since it was
+        reported last."""
+        rating = self.getRating()
+        if rating!=self._reportedRating:
+            self._reportedRating = rating
+            self._output.setRating(rating)
 
 #--------------------------------------------------------------------------------------
@@ -0,0 +1,316 @@
+# Profiling of the checkers of the aircraft
+
+#-----------------------------------------------------------------------------
+
+import time
+
+#-----------------------------------------------------------------------------
+
+## @package mlx.profiler
+#
+# Profiling of the checkers run by the aircraft for each state received from
+# the simulator.
+#
+# The \ref mlx.profiler.CheckerProfiler "profiler" measures the time spent
+# in the handling of each state as a whole (a tick), and counts the
+# exceptions thrown by each checker. The time spent in the individual
+# checkers is measured only in every SAMPLE_INTERVAL-th tick, and their total
+# time is extrapolated from those samples, since timing each checker in each
+# tick would take a considerable fraction of the time of the checkers
+# themselves. The durations are collected into histograms with four buckets
+# per doubling of the time, so that the percentiles can be estimated with a
+# constant cost per sample and a constant amount of memory even for a long
+# flight. This makes the profiler cheap enough to be always on.
+#
+# If a time budget is given, a warning is printed into the debug log when a
+# tick takes longer than that, naming the slowest checker of the tick, if it
+# was sampled. The tick after an over-budget one is always sampled. The
+# warnings are limited to one in every WARNING_INTERVAL seconds, with the
+# number of the ones suppressed reported with the next one.
+
+#-----------------------------------------------------------------------------
+
+class Histogram(object):
+    """A histogram of durations given in nanoseconds.
+
+    The limits of the buckets grow exponentially, with four buckets for each
+    doubling of the duration, so a percentile is overestimated by at most
+    25%."""
+    ## The number of buckets per doubling of the duration
+    BUCKETS_PER_OCTAVE = 4
+
+    ## The number of buckets, enough for durations of more than 30 years
+    NUM_BUCKETS = 64 * BUCKETS_PER_OCTAVE
+
+    @staticmethod
+    def getBucket(duration):
+        """Get the index of the bucket of the given duration."""
+        numBits = duration.bit_length()
+        if numBits<=2:
+            return duration
+        return numBits * 4 - 8 + ((duration >> (numBits - 3)) & 3)
+
+    @staticmethod
+    def getBucketLimit(bucket):
+        """Get the upper limit of the durations in the given bucket."""
+        if bucket<4:
+            return bucket
+        numBits = (bucket + 8) // 4
+        return ((4 + (bucket & 3)) << (numBits - 3)) + \
+            (1 << (numBits - 3)) - 1
+
+    def __init__(self):
+        """Construct the histogram."""
+        self._counts = [0] * Histogram.NUM_BUCKETS
+        self._numValues = 0
+
+    @property
+    def numValues(self):
+        """Get the number of the durations added."""
+        return self._numValues
+
+    def add(self, duration):
+        """Add the given duration."""
+        numBits = duration.bit_length()
+        self._counts[duration if numBits<=2 else
+                     numBits * 4 - 8 + ((duration >> (numBits - 3)) & 3)] += 1
+        self._numValues += 1
+
+    def getPercentile(self, percentile):
+        """Get an estimate of the given percentile (0..100) of the durations.
+
+        It is the upper limit of the bucket containing the percentile, or 0
+        if there are no durations."""
+        if self._numValues==0:
+            return 0
+        limit = self._numValues * percentile / 100.0
+        count = 0
+        for bucket in range(0, Histogram.NUM_BUCKETS):
+            count += self._counts[bucket]
+            if count>=limit and count>0:
+                return Histogram.getBucketLimit(bucket)
+        return Histogram.getBucketLimit(Histogram.NUM_BUCKETS - 1)
+
+#-----------------------------------------------------------------------------
+
+class Statistics(object):
+    """The statistics of the calls of a checker or of the ticks.
+
+    The durations are in nanoseconds."""
+    def __init__(self, name):
+        """Construct the statistics with the given name."""
+        self.name = name
+        self.numCalls = 0
+        self.totalTime = 0
+        self.maxTime = 0
+        self.numExceptions = 0
+        self.lastException = None
+        self.histogram = Histogram()
+
+    @property
+    def meanTime(self):
+        """Get the mean duration of the calls."""
+        return self.totalTime / self.numCalls if self.numCalls else 0.0
+
+    @property
+    def p99Time(self):
+        """Get an estimate of the 99th percentile of the durations."""
+        return self.histogram.getPercentile(99.0)
+
+    def add(self, duration):
+        """Add a call of the given duration."""
+        self.numCalls += 1
+        self.totalTime += duration
+        if duration>self.maxTime:
+            self.maxTime = duration
+        self.histogram.add(duration)
+
+    def addException(self, exception):
+        """Add the given exception thrown by a call."""
+        self.numExceptions += 1
+        self.lastException = "%s: %s" % (exception.__class__.__name__,
+                                         str(exception))
+
+#-----------------------------------------------------------------------------
+
+class CheckerProfiler(object):
+    """The profiler of the checkers of an aircraft.
+
+    A tick is begun by calling beginTick(), which tells if the tick is
+    sampled. Then each checker is executed, and if the tick is sampled, the
+    time it took is given to addCall(). The exceptions thrown by the
+    checkers are given to addException() in every tick. Finally endTick() is
+    called."""
+    ## The default number of ticks one of which is sampled
+    SAMPLE_INTERVAL = 16
+
+    ## The minimal number of seconds between two warnings about the time
+    ## budget having been exceeded
+    WARNING_INTERVAL = 10.0
+
+    def __init__(self, budget = 0, sampleInterval = SAMPLE_INTERVAL):
+        """Construct the profiler with the given time budget of a tick in
+        milliseconds, and sampling one in every sampleInterval ticks.
+
+        If the budget is 0, the ticks are not checked."""
+        self._budget = budget * 1000000
+        self._sampleInterval = sampleInterval
+        self._checkerStatistics = {}
+        self._tickStatistics = Statistics("Total")
+
+        self._ticksToSample = 0
+        self._numSampledTicks = 0
+        self._sampled = False
+        self._tickStart = None
+        self._slowestChecker = None
+        self._slowestTime = 0
+
+        self._numOverBudget = 0
+        self._lastWarningTime = None
+        self._numWarningsSuppressed = 0
+
+    @property
+    def budget(self):
+        """Get the time budget of a tick in milliseconds."""
+        return self._budget / 1000000
+
+    @budget.setter
+    def budget(self, budget):
+        """Set the time budget of a tick in milliseconds."""
+        self._budget = budget * 1000000
+
+    @property
+    def sampleInterval(self):
+        """Get the number of ticks one of which is sampled."""
+        return self._sampleInterval
+
+    @property
+    def checkerStatistics(self):
+        """Get the list of the statistics of the checkers in the order they
+        were first called.
+
+        The calls and the durations are those of the sampled ticks, while
+        the exceptions are those of all ticks."""
+        return list(self._checkerStatistics.values())
+
+    @property
+    def tickStatistics(self):
+        """Get the statistics of the ticks."""
+        return self._tickStatistics
+
+    @property
+    def numOverBudget(self):
+        """Get the number of the ticks that have exceeded the budget."""
+        return self._numOverBudget
+
+    def beginTick(self):
+        """Begin a tick.
+
+        Return whether the tick is sampled, i.e. if the time of the calls of
+        the checkers should be measured."""
+        sampled = self._sampled = self._ticksToSample<=0
+        if sampled:
+            self._ticksToSample = self._sampleInterval - 1
+            self._numSampledTicks += 1
+            self._slowestChecker = None
+            self._slowestTime = 0
+        else:
+            self._ticksToSample -= 1
+        self._tickStart = time.perf_counter_ns()
+        return sampled
+
+    def addCall(self, checker, duration):
+        """Add a call of the given checker in a sampled tick that took the
+        given number of nanoseconds."""
+        statistics = self._checkerStatistics.get(checker)
+        if statistics is None:
+            statistics = self._addChecker(checker)
+        statistics.add(duration)
+        if duration>self._slowestTime:
+            self._slowestTime = duration
+            self._slowestChecker = statistics
+
+    def addException(self, checker, exception):
+        """Add the given exception thrown by the given checker."""
+        statistics = self._checkerStatistics.get(checker)
+        if statistics is None:
+            statistics = self._addChecker(checker)
+        statistics.addException(exception)
+
+    def endTick(self, timestamp):
+        """End the current tick, which handled the state with the given
+        timestamp.
+
+        If it has exceeded the budget, a warning is printed, unless one was
+        printed too recently."""
+        duration = time.perf_counter_ns() - self._tickStart
+        self._tickStatistics.add(duration)
+
+        if self._budget>0 and duration>self._budget:
+            self._numOverBudget += 1
+            self._ticksToSample = 0
+            now = time.monotonic()
+            if self._lastWarningTime is not None and \
+               now<self._lastWarningTime + CheckerProfiler.WARNING_INTERVAL:
+                self._numWarningsSuppressed += 1
+                return
+
+            slowest = self._slowestChecker
+            print("CheckerProfiler: the handling of the state at %.1f took "
+                  "%.1f ms, more than the budget of %.1f ms%s%s" %
+                  (timestamp, duration / 1000000.0, self.budget,
+                   "" if not self._sampled or slowest is None else
+                   ", the slowest checker was %s with %.1f ms" %
+                   (slowest.name, self._slowestTime / 1000000.0),
+                   "" if self._numWarningsSuppressed==0 else
+                   " (%d warnings suppressed)" %
+                   (self._numWarningsSuppressed,)))
+            self._lastWarningTime = now
+            self._numWarningsSuppressed = 0
+
+    def format(self):
+        """Format the statistics as a table, the checkers ordered by the
+        total time spent in them, with the times in microseconds.
+
+        The total time of a checker is extrapolated from the sampled ticks
+        (see checkerStatistics) to all ticks, while that of the ticks is
+        measured."""
+        lines = ["%-32s %8s %10s %8s %8s %8s %5s" %
+                 ("Checker", "Samples", "Total", "Mean", "P99", "Max",
+                  "Exc")]
+        statistics = sorted(self._checkerStatistics.values(),
+                            key = lambda s: s.totalTime, reverse = True)
+        numTicks = self._tickStatistics.numCalls
+        for s in statistics + [self._tickStatistics]:
+            scale = 1 if s is self._tickStatistics or numTicks==0 \
+                    else numTicks / self._numSampledTicks
+            lines.append("%-32s %8d %10.0f %8.1f %8.1f %8.1f %5d" %
+                         (s.name[:32], s.numCalls,
+                          s.totalTime * scale / 1000.0,
+                          s.meanTime / 1000.0, s.p99Time / 1000.0,
+                          s.maxTime / 1000.0, s.numExceptions))
+        if self._budget>0:
+            lines.append("Ticks over the budget of %.1f ms: %d" %
+                         (self.budget, self._numOverBudget))
+        for s in statistics:
+            if s.lastException is not None:
+                lines.append("Last exception of %s: %s" %
+                             (s.name, s.lastException))
+        return "\n".join(lines)
+
+    def _addChecker(self, checker):
+        """Add the statistics of the given checker.
+
+        The name of the statistics is the name of the checker's class,
+        followed by a sequence number, if there are several checkers of the
+        same class."""
+        name = checker.__class__.__name__
+        names = set([s.name for s in self._checkerStatistics.values()])
+        if name in names:
+            number = 2
+            while "%s#%d" % (name, number) in names:
+                number += 1
+            name = "%s#%d" % (name, number)
+
+        statistics = self._checkerStatistics[checker] = Statistics(name)
+        return statistics
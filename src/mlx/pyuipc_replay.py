@@ -0,0 +1,288 @@
+# Replay of a telemetry recording through the PyUIPC interface
+
+from . import telemetry
+from .clock import VirtualClock, setClock
+
+import sys
+
+#------------------------------------------------------------------------------
+
+## @package mlx.pyuipc_replay
+#
+# Replay of a recorded flight via the interface of the PyUIPC module.
+#
+# The reads are served from a telemetry file recorded by \ref
+# mlx.telemetry.Recorder "Recorder" with the FSUIPC backend. The values of
+# the recorded reads are collected into an image of the offsets, and a read
+# returns the values of the offsets in the image as of the current time.
+#
+# The time is that of a \ref mlx.clock.VirtualClock "virtual clock" installed
+# when the recording is loaded. It starts at the time of the first recorded
+# read, and it is advanced by the waits of the FSUIPC handler, i.e. the
+# handler jumps from one periodic request to the next. Therefore the flight
+# is replayed as fast as the reads can be processed, and since the times of
+# the reads depend only on the recording and on the periods of the
+# requests, the replay is deterministic.
+#
+# When the time passes the last recorded read by more than a certain gap,
+# the reads fail and the connection cannot be re-established, so the handler
+# reports the disconnection.
+#
+# This module is used instead of the real PyUIPC module, if the
+# FORCE_PYUIPC_REPLAY environment variable is present. Its value is the path
+# of the recording.
+
+#------------------------------------------------------------------------------
+#------------------------------------------------------------------------------
+
+## Version constants
+SIM_ANY=0
+SIM_FS98=1
+SIM_FS2K=2
+SIM_CFS2=3
+SIM_CFS1=4
+SIM_FLY=5
+SIM_FS2K2=6
+SIM_FS2K4=7
+SIM_FSX=8
+SIM_P3D=10
+SIM_FSX64=11
+SIM_P3D64=12
+SIM_FS2020=13
+
+#------------------------------------------------------------------------------
+
+## Error constants
+ERR_OK=0
+ERR_OPEN=1
+ERR_NOFS=2
+ERR_REGMSG=3
+ERR_ATOM=4
+ERR_MAP=5
+ERR_VIEW=6
+ERR_VERSION=7
+ERR_WRONGFS=8
+ERR_NOTOPEN=9
+ERR_NODATA=10
+ERR_TIMEOUT=11
+ERR_SENDMSG=12
+ERR_DATA=13
+ERR_RUNNING=14
+ERR_SIZE=15
+
+#------------------------------------------------------------------------------
+
+## The version of FSUIPC. They are overwritten by the ones in the recording,
+## if any.
+fsuipc_version=0x0401
+lib_version=0x0302
+fs_version=SIM_FSX
+
+## The maximal time in seconds after the last recorded read, until which the
+## reads are served
+END_GAP = 10.0
+
+#------------------------------------------------------------------------------
+
+class FSUIPCException(Exception):
+    """FSUIPC exception class.
+
+    It contains a member variable named errorCode. The string is a text
+    describing the error."""
+
+    errors=["OK",
+            "Attempt to Open when already Open",
+            "Cannot link to FSUIPC or WideClient",
+            "Failed to Register common message with Windows",
+            "Failed to create Atom for mapping filename",
+            "Failed to create a file mapping object",
+            "Failed to open a view to the file map",
+            "Incorrect version of FSUIPC, or not FSUIPC",
+            "Sim is not version requested",
+            "Call cannot execute, link not Open",
+            "Call cannot execute: no requests accumulated",
+            "IPC timed out all retries",
+            "IPC sendmessage failed all retries",
+            "IPC request contains bad data",
+            "Maybe running on WideClient, but FS not running on Server, or wrong FSUIPC",
+            "Read or Write request cannot be added, memory for Process is full"]
+
+    def __init__(self, errorCode):
+        """
+        Construct the exception
+        """
+        if errorCode<len(self.errors):
+            self.errorString =  self.errors[errorCode]
+        else:
+            self.errorString = "Unknown error"
+        Exception.__init__(self, self.errorString)
+        self.errorCode = errorCode
+
+    def __str__(self):
+        """
+        Convert the excption to string
+        """
+        return "FSUIPC error: %d (%s)" % (self.errorCode, self.errorString)
+
+#------------------------------------------------------------------------------
+
+class Replay(object):
+    """The replay of a recording."""
+    def __init__(self, path):
+        """Construct the replay of the recording with the given path."""
+        reader = telemetry.Reader(path)
+        if reader.backend!="fsuipc":
+            raise ValueError("pyuipc_replay: not an FSUIPC recording: %s (%s)" %
+                             (path, reader.backend))
+
+        self._reader = reader
+        self._records = iter(reader)
+        self._schemaItems = {}
+        self._image = {}
+        self._missing = set()
+
+        self._nextRecord = next(self._records, None)
+        self._lastTime = None
+
+        self.clock = VirtualClock(reader.startTime
+                                  if self._nextRecord is None
+                                  else self._nextRecord.wallTime)
+
+    @property
+    def info(self):
+        """Get the information recorded about the simulator so far."""
+        return self._reader.info
+
+    @property
+    def finished(self):
+        """Determine if the time has passed the end of the recording."""
+        self._update()
+        return self._nextRecord is None and \
+            (self._lastTime is None or
+             self.clock.time()>self._lastTime + END_GAP)
+
+    def read(self, data):
+        """Read the given data from the image as of the current time."""
+        self._update()
+
+        image = self._image
+        values = []
+        for item in data:
+            value = image.get(item)
+            if value is None and item not in image:
+                value = self._getDefault(item)
+            values.append(value)
+        return values
+
+    def _update(self):
+        """Apply the records up to the current time to the image."""
+        now = self.clock.time()
+        image = self._image
+        record = self._nextRecord
+        while record is not None and record.wallTime<=now:
+            schema = record.schema
+            items = self._schemaItems.get(schema.id)
+            if items is None:
+                items = [tuple(item) for item in schema.dataSpec]
+                self._schemaItems[schema.id] = items
+            for (item, value) in zip(items, record.values):
+                image[item] = value
+            self._lastTime = record.wallTime
+            record = next(self._records, None)
+        self._nextRecord = record
+
+    def _getDefault(self, item):
+        """Get the default value of the given item that has not been recorded
+        yet."""
+        if item not in self._missing:
+            self._missing.add(item)
+            print("pyuipc_replay: offset 0x%04x has not been recorded, using a default value" %
+                  (item[0],), file=sys.stderr)
+
+        (offset, type) = item
+        if isinstance(type, int):
+            return b"\0" * (-type)
+        elif type=="f":
+            return 0.0
+        else:
+            return 0
+
+#------------------------------------------------------------------------------
+
+## The current replay
+replay = None
+
+## Indicate if the connection is open
+opened = False
+
+#------------------------------------------------------------------------------
+
+def load(path):
+    """Load the recording with the given path and install the virtual clock
+    of its replay.
+
+    The calling thread becomes the driver of the clock until the connection
+    is opened, so that the other threads waiting for the clock (e.g. the
+    message thread) cannot advance the time past the recording before the
+    handler starts reading it."""
+    global replay, opened
+    replay = Replay(path)
+    opened = False
+    replay.clock.setDriver()
+    setClock(replay.clock)
+
+#------------------------------------------------------------------------------
+
+def open(request):
+    """Open the connection."""
+    global opened, fsuipc_version, lib_version, fs_version
+    if replay is None or replay.finished:
+        raise FSUIPCException(ERR_NOFS)
+    elif opened:
+        raise FSUIPCException(ERR_OPEN)
+    else:
+        info = replay.info
+        fsuipc_version = info.get("fsuipcVersion", fsuipc_version)
+        lib_version = info.get("libVersion", lib_version)
+        fs_version = info.get("fsVersion", fs_version)
+        replay.clock.setDriver()
+        opened = True
+        return True
+
+#------------------------------------------------------------------------------
+
+def prepare_data(pattern, forRead = True):
+    """Prepare the given pattern for reading and/or writing."""
+    if opened:
+        return pattern
+    else:
+        raise FSUIPCException(ERR_NOTOPEN)
+
+#------------------------------------------------------------------------------
+
+def read(data):
+    """Read the given data."""
+    if not opened:
+        raise FSUIPCException(ERR_NOTOPEN)
+    elif replay.finished:
+        raise FSUIPCException(ERR_NODATA)
+    else:
+        return replay.read(data)
+
+#------------------------------------------------------------------------------
+
+def write(data):
+    """Write the given data.
+
+    The data is ignored, since the values to be read are all recorded."""
+    if not opened:
+        raise FSUIPCException(ERR_NOTOPEN)
+
+#------------------------------------------------------------------------------
+
+def close():
+    """Close the connection."""
+    global opened
+    opened = False
+
+#------------------------------------------------------------------------------
@@ -1,15 +1,20 @@
 
 from . import const
+from .clock import getClock, ScaledClock, VirtualClock
 
+import os
 import cmd
 import threading
+import asyncio
 import socket
 import time
 import calendar
 import sys
 import struct
-import pickle
 import math
+import json
+import io
+from operator import itemgetter
 
 #------------------------------------------------------------------------------
 
@@ -20,10 +25,27 @@ import math
 # This is a simulation of the PyUIPC module emulating offsets that are needed
 # by the logger.
 #
+# The state of the simulated aircraft is stored in the attributes of the
+# \ref mlx.pyuipc_sim.Values "Values" object. Like FSUIPC itself, the
+# simulator keeps an image of the offset space, which is refreshed from the
+# attributes when they are modified by a write or when the time (i.e. the
+# second of the UTC time) changes. A read of a pattern of offsets unpacks
+# them from the image by a few struct operations prepared in advance by a
+# \ref mlx.pyuipc_sim.DataReader "DataReader". The offsets not emulated read
+# as zero, and any value can be written to them.
+#
+# The values can also be animated by playing a \ref mlx.pyuipc_sim.Profile
+# "flight profile", i.e. a timeline of flight phases, along which the
+# altitude, the speed, the heading, the position, the fuel, the gear, the
+# flaps, etc. change continuously. The profile is played by a thread on the
+# current clock, or on a scaled one to make it faster than real time.
+#
 # This module can also be run as a program, in which case it connects to an
 # already running logger (that uses this module in place of the real pyuipc),
 # and various commands can be given to query or modify the values of the
-# offsets. There is a 'help' command and completion also works.
+# offsets. There is a 'help' command and completion also works. The commands
+# can also be executed in the process of the simulator via a \ref
+# mlx.pyuipc_sim.LocalClient "LocalClient".
 #
 # This module is used instead of the real PyUIPC module, if the program is not
 # running on Windows or the FORCE_PYUIPC_SIM environment variable is present.
@@ -117,6 +139,119 @@ class FSUIPCException(Exception):
 
 #------------------------------------------------------------------------------
 
+## The size of the image of the offset space
+IMAGE_SIZE = 0x10000
+
+## The struct formats of the PyUIPC types
+_typeFormats = { "b": "B", "c": "b", "h": "h", "H": "H", "d": "i", "u": "I",
+                 "l": "q", "L": "Q", "f": "d", "F": "f" }
+
+#------------------------------------------------------------------------------
+
+def _getFormat(type):
+    """Get the struct format of the given PyUIPC type.
+
+    A negative integer denotes a string of the given length."""
+    if isinstance(type, int) and type<0:
+        return "%ds" % (-type,)
+    elif type in _typeFormats:
+        return _typeFormats[type]
+    else:
+        print("Unhandled type: %s" % (type,))
+        raise FSUIPCException(ERR_DATA)
+
+#------------------------------------------------------------------------------
+
+def _coerceValue(value, type):
+    """Coerce the given value into the range of the given PyUIPC type.
+
+    Integer values are truncated to the width of the type."""
+    format = _getFormat(type)
+    if format[-1]=="s":
+        return Values._encodeString(value)
+    elif format in ["f", "d"]:
+        return float(value)
+    else:
+        numBits = struct.calcsize(format) * 8
+        value = int(value) & ((1<<numBits) - 1)
+        if format.islower() and value>=(1<<(numBits-1)):
+            value -= 1<<numBits
+        return value
+
+#------------------------------------------------------------------------------
+
+class DataReader(object):
+    """A reader of the values of a certain pattern of offsets from the image.
+
+    The items of the pattern are sorted by their offsets and are partitioned
+    into groups of non-overlapping items. Each group is read by a single
+    struct unpacking, skipping the bytes between the items, and the values
+    are then put into the order of the pattern."""
+    def __init__(self, pattern):
+        """Construct the reader for the given pattern of tuples of offsets
+        and types."""
+        self.pattern = pattern
+
+        groups = []
+        indices = sorted(range(0, len(pattern)), key = lambda i: pattern[i][0])
+        for index in indices:
+            (offset, type) = pattern[index][:2]
+            format = _getFormat(type)
+            size = struct.calcsize("<" + format)
+            if offset<0 or offset+size>IMAGE_SIZE:
+                print("Invalid offset: %04x" % (offset,))
+                raise FSUIPCException(ERR_DATA)
+
+            group = None
+            for g in groups:
+                if g[1]<=offset:
+                    group = g
+                    break
+            if group is None:
+                group = [offset, offset, "<", []]
+                groups.append(group)
+
+            if offset>group[1]:
+                group[2] += "%dx" % (offset - group[1],)
+            group[2] += format
+            group[1] = offset + size
+            group[3].append(index)
+
+        self._groups = [(struct.Struct(format).unpack_from, start)
+                        for (start, end, format, groupIndices) in groups]
+
+        positions = [0] * len(pattern)
+        position = 0
+        for (start, end, format, groupIndices) in groups:
+            for index in groupIndices:
+                positions[index] = position
+                position += 1
+        self._getter = itemgetter(*positions) if len(positions)>1 else None
+
+        self._stringIndices = [i for i in range(0, len(pattern))
+                               if isinstance(pattern[i][1], int)]
+
+    def read(self, image):
+        """Read the values from the given image."""
+        groups = self._groups
+        if len(groups)==1:
+            (unpack, start) = groups[0]
+            values = unpack(image, start)
+        else:
+            values = ()
+            for (unpack, start) in groups:
+                values += unpack(image, start)
+
+        getter = self._getter
+        values = list(values) if getter is None else list(getter(values))
+
+        for index in self._stringIndices:
+            values[index] = values[index].split(b"\0", 1)[0]
+
+        return values
+
+#------------------------------------------------------------------------------
+
 class Values(object):
     """The values that can be read from 'FSUIPC'."""
     ## Fuel data index: centre tank
@@ -167,6 +302,101 @@ class Values(object):
     ## The number of hotkey entries
     HOTKEY_SIZE = 56
 
+    ## The maximal number of the readers of unprepared patterns cached
+    MAX_CACHED_READERS = 256
+
+    ## The offsets of the fuel levels of the tanks
+    FUEL_LEVEL_OFFSETS = [0x0b74, 0x0b7c, 0x0b84, 0x0b8c, 0x0b94, 0x0b9c,
+                          0x0ba4, 0x1244, 0x1254, 0x125c]
+
+    ## The offsets of the fuel capacities of the tanks
+    FUEL_CAPACITY_OFFSETS = [0x0b78, 0x0b80, 0x0b88, 0x0b90, 0x0b98, 0x0ba0,
+                             0x0ba8, 0x1248, 0x1258, 0x1260]
+
+    ## The offsets of the image encoded by _getEncoders() that depend on
+    ## each attribute. When an attribute is set, these offsets are refreshed
+    ## before the next read. The payload and the hotkeys are not listed, as
+    ## they are refreshed by the writes of their offsets.
+    ATTRIBUTE_OFFSETS = {
+        "paused": [0x0264],
+        "pitot": [0x029c],
+        "ias": [0x02b4, 0x02b8, 0x02bc, 0x11c6],
+        "altitude": [0x02b8, 0x0570, 0x0590, 0x31e4],
+        "vs": [0x02c8],
+        "adf2": [0x02d4, 0x02d6],
+        "tdRate": [0x030c],
+        "altimeter": [0x0330],
+        "adf1": [0x034c, 0x0356],
+        "nav1": [0x0350],
+        "nav2": [0x0352],
+        "squawk": [0x0354],
+        "onTheGround": [0x0366],
+        "stalled": [0x036c],
+        "overspeed": [0x036d],
+        "latitude": [0x0560],
+        "longitude": [0x0568],
+        "pitch": [0x0578],
+        "bank": [0x057c],
+        "heading": [0x0580],
+        "slew": [0x05dc],
+        "replay": [0x0628],
+        "apMaster": [0x07bc],
+        "apHeadingHold": [0x07c8],
+        "apHeading": [0x07cc],
+        "apAltitudeHold": [0x07d0],
+        "apAltitude": [0x07d4],
+        "throttles": [0x088c, 0x0924, 0x09bc, 0x0a54],
+        "eng1DeIce": [0x08b2],
+        "eng2DeIce": [0x094a],
+        "eng3DeIce": [0x09e2],
+        "eng4DeIce": [0x0a7a],
+        "fuelWeight": [0x0af4] + FUEL_CAPACITY_OFFSETS,
+        "fuelWeights": FUEL_LEVEL_OFFSETS + [0x30c0],
+        "fuelCapacities": FUEL_LEVEL_OFFSETS + FUEL_CAPACITY_OFFSETS,
+        "parking": [0x0bc8],
+        "spoilersArmed": [0x0bcc],
+        "spoilers": [0x0bd0],
+        "flapsNotches": [0x0bdc, 0x0be0, 0x0be4, 0x3414, 0x3bfa],
+        "flapsControl": [0x0bdc, 0x3414],
+        "flaps": [0x0be0, 0x0be4],
+        "gearControl": [0x0be8],
+        "noseGear": [0x0bec],
+        "nav1_obs": [0x0c4e],
+        "nav2_obs": [0x0c5e],
+        "navLightsOn": [0x0d0c],
+        "antiCollisionLightsOn": [0x0d0c],
+        "landingLightsOn": [0x0d0c],
+        "strobeLightsOn": [0x0d0c],
+        "visibility": [0x0e8a],
+        "windSpeed": [0x0e90],
+        "windDirection": [0x0e92],
+        "qnh": [0x0ec6],
+        "gLoad": [0x11b8, 0x11ba],
+        "textScrolling": [0x1274],
+        "payloadCount": [0x13fc],
+        "n1": [0x2000, 0x2100, 0x2200, 0x2300],
+        "elevatorTrim": [0x2ea0],
+        "cog": [0x2ef8],
+        "zfw": [0x30c0, 0x3bfc],
+        "radioAltitude": [0x31e4],
+        "messageDuration": [0x32fa],
+        "frozen": [0x3364],
+        "propDeIce": [0x337c],
+        "structDeIce": [0x337d],
+        "message": [0x3380],
+        "airPath": [0x3c00],
+        "aircraftName": [0x3d00],
+        "pmdg_737ng_switches": [0x6202],
+        "pmdg_737ngx_lts_positionsw": [0x6500],
+        "xpdrC": [0x7b91]
+    }
+
+    @staticmethod
+    def _encodeString(value):
+        """Encode the given string into bytes, if it is not bytes yet."""
+        return value if isinstance(value, bytes) \
+            else bytes(str(value), "iso-8859-1", "replace")
+
     @staticmethod
     def _readFrequency(frequency):
         """Convert the given frequency into BCD."""
@@ -338,13 +568,141 @@ class Values(object):
         self.propDeIce = False
         self.structDeIce = False
 
+        self._image = bytearray(IMAGE_SIZE)
+        self._encoders = \
+            [(struct.Struct("<" + _getFormat(type)).pack_into, offset,
+              encoder, type)
+             for (offset, type, encoder) in self._getEncoders()]
+        self._tableEncoders = \
+            [(struct.Struct("<" + _getFormat(type)).pack_into, offset,
+              encoder, type)
+             for (offset, type, encoder) in self._getTableEncoders()]
+        self._timeEncoders = \
+            [(struct.Struct("<" + _getFormat(type)).pack_into, offset,
+              encoder, type)
+             for (offset, type, encoder) in self._getTimeEncoders()]
+
+        self._tableEncodersByOffset = {}
+        for encoder in self._tableEncoders:
+            self._tableEncodersByOffset[encoder[1]] = encoder
+
+        encodersByOffset = {}
+        for encoder in self._encoders:
+            encodersByOffset[encoder[1]] = encoder
+        self._encodersByAttribute = {}
+        for (name, offsets) in Values.ATTRIBUTE_OFFSETS.items():
+            self._encodersByAttribute[name] = \
+                [encodersByOffset[offset] for offset in offsets]
+
+        self._readers = {}
+        self._dirty = True
+        self._changed = set()
+        self._changedLock = threading.Lock()
+        self._utcSecond = None
+        self._encode(self._tableEncoders)
+
+    def __setattr__(self, name, value):
+        """Set the given attribute.
+
+        If it is a public attribute, its name is recorded, so that the
+        offsets depending on it are refreshed before the next read."""
+        object.__setattr__(self, name, value)
+        if name[0]!="_" and "_changedLock" in self.__dict__:
+            self._setChanged(name)
+
+    def _setChanged(self, name):
+        """Record that the attribute with the given name has changed.
+
+        It may be called from any thread, e.g. from that of the server or of
+        a profile runner."""
+        with self._changedLock:
+            self._changed.add(name)
+
+    def invalidate(self):
+        """Indicate that the attributes have been modified in a way not
+        detected automatically, e.g. by modifying the elements of a list, and
+        so the whole image should be refreshed before the next read."""
+        self._dirty = True
+        self._encode(self._tableEncoders)
+
     def read(self, offset, type):
         """Read the value at the given offset."""
-        try:
-            return self._read(offset, type)
-        except Exception as e:
-            print("failed to read offset %04x: %s" % (offset, str(e)))
+        return self.readData([(offset, type)])[0]
+
+    def readData(self, data):
+        """Read the values of the given data.
+
+        The data is either a list of tuples of offsets and types, or a
+        DataReader prepared for such a list."""
+        reader = data if isinstance(data, DataReader) else \
+                 self._getReader(data)
+        self._refresh()
+        return reader.read(self._image)
+
+    def _getReader(self, pattern):
+        """Get a reader for the given pattern."""
+        key = tuple([(item[0], item[1]) for item in pattern])
+        reader = self._readers.get(key)
+        if reader is None:
+            if len(self._readers)>=Values.MAX_CACHED_READERS:
+                self._readers.clear()
+            reader = DataReader(key)
+            self._readers[key] = reader
+        return reader
+
+    def _refresh(self):
+        """Refresh the image, if needed.
+
+        If the image has been invalidated, all offsets are refreshed.
+        Otherwise the offsets depending on the attributes set since the last
+        refresh are refreshed. The offsets of the time are refreshed, if the
+        time has changed since their last refresh."""
+        with self._changedLock:
+            changed = self._changed
+            self._changed = set()
+        if self._dirty:
+            self._dirty = False
+            self._encode(self._encoders)
+        elif changed:
+            encodersByAttribute = self._encodersByAttribute
+            encoders = set()
+            for name in changed:
+                encoders.update(encodersByAttribute.get(name, []))
+            self._encode(encoders)
+
+        now = getClock().time() + self._timeOffset
+        second = int(now)
+        if second!=self._utcSecond:
+            self._utcSecond = second
+            tm = time.gmtime(now)
+            self._encode([(pack, offset, lambda encoder = encoder:
+                           encoder(tm), type)
+                          for (pack, offset, encoder, type)
+                          in self._timeEncoders])
+
+    def _encode(self, encoders):
+        """Encode the values of the given encoders into the image."""
+        image = self._image
+        for (pack, offset, encoder, type) in encoders:
+            value = encoder()
+            try:
+                pack(image, offset, value)
+            except struct.error:
+                pack(image, offset, _coerceValue(value, type))
+
+    def _writeRaw(self, offset, value, type):
+        """Write the given value into the image at the given offset.
+
+        It is used for the offsets not emulated by the attributes."""
+        format = "<" + _getFormat(type)
+        if offset<0 or offset+struct.calcsize(format)>IMAGE_SIZE:
+            print("Invalid offset: %04x" % (offset,))
             raise FSUIPCException(ERR_DATA)
+        try:
+            struct.pack_into(format, self._image, offset, value)
+        except struct.error:
+            struct.pack_into(format, self._image, offset,
+                             _coerceValue(value, type))
 
     def _getFlapsControl(self):
         """Get the flaps control value"""
@@ -352,7 +710,7 @@ class Values(object):
         flapsIncrement = 16383.0 / numNotchesM1
         index = 0
         while index<numNotchesM1 and \
-              self.flapsControl>self.flapsNotches[index]:
+              self.flapsControl>=self.flapsNotches[index+1]:
             index += 1
 
         if index==numNotchesM1:
@@ -363,270 +721,200 @@ class Values(object):
                        flapsIncrement //
                        (self.flapsNotches[index+1] - self.flapsNotches[index]))
 
-    def _read(self, offset, type):
-        """Read the value at the given offset."""
-        if offset==0x023a:         # Second of time
-            return self._readUTC().tm_sec
-        elif offset==0x023b:       # Hour of Zulu time
-            return self._readUTC().tm_hour
-        elif offset==0x023c:       # Minute of Zulu time
-            return self._readUTC().tm_min
-        elif offset==0x023e:       # Day number on year
-            return self._readUTC().tm_yday
-        elif offset==0x0240:       # Year in FS
-            return self._readUTC().tm_year
-        elif offset==0x0264:       # Paused
-            return 1 if self.paused else 0
-        elif offset==0x029c:       # Pitot
-            return 1 if self.pitot else 0
-        elif offset==0x02b4:       # Ground speed
+    def _getLights(self):
+        """Get the value of the lights offset."""
+        lights = 0
+        if self.navLightsOn: lights |= 0x01
+        if self.antiCollisionLightsOn: lights |= 0x02
+        if self.landingLightsOn: lights |= 0x04
+        if self.strobeLightsOn: lights |= 0x10
+        return lights
+
+    def _getRadioAltitude(self):
+        """Get the value of the radio altitude offset."""
+        # FIXME: if self.radioAltitude is None, calculate from the
+        # altitude with some, perhaps random, ground altitude
+        # value
+        radioAltitude = (self.altitude - 517) \
+            if self.radioAltitude is None else self.radioAltitude
+        return int(radioAltitude * const.FEETTOMETRES * 65536.0)
+
+    def _getHotkey(self, index):
+        """Get the value of the hotkey with the given index."""
+        hotkey = self.hotkeyTable[index]
+        value = hotkey[3]
+        value <<= 8
+        value |= hotkey[2]
+        value <<= 8
+        value |= hotkey[1]
+        value <<= 8
+        value |= hotkey[0]
+        return value
+
+    def _getEncoders(self):
+        """Get the encoders of the offsets of the image.
+
+        Returns a list of tuples of the offset, the type and a function
+        returning the value of the offset computed from the attributes."""
+        encoders = [
+            (0x0264, "H", lambda: 1 if self.paused else 0),
+            (0x029c, "b", lambda: 1 if self.pitot else 0),
             # FIXME: calculate TAS first, then from the heading and
             # wind the GS
-            return int(self.ias * 65536.0 * 1852.0 / 3600.0)
-        elif offset==0x02b8:       # TAS
-            return int(self._getTAS() * 128.0)
-        elif offset==0x02bc:       # IAS
-            return int(self.ias * 128.0)
-        elif offset==0x02c8:       # VS
-            return int(self.vs * const.FEETTOMETRES * 256.0 / 60.0)
-        elif offset==0x02d4:       # ADF2 main
-            return Values._readADFFrequency(self.adf2)[0]
-        elif offset==0x02d6:       # ADF2 extended
-            return Values._readADFFrequency(self.adf2)[1]
-        elif offset==0x030c:       # TD rate
-            return int(self.tdRate * const.FEETTOMETRES * 256.0 / 60.0)
-        elif offset==0x0330:       # Altimeter
-            return int(self.altimeter * 16.0)
-        elif offset==0x034c:       # ADF1 main
-            return Values._readADFFrequency(self.adf1)[0]
-        elif offset==0x0350:       # NAV1
-            return Values._readFrequency(self.nav1)
-        elif offset==0x0352:       # NAV2
-            return Values._readFrequency(self.nav2)
-        elif offset==0x0354:       # Squawk
-            return Values._readBCD(self.squawk)
-        elif offset==0x0356:       # ADF1 extended
-            return Values._readADFFrequency(self.adf1)[1]
-        elif offset==0x0366:       # On the ground
-            return 1 if self.onTheGround else 0
-        elif offset==0x036c:       # Stalled
-            return 1 if self.stalled else 0
-        elif offset==0x036d:       # Overspeed
-            return 1 if self.overspeed else 0
-        elif offset==0x0560:       # Latitude
-            return int(self.latitude * 10001750.0 * 65536.0 * 65536.0 / 90.0)
-        elif offset==0x0568:       # Longitude
-            return int(self.longitude * 65536.0 * 65536.0 * 65536.0 * 65536.0 / 360.0)
-        elif offset==0x0570:       # Altitude
-            return int(self.altitude * const.FEETTOMETRES * 65536.0 * 65536.0)
-        elif offset==0x0590:       # Altitude (MSFS 2020)
-            return self.altitude
-        elif offset==0x0578:       # Pitch
-            return int(self.pitch * 65536.0 * 65536.0 / 360.0)
-        elif offset==0x057c:       # Bank
-            return int(self.bank * 65536.0 * 65536.0 / 360.0)
-        elif offset==0x0580:       # Heading
-            return int(self.heading * 65536.0 * 65536.0 / 360.0)
-        elif offset==0x05dc:       # Slew
-            return 1 if self.slew else 0
-        elif offset==0x0628:       # Replay
-            return 1 if self.replay else 0
-        elif offset==0x07bc:       # AP Master switch
-            return 1 if self.apMaster else 0
-        elif offset==0x07c8:       # AP heading hold
-            return 1 if self.apHeadingHold else 0
-        elif offset==0x07cc:       # AP heading
-            return int(self.apHeading * 65536.0 / 360.0)
-        elif offset==0x07d0:       # AP altitude hold
-            return 1 if self.apAltitudeHold else 0
-        elif offset==0x07d4:       # AP altitude
-            return int(self.apAltitude * const.FEETTOMETRES * 65536.0)
-        elif offset==0x088c:       # Engine #1 throttle
-            return self._getThrottle(self.ENGINE_1)
-        elif offset==0x08b2:       # Engine #1 de-ice
-            return 1 if self.eng1DeIce else 0
-        elif offset==0x0924:       # Engine #2 throttle
-            return self._getThrottle(self.ENGINE_2)
-        elif offset==0x094a:       # Engine #2 de-ice
-            return 1 if self.eng2DeIce else 0
-        elif offset==0x09bc:       # Engine #3 throttle
-            return self._getThrottle(self.ENGINE_3)
-        elif offset==0x09e2:       # Engine #3 de-ice
-            return 1 if self.eng3DeIce else 0
-        elif offset==0x0a54:       # Engine #4 throttle
-            return self._getThrottle(self.ENGINE_4)
-        elif offset==0x0a7a:       # Engine #4 de-ice
-            return 1 if self.eng4DeIce else 0
-        elif offset==0x0af4:       # Fuel weight
-            return int(self.fuelWeight * 256.0)
-        elif offset==0x0b74:       # Centre tank level
-            return self._getFuelLevel(self.FUEL_CENTRE)
-        elif offset==0x0b78:       # Centre tank capacity
-            return self._getFuelCapacity(self.FUEL_CENTRE)
-        elif offset==0x0b7c:       # Left tank level
-            return self._getFuelLevel(self.FUEL_LEFT)
-        elif offset==0x0b80:       # Left tank capacity
-            return self._getFuelCapacity(self.FUEL_LEFT)
-        elif offset==0x0b84:       # Left aux tank level
-            return self._getFuelLevel(self.FUEL_LEFT_AUX)
-        elif offset==0x0b88:       # Left aux tank capacity
-            return self._getFuelCapacity(self.FUEL_LEFT_AUX)
-        elif offset==0x0b8c:       # Left tip tank level
-            return self._getFuelLevel(self.FUEL_LEFT_TIP)
-        elif offset==0x0b90:       # Left tip tank capacity
-            return self._getFuelCapacity(self.FUEL_LEFT_TIP)
-        elif offset==0x0b94:       # Right aux tank level
-            return self._getFuelLevel(self.FUEL_RIGHT)
-        elif offset==0x0b98:       # Right aux tank capacity
-            return self._getFuelCapacity(self.FUEL_RIGHT)
-        elif offset==0x0b9c:       # Right tank level
-            return self._getFuelLevel(self.FUEL_RIGHT_AUX)
-        elif offset==0x0ba0:       # Right tank capacity
-            return self._getFuelCapacity(self.FUEL_RIGHT_AUX)
-        elif offset==0x0ba4:       # Right tip tank level
-            return self._getFuelLevel(self.FUEL_RIGHT_TIP)
-        elif offset==0x0ba8:       # Right tip tank capacity
-            return self._getFuelCapacity(self.FUEL_RIGHT_TIP)
-        elif offset==0x0bc8:       # Parking
-            return 1 if self.parking else 0
-        elif offset==0x0bcc:       # Spoilers armed
-            return 1 if self.spoilersArmed else 0
-        elif offset==0x0bd0:       # Spoilers
-            return 0 if self.spoilers == 0 \
-                else int(self.spoilers * (16383 - 4800) + 4800)
-        elif offset==0x0bdc:       # Flaps control
-            return self._getFlapsControl()
-        elif offset==0x0be0 or offset==0x0be4:    # Flaps left and  right
-            return self.flaps * 16383.0 / self.flapsNotches[-1]
-        elif offset==0x0be8:       # Gear control
-            return int(self.gearControl * 16383.0)
-        elif offset==0x0bec:       # Nose gear
-            return int(self.noseGear * 16383.0)
-        elif offset==0x0c4e:       # NAV1 OBS
-            return self.nav1_obs
-        elif offset==0x0c5e:       # NAV2 OBS
-            return self.nav2_obs
-        elif offset==0x0d0c:       # Lights
-            lights = 0
-            if self.navLightsOn: lights |= 0x01
-            if self.antiCollisionLightsOn: lights |= 0x02
-            if self.landingLightsOn: lights |= 0x04
-            if self.strobeLightsOn: lights |= 0x10
-            return lights
-        elif offset==0x0e8a:       # Visibility
-            return int(self.visibility * 100.0 / 1609.344)
-        elif offset==0x0e90:       # Wind speed
-            return int(self.windSpeed)
-        elif offset==0x0e92:       # Wind direction
-            return int(self.windDirection * 65536.0 / 360.0)
-        elif offset==0x0ec6:       # QNH
-            return int(self.qnh * 16.0)
-        elif offset==0x11b8:       # G-Load at touchdown
-            return int(self.gLoad * 625.0)
-        elif offset==0x11ba:       # G-Load
-            return int(self.gLoad * 625.0)
-        elif offset==0x11c6:       # Mach
+            (0x02b4, "d", lambda: int(self.ias * 65536.0 * 1852.0 / 3600.0)),
+            (0x02b8, "d", lambda: int(self._getTAS() * 128.0)),
+            (0x02bc, "d", lambda: int(self.ias * 128.0)),
+            (0x02c8, "d",
+             lambda: int(self.vs * const.FEETTOMETRES * 256.0 / 60.0)),
+            (0x02d4, "H", lambda: Values._readADFFrequency(self.adf2)[0]),
+            (0x02d6, "H", lambda: Values._readADFFrequency(self.adf2)[1]),
+            (0x030c, "d",
+             lambda: int(self.tdRate * const.FEETTOMETRES * 256.0 / 60.0)),
+            (0x0330, "H", lambda: int(self.altimeter * 16.0)),
+            (0x034c, "H", lambda: Values._readADFFrequency(self.adf1)[0]),
+            (0x0350, "H", lambda: Values._readFrequency(self.nav1)),
+            (0x0352, "H", lambda: Values._readFrequency(self.nav2)),
+            (0x0354, "H", lambda: Values._readBCD(self.squawk)),
+            (0x0356, "H", lambda: Values._readADFFrequency(self.adf1)[1]),
+            (0x0366, "H", lambda: 1 if self.onTheGround else 0),
+            (0x036c, "b", lambda: 1 if self.stalled else 0),
+            (0x036d, "b", lambda: 1 if self.overspeed else 0),
+            (0x0560, "l",
+             lambda: int(self.latitude * 10001750.0 * 65536.0 * 65536.0 / 90.0)),
+            (0x0568, "l",
+             lambda: int(self.longitude * 65536.0 * 65536.0 * 65536.0 *
+                         65536.0 / 360.0)),
+            (0x0570, "l",
+             lambda: int(self.altitude * const.FEETTOMETRES *
+                         65536.0 * 65536.0)),
+            (0x0578, "d", lambda: int(self.pitch * 65536.0 * 65536.0 / 360.0)),
+            (0x057c, "d", lambda: int(self.bank * 65536.0 * 65536.0 / 360.0)),
+            (0x0580, "d",
+             lambda: int(self.heading * 65536.0 * 65536.0 / 360.0)),
+            (0x0590, "d", lambda: int(self.altitude)),  # Altitude (MSFS 2020)
+            (0x05dc, "H", lambda: 1 if self.slew else 0),
+            (0x0628, "d", lambda: 1 if self.replay else 0),
+            (0x07bc, "d", lambda: 1 if self.apMaster else 0),
+            (0x07c8, "d", lambda: 1 if self.apHeadingHold else 0),
+            (0x07cc, "H", lambda: int(self.apHeading * 65536.0 / 360.0)),
+            (0x07d0, "d", lambda: 1 if self.apAltitudeHold else 0),
+            (0x07d4, "u",
+             lambda: int(self.apAltitude * const.FEETTOMETRES * 65536.0)),
+            (0x0af4, "H", lambda: int(self.fuelWeight * 256.0)),
+            (0x0bc8, "H", lambda: 1 if self.parking else 0),
+            (0x0bcc, "d", lambda: 1 if self.spoilersArmed else 0),
+            (0x0bd0, "d", lambda: 0 if self.spoilers == 0 \
+             else int(self.spoilers * (16383 - 4800) + 4800)),
+            (0x0bdc, "d", self._getFlapsControl),
+            (0x0be0, "d",
+             lambda: int(self.flaps * 16383.0 / self.flapsNotches[-1])),
+            (0x0be4, "d",
+             lambda: int(self.flaps * 16383.0 / self.flapsNotches[-1])),
+            (0x0be8, "d", lambda: int(self.gearControl * 16383.0)),
+            (0x0bec, "d", lambda: int(self.noseGear * 16383.0)),
+            (0x0c4e, "H", lambda: self.nav1_obs),
+            (0x0c5e, "H", lambda: self.nav2_obs),
+            (0x0d0c, "H", self._getLights),
+            (0x0e8a, "H", lambda: int(self.visibility * 100.0 / 1609.344)),
+            (0x0e90, "H", lambda: int(self.windSpeed)),
+            (0x0e92, "H", lambda: int(self.windDirection * 65536.0 / 360.0)),
+            (0x0ec6, "H", lambda: int(self.qnh * 16.0)),
+            (0x11b8, "h", lambda: int(self.gLoad * 625.0)),  # at touchdown
+            (0x11ba, "h", lambda: int(self.gLoad * 625.0)),
             # FIXME: calculate from IAS, altitude and QNH
-            return int(self.ias * 0.05 * 20480.)
-        elif offset==0x1244:       # Centre 2 tank level
-            return self._getFuelLevel(self.FUEL_CENTRE_2)
-        elif offset==0x1248:       # Centre 2 tank capacity
-            return self._getFuelCapacity(self.FUEL_CENTRE_2)
-        elif offset==0x1254:       # External 1 tank level
-            return self._getFuelLevel(self.FUEL_EXTERNAL_1)
-        elif offset==0x1258:       # External 1 tank capacity
-            return self._getFuelCapacity(self.FUEL_EXTERNAL_1)
-        elif offset==0x125c:       # External 2 tank level
-            return self._getFuelLevel(self.FUEL_EXTERNAL_2)
-        elif offset==0x1260:       # External 2 tank capacity
-            return self._getFuelCapacity(self.FUEL_EXTERNAL_2)
-        elif offset==0x1274:       # Text display mode
-            return 1 if self.textScrolling else 0
-        elif offset==0x13fc:       # The number of the payload stations
-            return self.payloadCount
-        elif offset>=0x1400 and offset<=0x1f40 and \
-             ((offset-0x1400)%48)==0: # Payload
-            return self.payload[ (offset - 0x1400) // 48 ]
-        elif offset==0x2000:       # Engine #1 N1
-            return self.n1[self.ENGINE_1]
-        elif offset==0x2100:       # Engine #2 N1
-            return self.n1[self.ENGINE_2]
-        elif offset==0x2200:       # Engine #3 N1
-            return self.n1[self.ENGINE_3]
-        elif offset==0x2300:       # Engine #4 N1
-            return self.n1[self.ENGINE_3]
-        elif offset==0x2ea0:       # Elevator trim
-            return self.elevatorTrim * math.pi / 180.0
-        elif offset==0x2ef8:       # Centre of Gravity
-            return self.cog
-        elif offset==0x30c0:       # Gross weight
-            return (self.zfw + sum(self.fuelWeights)) * const.KGSTOLB
-        elif offset==0x31e4:       # Radio altitude
-            # FIXME: if self.radioAltitude is None, calculate from the
-            # altitude with some, perhaps random, ground altitude
-            # value
-            radioAltitude = (self.altitude - 517) \
-                if self.radioAltitude is None else self.radioAltitude
-            return (radioAltitude * const.FEETTOMETRES * 65536.0)
-        elif offset==0x320c:
-            return Values.HOTKEY_SIZE
-        elif offset>=0x3210 and offset<0x3210+Values.HOTKEY_SIZE*4:
-            tableOffset = offset - 0x3210
-            hotkeyIndex = tableOffset // 4
-            index = tableOffset % 4
-            if type=="b" or type=="c":
-                return self.hotkeyTable[hotkeyIndex][index]
-            elif type=="d" or type=="u":
-                if index==0:
-                    hotkey = self.hotkeyTable[hotkeyIndex]
-                    value = hotkey[3]
-                    value <<= 8
-                    value |= hotkey[2]
-                    value <<= 8
-                    value |= hotkey[1]
-                    value <<= 8
-                    value |= hotkey[0]
-                    return value
-                else:
-                    print("Unhandled offset: %04x" % (offset,))
-                    raise FSUIPCException(ERR_DATA)
-            else:
-                print("Unhandled offset: %04x" % (offset,))
-                raise FSUIPCException(ERR_DATA)
-        elif offset==0x32fa:       # Message duration
-            return self.messageDuration
-        elif offset==0x337c:       # Prop de-ice
-            return 1 if self.propDeIce else 0
-        elif offset==0x337d:       # Structural de-ice
-            return 1 if self.structDeIce else 0
-        elif offset==0x3380:       # Message
-            return self.message
-        elif offset==0x3364:       # Frozen
-            return 1 if self.frozen else 0
-        elif offset==0x3414:       # Flaps axis
-            return self._getFlapsControl()
-        elif offset==0x3bfa:       # Flaps increment
-            return 16383 // (len(self.flapsNotches)-1)
-        elif offset==0x3bfc:       # ZFW
-            return int(self.zfw * 256.0 * const.KGSTOLB)
-        elif offset==0x3c00:       # Path of the current AIR file
-            return bytes(self.airPath, "iso-8859-1")
-        elif offset==0x3d00:       # Name of the current aircraft
-            return bytes(self.aircraftName, "iso-8859-1")
-        elif offset==0x6202:       # PMDG 737NG switches
-            return self.pmdg_737ng_switches
-        elif offset==0x6500:       # PMDG 737NGX lights position SW
-            return self.pmdg_737ngx_lts_positionsw
-        elif offset==0x7b91:       # Transponder standby
-            return 0 if self.xpdrC else 1
-        else:
-            print("Unhandled offset: %04x" % (offset,))
-            raise FSUIPCException(ERR_DATA)
+            (0x11c6, "H", lambda: int(self.ias * 0.05 * 20480.)),
+            (0x1274, "h", lambda: 1 if self.textScrolling else 0),
+            (0x13fc, "d", lambda: self.payloadCount),
+            (0x2ea0, "f", lambda: self.elevatorTrim * math.pi / 180.0),
+            (0x2ef8, "f", lambda: self.cog),
+            (0x30c0, "f",
+             lambda: (self.zfw + sum(self.fuelWeights)) * const.KGSTOLB),
+            (0x31e4, "d", self._getRadioAltitude),
+            (0x320c, "u", lambda: Values.HOTKEY_SIZE),
+            (0x32fa, "h", lambda: self.messageDuration),
+            (0x3364, "H", lambda: 1 if self.frozen else 0),
+            (0x337c, "b", lambda: 1 if self.propDeIce else 0),
+            (0x337d, "b", lambda: 1 if self.structDeIce else 0),
+            (0x3380, -128, lambda: Values._encodeString(self.message)),
+            (0x3414, "H", self._getFlapsControl),
+            (0x3bfa, "H", lambda: 16383 // (len(self.flapsNotches)-1)),
+            (0x3bfc, "d", lambda: int(self.zfw * 256.0 * const.KGSTOLB)),
+            (0x3c00, -256, lambda: Values._encodeString(self.airPath)),
+            (0x3d00, -256, lambda: Values._encodeString(self.aircraftName)),
+            (0x6202, "b", lambda: self.pmdg_737ng_switches),
+            (0x6500, "b", lambda: self.pmdg_737ngx_lts_positionsw),
+            (0x7b91, "b", lambda: 0 if self.xpdrC else 1)]
+
+        engineDeIces = [lambda: 1 if self.eng1DeIce else 0,
+                        lambda: 1 if self.eng2DeIce else 0,
+                        lambda: 1 if self.eng3DeIce else 0,
+                        lambda: 1 if self.eng4DeIce else 0]
+        for engine in range(0, 4):
+            encoders.append((0x088c + engine * 0x98, "h",
+                             lambda engine = engine:
+                             self._getThrottle(engine)))
+            encoders.append((0x08b2 + engine * 0x98, "H",
+                             engineDeIces[engine]))
+            encoders.append((0x2000 + engine * 0x100, "f",
+                             lambda engine = engine: self.n1[engine]))
+
+        for (tank, offset) in [(self.FUEL_CENTRE, 0x0b74),
+                               (self.FUEL_LEFT, 0x0b7c),
+                               (self.FUEL_LEFT_AUX, 0x0b84),
+                               (self.FUEL_LEFT_TIP, 0x0b8c),
+                               (self.FUEL_RIGHT, 0x0b94),
+                               (self.FUEL_RIGHT_AUX, 0x0b9c),
+                               (self.FUEL_RIGHT_TIP, 0x0ba4),
+                               (self.FUEL_CENTRE_2, 0x1244),
+                               (self.FUEL_EXTERNAL_1, 0x1254),
+                               (self.FUEL_EXTERNAL_2, 0x125c)]:
+            encoders.append((offset, "u",
+                             lambda tank = tank: self._getFuelLevel(tank)))
+            encoders.append((offset + 4, "u",
+                             lambda tank = tank: self._getFuelCapacity(tank)))
+
+        return encoders
+
+    def _getTableEncoders(self):
+        """Get the encoders of the offsets of the tables, i.e. of the payload
+        and of the hotkeys.
+
+        The values of these offsets do not depend on other attributes, so
+        only the offset written is refreshed by a write. The result is
+        of the same format as that of _getEncoders()."""
+        encoders = []
+        for index in range(0, len(self.payload)):
+            encoders.append((0x1400 + index * 48, "f",
+                             lambda index = index: self.payload[index]))
+
+        for index in range(0, Values.HOTKEY_SIZE):
+            encoders.append((0x3210 + index * 4, "u",
+                             lambda index = index: self._getHotkey(index)))
+
+        return encoders
+
+    def _getTimeEncoders(self):
+        """Get the encoders of the offsets of the UTC time.
+
+        Returns a list of tuples of the offset, the type and a function
+        returning the value of the offset from the given time structure."""
+        return [(0x023a, "b", lambda tm: tm.tm_sec),
+                (0x023b, "b", lambda tm: tm.tm_hour),
+                (0x023c, "b", lambda tm: tm.tm_min),
+                (0x023e, "H", lambda tm: tm.tm_yday),
+                (0x0240, "H", lambda tm: tm.tm_year)]
 
     def write(self, offset, value, type):
         """Write the value at the given offset."""
         try:
-            return self._write(offset, value, type)
+            result = self._write(offset, value, type)
+            tableOffset = offset
+            if offset>=0x3210 and offset<0x3210+Values.HOTKEY_SIZE*4:
+                tableOffset -= (offset - 0x3210) % 4
+            tableEncoder = self._tableEncodersByOffset.get(tableOffset)
+            if tableEncoder is not None:
+                self._encode([tableEncoder])
+            return result
         except TypeError as e:
             raise e
         except Exception as e:
@@ -764,8 +1052,8 @@ class Values(object):
         elif offset==0x0bcc:       # Spoilers armed
             self.spoilersArmed = value!=0
         elif offset==0x0bd0:       # Spoilers
-            self.spoilters = 0 if value==0 \
-                             else (value - 4800) // (16383 - 4800)
+            self.spoilers = 0 if value==0 \
+                            else (value - 4800) / (16383 - 4800)
         elif offset==0x0bdc:       # Flaps control
             numNotchesM1 = len(self.flapsNotches) - 1
             flapsIncrement = 16383.0 / numNotchesM1
@@ -818,7 +1106,7 @@ class Values(object):
         elif offset==0x1260:       # External 2 tank capacity
             self._setFuelCapacity(self.FUEL_EXTERNAL_2, value)
         elif offset==0x1274:       # Text display mode
-            textScrolling = value!=0
+            self.textScrolling = value!=0
         elif offset==0x13fc:       # The number of the payload stations
             self.payloadCount = int(value)
         elif offset>=0x1400 and offset<=0x1f40 and \
@@ -826,12 +1114,16 @@ class Values(object):
             self.payload[ (offset - 0x1400) // 48 ] = value
         elif offset==0x2000:       # Engine #1 N1
             self.n1[self.ENGINE_1] = value
+            self._setChanged("n1")
         elif offset==0x2100:       # Engine #2 N1
             self.n1[self.ENGINE_2] = value
+            self._setChanged("n1")
         elif offset==0x2200:       # Engine #3 N1
             self.n1[self.ENGINE_3] = value
+            self._setChanged("n1")
         elif offset==0x2300:       # Engine #4 N1
             self.n1[self.ENGINE_4] = value
+            self._setChanged("n1")
         elif offset==0x2ea0:       # Elevator trim
             self.elevatorTrim = value * 180.0 / math.pi
         elif offset==0x2ef8:       # Centre of Gravity
@@ -873,7 +1165,7 @@ class Values(object):
         elif offset==0x337d:       # Structural de-ice
             self.structDeIce = value!=0
         elif offset==0x3380:       # Message
-            if not isinstance(value, str):
+            if not isinstance(value, (str, bytes)):
                 raise TypeError("String expected!")
             self.message = value
         elif offset==0x3bfc:       # ZFW
@@ -889,14 +1181,13 @@ class Values(object):
         elif offset==0x7b91:       # Transponder standby
             self.xpdrC = value==0
         else:
-            print("Unhandled offset: %04x" % (offset,))
-            raise FSUIPCException(ERR_DATA)
+            self._writeRaw(offset, value, type)
 
     def _readUTC(self):
         """Read the UTC time.
 
         The current offset is added to it."""
-        return time.gmtime(time.time() + self._timeOffset)
+        return time.gmtime(getClock().time() + self._timeOffset)
 
     def _getFuelLevel(self, index):
         """Get the fuel level for the fuel tank with the given
@@ -918,19 +1209,23 @@ class Values(object):
         tm = self._readUTC()
         tm1 = tm[:index] + (value,) + tm[(index+1):]
         self._timeOffset += calendar.timegm(tm1) - calendar.timegm(tm)
+        self._utcSecond = None
 
     def _setThrottle(self, index, value):
         """Set the throttle value for the given index."""
         self.throttles[index] = value / 16383.0
+        self._setChanged("throttles")
 
     def _setFuelLevel(self, index, value):
         """Set the fuel level for the fuel tank with the given index."""
         self.fuelWeights[index] = self.fuelCapacities[index] * float(value) / \
                                   65536.0 / 128.0
+        self._setChanged("fuelWeights")
 
     def _setFuelCapacity(self, index, value):
         """Set the capacity of the fuel tank with the given index."""
         self.fuelCapacities[index] = value * self.fuelWeight * const.LBSTOKG
+        self._setChanged("fuelCapacities")
 
     def _getTAS(self):
         """Calculate the true airspeed."""
@@ -945,6 +1240,262 @@ class Values(object):
 
 #------------------------------------------------------------------------------
 
+class Phase(object):
+    """A phase of a flight profile.
+
+    A phase has a name, a duration in seconds and the values of the
+    attributes of \\ref mlx.pyuipc_sim.Values "Values" to be reached by its
+    end. The attributes in INTERPOLATED change linearly from their values at
+    the start of the phase to the given ones, the others are set at the
+    start of the phase. For the lists of the engine values (n1 and
+    throttles), a single number can be given, which is used for all engines.
+
+    The following items are not attributes:
+    - fuelFlow: the total fuel flow in kg/hour during the phase, with which
+    the fuel of the non-empty tanks is decreased proportionally,
+    - gear: the gear control and the position of the gear,
+    - flapsSet: the flaps control and the position of the flaps,
+    - groundAltitude: the altitude of the ground in feet from the start of
+    the phase on."""
+    ## The attributes that are interpolated
+    INTERPOLATED = frozenset(["altitude", "ias", "heading", "pitch", "bank",
+                              "flaps", "flapsControl", "gearControl",
+                              "noseGear", "spoilers", "n1", "throttles",
+                              "gLoad", "elevatorTrim", "altimeter", "qnh",
+                              "windSpeed", "windDirection", "visibility",
+                              "zfw"])
+
+    def __init__(self, name, duration, values):
+        """Construct the phase."""
+        self.name = name
+        self.duration = float(duration)
+        self.values = dict(values)
+
+        if "gear" in self.values:
+            gear = self.values.pop("gear")
+            self.values["gearControl"] = gear
+            self.values["noseGear"] = gear
+        if "flapsSet" in self.values:
+            flaps = self.values.pop("flapsSet")
+            self.values["flapsControl"] = flaps
+            self.values["flaps"] = flaps
+
+        self.fuelFlow = self.values.pop("fuelFlow", 0.0)
+        self.groundAltitude = self.values.pop("groundAltitude", None)
+
+#------------------------------------------------------------------------------
+
+class Profile(object):
+    """A flight profile, i.e. a sequence of phases.
+
+    It can be loaded from a JSON file containing an object with the
+    following members:
+    - phases: the list of the phases, each an object with the name, the
+    duration and the values of the phase,
+    - groundAltitude: the altitude of the ground in feet. If not given, the
+    altitude at the start of the profile is used."""
+    @staticmethod
+    def fromJSON(text):
+        """Create a profile from the given JSON text."""
+        return Profile.fromData(json.loads(text))
+
+    @staticmethod
+    def fromData(data):
+        """Create a profile from the given data, i.e. the object of the
+        JSON representation."""
+        return Profile([Phase(phase["name"], phase["duration"],
+                              phase.get("values", {}))
+                        for phase in data["phases"]],
+                       groundAltitude = data.get("groundAltitude"))
+
+    @staticmethod
+    def load(path):
+        """Load the profile from the JSON file with the given path."""
+        with io.open(path, "rt") as f:
+            return Profile.fromJSON(f.read())
+
+    def __init__(self, phases, groundAltitude = None):
+        """Construct the profile from the given phases."""
+        self.phases = phases
+        self.groundAltitude = groundAltitude
+
+    @property
+    def duration(self):
+        """Get the duration of the profile in seconds."""
+        return sum([phase.duration for phase in self.phases])
+
+#------------------------------------------------------------------------------
+
+class ProfilePlayer(object):
+    """Player of a flight profile.
+
+    It updates the attributes of a Values object as the time passes. The
+    vertical speed follows from the change of the altitude, and the position
+    is moved according to the airspeed and the heading, which are used as
+    the ground speed and the track."""
+    def __init__(self, profile, values):
+        """Construct the player of the given profile modifying the given
+        values."""
+        self._profile = profile
+        self._values = values
+
+        self._groundAltitude = values.altitude \
+            if profile.groundAltitude is None else profile.groundAltitude
+
+        self._phaseIndex = -1
+        self._phaseStart = 0.0
+        self._elapsed = 0.0
+        self._startValues = {}
+
+    @property
+    def phase(self):
+        """Get the current phase, or None, if the profile has not been
+        started or it has finished."""
+        phases = self._profile.phases
+        return phases[self._phaseIndex] \
+            if self._phaseIndex>=0 and self._phaseIndex<len(phases) else None
+
+    @property
+    def finished(self):
+        """Determine if the profile has finished."""
+        return self._phaseIndex>=len(self._profile.phases)
+
+    def advance(self, elapsed):
+        """Advance the profile to the given number of seconds elapsed since
+        its start.
+
+        Returns whether the profile has not finished yet."""
+        phases = self._profile.phases
+        if self._phaseIndex<0:
+            self._startPhase(0)
+
+        while not self.finished and \
+              elapsed>=self._phaseStart + phases[self._phaseIndex].duration:
+            phaseEnd = self._phaseStart + phases[self._phaseIndex].duration
+            self._update(phaseEnd)
+            self._startPhase(self._phaseIndex + 1)
+            self._phaseStart = phaseEnd
+
+        if not self.finished:
+            self._update(elapsed)
+
+        return not self.finished
+
+    def _startPhase(self, index):
+        """Start the phase with the given index."""
+        self._phaseIndex = index
+        phase = self.phase
+        if phase is None:
+            return
+
+        if phase.groundAltitude is not None:
+            self._groundAltitude = phase.groundAltitude
+
+        values = self._values
+        self._startValues = {}
+        for (name, value) in phase.values.items():
+            if name in Phase.INTERPOLATED:
+                current = getattr(values, name)
+                self._startValues[name] = \
+                    current[:] if isinstance(current, list) else current
+            else:
+                setattr(values, name, value)
+
+    def _update(self, elapsed):
+        """Update the values for the given elapsed time within the current
+        phase."""
+        values = self._values
+        phase = self.phase
+
+        duration = elapsed - self._elapsed
+        self._elapsed = elapsed
+
+        fraction = 1.0 if phase.duration<=0.0 else \
+            min(1.0, (elapsed - self._phaseStart) / phase.duration)
+
+        oldAltitude = values.altitude
+        for (name, startValue) in self._startValues.items():
+            target = phase.values[name]
+            if isinstance(startValue, list):
+                targets = target if isinstance(target, list) \
+                          else [target] * len(startValue)
+                setattr(values, name,
+                        [start + (target - start) * fraction
+                         for (start, target) in zip(startValue, targets)])
+            elif name=="heading" or name=="windDirection":
+                change = (target - startValue + 180.0) % 360.0 - 180.0
+                setattr(values, name, (startValue + change * fraction) % 360.0)
+            else:
+                setattr(values, name,
+                        startValue + (target - startValue) * fraction)
+
+        if duration>0.0:
+            values.vs = (values.altitude - oldAltitude) * 60.0 / duration
+            self._move(duration)
+            self._burnFuel(phase.fuelFlow * duration / 3600.0)
+        if not values.onTheGround:
+            values.tdRate = values.vs
+        values.radioAltitude = values.altitude - self._groundAltitude
+
+    def _move(self, duration):
+        """Move the aircraft according to its speed and heading for the
+        given number of seconds."""
+        values = self._values
+        distance = values.ias * duration / 3600.0 / 60.0
+        heading = math.radians(values.heading)
+        values.latitude += distance * math.cos(heading)
+        values.longitude += distance * math.sin(heading) / \
+            max(0.01, math.cos(math.radians(values.latitude)))
+
+    def _burnFuel(self, amount):
+        """Decrease the fuel of the non-empty tanks proportionally by the
+        given amount in kgs."""
+        values = self._values
+        total = sum(values.fuelWeights)
+        if amount>0.0 and total>0.0:
+            ratio = max(0.0, 1.0 - amount / total)
+            values.fuelWeights = [weight * ratio
+                                  for weight in values.fuelWeights]
+
+#------------------------------------------------------------------------------
+
+class ProfileRunner(threading.Thread):
+    """A thread playing a flight profile in time.
+
+    The time is taken from the given clock, or from the current one (see
+    \\ref mlx.clock), so the profile is played faster than real time with a
+    \\ref mlx.clock.ScaledClock "scaled clock"."""
+    def __init__(self, profile, values, interval = 1.0, clock = None):
+        """Construct the runner of the given profile modifying the given
+        values. The values are updated every interval seconds of the
+        clock."""
+        super(ProfileRunner, self).__init__()
+        self.daemon = True
+
+        self._player = ProfilePlayer(profile, values)
+        self._interval = interval
+        self._clock = clock
+        self._toStop = False
+
+    @property
+    def player(self):
+        """Get the player of the profile."""
+        return self._player
+
+    def stop(self):
+        """Stop the runner."""
+        self._toStop = True
+
+    def run(self):
+        """Play the profile."""
+        clock = getClock() if self._clock is None else self._clock
+        startTime = clock.time()
+        while not self._toStop and \
+              self._player.advance(clock.time() - startTime):
+            clock.sleep(self._interval)
+
+#------------------------------------------------------------------------------
+
 values = Values()
 
 #------------------------------------------------------------------------------
@@ -953,17 +1504,27 @@ failOpen = False
 
 opened = False
 
+## The runner of the flight profile being played, if any
+profileRunner = None
+
 #------------------------------------------------------------------------------
 
 def open(request):
-    """Open the connection."""
+    """Open the connection.
+
+    If a \\ref mlx.clock.VirtualClock "virtual clock" is in use, the calling
+    thread (i.e. the handler) becomes its driver, so the simulated flight
+    proceeds as fast as the handler processes the reads."""
     global opened
     if failOpen:
         raise FSUIPCException(ERR_NOFS)
     elif opened:
         raise FSUIPCException(ERR_OPEN)
     else:
-        time.sleep(0.5)
+        clock = getClock()
+        if isinstance(clock, VirtualClock):
+            clock.setDriver()
+        clock.sleep(0.5)
         opened = True
         return True
 
@@ -972,7 +1533,7 @@ def open(request):
 def prepare_data(pattern, forRead = True, checkOpened = True):
     """Prepare the given pattern for reading and/or writing."""
     if not checkOpened or opened:
-        return pattern
+        return DataReader(pattern) if forRead else pattern
     else:
         raise FSUIPCException(ERR_NOTOPEN)
 
@@ -981,7 +1542,7 @@ def prepare_data(pattern, forRead = True, checkOpened = True):
 def read(data, checkOpened = True):
     """Read the given data."""
     if not checkOpened or opened:
-        return [values.read(offset, type) for (offset, type) in data]
+        return values.readData(data)
     else:
         raise FSUIPCException(ERR_NOTOPEN)
 
@@ -1004,13 +1565,41 @@ def close():
 
 #------------------------------------------------------------------------------
 
-PORT=15015
+def startProfile(profile, scale = None):
+    """Start playing the given profile on the simulated values.
+
+    If a scale is given, the profile is played on a clock running that many
+    times faster than the current one. The profile being played, if any, is
+    stopped."""
+    global profileRunner
+    stopProfile()
+    clock = None if scale is None \
+            else ScaledClock(scale, startTime = getClock().time())
+    profileRunner = ProfileRunner(profile, values, clock = clock)
+    profileRunner.start()
+
+#------------------------------------------------------------------------------
+
+def stopProfile():
+    """Stop playing the current profile, if any."""
+    global profileRunner
+    if profileRunner is not None:
+        profileRunner.stop()
+        profileRunner = None
+
+#------------------------------------------------------------------------------
+
+## The port of the server. It can be overridden by the PYUIPC_SIM_PORT
+## environment variable, e.g. to 0 to let several simulators run on the same
+## host.
+PORT=int(os.environ.get("PYUIPC_SIM_PORT", "15015"))
 
 CALL_READ=1
 CALL_WRITE=2
 CALL_SETVERSION=3
 CALL_CLOSE=4
 CALL_FAILOPEN=5
+CALL_PROFILE=6
 CALL_QUIT = 99
 
 RESULT_RETURNED=1
@@ -1018,8 +1607,250 @@ RESULT_EXCEPTION=2
 
 #------------------------------------------------------------------------------
 
+# The binary protocol of the server
+#
+# Each message is preceded by its length as a 32-bit unsigned integer. All
+# integers are little-endian.
+#
+# A request message consists of the number of calls (16 bits), and the calls
+# themselves, each starting with its code (CALL_XXX, 8 bits):
+# - CALL_READ: the number of items (16 bits), followed by the offset (16
+# bits) and the type (16 bits) of each item. The type is the character code
+# of the PyUIPC type, or the negative length of a string.
+# - CALL_WRITE: the items as for CALL_READ, followed by the values packed
+# according to their types.
+# - CALL_SETVERSION: the version (32 bits).
+# - CALL_FAILOPEN: 1 or 0 (8 bits).
+# - CALL_PROFILE: the scale of the clock (64-bit float, 0 to use the current
+# clock), followed by the length (32 bits) and the UTF-8 JSON text of the
+# flight profile to play. If the length is 0, the current profile is stopped.
+# - CALL_CLOSE and CALL_QUIT: no arguments. CALL_QUIT closes the connection
+# without a reply.
+#
+# The reply contains the results of the calls in the same order. Each result
+# starts with its code (RESULT_XXX, 8 bits). If the call has returned, the
+# values read follow for a CALL_READ, otherwise there is nothing. If the call
+# has failed, the length (16 bits) and the UTF-8 text of the error follow.
+
+_messageLength = struct.Struct("<I")
+_count = struct.Struct("<H")
+_code = struct.Struct("<B")
+_item = struct.Struct("<Hh")
+_version = struct.Struct("<i")
+_scale = struct.Struct("<d")
+
+#------------------------------------------------------------------------------
+
+def _encodeType(type):
+    """Encode the given PyUIPC type for the protocol."""
+    return type if isinstance(type, int) else ord(type)
+
+def _decodeType(type):
+    """Decode the given PyUIPC type received via the protocol."""
+    return type if type<0 else chr(type)
+
+## The structs of the values of the patterns sent or received recently
+_valuesStructs = {}
+
+def _getValuesStruct(pattern):
+    """Get the struct of the values of the given pattern."""
+    key = tuple([item[1] for item in pattern])
+    valuesStruct = _valuesStructs.get(key)
+    if valuesStruct is None:
+        if len(_valuesStructs)>=Values.MAX_CACHED_READERS:
+            _valuesStructs.clear()
+        valuesStruct = struct.Struct("<" + "".join([_getFormat(type)
+                                                    for type in key]))
+        _valuesStructs[key] = valuesStruct
+    return valuesStruct
+
+def _packValues(pattern, values):
+    """Pack the given values of the given pattern."""
+    valuesStruct = _getValuesStruct(pattern)
+    try:
+        return valuesStruct.pack(*values)
+    except struct.error:
+        return valuesStruct.pack(*[_coerceValue(value, type)
+                                   for ((offset, type), value)
+                                   in zip(pattern, values)])
+
+def _unpackValues(pattern, data, offset):
+    """Unpack the values of the given pattern from the given data at the given
+    offset.
+
+    Returns a tuple of the values and of the offset following them."""
+    valuesStruct = _getValuesStruct(pattern)
+    values = list(valuesStruct.unpack_from(data, offset))
+    for index in range(0, len(pattern)):
+        if isinstance(pattern[index][1], int):
+            values[index] = values[index].split(b"\0", 1)[0]
+    return (values, offset + valuesStruct.size)
+
+def _packPattern(pattern):
+    """Pack the given pattern of offsets and types."""
+    data = _count.pack(len(pattern))
+    for item in pattern:
+        data += _item.pack(item[0], _encodeType(item[1]))
+    return data
+
+def _unpackPattern(data, offset):
+    """Unpack a pattern of offsets and types from the given data at the given
+    offset.
+
+    Returns a tuple of the pattern and of the offset following it."""
+    (numItems,) = _count.unpack_from(data, offset)
+    offset += _count.size
+    pattern = []
+    for i in range(0, numItems):
+        (itemOffset, type) = _item.unpack_from(data, offset)
+        pattern.append((itemOffset, _decodeType(type)))
+        offset += _item.size
+    return (pattern, offset)
+
+#------------------------------------------------------------------------------
+
+def _encodeCalls(calls):
+    """Encode a request message containing the given calls.
+
+    calls is a list of tuples of the call code and its argument."""
+    data = bytearray(_count.pack(len(calls)))
+    for (call, argument) in calls:
+        data += _code.pack(call)
+        if call==CALL_READ:
+            data += _packPattern(argument)
+        elif call==CALL_WRITE:
+            pattern = [(offset, type) for (offset, type, value) in argument]
+            data += _packPattern(pattern)
+            data += _packValues(pattern,
+                                [value for (offset, type, value) in argument])
+        elif call==CALL_SETVERSION:
+            data += _version.pack(argument)
+        elif call==CALL_FAILOPEN:
+            data += _code.pack(1 if argument else 0)
+        elif call==CALL_PROFILE:
+            (text, scale) = argument
+            text = b"" if text is None else text.encode("utf-8")
+            data += _scale.pack(0.0 if scale is None else scale)
+            data += _messageLength.pack(len(text))
+            data += text
+    return _messageLength.pack(len(data)) + data
+
+def _processRequest(data):
+    """Process the calls of the given request message.
+
+    Returns the reply message, or None, if the connection should be
+    closed."""
+    global fs_version, opened, failOpen
+
+    (numCalls,) = _count.unpack_from(data, 0)
+    offset = _count.size
+
+    reply = bytearray()
+    for i in range(0, numCalls):
+        (call,) = _code.unpack_from(data, offset)
+        offset += _code.size
+
+        try:
+            if call==CALL_READ:
+                (pattern, offset) = _unpackPattern(data, offset)
+                result = _packValues(pattern,
+                                     read(pattern, checkOpened = False))
+            elif call==CALL_WRITE:
+                (pattern, offset) = _unpackPattern(data, offset)
+                (values, offset) = _unpackValues(pattern, data, offset)
+                write([(itemOffset, type, value) for ((itemOffset, type), value)
+                       in zip(pattern, values)], checkOpened = False)
+                result = b""
+            elif call==CALL_SETVERSION:
+                (fs_version,) = _version.unpack_from(data, offset)
+                offset += _version.size
+                result = b""
+            elif call==CALL_CLOSE:
+                opened = False
+                result = b""
+            elif call==CALL_FAILOPEN:
+                (value,) = _code.unpack_from(data, offset)
+                offset += _code.size
+                failOpen = value!=0
+                result = b""
+            elif call==CALL_PROFILE:
+                (scale,) = _scale.unpack_from(data, offset)
+                offset += _scale.size
+                (length,) = _messageLength.unpack_from(data, offset)
+                offset += _messageLength.size
+                text = str(data[offset:offset+length], "utf-8")
+                offset += length
+                if text:
+                    startProfile(Profile.fromJSON(text),
+                                 scale = scale if scale>0.0 else None)
+                else:
+                    stopProfile()
+                result = b""
+            else:
+                return None
+            reply += _code.pack(RESULT_RETURNED)
+            reply += result
+        except Exception as e:
+            message = str(e).encode("utf-8")
+            reply += _code.pack(RESULT_EXCEPTION)
+            reply += _count.pack(len(message))
+            reply += message
+
+    return _messageLength.pack(len(reply)) + reply
+
+#------------------------------------------------------------------------------
+
+class ServerProtocol(asyncio.Protocol):
+    """The protocol of a connection to the server.
+
+    The received data is collected in a buffer, and the complete request
+    messages in it are processed as soon as they arrive."""
+    def __init__(self):
+        """Construct the protocol."""
+        self._transport = None
+        self._buffer = bytearray()
+
+    def connection_made(self, transport):
+        """Called when the connection is made."""
+        self._transport = transport
+
+    def data_received(self, data):
+        """Called when data is received via the connection."""
+        buffer = self._buffer
+        buffer += data
+
+        offset = 0
+        replies = []
+        while len(buffer)-offset>=_messageLength.size:
+            (length,) = _messageLength.unpack_from(buffer, offset)
+            start = offset + _messageLength.size
+            if len(buffer)-start<length:
+                break
+
+            try:
+                reply = _processRequest(bytes(buffer[start:start+length]))
+            except Exception as e:
+                print("pyuipc_sim.ServerProtocol.data_received: failed with exception:", str(e), file=sys.stderr)
+                reply = None
+
+            offset = start + length
+            if reply is None:
+                self._transport.write(b"".join(replies))
+                self._transport.close()
+                return
+            replies.append(reply)
+
+        del buffer[:offset]
+        if replies:
+            self._transport.write(b"".join(replies))
+
+#------------------------------------------------------------------------------
+
 class Server(threading.Thread):
-    """The server thread."""
+    """The server thread.
+
+    The server runs an asyncio event loop, so it can serve any number of
+    clients concurrently."""
     def __init__(self):
         """Construct the thread."""
         super(Server, self).__init__()
@@ -1027,112 +1858,142 @@ class Server(threading.Thread):
 
     def run(self):
         """Perform the server's operation."""
-        serverSocket = socket.socket()
-
-        serverSocket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        serverSocket.bind(("", PORT))
-
-        serverSocket.listen(5)
-
-        while True:
-            (clientSocket, clientAddress) = serverSocket.accept()
-            thread = threading.Thread(target = self._process, args=(clientSocket,))
-            thread.start()
-
-    def _process(self, clientSocket):
-        """Process the commands arriving on the given socket."""
-        socketFile = clientSocket.makefile()
         try:
-            while True:
-                (length,) = struct.unpack("I", clientSocket.recv(4))
-                data = clientSocket.recv(length)
-                (call, args) = pickle.loads(data)
-                exception = None
-
-                try:
-                    if call==CALL_READ:
-                        result = read(args[0], checkOpened = False)
-                    elif call==CALL_WRITE:
-                        result = write(args[0], checkOpened = False)
-                    elif call==CALL_SETVERSION:
-                        global fs_version
-                        fs_version = args[0]
-                        result = None
-                    elif call==CALL_CLOSE:
-                        global opened
-                        opened = False
-                        result = None
-                    elif call==CALL_FAILOPEN:
-                        global failOpen
-                        failOpen = args[0]
-                        result = None
-                    else:
-                        break
-                except Exception as e:
-                    exception = e
-
-                if exception is None:
-                    data = pickle.dumps((RESULT_RETURNED, result))
-                else:
-                    data = pickle.dumps((RESULT_EXCEPTION, str(exception)))
-                clientSocket.send(struct.pack("I", len(data)) + data)
+            asyncio.run(self._serve())
         except Exception as e:
-            print("pyuipc_sim.Server._process: failed with exception:", str(e), file=sys.stderr)
-        finally:
-            try:
-                socketFile.close()
-            except:
-                pass
-            clientSocket.close()
+            print("pyuipc_sim.Server.run: failed with exception:", str(e),
+                  file=sys.stderr)
+
+    async def _serve(self):
+        """Serve the clients."""
+        loop = asyncio.get_running_loop()
+        server = await loop.create_server(ServerProtocol, "", PORT,
+                                          reuse_address = True)
+        async with server:
+            await server.serve_forever()
 
 #------------------------------------------------------------------------------
 
 class Client(object):
-    """Client to the server."""
+    """Client to the server.
+
+    Besides the functions performing a single call, several calls can be
+    sent in a single request by call()."""
     def __init__(self, serverHost):
         """Construct the client and connect to the given server
         host."""
-        self._socket = socket.socket()
-        self._socket.connect((serverHost, PORT))
-
-        self._socketFile = self._socket.makefile()
+        self._socket = socket.create_connection((serverHost, PORT))
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
 
     def read(self, data):
         """Read the given data."""
-        return self._call(CALL_READ, data)
+        return self.call([(CALL_READ, data)])[0]
 
     def write(self, data):
         """Write the given data."""
-        return self._call(CALL_WRITE, data)
+        return self.call([(CALL_WRITE, data)])[0]
 
     def setVersion(self, version):
         """Set the FS version to emulate."""
-        return self._call(CALL_SETVERSION, int(version))
+        return self.call([(CALL_SETVERSION, int(version))])[0]
 
     def close(self):
         """Close the connection currently opened in the simulator."""
-        return self._call(CALL_CLOSE, None)
+        return self.call([(CALL_CLOSE, None)])[0]
 
     def failOpen(self, really):
         """Enable/disable open failure in the simulator."""
-        return self._call(CALL_FAILOPEN, really)
+        return self.call([(CALL_FAILOPEN, really)])[0]
+
+    def playProfile(self, text, scale = None):
+        """Start playing the flight profile with the given JSON text in the
+        simulator. If the text is None, the current profile is stopped."""
+        return self.call([(CALL_PROFILE, (text, scale))])[0]
 
     def quit(self):
         """Quit from the simulator."""
-        data = pickle.dumps((CALL_QUIT, None))
-        self._socket.send(struct.pack("I", len(data)) + data)
-
-    def _call(self, command, data):
-        """Perform a call with the given command and data."""
-        data = pickle.dumps((command, [data]))
-        self._socket.send(struct.pack("I", len(data)) + data)
-        (length,) = struct.unpack("I", self._socket.recv(4))
-        data = self._socket.recv(length)
-        (resultCode, result) = pickle.loads(data)
-        if resultCode==RESULT_RETURNED:
-            return result
-        else:
-            raise Exception(result)
+        self._socket.sendall(_encodeCalls([(CALL_QUIT, None)]))
+        self._socket.close()
+
+    def call(self, calls):
+        """Perform the given calls in a single request.
+
+        calls is a list of tuples of the call code (CALL_XXX) and the
+        argument of the call. Returns the list of the results of the calls,
+        which is the list of values for CALL_READ and None for the other
+        calls. If any of the calls has failed, an exception is raised with
+        the error of the first failed call."""
+        data = self._exchange(_encodeCalls(calls))
+
+        results = []
+        error = None
+        offset = 0
+        for (call, argument) in calls:
+            (resultCode,) = _code.unpack_from(data, offset)
+            offset += _code.size
+            if resultCode==RESULT_RETURNED:
+                if call==CALL_READ:
+                    (values, offset) = _unpackValues(argument, data, offset)
+                    results.append(values)
+                else:
+                    results.append(None)
+            else:
+                (length,) = _count.unpack_from(data, offset)
+                offset += _count.size
+                message = str(data[offset:offset+length], "utf-8")
+                offset += length
+                if error is None:
+                    error = message
+                results.append(None)
+
+        if error is not None:
+            raise Exception(error)
+
+        return results
+
+    def _exchange(self, request):
+        """Send the given request message and receive the reply.
+
+        Returns the reply without the length."""
+        self._socket.sendall(request)
+        (length,) = _messageLength.unpack(self._receive(_messageLength.size))
+        return self._receive(length)
+
+    def _receive(self, length):
+        """Receive the given number of bytes."""
+        data = bytearray(length)
+        view = memoryview(data)
+        received = 0
+        while received<length:
+            numBytes = self._socket.recv_into(view[received:])
+            if numBytes==0:
+                raise Exception("The connection has been closed")
+            received += numBytes
+        return data
+
+#------------------------------------------------------------------------------
+
+class LocalClient(Client):
+    """A client performing the calls in the process of the simulator.
+
+    The requests are processed directly without a connection to the
+    server, so the simulator can be driven by the CLI or the like in the
+    same process, e.g. by automated tests."""
+    def __init__(self):
+        """Construct the client."""
+        pass
+
+    def quit(self):
+        """Quit from the simulator.
+
+        It does nothing, since there is no connection."""
+        pass
+
+    def _exchange(self, request):
+        """Process the given request message and return the reply without
+        the length."""
+        reply = _processRequest(memoryview(request)[_messageLength.size:])
+        return memoryview(reply)[_messageLength.size:]
 
 #------------------------------------------------------------------------------
 #------------------------------------------------------------------------------
@@ -1210,8 +2071,11 @@ class CLI(cmd.Cmd):
         """Convert the given PyUIPC value into an altitude."""
         return value / const.FEETTOMETRES / 65536.0
 
-    def __init__(self):
-        """Construct the CLI."""
+    def __init__(self, client = None):
+        """Construct the CLI.
+
+        If no client is given, it connects to the server on the host given
+        as the first command-line argument."""
         cmd.Cmd.__init__(self)
 
         self.use_rawinput = True
@@ -1220,8 +2084,10 @@ class CLI(cmd.Cmd):
 
         self.daemon = True
 
-        host = sys.argv[1] if len(sys.argv)>1 else "localhost"
-        self._client = Client(host)
+        if client is None:
+            host = sys.argv[1] if len(sys.argv)>1 else "localhost"
+            client = Client(host)
+        self._client = client
 
         self._valueHandlers = {}
         self._valueHandlers["year"] = ([(0x0240, "H")],  lambda value: value,
@@ -1703,6 +2569,33 @@ class CLI(cmd.Cmd):
         else:
             return ["yes", "no"]
 
+    def do_profile(self, args):
+        """Start or stop playing a flight profile."""
+        words = args.split()
+        if not words or len(words)>2:
+            self.help_profile(usage = True)
+            return
+
+        try:
+            if words[0]=="stop":
+                self._client.playProfile(None)
+                print("Profile stopped")
+            else:
+                with io.open(words[0], "rt") as f:
+                    text = f.read()
+                scale = float(words[1]) if len(words)>1 else None
+                profile = Profile.fromJSON(text)
+                self._client.playProfile(text, scale)
+                print("Playing profile of %d phases (%.0f s)" %
+                      (len(profile.phases), profile.duration))
+        except Exception as e:
+            print("Failed to play the profile: " + str(e), file=sys.stderr)
+
+    def help_profile(self, usage = False):
+        """Help for the profile command"""
+        if usage: print("Usage:", end=' ')
+        print("profile <JSON file> [<clock scale>]|stop")
+
     def do_quit(self, args):
         """Handle the quit command."""
         self._client.quit()
@@ -0,0 +1,142 @@
+# Scheduler of periodic requests
+
+#-----------------------------------------------------------------------------
+
+import heapq
+import math
+
+#-----------------------------------------------------------------------------
+
+## @package mlx.scheduler
+#
+# Scheduler of the periodic requests of the simulator handlers.
+#
+# The requests are kept in a heap ordered by their next firing times, so that
+# adding a request and querying the next firing time take logarithmic or
+# constant time. Removed requests are only marked as such, and they are
+# dropped from the heap lazily, when they get to its top, or when there are
+# too many of them.
+
+#-----------------------------------------------------------------------------
+
+def getNextFire(firstFire, period, time):
+    """Get the first firing time after the given time of a request with the
+    given first firing time and period.
+
+    The firing time is calculated from the first one, so that the rounding
+    errors do not accumulate during a long flight."""
+    if time<firstFire:
+        return firstFire
+
+    numPeriods = math.floor((time - firstFire) / period) + 1
+    nextFire = firstFire + numPeriods * period
+    while nextFire<=time:
+        numPeriods += 1
+        nextFire = firstFire + numPeriods * period
+    return nextFire
+
+#-----------------------------------------------------------------------------
+
+class Scheduler(object):
+    """The scheduler of the periodic requests.
+
+    The requests should have the following properties:
+    - id: the identifier of the request, unique within the scheduler,
+    - nextFire: the time the request should be executed next.
+
+    A request is in the scheduler from the time it is added until it is
+    removed. The due requests are popped from the scheduler's heap, and when
+    they are processed, they should be rescheduled, which puts them back into
+    the heap with their new firing times, unless they have been removed in the
+    meantime."""
+    def __init__(self):
+        """Construct the scheduler."""
+        self._heap = []
+        self._requests = {}
+        self._entries = {}
+        self._numCancelled = 0
+        self._sequence = 0
+
+    @property
+    def nextFire(self):
+        """Get the earliest firing time of the requests in the heap, or None
+        if there are no requests in it."""
+        self._dropCancelled()
+        return self._heap[0][0] if self._heap else None
+
+    def __len__(self):
+        """Get the number of the requests in the scheduler."""
+        return len(self._requests)
+
+    def get(self, id):
+        """Get the request with the given ID, or None if there is no such
+        request in the scheduler."""
+        return self._requests.get(id)
+
+    def add(self, request):
+        """Add the given request to the scheduler."""
+        self._requests[request.id] = request
+        self._push(request)
+
+    def remove(self, id):
+        """Remove the request with the given ID.
+
+        Return a boolean indicating if the request was in the scheduler."""
+        if self._requests.pop(id, None) is None:
+            return False
+
+        entry = self._entries.pop(id)
+        if entry[2] is not None:
+            entry[2] = None
+            self._numCancelled += 1
+            if self._numCancelled>16 and \
+               self._numCancelled>len(self._heap)//2:
+                self._heap = [e for e in self._heap if e[2] is not None]
+                heapq.heapify(self._heap)
+                self._numCancelled = 0
+        return True
+
+    def clear(self):
+        """Remove all requests from the scheduler."""
+        self._heap = []
+        self._requests = {}
+        self._entries = {}
+        self._numCancelled = 0
+
+    def popDue(self, time):
+        """Pop the requests whose firing time is not later than the given
+        time.
+
+        The requests are returned in the order of their firing times."""
+        requests = []
+        heap = self._heap
+        while heap and heap[0][0]<=time:
+            (_nextFire, _sequence, request) = heapq.heappop(heap)
+            if request is None:
+                self._numCancelled -= 1
+            else:
+                self._entries[request.id][2] = None
+                requests.append(request)
+        return requests
+
+    def reschedule(self, request):
+        """Put the given popped request back into the heap with its current
+        firing time, if it has not been removed from the scheduler."""
+        if request.id in self._requests:
+            self._push(request)
+
+    def _push(self, request):
+        """Push the given request into the heap."""
+        self._sequence += 1
+        entry = [request.nextFire, self._sequence, request]
+        self._entries[request.id] = entry
+        heapq.heappush(self._heap, entry)
+
+    def _dropCancelled(self):
+        """Drop the cancelled entries from the top of the heap."""
+        heap = self._heap
+        while heap and heap[0][2] is None:
+            heapq.heappop(heap)
+            self._numCancelled -= 1
+
+#-----------------------------------------------------------------------------
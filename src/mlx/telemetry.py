@@ -0,0 +1,441 @@
+# Recording of the raw telemetry read from the simulator
+
+#-----------------------------------------------------------------------------
+
+from .clock import getClock
+
+import struct
+import zlib
+import json
+import threading
+import sys
+
+#-----------------------------------------------------------------------------
+
+## @package mlx.telemetry
+#
+# Recording of the raw data read from the simulator.
+#
+# The \ref mlx.telemetry.Recorder "Recorder" appends the results of the reads
+# performed by the simulator handlers to a binary telemetry file, so that it
+# can be examined or replayed later. The file is read by the
+# \ref mlx.telemetry.Reader "Reader".
+#
+# The file starts with a header consisting of the magic string, the version
+# of the format, the time the recording has started and the name of the
+# simulator backend. It is followed by chunks, each starting with the kind
+# and the flags of the chunk and the length of its payload. The chunks are
+# the following:
+# - schema: the description of the data read, i.e. the list of the FSUIPC
+# offsets or X-Plane datarefs and their types as JSON, along with the ID the
+# records of the reads of the data refer to,
+# - info: a JSON object with information about the simulator, such as its
+# version,
+# - block: a sequence of records, possibly compressed by zlib. A record
+# consists of the ID of the schema, the wall-clock time of the read, the
+# simulator time known at the time of the read (or a negative value, if not
+# known yet), a bitmap of the values that have changed since the previous
+# record of the same schema in the block, and the type-tagged changed
+# values. The first record of each schema in a block contains all values, so
+# that the blocks can be decoded independently.
+#
+# The schemas and the blocks are only appended to the file, and a block is
+# written when it reaches a certain size or age, so a file remains readable
+# up to its last complete block even if the program terminates abruptly.
+
+#-----------------------------------------------------------------------------
+
+## The magic string at the beginning of the telemetry files
+MAGIC = b"MLXTLM"
+
+## The version of the format of the telemetry files
+VERSION = 1
+
+## The kind of the schema chunks
+CHUNK_SCHEMA = b"S"
+
+## The kind of the info chunks
+CHUNK_INFO = b"I"
+
+## The kind of the block chunks
+CHUNK_BLOCK = b"B"
+
+## Chunk flag: the payload is compressed
+FLAG_COMPRESSED = 0x01
+
+#-----------------------------------------------------------------------------
+
+_fileHeader = struct.Struct("<6sHdH")
+_chunkHeader = struct.Struct("<cBI")
+_schemaID = struct.Struct("<H")
+_recordHeader = struct.Struct("<Hdd")
+_length = struct.Struct("<I")
+_int = struct.Struct("<q")
+_unsigned = struct.Struct("<Q")
+_float = struct.Struct("<d")
+
+## The maximal value of the signed 64-bit integers
+_maxInt = 0x7fffffffffffffff
+
+## The minimal value of the signed 64-bit integers
+_minInt = -0x8000000000000000
+
+#-----------------------------------------------------------------------------
+
+def _encodeValue(buffer, value):
+    """Append the encoding of the given value to the given buffer.
+
+    The value is preceded by a tag denoting its type, so that it is decoded
+    exactly as read from the simulator."""
+    valueType = type(value)
+    if valueType is int:
+        if value>=_minInt and value<=_maxInt:
+            buffer += b"i"
+            buffer += _int.pack(value)
+        else:
+            buffer += b"u"
+            buffer += _unsigned.pack(value)
+    elif valueType is float:
+        buffer += b"f"
+        buffer += _float.pack(value)
+    elif valueType is bytes:
+        buffer += b"y"
+        buffer += _length.pack(len(value))
+        buffer += value
+    elif valueType is str:
+        encoded = value.encode("utf-8")
+        buffer += b"s"
+        buffer += _length.pack(len(encoded))
+        buffer += encoded
+    elif valueType is bool:
+        buffer += b"T" if value else b"F"
+    elif value is None:
+        buffer += b"n"
+    elif valueType is list or valueType is tuple:
+        buffer += b"l" if valueType is list else b"t"
+        buffer += _length.pack(len(value))
+        for item in value:
+            _encodeValue(buffer, item)
+    else:
+        raise TypeError("telemetry: cannot record value of type %s" %
+                        (valueType.__name__,))
+
+def _decodeValue(data, offset):
+    """Decode the value at the given offset of the given data.
+
+    Returns a tuple of the value and of the offset following it."""
+    tag = data[offset:offset+1]
+    offset += 1
+    if tag==b"i":
+        return (_int.unpack_from(data, offset)[0], offset + 8)
+    elif tag==b"f":
+        return (_float.unpack_from(data, offset)[0], offset + 8)
+    elif tag==b"u":
+        return (_unsigned.unpack_from(data, offset)[0], offset + 8)
+    elif tag==b"y" or tag==b"s":
+        length = _length.unpack_from(data, offset)[0]
+        offset += 4
+        value = bytes(data[offset:offset+length])
+        return (value if tag==b"y" else value.decode("utf-8"),
+                offset + length)
+    elif tag==b"T" or tag==b"F":
+        return (tag==b"T", offset)
+    elif tag==b"n":
+        return (None, offset)
+    elif tag==b"l" or tag==b"t":
+        length = _length.unpack_from(data, offset)[0]
+        offset += 4
+        value = []
+        for i in range(0, length):
+            (item, offset) = _decodeValue(data, offset)
+            value.append(item)
+        return (value if tag==b"l" else tuple(value), offset)
+    else:
+        raise ValueError("telemetry: invalid value tag: %s" % (tag,))
+
+#-----------------------------------------------------------------------------
+
+class Schema(object):
+    """The schema of the records of a certain read, i.e. the description of
+    the data read."""
+    def __init__(self, id, dataSpec):
+        """Construct the schema with the given ID and data specification.
+
+        The data specification is the list of the items passed to the
+        read function of the simulator backend, such as the tuples of the
+        FSUIPC offsets and types."""
+        self.id = id
+        self.dataSpec = dataSpec
+        self.key = Schema.getKey(dataSpec)
+
+    @staticmethod
+    def getKey(dataSpec):
+        """Get the key identifying the schema of the given data
+        specification.
+
+        Tuples and lists are not distinguished, so the key of a data
+        specification is the same as that of its copy read back from the
+        file."""
+        return json.dumps(dataSpec, separators = (",", ":"))
+
+#-----------------------------------------------------------------------------
+
+class Record(object):
+    """A record read from a telemetry file."""
+    def __init__(self, schema, wallTime, simTime, values):
+        """Construct the record."""
+        self.schema = schema
+        self.wallTime = wallTime
+        self.simTime = simTime
+        self.values = values
+
+#-----------------------------------------------------------------------------
+
+class Recorder(object):
+    """Recorder of the raw data read from the simulator.
+
+    The simulator handler calls record() after each successful read. The
+    recorder is thread-safe, so it can be closed from another thread while
+    the handler is recording. Any failure of the recording is logged, but
+    it does not affect the handling of the simulator."""
+    ## The default size of the blocks before compression
+    DEFAULT_BLOCK_SIZE = 256*1024
+
+    ## The default maximal age of a block in seconds, after which it is
+    ## written even if it has not reached the block size
+    DEFAULT_BLOCK_AGE = 60.0
+
+    ## The maximal number of data specification objects whose schema IDs
+    ## are remembered by the identity of the object
+    MAX_CACHED_SPECS = 256
+
+    def __init__(self, path, backend, compress = True,
+                 blockSize = DEFAULT_BLOCK_SIZE, blockAge = DEFAULT_BLOCK_AGE):
+        """Construct the recorder to write the file with the given path.
+
+        backend is the name of the simulator backend, e.g. "fsuipc".
+
+        If compress is True, the blocks are compressed."""
+        self._lock = threading.Lock()
+
+        self._file = open(path, "wb")
+        self._compress = compress
+        self._blockSize = blockSize
+        self._blockAge = blockAge
+
+        self._schemaIDs = {}
+        self._specSchemaIDs = {}
+
+        self._buffer = bytearray()
+        self._blockStart = None
+        self._lastValues = {}
+
+        ## The simulator time in seconds. It should be updated by the
+        ## simulator whenever it is known.
+        self.simTime = -1.0
+
+        encodedBackend = backend.encode("utf-8")
+        self._file.write(_fileHeader.pack(MAGIC, VERSION, getClock().time(),
+                                          len(encodedBackend)))
+        self._file.write(encodedBackend)
+
+    def setInfo(self, info):
+        """Record the given information (a JSON-serializable dictionary)
+        about the simulator."""
+        with self._lock:
+            if self._file is None:
+                return
+            try:
+                self._writeChunk(CHUNK_INFO, 0,
+                                 json.dumps(info).encode("utf-8"))
+            except Exception as e:
+                print("telemetry.Recorder.setInfo: failed: " + str(e),
+                      file=sys.stderr)
+
+    def record(self, dataSpec, values):
+        """Record the given values read for the given data specification."""
+        with self._lock:
+            if self._file is None:
+                return
+            try:
+                self._record(dataSpec, values)
+            except Exception as e:
+                print("telemetry.Recorder.record: failed: " + str(e),
+                      file=sys.stderr)
+
+    def close(self):
+        """Write the pending records and close the file."""
+        with self._lock:
+            if self._file is None:
+                return
+            try:
+                self._writeBlock()
+            finally:
+                self._file.close()
+                self._file = None
+
+    def _getSchemaID(self, dataSpec):
+        """Get the ID of the schema of the given data specification.
+
+        If the schema is new, it is written to the file. The IDs are
+        remembered also by the identity of the data specification object,
+        since the periodic requests read the same object again and again."""
+        entry = self._specSchemaIDs.get(id(dataSpec))
+        if entry is not None and entry[0] is dataSpec:
+            return entry[1]
+
+        key = Schema.getKey(dataSpec)
+        schemaID = self._schemaIDs.get(key)
+        if schemaID is None:
+            schemaID = len(self._schemaIDs)
+            self._schemaIDs[key] = schemaID
+            self._writeChunk(CHUNK_SCHEMA, 0,
+                             _schemaID.pack(schemaID) + key.encode("utf-8"))
+
+        if len(self._specSchemaIDs)>=Recorder.MAX_CACHED_SPECS:
+            self._specSchemaIDs = {}
+        self._specSchemaIDs[id(dataSpec)] = (dataSpec, schemaID)
+
+        return schemaID
+
+    def _record(self, dataSpec, values):
+        """Record the given values without locking."""
+        now = getClock().time()
+        schemaID = self._getSchemaID(dataSpec)
+
+        if len(values)!=len(dataSpec):
+            raise ValueError("the number of values (%d) differs from that of the data items (%d)" %
+                             (len(values), len(dataSpec)))
+
+        lastValues = self._lastValues.get(schemaID)
+        if lastValues is None:
+            changed = range(0, len(values))
+        else:
+            changed = [index for (index, (value, lastValue)) in
+                       enumerate(zip(values, lastValues))
+                       if value!=lastValue or
+                       type(value) is not type(lastValue)]
+
+        mask = 0
+        for index in changed:
+            mask |= 1<<index
+
+        buffer = self._buffer
+        if self._blockStart is None:
+            self._blockStart = now
+        buffer += _recordHeader.pack(schemaID, now, self.simTime)
+        buffer += mask.to_bytes((len(values) + 7)//8, "little")
+        for index in changed:
+            _encodeValue(buffer, values[index])
+
+        self._lastValues[schemaID] = list(values)
+
+        if len(buffer)>=self._blockSize or \
+           (now - self._blockStart)>=self._blockAge:
+            self._writeBlock()
+
+    def _writeBlock(self):
+        """Write the current block, if it is not empty."""
+        if not self._buffer:
+            return
+
+        if self._compress:
+            self._writeChunk(CHUNK_BLOCK, FLAG_COMPRESSED,
+                             zlib.compress(bytes(self._buffer)))
+        else:
+            self._writeChunk(CHUNK_BLOCK, 0, bytes(self._buffer))
+        self._file.flush()
+
+        self._buffer = bytearray()
+        self._blockStart = None
+        self._lastValues = {}
+
+    def _writeChunk(self, kind, flags, payload):
+        """Write a chunk with the given kind, flags and payload."""
+        self._file.write(_chunkHeader.pack(kind, flags, len(payload)))
+        self._file.write(payload)
+
+#-----------------------------------------------------------------------------
+
+class Reader(object):
+    """Reader of a telemetry file.
+
+    Iterating over the reader yields the records of the file in the order
+    they were recorded. The information recorded about the simulator is
+    collected into the info member while iterating. A truncated last chunk
+    (e.g. if the recording program has crashed) is ignored."""
+    def __init__(self, path):
+        """Construct the reader for the file with the given path."""
+        with open(path, "rb") as f:
+            self._data = f.read()
+
+        if len(self._data)<_fileHeader.size:
+            raise ValueError("telemetry.Reader: file too short: " + path)
+
+        (magic, version, self.startTime, backendLength) = \
+            _fileHeader.unpack_from(self._data, 0)
+        if magic!=MAGIC:
+            raise ValueError("telemetry.Reader: not a telemetry file: " + path)
+        if version>VERSION:
+            raise ValueError("telemetry.Reader: unsupported version %d: %s" %
+                             (version, path))
+
+        offset = _fileHeader.size
+        self.version = version
+        self.backend = self._data[offset:offset+backendLength].decode("utf-8")
+        self._firstChunkOffset = offset + backendLength
+
+        self.schemas = {}
+        self.info = {}
+
+    def __iter__(self):
+        """Iterate over the records."""
+        data = self._data
+        offset = self._firstChunkOffset
+        while offset + _chunkHeader.size<=len(data):
+            (kind, flags, length) = _chunkHeader.unpack_from(data, offset)
+            offset += _chunkHeader.size
+            if offset + length>len(data):
+                break
+
+            payload = memoryview(data)[offset:offset+length]
+            offset += length
+
+            if kind==CHUNK_SCHEMA:
+                schemaID = _schemaID.unpack_from(payload, 0)[0]
+                dataSpec = json.loads(bytes(payload[_schemaID.size:]).
+                                      decode("utf-8"))
+                self.schemas[schemaID] = Schema(schemaID, dataSpec)
+            elif kind==CHUNK_INFO:
+                self.info.update(json.loads(bytes(payload).decode("utf-8")))
+            elif kind==CHUNK_BLOCK:
+                if flags&FLAG_COMPRESSED:
+                    payload = zlib.decompress(payload)
+                for record in self._decodeBlock(payload):
+                    yield record
+
+    def _decodeBlock(self, block):
+        """Decode the records of the given block."""
+        lastValues = {}
+        offset = 0
+        while offset<len(block):
+            (schemaID, wallTime, simTime) = \
+                _recordHeader.unpack_from(block, offset)
+            offset += _recordHeader.size
+
+            schema = self.schemas[schemaID]
+            numValues = len(schema.dataSpec)
+            maskLength = (numValues + 7)//8
+            mask = int.from_bytes(block[offset:offset+maskLength], "little")
+            offset += maskLength
+
+            values = lastValues.get(schemaID)
+            values = [None] * numValues if values is None else values[:]
+            for index in range(0, numValues):
+                if mask&(1<<index):
+                    (values[index], offset) = _decodeValue(block, offset)
+            lastValues[schemaID] = values
+
+            yield Record(schema, wallTime, simTime, values[:])
+
+#-----------------------------------------------------------------------------
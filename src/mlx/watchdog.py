@@ -2,9 +2,9 @@
 
 #-----------------------------------------------------------------------------
 
-from threading import Thread, Lock
+from .clock import getClock
 
-import time
+from threading import Thread, Lock
 
 #-----------------------------------------------------------------------------
 
@@ -36,7 +36,7 @@ class _ClientState(object):
         """Put the client into the set state."""
         with self._lock:
             if self._nextTimeout is None:
-                self._nextTimeout = time.time() + self._timeout
+                self._nextTimeout = getClock().time() + self._timeout
 
     def clear(self):
         """Put the client into the cleared state."""
@@ -105,11 +105,11 @@ class Watchdog(Thread):
         If LOG_INTERVAL elapses, put an entry in the debug log to confirm that
         the watchdog still works."""
 
-        nextLogTime = time.time()
+        nextLogTime = getClock().time()
         nextWakeupTime = nextLogTime + self.WAKEUP_INTERVAL
 
         while True:
-            t = time.time()
+            t = getClock().time()
             while t>=nextWakeupTime:
                 nextWakeupTime += self.WAKEUP_INTERVAL
 
@@ -120,9 +120,9 @@ class Watchdog(Thread):
 
             self._checkClients(t)
 
-            t = time.time()
+            t = getClock().time()
             if t<nextWakeupTime:
-                time.sleep(nextWakeupTime - t)
+                getClock().sleep(nextWakeupTime - t)
 
     def _checkClients(self, t):
         """Check the clients."""
@@ -2,8 +2,12 @@
 from . import fs
 from . import const
 from . import util
+from . import telemetry
 from .watchdog import Watchdog
+from .scheduler import Scheduler, getNextFire
+from .clock import getClock
 
+import os
 import threading
 import time
 import calendar
@@ -11,12 +15,22 @@ import datetime
 import sys
 import codecs
 import math
+import collections
 from functools import total_ordering
 
-from xplra import XPlane, MultiGetter, MultiSetter, ProtocolException
-from xplra import TYPE_INT, TYPE_FLOAT, TYPE_DOUBLE
-from xplra import TYPE_FLOAT_ARRAY, TYPE_INT_ARRAY, TYPE_BYTE_ARRAY
-from xplra import HOTKEY_MODIFIER_SHIFT, HOTKEY_MODIFIER_CONTROL
+if "FORCE_XPLRA_SIM" in os.environ:
+    from .xplra_sim import XPlane, MultiGetter, MultiSetter, ProtocolException
+    from .xplra_sim import TYPE_INT, TYPE_FLOAT, TYPE_DOUBLE
+    from .xplra_sim import TYPE_FLOAT_ARRAY, TYPE_INT_ARRAY, TYPE_BYTE_ARRAY
+    from .xplra_sim import HOTKEY_MODIFIER_SHIFT, HOTKEY_MODIFIER_CONTROL
+    from .xplra_sim import PUSH_XPLRA_VERSION
+else:
+    import xplra
+    from xplra import XPlane, MultiGetter, MultiSetter, ProtocolException
+    from xplra import TYPE_INT, TYPE_FLOAT, TYPE_DOUBLE
+    from xplra import TYPE_FLOAT_ARRAY, TYPE_INT_ARRAY, TYPE_BYTE_ARRAY
+    from xplra import HOTKEY_MODIFIER_SHIFT, HOTKEY_MODIFIER_CONTROL
+    PUSH_XPLRA_VERSION = getattr(xplra, "PUSH_XPLRA_VERSION", None)
 
 #------------------------------------------------------------------------------
 
@@ -25,7 +39,14 @@ from xplra import HOTKEY_MODIFIER_SHIFT, HOTKEY_MODIFIER_CONTROL
 # The module towards X-Plane
 #
 # This module implements the simulator interface to X-Plane via the
-# X-Plane Remote Access (xplra) plugin.
+# X-Plane Remote Access (xplra) plugin. If the FORCE_XPLRA_SIM environment
+# variable is present, the client of \ref mlx.xplra_sim is used instead of
+# the xplra module, so that a stand-in of X-Plane can be connected to.
+#
+# If the plugin supports it (see PUSH_XPLRA_VERSION), the periodic reads and
+# the hotkey queries are turned into subscriptions, i.e. the plugin pushes the
+# data over a channel of its own in every period instead of being polled for
+# it, which saves a round trip per read. Otherwise the data is polled.
 
 #------------------------------------------------------------------------------
 
@@ -62,7 +83,11 @@ class Request(object):
         Handler._callSafe(lambda: self._callback(False, self._extra))
 
 class DataRequest(Request):
-    """A simple, one-shot data read or write request."""
+    """A simple, one-shot data read or write request.
+
+    The multi-dataref buffer is obtained from the handler when the request
+    is processed, so that the buffers registered for the same data can be
+    reused (see Handler._getMultiBuffer())."""
     def __init__(self, handler, forWrite, data, callback, extra,
                  validator = None):
         """Construct the request."""
@@ -71,19 +96,8 @@ class DataRequest(Request):
         self._forWrite = forWrite
         self._validator = validator
 
-        xplane = handler._xplane
-        self._multiBuffer = xplane.createMultiSetter() if forWrite \
-                            else xplane.createMultiGetter()
-
-        Handler._setupMultiBuffer(self._multiBuffer,
-                                  [(d[0], d[1]) for d in data])
-
-        if forWrite:
-            index = 0
-            for (_, _, value) in data:
-                self._multiBuffer[index] = value
-                index += 1
-
+        self._dataSpec = [(d[0], d[1]) for d in data]
+        self._values = [d[2] for d in data] if forWrite else None
 
     def fail(self):
         """Handle the failure of this request."""
@@ -95,14 +109,22 @@ class DataRequest(Request):
     def _process(self, time):
         """Process the request."""
         if self._forWrite:
-            self._multiBuffer.execute()
+            multiSetter = self._handler._getMultiBuffer(True, self._dataSpec)
+            index = 0
+            for value in self._values:
+                multiSetter[index] = value
+                index += 1
+            multiSetter.execute()
             self._result = True
             return True
 
         try:
-            if Handler._performRead(self._multiBuffer,
-                                    self._extra, self._validator):
-                self._result = self._multiBuffer
+            multiGetter = self._handler._getMultiBuffer(False, self._dataSpec)
+            if Handler._performRead(multiGetter,
+                                    self._extra, self._validator,
+                                    dataSpec = self._dataSpec,
+                                    recorder = self._handler._recorder):
+                self._result = multiGetter
                 return True
             else:
                 return False
@@ -148,18 +170,41 @@ class UnregisterHotkeysRequest(Request):
         self._result = True
         return True
 
+class UnsubscribeRequest(Request):
+    """Request to cancel the subscription of a periodic request that has
+    been cleared."""
+    def __init__(self, handler, periodicRequest):
+        """Construct the request."""
+        super(UnsubscribeRequest, self).__init__(handler,
+                                                 lambda result, extra: None,
+                                                 None)
+        self._periodicRequest = periodicRequest
+
+    def _process(self, time):
+        """Process the request."""
+        self._periodicRequest.unsubscribe()
+        self._result = True
+        return True
+
 @total_ordering
 class PeriodicRequest(object):
-    """A periodic request."""
+    """A periodic request.
+
+    If the plugin can push data, and the request supports it, the request
+    is subscribed to when it is first processed, and from then on, it is
+    executed by the frames pushed by the plugin (see handleFrame()) instead
+    of being polled."""
     def __init__(self, handler, id, period, callback, extra):
         """Construct the periodic request."""
         self._handler = handler
         self._id = id
         self._period = period
-        self._nextFire = time.time()
+        self._firstFire = getClock().time()
+        self._nextFire = self._firstFire
         self._callback = callback
         self._extra = extra
         self._result = None
+        self._subscribed = False
 
     @property
     def id(self):
@@ -171,12 +216,19 @@ class PeriodicRequest(object):
         """Get the next firing time."""
         return self._nextFire
 
+    @property
+    def subscribed(self):
+        """Determine if the request is subscribed to, i.e. if its data is
+        pushed by the plugin."""
+        return self._subscribed
+
     def process(self, now):
         """Check if this request should be executed, and if so, do so.
 
         now is the time at which the request is being executed. If this
         function is called too early, nothing is done, and True is
-        returned.
+        returned. If the plugin can push data, the request is subscribed to
+        instead, if possible.
 
         Return True if the request has succeeded, False if data validation
         has failed. An exception may also be thrown if there is some
@@ -184,14 +236,20 @@ class PeriodicRequest(object):
         if now<self._nextFire:
             return True
 
-        isOK = self._process(time)
+        self._subscribed = False
+        if self._handler.pushing and self._subscribe():
+            self._subscribed = True
+            return True
+
+        isOK = self._process(now)
 
         if isOK:
             Handler._callSafe(lambda: self._callback(self._result,
                                                      self._extra))
-            now = time.time()
-            while self._nextFire <= now:
-                self._nextFire += self._period
+            now = getClock().time()
+            if self._nextFire <= now:
+                self._nextFire = getNextFire(self._firstFire, self._period,
+                                             now)
 
         return isOK
 
@@ -199,6 +257,37 @@ class PeriodicRequest(object):
         """Handle the failure of this request."""
         pass
 
+    def handleFrame(self, frame):
+        """Handle the given frame of data pushed by the plugin for the
+        subscription of this request.
+
+        An invalid frame is dropped, since the next one is pushed anyway."""
+        if self._handleFrame(frame):
+            Handler._callSafe(lambda: self._callback(self._result,
+                                                     self._extra))
+
+    def unsubscribe(self):
+        """Cancel the subscription of the request, if it is subscribed
+        to."""
+        if self._subscribed:
+            self._subscribed = False
+            self._unsubscribe()
+
+    def _subscribe(self):
+        """Subscribe to the request.
+
+        Return whether the request supports subscriptions. This default
+        implementation returns False."""
+        return False
+
+    def setPeriod(self, period):
+        """Set the period of the request.
+
+        The new period takes effect from the next firing of the
+        request."""
+        self._firstFire = self._nextFire
+        self._period = period
+
     def __eq__(self, other):
         """Equality comparison by the firing times"""
         return self._nextFire == other._nextFire
@@ -214,18 +303,51 @@ class PeriodicRequest(object):
 class PeriodicDataRequest(PeriodicRequest):
     """A periodic request."""
     def __init__(self, handler, id, period, data, callback, extra,
-                 validator):
+                 validator, threshold):
         """Construct the periodic request."""
         super(PeriodicDataRequest, self).__init__(handler, id, period,
                                                   callback, extra)
         self._validator = validator
+        self._threshold = threshold
+        self._data = data
         self._multiGetter = handler._xplane.createMultiGetter()
         Handler._setupMultiBuffer(self._multiGetter, data)
 
+    def _subscribe(self):
+        """Subscribe to the data with the period and the threshold of the
+        request."""
+        self._multiGetter.subscribe(self._period,
+                                    threshold = self._threshold,
+                                    key = self._id)
+        return True
+
+    def _unsubscribe(self):
+        """Unsubscribe from the data."""
+        self._multiGetter.unsubscribe()
+
+    def _handleFrame(self, frame):
+        """Handle the given frame of data pushed by the plugin.
+
+        It is recorded, if there is a recorder, and validated, if there is a
+        validator."""
+        recorder = self._handler._recorder
+        if recorder is not None:
+            recorder.record(self._data, list(frame))
+
+        validator = self._validator
+        if validator is None or \
+           Handler._callSafe(lambda: validator(frame, self._extra)):
+            self._result = frame
+            return True
+        else:
+            return False
+
     def _process(self, now):
         """Process the request."""
         if Handler._performRead(self._multiGetter,
-                                self._extra, self._validator):
+                                self._extra, self._validator,
+                                dataSpec = self._data,
+                                recorder = self._handler._recorder):
             self._result = self._multiGetter
             return True
         else:
@@ -234,12 +356,29 @@ class PeriodicDataRequest(PeriodicRequest):
 #------------------------------------------------------------------------------
 
 class HotkeysStateRequest(PeriodicRequest):
-    """Periodic hotkey query request."""
+    """Periodic hotkey query request.
+
+    If subscribed to, the plugin pushes the hotkeys only when any of them
+    has been pressed."""
     def _process(self, now):
         """Process the request."""
         self._result = self._handler._xplane.queryHotkeys()
         return True
 
+    def _subscribe(self):
+        """Subscribe to the hotkeys."""
+        self._handler._xplane.subscribeHotkeys(key = self._id)
+        return True
+
+    def _unsubscribe(self):
+        """Unsubscribe from the hotkeys."""
+        self._handler._xplane.unsubscribeHotkeys()
+
+    def _handleFrame(self, frame):
+        """Handle the given pushed states of the hotkeys."""
+        self._result = frame
+        return True
+
 #------------------------------------------------------------------------------
 
 class Handler(threading.Thread):
@@ -262,6 +401,10 @@ class Handler(threading.Thread):
     # The interval between successive connect attempts
     CONNECT_INTERVAL = 0.25
 
+    # The maximal number of multi-dataref buffers of one-shot requests kept
+    # registered in the plugin
+    MAX_CACHED_MULTIBUFFERS = 32
+
     @staticmethod
     def _setupMultiBuffer(buffer, dataSpec):
         """Setup the given multi-dataref buffer for the given data
@@ -306,13 +449,17 @@ class Handler(threading.Thread):
 
 
     @staticmethod
-    def _performRead(multiGetter, extra, validator):
+    def _performRead(multiGetter, extra, validator, dataSpec = None,
+                     recorder = None):
         """Perform a read request.
 
         If there is a validator, that will be called with the return values,
         and if the values are wrong, the request is retried at most a certain
         number of times.
 
+        If recorder is not None, the values read are recorded by it along
+        with dataSpec, the specification the multi-getter was set up with.
+
         Return True if the request has succeeded, False if validation has
         failed during all attempts. An exception may also be thrown if there is
         some lower-level communication problem."""
@@ -324,6 +471,11 @@ class Handler(threading.Thread):
                 print("xplane.Handler._performRead: " + str(e))
                 raise
 
+            if recorder is not None:
+                recorder.record(dataSpec,
+                                [multiGetter[i]
+                                 for i in range(0, len(dataSpec))])
+
             if validator is None or \
                Handler._callSafe(lambda: validator(multiGetter, extra)):
                 return True
@@ -348,12 +500,38 @@ class Handler(threading.Thread):
 
         self._requests = []
         self._nextPeriodicID = 1
-        self._periodicRequests = []
+        self._scheduler = Scheduler()
+
+        self._recorder = None
+
+        self._multiBuffers = collections.OrderedDict()
+
+        self._pushing = False
+        self._subscribed = {}
+        self._frames = collections.deque()
 
         self._watchdogClient = Watchdog.get().addClient(2.0, "xplane.Handler")
 
         self.daemon = True
 
+    @property
+    def pushing(self):
+        """Determine if the plugin pushes the data of the periodic requests
+        via subscriptions."""
+        return self._pushing
+
+    @property
+    def recorder(self):
+        """Get the recorder of the values read, if any."""
+        return self._recorder
+
+    @recorder.setter
+    def recorder(self, recorder):
+        """Set the recorder of the values read.
+
+        If it is None, the values are not recorded."""
+        self._recorder = recorder
+
     def requestRead(self, data, callback, extra = None, validator = None):
         """Request the reading of some data.
 
@@ -393,11 +571,15 @@ class Handler(threading.Thread):
             self._requestCondition.notify()
 
     def requestPeriodicRead(self, period, data, callback, extra = None,
-                            validator = None):
+                            validator = None, threshold = None):
         """Request a periodic read of data.
 
         period is a floating point number with the period in seconds.
 
+        If threshold is not None, and the plugin pushes the data, it is
+        pushed only if any of the values has changed by more than the
+        threshold. When polling, the callback is called in every period.
+
         This function returns an identifier which can be used to cancel the
         request."""
         with self._requestCondition:
@@ -405,18 +587,38 @@ class Handler(threading.Thread):
             self._nextPeriodicID += 1
             request = PeriodicDataRequest(self, id, period,
                                           data, callback,
-                                          extra, validator)
-            self._periodicRequests.append(request)
+                                          extra, validator, threshold)
+            self._scheduler.add(request)
             self._requestCondition.notify()
             return id
 
     def clearPeriodic(self, id):
-        """Clear the periodic request with the given ID."""
+        """Clear the periodic request with the given ID.
+
+        If it is subscribed to, it is unsubscribed from by the thread."""
+        with self._requestCondition:
+            if self._scheduler.remove(id):
+                request = self._subscribed.pop(id, None)
+                if request is not None:
+                    self._requests.append(UnsubscribeRequest(self, request))
+                    self._requestCondition.notify()
+                return True
+        return False
+
+    def setPeriod(self, id, period):
+        """Set the period of the periodic request with the given ID.
+
+        The new period takes effect from the next execution of the
+        request. If the request is subscribed to, it is rescheduled so that
+        the thread subscribes to it again with the new period."""
         with self._requestCondition:
-            for i in range(0, len(self._periodicRequests)):
-                if self._periodicRequests[i].id==id:
-                    del self._periodicRequests[i]
-                    return True
+            request = self._scheduler.get(id)
+            if request is not None:
+                request.setPeriod(period)
+                if self._subscribed.pop(id, None) is not None:
+                    self._scheduler.reschedule(request)
+                    self._requestCondition.notify()
+                return True
         return False
 
     def requestShowMessage(self, message, duration, callback, extra = None):
@@ -440,7 +642,7 @@ class Handler(threading.Thread):
             id = self._nextPeriodicID
             self._nextPeriodicID += 1
             request = HotkeysStateRequest(self, id, period, callback, extra)
-            self._periodicRequests.append(request)
+            self._scheduler.add(request)
             self._requestCondition.notify()
             return id
 
@@ -521,6 +723,12 @@ class Handler(threading.Thread):
 
                 description = "(X-Plane version: %d, XPLM version: %d, XPLRA version: %03d)" % \
                   (xplaneVersion, xplmVersion, xplraVersion)
+                recorder = self._recorder
+                if recorder is not None:
+                    recorder.setInfo({"xplaneVersion": xplaneVersion,
+                                      "xplmVersion": xplmVersion,
+                                      "xplraVersion": xplraVersion})
+                self._pushing = self._openPushChannel(xplraVersion)
                 if not autoReconnection:
                     fsType = \
                       const.SIM_XPLANE12 if xplaneVersion>=12000 else \
@@ -540,7 +748,7 @@ class Handler(threading.Thread):
                       util.utf2unicode(str(e)) + \
                       " (attempts: %d)" % (attempts,))
                 if attempts<self.NUM_CONNECTATTEMPTS:
-                    time.sleep(self.CONNECT_INTERVAL)
+                    getClock().sleep(self.CONNECT_INTERVAL)
                 self._xplane.disconnect()
 
     def _handleConnection(self):
@@ -558,19 +766,84 @@ class Handler(threading.Thread):
         Should be called with the request condition lock held."""
         while self._connectionRequested:
             timeout = None
-            if self._periodicRequests:
-                self._periodicRequests.sort()
-                timeout = self._periodicRequests[0].nextFire - time.time()
+            nextFire = self._scheduler.nextFire
+            if nextFire is not None:
+                timeout = nextFire - getClock().time()
 
-            if self._requests or \
+            if self._requests or self._frames or \
                (timeout is not None and timeout <= 0.0):
                 return
 
-            self._requestCondition.wait(timeout)
+            getClock().wait(self._requestCondition, timeout)
+
+    def _getMultiBuffer(self, forWrite, dataSpec):
+        """Get a registered multi-dataref buffer for the given data
+        specification.
+
+        The buffers are cached with the least recently used one unregistered
+        and dropped when there are too many of them. A buffer returned
+        is valid only until the next request with the same data, which
+        reuses it.
+
+        Should be called in the handler's thread only."""
+        key = (forWrite, tuple(dataSpec))
+        multiBuffers = self._multiBuffers
+        multiBuffer = multiBuffers.get(key)
+        if multiBuffer is None:
+            multiBuffer = self._xplane.createMultiSetter() if forWrite \
+                          else self._xplane.createMultiGetter()
+            Handler._setupMultiBuffer(multiBuffer, dataSpec)
+            multiBuffer.register()
+
+            multiBuffers[key] = multiBuffer
+            while len(multiBuffers)>self.MAX_CACHED_MULTIBUFFERS:
+                (_, oldMultiBuffer) = multiBuffers.popitem(last = False)
+                Handler._callSafe(oldMultiBuffer.unregister)
+        else:
+            multiBuffers.move_to_end(key)
+
+        return multiBuffer
+
+    def _openPushChannel(self, xplraVersion):
+        """Open the channel the plugin pushes the data of the subscriptions
+        over, if the plugin of the given version supports it.
+
+        Return whether the data can be pushed."""
+        if PUSH_XPLRA_VERSION is None or xplraVersion<PUSH_XPLRA_VERSION:
+            return False
+
+        try:
+            self._xplane.openPushChannel(self._handleFrame)
+            return True
+        except Exception as e:
+            print("xplane.Handler._openPushChannel: failed, polling the data: " + \
+                  util.utf2unicode(str(e)))
+            return False
+
+    def _handleFrame(self, id, frame):
+        """Handle the given frame pushed for the subscription of the periodic
+        request with the given ID.
+
+        It is called in the thread of the push channel, so the frame is
+        queued to be processed by the handler's thread."""
+        with self._requestCondition:
+            self._frames.append((id, frame))
+            self._requestCondition.notify()
 
     def _disconnect(self):
-        """Disconnect from the flight simulator."""
+        """Disconnect from the flight simulator.
+
+        The cached multi-dataref buffers are dropped, since their
+        registrations do not survive the connection, and so are the
+        subscriptions, the requests of which are rescheduled."""
         print("xplane.Handler._disconnect")
+        self._multiBuffers.clear()
+        with self._requestCondition:
+            self._pushing = False
+            self._frames.clear()
+            for request in self._subscribed.values():
+                self._scheduler.reschedule(request)
+            self._subscribed = {}
         if self._connected:
             try:
                 self._xplane.disconnect()
@@ -619,21 +892,50 @@ class Handler(threading.Thread):
             self._watchdogClient.clear()
             self._requestCondition.acquire()
 
+    def _processFrame(self, request, frame):
+        """Process the given frame pushed for the given periodic request.
+
+        This function is called with the request lock held, but is released
+        while processing the frame."""
+        self._requestCondition.release()
+        try:
+            self._watchdogClient.set()
+            request.handleFrame(frame)
+        finally:
+            self._watchdogClient.clear()
+            self._requestCondition.acquire()
+
     def _processRequests(self):
-        """Process any pending requests.
+        """Process any pending requests and pushed frames.
+
+        The periodic requests subscribed to are not rescheduled, but kept
+        until they are cleared or the connection is broken.
 
         Will be called with the request lock held."""
         attempts = 0
-        while self._connectionRequested and self._periodicRequests:
-            self._periodicRequests.sort()
-            request = self._periodicRequests[0]
+        while self._connectionRequested and self._frames:
+            (id, frame) = self._frames.popleft()
+            request = self._scheduler.get(id)
+            if request is not None and request.subscribed:
+                self._processFrame(request, frame)
 
-            t = time.time()
+        while self._connectionRequested:
+            t = getClock().time()
 
-            if request.nextFire>t:
+            periodicRequests = self._scheduler.popDue(t)
+            if not periodicRequests:
                 break
 
-            attempts = self._processRequest(request, t, attempts, True)
+            for request in periodicRequests:
+                if self._connectionRequested:
+                    attempts = self._processRequest(request, t, attempts,
+                                                    True)
+                if not request.subscribed:
+                    self._scheduler.reschedule(request)
+                elif self._scheduler.get(request.id) is request:
+                    self._subscribed[request.id] = request
+                else:
+                    self._requests.append(UnsubscribeRequest(self, request))
 
         while self._connectionRequested and self._requests:
             request = self._requests[0]
@@ -727,9 +1029,11 @@ class Simulator(object):
         self._lastZuluSeconds = None
 
         self._normalRequestID = None
+        self._slowRequestID = None
 
         self._monitoringRequested = False
         self._monitoring = False
+        self._monitoringPeriod = fs.MONITORING_PERIOD_DEFAULT
 
         self._aircraftInfo = None
         self._aircraftModel = None
@@ -776,6 +1080,22 @@ class Simulator(object):
         handler."""
         self._handler.connect()
 
+    def startRecording(self, path):
+        """Start recording the raw data read from the simulator into the
+        telemetry file with the given path.
+
+        If a recording is in progress, it is stopped first."""
+        self.stopRecording()
+        self._handler.recorder = telemetry.Recorder(path, "xplane")
+
+    def stopRecording(self):
+        """Stop recording the raw data read from the simulator, if a recording
+        is in progress."""
+        recorder = self._handler.recorder
+        if recorder is not None:
+            self._handler.recorder = None
+            recorder.close()
+
     def requestZFW(self, callback):
         """Send a request for the ZFW."""
         if self._aircraftModel is None:
@@ -991,6 +1311,7 @@ class Simulator(object):
         """Start the default normal periodic request."""
         assert self._normalRequestID is None
         self._timestampBase = None
+        self._monitoringPeriod = fs.MONITORING_PERIOD_DEFAULT
         self._normalRequestID = \
              self._handler.requestPeriodicRead(1.0,
                                                Simulator.normalData,
@@ -1001,6 +1322,9 @@ class Simulator(object):
         assert self._normalRequestID is not None
         self._handler.clearPeriodic(self._normalRequestID)
         self._normalRequestID = None
+        if self._slowRequestID is not None:
+            self._handler.clearPeriodic(self._slowRequestID)
+            self._slowRequestID = None
         self._monitoring = False
 
     def _handleNormal(self, data, extra):
@@ -1008,10 +1332,18 @@ class Simulator(object):
 
         At the beginning the result consists the data for normalData. When
         monitoring is started, it contains the result also for the
-        aircraft-specific values.
+        fast aircraft-specific values, and extra is the fs.MonitoringData
+        object the values of the other tiers are merged with.
         """
+        if extra is not None:
+            extra.update(const.MONITORING_TIER_FAST, data)
+
         timestamp = self._getTimestamp(data)
 
+        recorder = self._handler.recorder
+        if recorder is not None:
+            recorder.simTime = timestamp
+
         createdNewModel = self._setAircraftName(timestamp,
                                                 data.getString(2),
                                                 data.getString(3),
@@ -1030,12 +1362,27 @@ class Simulator(object):
             self._stopNormal()
             self._startDefaultNormal()
         elif self._monitoring and self._aircraftModel is not None and \
-             not createdNewModel:
-            aircraftState = self._aircraftModel.getAircraftState(self._aircraft,
-                                                                 timestamp, data)
+             not createdNewModel and extra is not None and extra.complete:
+            aircraftState = \
+                self._aircraftModel.getNextAircraftState(self._aircraft,
+                                                         timestamp, extra)
 
             self._aircraft.handleState(aircraftState)
 
+            self._updateMonitoringPeriod(aircraftState)
+
+    def _updateMonitoringPeriod(self, aircraftState):
+        """Update the period of the monitoring request according to the
+        current flight stage and the given aircraft state."""
+        period = fs.getMonitoringPeriod(self._aircraft.flight.stage,
+                                        aircraftState)
+        if period!=self._monitoringPeriod:
+            self._monitoringPeriod = period
+            self._handler.setPeriod(self._normalRequestID, period)
+            if self._slowRequestID is not None:
+                self._handler.setPeriod(self._slowRequestID,
+                                        max(fs.MONITORING_PERIOD_SLOW, period))
+
     def _setAircraftName(self, timestamp, tailnum, author, description,
                          notes, icao, liveryPath):
         """Set the name of the aicraft and if it is different from the
@@ -1083,15 +1430,62 @@ class Simulator(object):
             self._startMonitoring()
 
     def _startMonitoring(self):
-        """Start monitoring with the current aircraft model."""
+        """Start monitoring with the current aircraft model.
+
+        The fast tier of the monitoring data is read with the normal request,
+        the slow tier with a separate, less frequent periodic request, while
+        the static tier is read only once."""
         data = Simulator.normalData[:]
         self._aircraftModel.addMonitoringData(data, self._fsType)
 
+        monitoringData = \
+            fs.MonitoringData(data,
+                              [self._aircraftModel.getMonitoringTier(i)
+                               for i in range(0, len(data))])
+        tierData = monitoringData.tierData
+
         self._normalRequestID = \
-            self._handler.requestPeriodicRead(1.0, data,
-                                              self._handleNormal)
+            self._handler.requestPeriodicRead(self._monitoringPeriod,
+                                              tierData[const.MONITORING_TIER_FAST],
+                                              self._handleNormal,
+                                              extra = monitoringData)
+
+        # The values of the slow tier are merged with those of the fast one,
+        # so if they are pushed, it is enough to do so when they change
+        if const.MONITORING_TIER_SLOW in tierData:
+            self._slowRequestID = \
+                self._handler.requestPeriodicRead(
+                    max(fs.MONITORING_PERIOD_SLOW, self._monitoringPeriod),
+                    tierData[const.MONITORING_TIER_SLOW],
+                    self._handleMonitoringTier,
+                    extra = (const.MONITORING_TIER_SLOW, monitoringData),
+                    threshold = 0.0)
+
+        if const.MONITORING_TIER_STATIC in tierData:
+            self._requestStaticMonitoringData(monitoringData)
+
         self._monitoring = True
 
+    def _requestStaticMonitoringData(self, monitoringData):
+        """Request the reading of the static tier of the given monitoring
+        data."""
+        self._handler.requestRead(
+            monitoringData.tierData[const.MONITORING_TIER_STATIC],
+            self._handleMonitoringTier,
+            extra = (const.MONITORING_TIER_STATIC, monitoringData))
+
+    def _handleMonitoringTier(self, data, extra):
+        """Handle the reply to the request of a non-fast tier of the
+        monitoring data.
+
+        If the reading of the static tier has failed, it is requested
+        again."""
+        (tier, monitoringData) = extra
+        if data is not None:
+            monitoringData.update(tier, data)
+        elif tier==const.MONITORING_TIER_STATIC:
+            self._requestStaticMonitoringData(monitoringData)
+
     def _addFlareRate(self, data):
         """Append a flare rate to the list of last rates."""
         if len(self._flareRates)>=3:
@@ -1102,7 +1496,7 @@ class Simulator(object):
         """Handle the first stage of flare monitoring."""
         #self._aircraft.logger.debug("handleFlare1: " + str(data))
         if data[1]<=50.0*0.3048:
-            self._flareStart = time.time()
+            self._flareStart = getClock().time()
             self._flareStartFS = data[0]
             self._handler.clearPeriodic(self._flareRequestID)
             self._handler.requestRead(Simulator.flareStartData,
@@ -1129,7 +1523,7 @@ class Simulator(object):
         """Handle the first stage of flare monitoring."""
         #self._aircraft.logger.debug("handleFlare2: " + str(data))
         if data[1]!=0:
-            flareEnd = time.time()
+            flareEnd = getClock().time()
             self._handler.clearPeriodic(self._flareRequestID)
             self._flareRequestID = None
 
@@ -1208,7 +1602,11 @@ class AircraftModel(object):
     """Base class for the aircraft models.
 
     Aircraft models handle the data arriving from X-Plane and turn it into an
-    object describing the aircraft's state."""
+    object describing the aircraft's state.
+
+    The monitoring data items belong to one of the tiers (see
+    const.MONITORING_TIER_XXX), which are read with different periods. The
+    items are in the fast tier, unless specified otherwise."""
     monitoringData = [ ("paused",
                         "sim/time/paused", TYPE_INT),
                        ("latitude",
@@ -1224,11 +1622,14 @@ class AircraftModel(object):
                        ("onTheGround",
                         "sim/flightmodel/failures/onground_any", TYPE_INT),
                        ("emptyWeight",
-                        "sim/aircraft/weight/acf_m_empty", TYPE_FLOAT),
+                        "sim/aircraft/weight/acf_m_empty", TYPE_FLOAT,
+                        const.MONITORING_TIER_STATIC),
                        ("payloadWeight",
-                        "sim/flightmodel/weight/m_fixed", TYPE_FLOAT),
+                        "sim/flightmodel/weight/m_fixed", TYPE_FLOAT,
+                        const.MONITORING_TIER_SLOW),
                        ("grossWeight",
-                        "sim/flightmodel/weight/m_total", TYPE_FLOAT),
+                        "sim/flightmodel/weight/m_total", TYPE_FLOAT,
+                        const.MONITORING_TIER_SLOW),
                        ("heading",
                         "sim/flightmodel/position/psi", TYPE_FLOAT),
                        ("pitch",
@@ -1277,53 +1678,76 @@ class AircraftModel(object):
                        ("spoilers",
                         "sim/flightmodel/controls/lsplrdef", TYPE_FLOAT),
                        ("altimeter",
-                        "sim/cockpit/misc/barometer_setting", TYPE_FLOAT),
+                        "sim/cockpit/misc/barometer_setting", TYPE_FLOAT,
+                        const.MONITORING_TIER_SLOW),
                        ("qnh",
-                        "sim/physics/earth_pressure_p", TYPE_FLOAT),
+                        "sim/physics/earth_pressure_p", TYPE_FLOAT,
+                        const.MONITORING_TIER_SLOW),
                        ("nav1",
-                        "sim/cockpit/radios/nav1_freq_hz", TYPE_INT),
+                        "sim/cockpit/radios/nav1_freq_hz", TYPE_INT,
+                        const.MONITORING_TIER_SLOW),
                        ("nav1_obs",
-                        "sim/cockpit/radios/nav1_obs_degm", TYPE_FLOAT),
+                        "sim/cockpit/radios/nav1_obs_degm", TYPE_FLOAT,
+                        const.MONITORING_TIER_SLOW),
                        ("nav2",
-                        "sim/cockpit/radios/nav2_freq_hz", TYPE_INT),
+                        "sim/cockpit/radios/nav2_freq_hz", TYPE_INT,
+                        const.MONITORING_TIER_SLOW),
                        ("nav2_obs",
-                        "sim/cockpit/radios/nav2_obs_degm", TYPE_FLOAT),
+                        "sim/cockpit/radios/nav2_obs_degm", TYPE_FLOAT,
+                        const.MONITORING_TIER_SLOW),
                        ("adf1",
-                        "sim/cockpit/radios/adf1_freq_hz", TYPE_INT),
+                        "sim/cockpit/radios/adf1_freq_hz", TYPE_INT,
+                        const.MONITORING_TIER_SLOW),
                        ("adf2",
-                        "sim/cockpit/radios/adf2_freq_hz", TYPE_INT),
+                        "sim/cockpit/radios/adf2_freq_hz", TYPE_INT,
+                        const.MONITORING_TIER_SLOW),
                        ("squawk",
-                        "sim/cockpit/radios/transponder_code", TYPE_INT),
+                        "sim/cockpit/radios/transponder_code", TYPE_INT,
+                        const.MONITORING_TIER_SLOW),
                        ("windSpeed",
-                        "sim/weather/wind_speed_kt[0]", TYPE_FLOAT),
+                        "sim/weather/wind_speed_kt[0]", TYPE_FLOAT,
+                        const.MONITORING_TIER_SLOW),
                        ("windDirection",
-                        "sim/weather/wind_direction_degt[0]", TYPE_FLOAT),
+                        "sim/weather/wind_direction_degt[0]", TYPE_FLOAT,
+                        const.MONITORING_TIER_SLOW),
                        ("visibility",
-                        "sim/weather/visibility_reported_m", TYPE_FLOAT),
+                        "sim/weather/visibility_reported_m", TYPE_FLOAT,
+                        const.MONITORING_TIER_SLOW),
                        ("cog",
-                        "sim/flightmodel/misc/cgz_ref_to_default", TYPE_FLOAT),
+                        "sim/flightmodel/misc/cgz_ref_to_default", TYPE_FLOAT,
+                        const.MONITORING_TIER_SLOW),
                        ("xpdrC",
-                        "sim/cockpit/radios/transponder_mode", TYPE_INT),
+                        "sim/cockpit/radios/transponder_mode", TYPE_INT,
+                        const.MONITORING_TIER_SLOW),
                        ("apMaster",
-                        "sim/cockpit/autopilot/autopilot_mode", TYPE_INT),
+                        "sim/cockpit/autopilot/autopilot_mode", TYPE_INT,
+                        const.MONITORING_TIER_SLOW),
                        ("apState",
-                        "sim/cockpit/autopilot/autopilot_state", TYPE_INT),
+                        "sim/cockpit/autopilot/autopilot_state", TYPE_INT,
+                        const.MONITORING_TIER_SLOW),
                        ("apHeading",
-                        "sim/cockpit/autopilot/heading_mag", TYPE_FLOAT),
+                        "sim/cockpit/autopilot/heading_mag", TYPE_FLOAT,
+                        const.MONITORING_TIER_SLOW),
                        ("apAltitude",
-                        "sim/cockpit/autopilot/altitude", TYPE_FLOAT),
+                        "sim/cockpit/autopilot/altitude", TYPE_FLOAT,
+                        const.MONITORING_TIER_SLOW),
                        ("elevatorTrim",
                         "sim/flightmodel/controls/elv_trim", TYPE_FLOAT),
                        ("antiIceOn",
-                        "sim/cockpit/switches/anti_ice_on", TYPE_INT),
+                        "sim/cockpit/switches/anti_ice_on", TYPE_INT,
+                        const.MONITORING_TIER_SLOW),
                        ("surfaceHeat",
-                        "sim/cockpit/switches/anti_ice_surf_heat", TYPE_INT),
+                        "sim/cockpit/switches/anti_ice_surf_heat", TYPE_INT,
+                        const.MONITORING_TIER_SLOW),
                        ("propHeat",
-                        "sim/cockpit/switches/anti_ice_prop_heat", TYPE_INT),
+                        "sim/cockpit/switches/anti_ice_prop_heat", TYPE_INT,
+                        const.MONITORING_TIER_SLOW),
                        ("autopilotOn",
-                        "sim/cockpit2/autopilot/autopilot_on", TYPE_INT),
+                        "sim/cockpit2/autopilot/autopilot_on", TYPE_INT,
+                        const.MONITORING_TIER_SLOW),
                        ("apHeadingMode",
-                        "sim/cockpit2/autopilot/heading_mode", TYPE_INT)]
+                        "sim/cockpit2/autopilot/heading_mode", TYPE_INT,
+                        const.MONITORING_TIER_SLOW)]
 
 
     specialModels = []
@@ -1370,6 +1794,8 @@ class AircraftModel(object):
         flapsNotches is a list of degrees of flaps that are available on the aircraft."""
         self._flapsNotches = flapsNotches
         self._simulator = None
+        self._monitoringTiers = {}
+        self._lastState = None
 
     @property
     def name(self):
@@ -1392,12 +1818,22 @@ class AircraftModel(object):
         This default implementation returns False."""
         return False
 
-    def _addDatarefWithIndexMember(self, dest, name, type, attrName = None):
+    def getMonitoringTier(self, index):
+        """Get the tier of the monitoring data item with the given index."""
+        return self._monitoringTiers.get(index, const.MONITORING_TIER_FAST)
+
+    def _addDatarefWithIndexMember(self, dest, name, type, attrName = None,
+                                   tier = const.MONITORING_TIER_FAST):
         """Add the given X-Plane dataref name and type to the given array and a
-        member attribute with the given name."""
+        member attribute with the given name.
+
+        If the dataref is added to the monitoring data, tier is the monitoring
+        tier it belongs to."""
         dest.append((name, type))
         if attrName is not None:
             setattr(self, attrName, len(dest)-1)
+        if tier!=const.MONITORING_TIER_FAST:
+            self._monitoringTiers[len(dest)-1] = tier
 
     def _addDataWithIndexMembers(self, dest, prefix, data):
         """Add X-Plane dataref data to the given array and also corresponding
@@ -1409,16 +1845,35 @@ class AircraftModel(object):
         - the X-Plane dataref name
         - the dataref type
 
-        The latter two items will be appended to dest."""
-        for (name, datarefName, type) in data:
+        The latter two items will be appended to dest. A fourth item may also
+        be given, which is the monitoring tier of the data item."""
+        for item in data:
+            (name, datarefName, type) = item[:3]
+            tier = item[3] if len(item)>3 else const.MONITORING_TIER_FAST
             self._addDatarefWithIndexMember(dest, datarefName, type,
-                                            prefix + name)
+                                            prefix + name, tier = tier)
 
     def addMonitoringData(self, data, fsType):
         """Add the model-specific monitoring data to the given array."""
+        self._monitoringTiers = {}
+        self._lastState = None
         self._addDataWithIndexMembers(data, "_monidx_",
                                       AircraftModel.monitoringData)
 
+    def getNextAircraftState(self, aircraft, timestamp, data):
+        """Get the aircraft state for the given monitoring data following the
+        state returned by the previous call.
+
+        The change mask of the state is also set. The values are simple to
+        decode from the datarefs, so they are not reused unlike in case of
+        FSUIPC."""
+        state = self.getAircraftState(aircraft, timestamp, data)
+
+        state.computeChangeMask(self._lastState)
+        self._lastState = state
+
+        return state
+
     def getAircraftState(self, aircraft, timestamp, data):
         """Get an aircraft state object for the given monitoring data."""
         state = fs.AircraftState()
@@ -1597,7 +2052,8 @@ class GenericAircraftModel(AircraftModel):
         """Add the model-specific monitoring data to the given array."""
         super(GenericAircraftModel, self).addMonitoringData(data, fsType)
 
-        self._fuelIndex = self._addFuelData(data)
+        self._fuelIndex = self._addFuelData(data,
+                                            tier = const.MONITORING_TIER_SLOW)
 
         self._engineStartIndex = len(data)
         if self._isN1:
@@ -1676,13 +2132,18 @@ class GenericAircraftModel(AircraftModel):
 
         handler.requestWrite(data, self._handleFuelWritten)
 
-    def _addFuelData(self, data):
+    def _addFuelData(self, data, tier = const.MONITORING_TIER_FAST):
         """Add the fuel offsets to the given data array.
 
+        If the offsets are added to the monitoring data, tier is the
+        monitoring tier they belong to.
+
         Returns the index of the first fuel tank's data."""
         fuelStartIndex = len(data)
-        data.append( ("sim/flightmodel/weight/m_fuel",
-                      (TYPE_FLOAT_ARRAY, len(self._fuelTanks) ) ) )
+        self._addDatarefWithIndexMember(data, "sim/flightmodel/weight/m_fuel",
+                                        (TYPE_FLOAT_ARRAY,
+                                         len(self._fuelTanks)),
+                                        tier = tier)
 
         return fuelStartIndex
 
@@ -1787,19 +2248,23 @@ class ZiboB737NGModel(B737Model):
         self._cgIndex = len(data)
         self._addDatarefWithIndexMember(data,
                                         "laminar/B738/efb_mac",
-                                        TYPE_FLOAT)
+                                        TYPE_FLOAT,
+                                        tier = const.MONITORING_TIER_SLOW)
         self._wingHeatIndex = len(data)
         self._addDatarefWithIndexMember(data,
                                         "laminar/B738/ice/wing_heat_pos",
-                                        TYPE_FLOAT)
+                                        TYPE_FLOAT,
+                                        tier = const.MONITORING_TIER_SLOW)
         self._eng1HeatIndex = len(data)
         self._addDatarefWithIndexMember(data,
                                         "laminar/B738/ice/eng1_heat_pos",
-                                        TYPE_FLOAT)
+                                        TYPE_FLOAT,
+                                        tier = const.MONITORING_TIER_SLOW)
         self._eng2HeatIndex = len(data)
         self._addDatarefWithIndexMember(data,
                                         "laminar/B738/ice/eng2_heat_pos",
-                                        TYPE_FLOAT)
+                                        TYPE_FLOAT,
+                                        tier = const.MONITORING_TIER_SLOW)
         self._spoilersArmedIndex = len(data)
         self._addDatarefWithIndexMember(data,
                                         "laminar/B738/annunciator/speedbrake_armed",
@@ -1808,23 +2273,28 @@ class ZiboB737NGModel(B737Model):
         self._apCMDStatusIndex = len(data)
         self._addDatarefWithIndexMember(data,
                                         "laminar/B738/autopilot/cmd_a_status",
-                                        TYPE_FLOAT)
+                                        TYPE_FLOAT,
+                                        tier = const.MONITORING_TIER_SLOW)
         self._addDatarefWithIndexMember(data,
                                         "laminar/B738/autopilot/cmd_b_status",
-                                        TYPE_FLOAT)
+                                        TYPE_FLOAT,
+                                        tier = const.MONITORING_TIER_SLOW)
 
         self._apHeadingIndex = len(data)
         self._addDatarefWithIndexMember(data,
                                         "laminar/B738/autopilot/hdg_sel_status",
-                                        TYPE_FLOAT)
+                                        TYPE_FLOAT,
+                                        tier = const.MONITORING_TIER_SLOW)
         self._addDatarefWithIndexMember(data,
                                         "laminar/B738/hud/hdg_bug_tape",
-                                        TYPE_FLOAT)
+                                        TYPE_FLOAT,
+                                        tier = const.MONITORING_TIER_SLOW)
 
         self._apAltitudeIndex = len(data)
         self._addDatarefWithIndexMember(data,
                                         "laminar/B738/autopilot/alt_hld_status",
-                                        TYPE_FLOAT)
+                                        TYPE_FLOAT,
+                                        tier = const.MONITORING_TIER_SLOW)
 
         self._reverserIndex = len(data)
         self._addDatarefWithIndexMember(data,
@@ -1837,26 +2307,32 @@ class ZiboB737NGModel(B737Model):
         self._oewIndex = len(data)
         self._addDatarefWithIndexMember(data,
                                         "laminar/B738/oew_kg",
-                                        TYPE_FLOAT)
+                                        TYPE_FLOAT,
+                                        tier = const.MONITORING_TIER_STATIC)
 
         self._equipmentWeightIndex = len(data)
         self._addDatarefWithIndexMember(data,
                                         "laminar/B738/fa_fwd_kg",
-                                        TYPE_FLOAT)
+                                        TYPE_FLOAT,
+                                        tier = const.MONITORING_TIER_SLOW)
         self._addDatarefWithIndexMember(data,
                                         "laminar/B738/fa_aft_kg",
-                                        TYPE_FLOAT)
+                                        TYPE_FLOAT,
+                                        tier = const.MONITORING_TIER_SLOW)
         self._addDatarefWithIndexMember(data,
                                         "laminar/B738/galley_fwd_kg",
-                                        TYPE_FLOAT)
+                                        TYPE_FLOAT,
+                                        tier = const.MONITORING_TIER_SLOW)
         self._addDatarefWithIndexMember(data,
                                         "laminar/B738/galley_aft_kg",
-                                        TYPE_FLOAT)
+                                        TYPE_FLOAT,
+                                        tier = const.MONITORING_TIER_SLOW)
 
         self._fuelTotalIndex = len(data)
         self._addDatarefWithIndexMember(data,
                                         "sim/flightmodel/weight/m_fuel_total",
-                                        TYPE_FLOAT)
+                                        TYPE_FLOAT,
+                                        tier = const.MONITORING_TIER_SLOW)
 
     def getAircraftState(self, aircraft, timestamp, data):
         """Get the aircraft state."""
@@ -2206,10 +2682,12 @@ class FJSDH8DXPModel(DH8DModel):
         self._apIndex = len(data)
         self._addDatarefWithIndexMember(data,
                                         "FJS/Q4XP/FMA/roll_act",
-                                        TYPE_INT)
+                                        TYPE_INT,
+                                        tier = const.MONITORING_TIER_SLOW)
         self._addDatarefWithIndexMember(data,
                                         "FJS/Q4XP/FMA/pitch_act",
-                                        TYPE_INT)
+                                        TYPE_INT,
+                                        tier = const.MONITORING_TIER_SLOW)
 
         self._propPitchIndex = len(data)
         self._addDatarefWithIndexMember(data,
@@ -2410,7 +2888,8 @@ class FelisT154B2Model(T154Model):
             self._cgIndex = len(data)
             self._addDatarefWithIndexMember(data,
                                             "tu154b2/custom/misc/cg_pos_actual",
-                                            TYPE_FLOAT)
+                                            TYPE_FLOAT,
+                                            tier = const.MONITORING_TIER_SLOW)
 
             self._flapsControlIndex = len(data)
             self._addDatarefWithIndexMember(data,
@@ -2434,7 +2913,8 @@ class FelisT154B2Model(T154Model):
             self._cgIndex = len(data)
             self._addDatarefWithIndexMember(data,
                                             "sim/custom/misc/cg_pos_actual",
-                                            TYPE_FLOAT)
+                                            TYPE_FLOAT,
+                                            tier = const.MONITORING_TIER_SLOW)
 
             self._flapsControlIndex = len(data)
             self._addDatarefWithIndexMember(data,
@@ -0,0 +1,1829 @@
+# Stand-in for X-Plane with the XPLRA plugin
+
+from .clock import getClock
+
+import os
+import sys
+import json
+import time
+import random
+import socket
+import struct
+import asyncio
+import argparse
+import threading
+
+#------------------------------------------------------------------------------
+
+## @package mlx.xplra_sim
+#
+# Stand-in for X-Plane running the X-Plane Remote Access (XPLRA) plugin.
+#
+# The \ref mlx.xplra_sim.Server "server" speaks the wire protocol of the
+# plugin over TCP: single and multi-dataref reads and writes, registered
+# multi-getters and multi-setters, version queries, messages and hotkeys.
+# The datarefs are served from a \ref mlx.xplra_sim.DatarefTable "table",
+# which can be loaded from a JSON file and modified while the server runs.
+# It can be prepared for the aircraft the X-Plane aircraft models of the
+# logger recognize (e.g. the Zibo or the LevelUp Boeing 737s), the time
+# datarefs follow the current clock (see \ref mlx.clock), and unknown
+# datarefs are created on first access with a zero value, unless the table
+# is strict. A latency, optionally with a random jitter, can be injected
+# into each reply.
+#
+# As an extension of the protocol, the server can push data to the client
+# instead of being polled for it. The client opens a push channel, i.e. a
+# second connection attached to the first one, then subscribes its
+# registered multi-getters with a period and optionally with a threshold of
+# change, and the hotkeys. The server samples the datarefs of a subscribed
+# getter periodically, and sends a frame with the values over the push
+# channel, if any of them has changed by more than the threshold (or always,
+# if there is no threshold). The hotkeys are pushed when one of them is
+# pressed. A frame consists of its kind (FRAME_XXX), the ID of the getter, the
+# length of the payload and the payload, which is encoded like the reply of
+# the corresponding query. The push channel is supported by the servers
+# reporting a plugin version of at least PUSH_XPLRA_VERSION.
+#
+# The module also contains a client with the same interface as the xplra
+# module, which is used by \ref mlx.xplane instead of the real one if the
+# FORCE_XPLRA_SIM environment variable is present. Since it speaks the same
+# protocol, the X-Plane backend of the logger can be exercised on any
+# platform without a simulator.
+#
+# This module can also be run as a program to start a server, e.g.
+#
+#   python3 -m mlx.xplra_sim --aircraft zibo --latency 0.002
+#
+# The messages shown and the hotkeys registered are printed then.
+
+#------------------------------------------------------------------------------
+
+## The default port of the server
+PORT = int(os.environ.get("XPLRA_SIM_PORT", "51001"))
+
+#------------------------------------------------------------------------------
+
+## Command constants
+COMMAND_GET_SINGLE = 0x01
+COMMAND_SET_SINGLE = 0x02
+COMMAND_GET_MULTI = 0x03
+COMMAND_SET_MULTI = 0x04
+COMMAND_REGISTER_GET_MULTI = 0x11
+COMMAND_UNREGISTER_GET_MULTI = 0x12
+COMMAND_EXECUTE_GET_MULTI = 0x13
+COMMAND_REGISTER_SET_MULTI = 0x21
+COMMAND_UNREGISTER_SET_MULTI = 0x22
+COMMAND_EXECUTE_SET_MULTI = 0x23
+COMMAND_GET_VERSIONS = 0x31
+COMMAND_RELOAD_PLUGINS = 0x32
+COMMAND_SAVE_SITUATION = 0x33
+COMMAND_SHOW_MESSAGE = 0x41
+COMMAND_REGISTER_HOTKEYS = 0x51
+COMMAND_QUERY_HOTKEYS = 0x52
+COMMAND_UNREGISTER_HOTKEYS = 0x53
+COMMAND_OPEN_PUSH_CHANNEL = 0x61
+COMMAND_ATTACH_PUSH_CHANNEL = 0x62
+COMMAND_SUBSCRIBE_GET_MULTI = 0x63
+COMMAND_UNSUBSCRIBE_GET_MULTI = 0x64
+COMMAND_SUBSCRIBE_HOTKEYS = 0x65
+COMMAND_UNSUBSCRIBE_HOTKEYS = 0x66
+
+#------------------------------------------------------------------------------
+
+## Push frame constants
+FRAME_GET_MULTI = 0x01
+FRAME_HOTKEYS = 0x02
+
+## The first version of the plugin supporting the push channel
+PUSH_XPLRA_VERSION = 6
+
+#------------------------------------------------------------------------------
+
+## Type constants
+TYPE_INT = 0x01
+TYPE_FLOAT = 0x02
+TYPE_DOUBLE = 0x04
+TYPE_FLOAT_ARRAY = 0x11
+TYPE_INT_ARRAY = 0x12
+TYPE_BYTE_ARRAY = 0x13
+
+#------------------------------------------------------------------------------
+
+## Result constants
+RESULT_OK = 0x00
+RESULT_INVALID_COMMAND = 0x01
+RESULT_UNKNOWN_DATAREF = 0x02
+RESULT_INVALID_TYPE = 0x03
+RESULT_INVALID_LENGTH = 0x04
+RESULT_INVALID_OFFSET = 0x05
+RESULT_INVALID_COUNT = 0x06
+RESULT_INVALID_ID = 0x07
+RESULT_INVALID_DURATION = 0x08
+RESULT_OTHER_ERROR = 0xff
+
+#------------------------------------------------------------------------------
+
+## Hotkey modifier constants
+HOTKEY_MODIFIER_SHIFT = 0x0100
+HOTKEY_MODIFIER_CONTROL = 0x0200
+
+#------------------------------------------------------------------------------
+
+## The types of the arrays
+_arrayTypes = frozenset([TYPE_FLOAT_ARRAY, TYPE_INT_ARRAY, TYPE_BYTE_ARRAY])
+
+## The names of the types in the JSON tables
+_typeNames = { "int" : TYPE_INT,
+               "float" : TYPE_FLOAT,
+               "double" : TYPE_DOUBLE,
+               "float_array" : TYPE_FLOAT_ARRAY,
+               "int_array" : TYPE_INT_ARRAY,
+               "byte_array" : TYPE_BYTE_ARRAY }
+
+## The results reported with the index of the offending dataref by the
+## multi-dataref commands
+_datarefResults = frozenset([RESULT_UNKNOWN_DATAREF, RESULT_INVALID_TYPE,
+                             RESULT_INVALID_LENGTH, RESULT_INVALID_OFFSET])
+
+_u8 = struct.Struct("<B")
+_u16 = struct.Struct("<H")
+_u32 = struct.Struct("<I")
+_s32 = struct.Struct("<i")
+_float = struct.Struct("<f")
+_double = struct.Struct("<d")
+
+## The structures of the scalar types
+_scalarStructs = { TYPE_INT : _s32,
+                   TYPE_FLOAT : _float,
+                   TYPE_DOUBLE : _double }
+
+#------------------------------------------------------------------------------
+
+def _encodeLength(length):
+    """Encode the given length of a string in 7-bit groups, the lowest group
+    first, with the highest bit set in all but the last byte."""
+    data = bytearray()
+    while True:
+        byte = length & 0x7f
+        length >>= 7
+        if length:
+            data.append(byte | 0x80)
+        else:
+            data.append(byte)
+            return bytes(data)
+
+def _encodeString(text):
+    """Encode the given string with its length."""
+    if isinstance(text, str):
+        text = text.encode("utf-8")
+    return _encodeLength(len(text)) + text
+
+def _encodeValue(type, value):
+    """Encode the given value of the given type.
+
+    An array is encoded as the number of items followed by the items."""
+    if type==TYPE_FLOAT_ARRAY:
+        return _s32.pack(len(value)) + \
+            struct.pack("<%df" % (len(value),), *value)
+    elif type==TYPE_INT_ARRAY:
+        return _s32.pack(len(value)) + \
+            struct.pack("<%di" % (len(value),), *value)
+    elif type==TYPE_BYTE_ARRAY:
+        return _s32.pack(len(value)) + bytes(value)
+    else:
+        return _scalarStructs[type].pack(value)
+
+def _encodeSpec(name, type, length, offset):
+    """Encode the specification of a dataref."""
+    data = _encodeString(name) + _u8.pack(type)
+    if type in _arrayTypes:
+        data += _s32.pack(length) + _s32.pack(offset)
+    return data
+
+def _coerceValue(type, value):
+    """Convert the given value to the given type."""
+    if type==TYPE_INT:
+        return int(value)
+    elif type in [TYPE_FLOAT, TYPE_DOUBLE]:
+        return float(value)
+    elif type==TYPE_FLOAT_ARRAY:
+        return [float(v) for v in value]
+    elif type==TYPE_INT_ARRAY:
+        return [int(v) for v in value]
+    elif isinstance(value, str):
+        return value.encode("utf-8")
+    else:
+        return bytes(value)
+
+def _decodeValue(read, type):
+    """Decode a value of the given type from the data returned by the given
+    function reading the given number of bytes."""
+    if type in _scalarStructs:
+        valueStruct = _scalarStructs[type]
+        return valueStruct.unpack(read(valueStruct.size))[0]
+
+    count = _s32.unpack(read(4))[0]
+    if type==TYPE_BYTE_ARRAY:
+        return read(count)
+    return list(struct.unpack("<%d%s" %
+                              (count, "f" if type==TYPE_FLOAT_ARRAY else "i"),
+                              read(count * 4)))
+
+def _encodeValues(specs, values):
+    """Encode the given values of the datarefs with the given
+    specifications."""
+    return b"".join([_encodeValue(spec[1], value)
+                     for (spec, value) in zip(specs, values)])
+
+def _getRealDuration(duration):
+    """Get the real number of seconds corresponding to the given number of
+    seconds of the current clock."""
+    return duration / getattr(getClock(), "scale", 1.0)
+
+def _hasChanged(previous, values, threshold):
+    """Determine if any of the given values differs from the corresponding
+    previous one by more than the given threshold.
+
+    The byte arrays are considered changed if they are different."""
+    if previous is None:
+        return True
+    for (old, new) in zip(previous, values):
+        if isinstance(new, bytes):
+            if old!=new:
+                return True
+        elif isinstance(new, list):
+            if len(old)!=len(new) or \
+               any(abs(n - o)>threshold for (o, n) in zip(old, new)):
+                return True
+        elif abs(new - old)>threshold:
+            return True
+    return False
+
+#------------------------------------------------------------------------------
+#------------------------------------------------------------------------------
+
+class Dataref(object):
+    """A dataref in the table.
+
+    Its value is either stored, or it is computed by a getter function, in
+    which case the dataref is read-only. An array reads as padded with
+    zeros up to the length requested."""
+    def __init__(self, name, type, value = None, getter = None):
+        """Construct the dataref."""
+        self.name = name
+        self.type = type
+        self.getter = getter
+        if value is None:
+            value = b"" if type==TYPE_BYTE_ARRAY else \
+                [] if type in _arrayTypes else 0
+        self.value = _coerceValue(type, value)
+
+    def get(self, type, length, offset):
+        """Get the value of the dataref as the given type.
+
+        Returns a tuple of the result code and the value."""
+        result = self._checkType(type)
+        if result!=RESULT_OK:
+            return (result, None)
+
+        value = self.value if self.getter is None else self.getter()
+        if type in _arrayTypes:
+            if offset<0:
+                return (RESULT_INVALID_OFFSET, None)
+            if length<0:
+                value = value[offset:]
+            else:
+                value = value[offset:offset+length]
+                if len(value)<length:
+                    value = value + \
+                        (b"\0" if self.type==TYPE_BYTE_ARRAY else [0]) * \
+                        (length - len(value))
+        return (RESULT_OK, _coerceValue(type, value))
+
+    def set(self, type, value, length, offset):
+        """Set the value of the dataref from the given one of the given type.
+
+        Returns the result code."""
+        result = self._checkType(type)
+        if result!=RESULT_OK:
+            return result
+        if self.getter is not None:
+            return RESULT_OTHER_ERROR
+
+        if type in _arrayTypes:
+            if offset<0:
+                return RESULT_INVALID_OFFSET
+            if length>=0 and len(value)>length:
+                return RESULT_INVALID_LENGTH
+            current = self.value
+            if self.type==TYPE_BYTE_ARRAY:
+                current = bytearray(current)
+            else:
+                current = list(current)
+            if len(current)<offset + len(value):
+                current.extend([0] * (offset + len(value) - len(current)))
+            current[offset:offset+len(value)] = value
+            value = current
+        self.value = _coerceValue(self.type, value)
+        return RESULT_OK
+
+    def _checkType(self, type):
+        """Check if the dataref can be accessed as the given type.
+
+        The scalar types are convertible to each other, and so are the float
+        and integer arrays."""
+        if type==self.type:
+            return RESULT_OK
+        elif type in _scalarStructs and self.type in _scalarStructs:
+            return RESULT_OK
+        elif type in [TYPE_FLOAT_ARRAY, TYPE_INT_ARRAY] and \
+             self.type in [TYPE_FLOAT_ARRAY, TYPE_INT_ARRAY]:
+            return RESULT_OK
+        else:
+            return RESULT_INVALID_TYPE
+
+#------------------------------------------------------------------------------
+
+class DatarefTable(object):
+    """The table of the datarefs served.
+
+    If the table is not strict, an unknown dataref is created when it is
+    first accessed, with a zero value of the type it is accessed as."""
+
+    ## The aircraft data of the presets. Each preset contains the values of
+    ## the datarefs identifying the aircraft (i.e. the tail number, the
+    ## author, the description, the notes and the ICAO code), and the
+    ## values of the model-specific datarefs, if any.
+    aircraftPresets = {
+        "generic" : { "sim/aircraft/view/acf_tailnum" : "HA-LOC",
+                      "sim/aircraft/view/acf_author" : "Laminar Research",
+                      "sim/aircraft/view/acf_descrip" : "Boeing 737-800",
+                      "sim/aircraft/view/acf_ICAO" : "B738" },
+        "zibo" : { "sim/aircraft/view/acf_tailnum" : "HA-LOC",
+                   "sim/aircraft/view/acf_author" : "Alex Unruh",
+                   "sim/aircraft/view/acf_descrip" : "Boeing 737-800X",
+                   "sim/aircraft/view/acf_notes" : "ZIBOmod 3.54",
+                   "sim/aircraft/view/acf_ICAO" : "B738",
+                   "laminar/B738/oew_kg" : 41413.0,
+                   "laminar/B738/efb_mac" : 20.0 },
+        "levelup736" : { "sim/aircraft/view/acf_tailnum" : "HA-LOH",
+                         "sim/aircraft/view/acf_author" : "Alex Unruh",
+                         "sim/aircraft/view/acf_descrip" : "Boeing 737-600NG",
+                         "sim/aircraft/view/acf_ICAO" : "B736",
+                         "laminar/B738/oew_kg" : 36378.0,
+                         "laminar/B738/efb_mac" : 20.0 },
+        "levelup737" : { "sim/aircraft/view/acf_tailnum" : "HA-LOR",
+                         "sim/aircraft/view/acf_author" : "Alex Unruh",
+                         "sim/aircraft/view/acf_descrip" : "Boeing 737-700NG",
+                         "sim/aircraft/view/acf_ICAO" : "B737",
+                         "laminar/B738/oew_kg" : 37648.0,
+                         "laminar/B738/efb_mac" : 20.0 },
+        "levelup738" : { "sim/aircraft/view/acf_tailnum" : "HA-LOC",
+                         "sim/aircraft/view/acf_author" : "Alex Unruh",
+                         "sim/aircraft/view/acf_descrip" : "Boeing 737-800NG",
+                         "sim/aircraft/view/acf_ICAO" : "B738",
+                         "laminar/B738/oew_kg" : 41413.0,
+                         "laminar/B738/efb_mac" : 20.0 }
+    }
+
+    @staticmethod
+    def load(path):
+        """Load a table from the JSON file with the given path.
+
+        The file contains an object with the following members, all of
+        which are optional:
+        - aircraft: the name of the aircraft preset,
+        - strict: whether unknown datarefs are refused,
+        - datarefs: an object mapping the names of the datarefs to objects
+          with a type (e.g. "float" or "int_array") and a value."""
+        with open(path, "rt") as f:
+            description = json.load(f)
+
+        table = DatarefTable(aircraft = description.get("aircraft",
+                                                        "generic"),
+                             strict = description.get("strict", False))
+        for (name, dataref) in description.get("datarefs", {}).items():
+            table.add(name, _typeNames[dataref["type"]], dataref.get("value"))
+        return table
+
+    def __init__(self, aircraft = "generic", strict = False):
+        """Construct the table with the datarefs of the given aircraft
+        preset."""
+        self._datarefs = {}
+        self._lock = threading.Lock()
+        self.strict = strict
+
+        self.add("sim/time/local_date_days", TYPE_INT,
+                 getter = lambda: time.gmtime(getClock().time()).tm_yday - 1)
+        self.add("sim/time/zulu_time_sec", TYPE_FLOAT,
+                 getter = lambda: getClock().time() % 86400.0)
+        for name in ["acf_tailnum", "acf_author", "acf_descrip",
+                     "acf_notes", "acf_ICAO", "acf_livery_path"]:
+            self.add("sim/aircraft/view/" + name, TYPE_BYTE_ARRAY, b"")
+        self.add("sim/flightmodel/failures/onground_any", TYPE_INT, 1)
+        self.add("sim/aircraft/engine/acf_num_engines", TYPE_INT, 2)
+        self.add("sim/flightmodel/weight/m_fixed", TYPE_FLOAT, 6000.0)
+        self.add("sim/aircraft/weight/acf_m_empty", TYPE_FLOAT, 41413.0)
+        self.add("sim/weather/barometer_sealevel_inhg", TYPE_FLOAT, 29.92)
+        self.add("sim/cockpit/misc/barometer_setting", TYPE_FLOAT, 29.92)
+
+        self.setAircraft(aircraft)
+
+    def add(self, name, type, value = None, getter = None):
+        """Add a dataref with the given name, type and value or getter."""
+        with self._lock:
+            self._datarefs[name] = Dataref(name, type, value = value,
+                                           getter = getter)
+
+    def setAircraft(self, aircraft):
+        """Set the values of the datarefs of the aircraft preset with the
+        given name."""
+        for (name, value) in DatarefTable.aircraftPresets[aircraft].items():
+            self.set(name, value)
+
+    def set(self, name, value, offset = 0):
+        """Set the value of the dataref with the given name.
+
+        An array given at offset 0 replaces the whole value of the dataref,
+        otherwise its items are written from the offset. If the dataref does
+        not exist, it is created with the type derived
+        from the value."""
+        with self._lock:
+            dataref = self._datarefs.get(name)
+            if dataref is None:
+                type = TYPE_BYTE_ARRAY if isinstance(value, (str, bytes)) \
+                       else TYPE_FLOAT_ARRAY if isinstance(value, list) \
+                       else TYPE_INT if isinstance(value, int) \
+                       else TYPE_FLOAT
+                self._datarefs[name] = Dataref(name, type)
+                dataref = self._datarefs[name]
+            if isinstance(value, str):
+                value = value.encode("utf-8")
+            if dataref.type not in _arrayTypes:
+                dataref.value = _coerceValue(dataref.type, value)
+            elif not isinstance(value, (list, bytes)):
+                dataref.set(dataref.type, [value], -1, offset)
+            elif offset==0:
+                dataref.value = _coerceValue(dataref.type, value)
+            else:
+                dataref.set(dataref.type, value, -1, offset)
+
+    def find(self, name, type):
+        """Find the dataref with the given name to be accessed as the given
+        type.
+
+        Returns the dataref or None if it is unknown and the table is
+        strict."""
+        with self._lock:
+            dataref = self._datarefs.get(name)
+            if dataref is None and not self.strict:
+                dataref = self._datarefs[name] = Dataref(name, type)
+            return dataref
+
+    def get(self, name):
+        """Get the current value of the dataref with the given name, or None
+        if it does not exist."""
+        with self._lock:
+            dataref = self._datarefs.get(name)
+        if dataref is None:
+            return None
+        else:
+            return dataref.get(dataref.type, -1, 0)[1]
+
+#------------------------------------------------------------------------------
+
+class _Request(object):
+    """A reader of the data of a request received by the server."""
+    def __init__(self, reader):
+        """Construct the request for the given asyncio stream reader."""
+        self._reader = reader
+
+    async def readU8(self):
+        """Read an unsigned byte."""
+        return _u8.unpack(await self._reader.readexactly(1))[0]
+
+    async def readU16(self):
+        """Read an unsigned 16-bit integer."""
+        return _u16.unpack(await self._reader.readexactly(2))[0]
+
+    async def readU32(self):
+        """Read an unsigned 32-bit integer."""
+        return _u32.unpack(await self._reader.readexactly(4))[0]
+
+    async def readS32(self):
+        """Read a signed 32-bit integer."""
+        return _s32.unpack(await self._reader.readexactly(4))[0]
+
+    async def readFloat(self):
+        """Read a float."""
+        return _float.unpack(await self._reader.readexactly(4))[0]
+
+    async def readString(self):
+        """Read a string with its length."""
+        length = 0
+        shift = 0
+        while True:
+            byte = await self.readU8()
+            length |= (byte & 0x7f) << shift
+            shift += 7
+            if (byte & 0x80)==0:
+                break
+        return (await self._reader.readexactly(length)).decode("utf-8")
+
+    async def readSpec(self):
+        """Read the specification of a dataref.
+
+        Returns a tuple of the name, the type, the length and the offset."""
+        name = await self.readString()
+        type = await self.readU8()
+        (length, offset) = (-1, 0)
+        if type in _arrayTypes:
+            length = await self.readS32()
+            offset = await self.readS32()
+        return (name, type, length, offset)
+
+    async def readValue(self, type):
+        """Read a value of the given type."""
+        if type in _scalarStructs:
+            valueStruct = _scalarStructs[type]
+            return valueStruct.unpack(await
+                                      self._reader.readexactly(
+                                          valueStruct.size))[0]
+
+        count = await self.readS32()
+        if count<0:
+            raise ValueError("invalid array length: %d" % (count,))
+        if type==TYPE_BYTE_ARRAY:
+            return await self._reader.readexactly(count)
+        data = await self._reader.readexactly(count * 4)
+        return list(struct.unpack("<%d%s" %
+                                  (count,
+                                   "f" if type==TYPE_FLOAT_ARRAY else "i"),
+                                  data))
+
+#------------------------------------------------------------------------------
+
+class _Connection(object):
+    """A connection of a client to the server."""
+    def __init__(self, server, reader, writer):
+        """Construct the connection."""
+        self._server = server
+        self._request = _Request(reader)
+        self._writer = writer
+
+        self._getters = {}
+        self._setters = {}
+        self._nextID = 1
+
+        self.hotkeyCodes = []
+        self.hotkeyStates = []
+
+        self._pushWriter = None
+        self._pushQueue = asyncio.Queue()
+        self._pushTask = None
+        self._subscriptions = {}
+        self.hotkeysSubscribed = False
+
+        self._handlers = {
+            COMMAND_GET_SINGLE : self._getSingle,
+            COMMAND_SET_SINGLE : self._setSingle,
+            COMMAND_GET_MULTI : self._getMulti,
+            COMMAND_SET_MULTI : self._setMulti,
+            COMMAND_REGISTER_GET_MULTI : self._registerGetMulti,
+            COMMAND_UNREGISTER_GET_MULTI : self._unregisterGetMulti,
+            COMMAND_EXECUTE_GET_MULTI : self._executeGetMulti,
+            COMMAND_REGISTER_SET_MULTI : self._registerSetMulti,
+            COMMAND_UNREGISTER_SET_MULTI : self._unregisterSetMulti,
+            COMMAND_EXECUTE_SET_MULTI : self._executeSetMulti,
+            COMMAND_GET_VERSIONS : self._getVersions,
+            COMMAND_RELOAD_PLUGINS : self._reloadPlugins,
+            COMMAND_SAVE_SITUATION : self._saveSituation,
+            COMMAND_SHOW_MESSAGE : self._showMessage,
+            COMMAND_REGISTER_HOTKEYS : self._registerHotkeys,
+            COMMAND_QUERY_HOTKEYS : self._queryHotkeys,
+            COMMAND_UNREGISTER_HOTKEYS : self._unregisterHotkeys,
+            COMMAND_OPEN_PUSH_CHANNEL : self._openPushChannel,
+            COMMAND_ATTACH_PUSH_CHANNEL : self._attachPushChannel,
+            COMMAND_SUBSCRIBE_GET_MULTI : self._subscribeGetMulti,
+            COMMAND_UNSUBSCRIBE_GET_MULTI : self._unsubscribeGetMulti,
+            COMMAND_SUBSCRIBE_HOTKEYS : self._subscribeHotkeys,
+            COMMAND_UNSUBSCRIBE_HOTKEYS : self._unsubscribeHotkeys
+        }
+
+    async def serve(self):
+        """Serve the commands of the client until it disconnects."""
+        server = self._server
+        server._addConnection(self)
+        try:
+            while True:
+                command = await self._request.readU8()
+                handler = self._handlers.get(command)
+                if handler is None:
+                    self._writer.write(_u8.pack(RESULT_INVALID_COMMAND))
+                    break
+
+                reply = await handler()
+                server._commandServed()
+
+                await self._delay()
+
+                self._writer.write(reply)
+                await self._writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError,
+                asyncio.CancelledError):
+            pass
+        except Exception as e:
+            print("xplra_sim._Connection.serve: failed with exception:",
+                  str(e), file=sys.stderr)
+        finally:
+            for task in self._subscriptions.values():
+                task.cancel()
+            self._subscriptions = {}
+            if self._pushTask is not None:
+                self._pushTask.cancel()
+            if self._pushWriter is not None:
+                self._pushWriter.close()
+            server._removeConnection(self)
+            self._writer.close()
+
+    def pushHotkeys(self):
+        """Push the states of the hotkeys, if they are subscribed to and any
+        of them has been pressed.
+
+        The states are cleared then, like by a query."""
+        states = self.hotkeyStates
+        if self.hotkeysSubscribed and any(states):
+            self.hotkeyStates = [False] * len(states)
+            self._pushFrame(FRAME_HOTKEYS, 0,
+                            _u32.pack(len(states)) +
+                            bytes([1 if state else 0 for state in states]))
+
+    def _getDelay(self):
+        """Get the number of seconds some data should be delayed by
+        according to the latency of the server."""
+        server = self._server
+        delay = server.latency
+        if server.jitter>0.0:
+            delay += random.uniform(0.0, server.jitter)
+        return delay
+
+    async def _delay(self):
+        """Delay the sending of some data by the latency of the server."""
+        delay = self._getDelay()
+        if delay>0.0:
+            await asyncio.sleep(delay)
+
+    def _readValues(self, specs):
+        """Read the values of the datarefs with the given specifications.
+
+        Returns a tuple of the result code, the index of the offending
+        dataref if the code indicates an error, and the list of the
+        values."""
+        table = self._server.table
+        values = []
+        index = 0
+        for (name, type, length, offset) in specs:
+            dataref = table.find(name, type)
+            if dataref is None:
+                return (RESULT_UNKNOWN_DATAREF, index, None)
+            (result, value) = dataref.get(type, length, offset)
+            if result!=RESULT_OK:
+                return (result, index, None)
+            values.append(value)
+            index += 1
+        return (RESULT_OK, None, values)
+
+    def _getValues(self, specs):
+        """Get the values for the given dataref specifications.
+
+        Returns the reply."""
+        (result, index, values) = self._readValues(specs)
+        if result!=RESULT_OK:
+            return _u8.pack(result) + _u32.pack(index)
+        return _u8.pack(RESULT_OK) + _encodeValues(specs, values)
+
+    def _setValues(self, specs, values):
+        """Set the values of the datarefs with the given specifications.
+
+        Returns the reply."""
+        table = self._server.table
+        datarefs = []
+        index = 0
+        for (name, type, length, offset) in specs:
+            dataref = table.find(name, type)
+            if dataref is None:
+                return _u8.pack(RESULT_UNKNOWN_DATAREF) + _u32.pack(index)
+            datarefs.append(dataref)
+            index += 1
+
+        index = 0
+        for (dataref, (name, type, length, offset), value) in \
+            zip(datarefs, specs, values):
+            result = dataref.set(type, value, length, offset)
+            if result!=RESULT_OK:
+                return _u8.pack(result) + _u32.pack(index)
+            index += 1
+        return _u8.pack(RESULT_OK)
+
+    async def _readSpecs(self, withValues = False):
+        """Read the specifications of datarefs, and if requested, a value
+        after each of them.
+
+        Returns the list of the specifications and that of the values."""
+        request = self._request
+        count = await request.readU32()
+        specs = []
+        values = []
+        for i in range(0, count):
+            spec = await request.readSpec()
+            specs.append(spec)
+            if withValues:
+                values.append(await request.readValue(spec[1]))
+        return (specs, values)
+
+    async def _getSingle(self):
+        """Handle the command to get a single dataref."""
+        spec = await self._request.readSpec()
+        reply = self._getValues([spec])
+        return reply if reply[0]==RESULT_OK else reply[:1]
+
+    async def _setSingle(self):
+        """Handle the command to set a single dataref."""
+        spec = await self._request.readSpec()
+        value = await self._request.readValue(spec[1])
+        return self._setValues([spec], [value])[:1]
+
+    async def _getMulti(self):
+        """Handle the command to get several datarefs."""
+        (specs, _) = await self._readSpecs()
+        return self._getValues(specs)
+
+    async def _setMulti(self):
+        """Handle the command to set several datarefs."""
+        (specs, values) = await self._readSpecs(withValues = True)
+        return self._setValues(specs, values)
+
+    async def _register(self, buffers):
+        """Handle the command to register a multi-dataref buffer into the
+        given dictionary."""
+        (specs, _) = await self._readSpecs()
+        table = self._server.table
+        index = 0
+        for (name, type, length, offset) in specs:
+            if table.find(name, type) is None:
+                return _u8.pack(RESULT_UNKNOWN_DATAREF) + _u32.pack(index)
+            index += 1
+
+        id = self._nextID
+        self._nextID += 1
+        buffers[id] = specs
+        return _u8.pack(RESULT_OK) + _u32.pack(id)
+
+    async def _unregister(self, buffers):
+        """Handle the command to unregister a multi-dataref buffer from the
+        given dictionary."""
+        id = await self._request.readU32()
+        if buffers.pop(id, None) is None:
+            return _u8.pack(RESULT_INVALID_ID)
+        return _u8.pack(RESULT_OK)
+
+    async def _registerGetMulti(self):
+        """Handle the command to register a multi-getter."""
+        return await self._register(self._getters)
+
+    async def _unregisterGetMulti(self):
+        """Handle the command to unregister a multi-getter.
+
+        Its subscription, if any, is cancelled too."""
+        reply = await self._unregister(self._getters)
+        for id in list(self._subscriptions):
+            if id not in self._getters:
+                self._subscriptions.pop(id).cancel()
+        return reply
+
+    async def _executeGetMulti(self):
+        """Handle the command to execute a multi-getter."""
+        id = await self._request.readU32()
+        specs = self._getters.get(id)
+        if specs is None:
+            return _u8.pack(RESULT_INVALID_ID)
+        return self._getValues(specs)
+
+    async def _registerSetMulti(self):
+        """Handle the command to register a multi-setter."""
+        return await self._register(self._setters)
+
+    async def _unregisterSetMulti(self):
+        """Handle the command to unregister a multi-setter."""
+        return await self._unregister(self._setters)
+
+    async def _executeSetMulti(self):
+        """Handle the command to execute a multi-setter.
+
+        If the ID is invalid, the connection is closed, since the values
+        following it cannot be parsed."""
+        id = await self._request.readU32()
+        specs = self._setters.get(id)
+        if specs is None:
+            raise ConnectionError("invalid multi-setter ID: %d" % (id,))
+        values = []
+        for (name, type, length, offset) in specs:
+            values.append(await self._request.readValue(type))
+        return self._setValues(specs, values)
+
+    async def _getVersions(self):
+        """Handle the command to get the versions."""
+        server = self._server
+        return _u8.pack(RESULT_OK) + _s32.pack(server.xplaneVersion) + \
+            _s32.pack(server.xplmVersion) + _s32.pack(server.xplraVersion)
+
+    async def _reloadPlugins(self):
+        """Handle the command to reload the plugins."""
+        return _u8.pack(RESULT_OK)
+
+    async def _saveSituation(self):
+        """Handle the command to save the situation."""
+        await self._request.readString()
+        return _u8.pack(RESULT_OK)
+
+    async def _showMessage(self):
+        """Handle the command to show a message."""
+        message = await self._request.readString()
+        duration = await self._request.readFloat()
+        if duration<0.0:
+            return _u8.pack(RESULT_INVALID_DURATION)
+        self._server._addMessage(message, duration)
+        return _u8.pack(RESULT_OK)
+
+    async def _registerHotkeys(self):
+        """Handle the command to register hotkeys."""
+        count = await self._request.readU32()
+        codes = []
+        for i in range(0, count):
+            codes.append(await self._request.readU16())
+        self.hotkeyCodes = codes
+        self.hotkeyStates = [False] * count
+        self._server._hotkeysRegistered(codes)
+        return _u8.pack(RESULT_OK)
+
+    async def _queryHotkeys(self):
+        """Handle the command to query the hotkeys.
+
+        The state of a hotkey tells if it has been pressed since the previous
+        query."""
+        states = self.hotkeyStates
+        self.hotkeyStates = [False] * len(states)
+        return _u8.pack(RESULT_OK) + _u32.pack(len(states)) + \
+            bytes([1 if state else 0 for state in states])
+
+    async def _unregisterHotkeys(self):
+        """Handle the command to unregister the hotkeys."""
+        self.hotkeyCodes = []
+        self.hotkeyStates = []
+        return _u8.pack(RESULT_OK)
+
+    async def _openPushChannel(self):
+        """Handle the command to open a push channel.
+
+        The reply contains the token the new connection of the push channel
+        should be attached with."""
+        return _u8.pack(RESULT_OK) + \
+            _u32.pack(self._server._addPushToken(self))
+
+    async def _attachPushChannel(self):
+        """Handle the command to attach this connection as the push channel
+        of the connection that has opened it with the given token.
+
+        Nothing else should be sent over this connection afterwards."""
+        token = await self._request.readU32()
+        connection = self._server._removePushToken(token)
+        if connection is None:
+            return _u8.pack(RESULT_INVALID_ID)
+        connection._pushWriter = self._writer
+        connection._pushTask = \
+            asyncio.ensure_future(connection._sendFrames())
+        return _u8.pack(RESULT_OK)
+
+    async def _subscribeGetMulti(self):
+        """Handle the command to subscribe to a registered multi-getter with
+        a period and a threshold.
+
+        If the getter is already subscribed to, the period and the threshold
+        are changed."""
+        id = await self._request.readU32()
+        period = await self._request.readFloat()
+        threshold = await self._request.readFloat()
+        specs = self._getters.get(id)
+        if specs is None or period<=0.0:
+            return _u8.pack(RESULT_INVALID_ID)
+        if self._pushWriter is None:
+            return _u8.pack(RESULT_OTHER_ERROR)
+
+        task = self._subscriptions.pop(id, None)
+        if task is not None:
+            task.cancel()
+        self._subscriptions[id] = \
+            asyncio.ensure_future(self._pushValues(id, specs, period,
+                                                   threshold))
+        return _u8.pack(RESULT_OK)
+
+    async def _unsubscribeGetMulti(self):
+        """Handle the command to unsubscribe from a multi-getter."""
+        id = await self._request.readU32()
+        task = self._subscriptions.pop(id, None)
+        if task is None:
+            return _u8.pack(RESULT_INVALID_ID)
+        task.cancel()
+        return _u8.pack(RESULT_OK)
+
+    async def _subscribeHotkeys(self):
+        """Handle the command to subscribe to the hotkeys.
+
+        If any of them has been pressed since the previous query, they are
+        pushed immediately."""
+        if self._pushWriter is None:
+            return _u8.pack(RESULT_OTHER_ERROR)
+        self.hotkeysSubscribed = True
+        with self._server._lock:
+            self.pushHotkeys()
+        return _u8.pack(RESULT_OK)
+
+    async def _unsubscribeHotkeys(self):
+        """Handle the command to unsubscribe from the hotkeys."""
+        self.hotkeysSubscribed = False
+        return _u8.pack(RESULT_OK)
+
+    async def _pushValues(self, id, specs, period, threshold):
+        """Push the values of the datarefs of the getter with the given ID
+        and specifications in every period of the clock, if any of them has
+        changed by more than the threshold.
+
+        If the threshold is negative, the values are pushed always."""
+        clock = getClock()
+        previous = None
+        nextSample = clock.time()
+        try:
+            while True:
+                (result, index, values) = self._readValues(specs)
+                if result==RESULT_OK and \
+                   (threshold<0.0 or _hasChanged(previous, values, threshold)):
+                    previous = values
+                    self._pushFrame(FRAME_GET_MULTI, id,
+                                    _encodeValues(specs, values))
+
+                now = clock.time()
+                nextSample = max(nextSample + period, now)
+                await asyncio.sleep(_getRealDuration(nextSample - now))
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+
+    def _pushFrame(self, kind, id, payload):
+        """Queue a frame of the given kind with the given ID and payload to
+        be pushed over the push channel when the latency has elapsed."""
+        self._pushQueue.put_nowait((asyncio.get_running_loop().time() +
+                                    self._getDelay(),
+                                    _u8.pack(kind) + _u32.pack(id) +
+                                    _u32.pack(len(payload)) + payload))
+
+    async def _sendFrames(self):
+        """Send the queued frames over the push channel in their order, each
+        when it is due.
+
+        The latency thus delays the frames, but it does not limit their
+        rate."""
+        loop = asyncio.get_running_loop()
+        writer = self._pushWriter
+        try:
+            while True:
+                (due, frame) = await self._pushQueue.get()
+                delay = due - loop.time()
+                if delay>0.0:
+                    await asyncio.sleep(delay)
+                writer.write(frame)
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+
+#------------------------------------------------------------------------------
+
+class Server(threading.Thread):
+    """The server thread.
+
+    Like the server of \\ref mlx.pyuipc_sim, it runs an asyncio event loop,
+    so it can serve any number of clients concurrently."""
+    def __init__(self, table = None, port = None, latency = 0.0,
+                 jitter = 0.0, xplaneVersion = 12000, xplmVersion = 400,
+                 xplraVersion = PUSH_XPLRA_VERSION, verbose = False):
+        """Construct the server for the given table of datarefs.
+
+        If the port is 0, a free one is chosen, which is available from the
+        port property once the server is ready.
+
+        latency is the number of seconds each reply is delayed by, and jitter
+        is the maximal number of seconds of a random additional delay."""
+        super(Server, self).__init__()
+        self.daemon = True
+
+        self.table = DatarefTable() if table is None else table
+        self.latency = latency
+        self.jitter = jitter
+        self.xplaneVersion = xplaneVersion
+        self.xplmVersion = xplmVersion
+        self.xplraVersion = xplraVersion
+
+        self._port = PORT if port is None else port
+        self._verbose = verbose
+        self._ready = threading.Event()
+        self._loop = None
+        self._stopFuture = None
+
+        self._lock = threading.Lock()
+        self._connections = []
+        self._messages = []
+        self._numCommands = 0
+        self._pushTokens = {}
+        self._nextPushToken = 1
+
+    @property
+    def port(self):
+        """Get the port the server listens on."""
+        return self._port
+
+    @property
+    def messages(self):
+        """Get the list of the messages shown so far.
+
+        Each item is a tuple of the text and the duration."""
+        with self._lock:
+            return self._messages[:]
+
+    @property
+    def numConnections(self):
+        """Get the number of the clients connected."""
+        with self._lock:
+            return len(self._connections)
+
+    @property
+    def numCommands(self):
+        """Get the number of the commands served so far, i.e. the number of
+        the round trips of the clients."""
+        return self._numCommands
+
+    def waitReady(self, timeout = None):
+        """Wait for the server to listen for the connections."""
+        return self._ready.wait(timeout)
+
+    def pressHotkey(self, code):
+        """Press the hotkey with the given code, which is reported as pressed
+        to the clients that have registered it at their next query."""
+        with self._lock:
+            for connection in self._connections:
+                codes = connection.hotkeyCodes
+                for index in range(0, len(codes)):
+                    if codes[index]==code:
+                        connection.hotkeyStates[index] = True
+                if connection.hotkeysSubscribed:
+                    self._loop.call_soon_threadsafe(self._pushHotkeys,
+                                                    connection)
+
+    def stop(self):
+        """Stop the server."""
+        loop = self._loop
+        if loop is not None:
+            loop.call_soon_threadsafe(self._stopFuture.cancel)
+
+    def run(self):
+        """Perform the server's operation."""
+        try:
+            asyncio.run(self._serve())
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print("xplra_sim.Server.run: failed with exception:", str(e),
+                  file=sys.stderr)
+        finally:
+            self._ready.set()
+
+    async def _serve(self):
+        """Serve the clients."""
+        self._loop = asyncio.get_running_loop()
+        self._stopFuture = self._loop.create_future()
+
+        # A single socket is listened on, so that the port is the same for
+        # IPv4 and IPv6 even if a free one is chosen
+        if socket.has_dualstack_ipv6():
+            listenSocket = socket.create_server(("", self._port),
+                                                family = socket.AF_INET6,
+                                                dualstack_ipv6 = True)
+        else:
+            listenSocket = socket.create_server(("", self._port))
+        server = await asyncio.start_server(self._handleConnection,
+                                            sock = listenSocket)
+        self._port = listenSocket.getsockname()[1]
+        self._ready.set()
+        async with server:
+            try:
+                await self._stopFuture
+            except asyncio.CancelledError:
+                pass
+
+    async def _handleConnection(self, reader, writer):
+        """Handle the connection with the given reader and writer."""
+        writer.get_extra_info("socket").setsockopt(socket.IPPROTO_TCP,
+                                                   socket.TCP_NODELAY, 1)
+        await _Connection(self, reader, writer).serve()
+
+    def _addConnection(self, connection):
+        """Add the given connection."""
+        with self._lock:
+            self._connections.append(connection)
+        if self._verbose:
+            print("Client connected")
+
+    def _removeConnection(self, connection):
+        """Remove the given connection."""
+        with self._lock:
+            self._connections.remove(connection)
+        if self._verbose:
+            print("Client disconnected")
+
+    def _commandServed(self):
+        """Called when a command has been served."""
+        self._numCommands += 1
+
+    def _addPushToken(self, connection):
+        """Add a token for a push channel to be attached to the given
+        connection.
+
+        Returns the token."""
+        with self._lock:
+            token = self._nextPushToken
+            self._nextPushToken += 1
+            self._pushTokens[token] = connection
+            return token
+
+    def _removePushToken(self, token):
+        """Remove the given push channel token.
+
+        Returns the connection it belongs to, or None if the token is
+        invalid."""
+        with self._lock:
+            return self._pushTokens.pop(token, None)
+
+    def _pushHotkeys(self, connection):
+        """Push the states of the hotkeys to the given connection."""
+        with self._lock:
+            connection.pushHotkeys()
+
+    def _addMessage(self, message, duration):
+        """Add a message that has been shown."""
+        with self._lock:
+            self._messages.append((message, duration))
+        if self._verbose:
+            print("Message (%.1f s): %s" % (duration, message))
+
+    def _hotkeysRegistered(self, codes):
+        """Called when a client has registered the given hotkeys."""
+        if self._verbose:
+            print("Hotkeys registered: %s" %
+                  (", ".join(["0x%04x" % (code,) for code in codes]),))
+
+#------------------------------------------------------------------------------
+#------------------------------------------------------------------------------
+
+class ProtocolException(Exception):
+    """Exception for the errors reported by the server."""
+
+    ## The descriptions of the result codes
+    descriptions = { RESULT_INVALID_COMMAND : "invalid command",
+                     RESULT_UNKNOWN_DATAREF : "unknown dataref",
+                     RESULT_INVALID_TYPE : "invalid type",
+                     RESULT_INVALID_LENGTH : "invalid length",
+                     RESULT_INVALID_OFFSET : "invalid offset",
+                     RESULT_INVALID_COUNT : "invalid count",
+                     RESULT_INVALID_ID : "invalid ID",
+                     RESULT_INVALID_DURATION : "invalid duration",
+                     RESULT_OTHER_ERROR : "other error" }
+
+    def __init__(self, resultCode, parameter = None):
+        """Construct the exception for the given result code and
+        parameter, which is the index of the offending dataref for the
+        multi-dataref commands."""
+        message = "xplra error: %d (%s)" % \
+            (resultCode,
+             ProtocolException.descriptions.get(resultCode, "unknown"))
+        if parameter is not None:
+            message += " for item %d" % (parameter,)
+        super(ProtocolException, self).__init__(message)
+        self.resultCode = resultCode
+        self.parameter = parameter
+
+#------------------------------------------------------------------------------
+
+class MultiBuffer(object):
+    """A buffer of several datarefs read or written together.
+
+    The datarefs are added first, then the buffer may be registered, after
+    which it can be executed by its ID instead of by sending the
+    specifications of the datarefs each time."""
+    def __init__(self, xplane, registerCommand, unregisterCommand):
+        """Construct the buffer for the given connection."""
+        self._xplane = xplane
+        self._registerCommand = registerCommand
+        self._unregisterCommand = unregisterCommand
+
+        self._specs = []
+        self._values = []
+        self._registeredID = None
+        self._connectionNumber = None
+
+    @property
+    def registeredID(self):
+        """Get the ID of the buffer if it is registered with the current
+        connection, None otherwise."""
+        if self._connectionNumber!=self._xplane._connectionNumber:
+            self._registeredID = None
+        return self._registeredID
+
+    def addInt(self, name):
+        """Add an integer dataref."""
+        return self._add(name, TYPE_INT, -1, 0, 0)
+
+    def addFloat(self, name):
+        """Add a float dataref."""
+        return self._add(name, TYPE_FLOAT, -1, 0, 0.0)
+
+    def addDouble(self, name):
+        """Add a double dataref."""
+        return self._add(name, TYPE_DOUBLE, -1, 0, 0.0)
+
+    def addFloatArray(self, name, length = -1, offset = 0):
+        """Add a float array dataref."""
+        return self._add(name, TYPE_FLOAT_ARRAY, length, offset, [])
+
+    def addIntArray(self, name, length = -1, offset = 0):
+        """Add an integer array dataref."""
+        return self._add(name, TYPE_INT_ARRAY, length, offset, [])
+
+    def addByteArray(self, name, length = -1, offset = 0):
+        """Add a byte array dataref."""
+        return self._add(name, TYPE_BYTE_ARRAY, length, offset, b"")
+
+    def register(self):
+        """Register the buffer with the server."""
+        if self.registeredID is None:
+            xplane = self._xplane
+            xplane._send(_u8.pack(self._registerCommand) + self._encodeSpecs())
+            xplane._checkResult(multi = True)
+            self._registeredID = xplane._readU32()
+            self._connectionNumber = xplane._connectionNumber
+
+    def unregister(self):
+        """Unregister the buffer from the server."""
+        id = self.registeredID
+        if id is not None:
+            self._registeredID = None
+            xplane = self._xplane
+            if xplane._pushChannel is not None:
+                xplane._pushChannel.removeSubscription(id)
+            xplane._send(_u8.pack(self._unregisterCommand) + _u32.pack(id))
+            xplane._checkResult()
+
+    def getString(self, index):
+        """Get the value of the byte array with the given index as a string
+        terminated by the first zero byte."""
+        return self._values[index].split(b"\0", 1)[0].decode("utf-8",
+                                                              "replace")
+
+    def __len__(self):
+        """Get the number of the datarefs."""
+        return len(self._specs)
+
+    def __getitem__(self, index):
+        """Get the value of the dataref with the given index."""
+        return self._values[index]
+
+    def __setitem__(self, index, value):
+        """Set the value of the dataref with the given index."""
+        self._values[index] = _coerceValue(self._specs[index][1], value)
+
+    def __iter__(self):
+        """Iterate over the values."""
+        return iter(self._values)
+
+    def _add(self, name, type, length, offset, value):
+        """Add a dataref with the given specification and initial value.
+
+        Returns the index of the dataref."""
+        if self._registeredID is not None:
+            raise ValueError("xplra_sim.MultiBuffer: buffer already registered")
+        self._specs.append((name, type, length, offset))
+        self._values.append(value)
+        return len(self._specs) - 1
+
+    def _encodeSpecs(self, withValues = False):
+        """Encode the specifications of the datarefs with their count."""
+        data = [_u32.pack(len(self._specs))]
+        for (spec, value) in zip(self._specs, self._values):
+            data.append(_encodeSpec(*spec))
+            if withValues:
+                data.append(_encodeValue(spec[1], value))
+        return b"".join(data)
+
+class MultiGetter(MultiBuffer):
+    """A buffer of datarefs read together."""
+    def __init__(self, xplane):
+        """Construct the getter."""
+        super(MultiGetter, self).__init__(xplane, COMMAND_REGISTER_GET_MULTI,
+                                          COMMAND_UNREGISTER_GET_MULTI)
+
+    def execute(self):
+        """Read the values of the datarefs."""
+        xplane = self._xplane
+        id = self.registeredID
+        if id is None:
+            xplane._send(_u8.pack(COMMAND_GET_MULTI) + self._encodeSpecs())
+        else:
+            xplane._send(_u8.pack(COMMAND_EXECUTE_GET_MULTI) + _u32.pack(id))
+        xplane._checkResult(multi = True)
+        self._values = [xplane._readValue(spec[1]) for spec in self._specs]
+
+    def subscribe(self, period, threshold = None, key = None):
+        """Subscribe to the values of the datarefs, which are then pushed by
+        the server over the push channel in every period given in seconds.
+
+        If threshold is not None, the values are pushed only if any of them
+        has changed by more than it since the previous push. The getter is
+        registered, if it is not registered yet. The frames are passed to the
+        callback of the push channel with the given key.
+
+        If already subscribed, the period and the threshold are changed."""
+        xplane = self._xplane
+        pushChannel = xplane._pushChannel
+        if pushChannel is None:
+            raise ProtocolException(RESULT_OTHER_ERROR)
+
+        self.register()
+        id = self._registeredID
+        pushChannel.addSubscription(id, key, self._specs)
+        try:
+            xplane._send(_u8.pack(COMMAND_SUBSCRIBE_GET_MULTI) +
+                         _u32.pack(id) + _float.pack(period) +
+                         _float.pack(-1.0 if threshold is None
+                                     else threshold))
+            xplane._checkResult()
+        except:
+            pushChannel.removeSubscription(id)
+            raise
+
+    def unsubscribe(self):
+        """Unsubscribe from the values of the datarefs."""
+        xplane = self._xplane
+        id = self.registeredID
+        if id is not None and xplane._pushChannel is not None and \
+           xplane._pushChannel.removeSubscription(id):
+            xplane._send(_u8.pack(COMMAND_UNSUBSCRIBE_GET_MULTI) +
+                         _u32.pack(id))
+            xplane._checkResult()
+
+class MultiSetter(MultiBuffer):
+    """A buffer of datarefs written together."""
+    def __init__(self, xplane):
+        """Construct the setter."""
+        super(MultiSetter, self).__init__(xplane, COMMAND_REGISTER_SET_MULTI,
+                                          COMMAND_UNREGISTER_SET_MULTI)
+
+    def execute(self):
+        """Write the values of the datarefs."""
+        xplane = self._xplane
+        id = self.registeredID
+        if id is None:
+            xplane._send(_u8.pack(COMMAND_SET_MULTI) +
+                         self._encodeSpecs(withValues = True))
+        else:
+            xplane._send(_u8.pack(COMMAND_EXECUTE_SET_MULTI) + _u32.pack(id) +
+                         b"".join([_encodeValue(spec[1], value)
+                                   for (spec, value) in
+                                   zip(self._specs, self._values)]))
+        xplane._checkResult(multi = True)
+
+#------------------------------------------------------------------------------
+
+class Frame(object):
+    """The values of the datarefs of a multi-getter pushed by the server.
+
+    It can be accessed like the getter itself."""
+    def __init__(self, values):
+        """Construct the frame with the given values."""
+        self._values = values
+
+    def getString(self, index):
+        """Get the value of the byte array with the given index as a string
+        terminated by the first zero byte."""
+        return self._values[index].split(b"\0", 1)[0].decode("utf-8",
+                                                               "replace")
+
+    def __len__(self):
+        """Get the number of the values."""
+        return len(self._values)
+
+    def __getitem__(self, index):
+        """Get the value with the given index."""
+        return self._values[index]
+
+    def __iter__(self):
+        """Iterate over the values."""
+        return iter(self._values)
+
+class PushChannel(threading.Thread):
+    """The thread receiving the frames pushed by the server over the push
+    channel of a connection.
+
+    The frames are passed to a callback function in this thread with two
+    arguments:
+    - the key given when subscribing,
+    - the frame (see Frame) for the multi-getters, or the list of booleans
+      telling if the corresponding hotkey has been pressed for the
+      hotkeys."""
+    def __init__(self, pushSocket, callback):
+        """Construct the channel for the given connected and attached
+        socket."""
+        super(PushChannel, self).__init__()
+        self.daemon = True
+
+        self._socket = pushSocket
+        self._stream = pushSocket.makefile("rb")
+        self._callback = callback
+
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+        self.hotkeysKey = None
+
+    def addSubscription(self, id, key, specs):
+        """Add a subscription of the getter with the given ID, key and
+        dataref specifications."""
+        with self._lock:
+            self._subscriptions[id] = (key, specs)
+
+    def removeSubscription(self, id):
+        """Remove the subscription of the getter with the given ID.
+
+        Returns whether there was such a subscription."""
+        with self._lock:
+            return self._subscriptions.pop(id, None) is not None
+
+    def close(self):
+        """Close the channel."""
+        try:
+            self._socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._socket.close()
+
+    def run(self):
+        """Receive the frames until the channel is closed."""
+        try:
+            while True:
+                header = self._read(9)
+                (kind, id, length) = (header[0], _u32.unpack(header[1:5])[0],
+                                      _u32.unpack(header[5:])[0])
+                payload = self._read(length)
+                if kind==FRAME_GET_MULTI:
+                    with self._lock:
+                        subscription = self._subscriptions.get(id)
+                    if subscription is None:
+                        continue
+                    (key, specs) = subscription
+                    offset = [0]
+                    def read(length):
+                        data = payload[offset[0]:offset[0] + length]
+                        offset[0] += length
+                        return data
+                    frame = Frame([_decodeValue(read, spec[1])
+                                   for spec in specs])
+                elif kind==FRAME_HOTKEYS:
+                    key = self.hotkeysKey
+                    if key is None:
+                        continue
+                    frame = [state!=0 for state in payload[4:]]
+                else:
+                    continue
+
+                try:
+                    self._callback(key, frame)
+                except Exception as e:
+                    print("xplra_sim.PushChannel.run: callback failed:",
+                          str(e), file=sys.stderr)
+        except (ConnectionError, OSError, ValueError):
+            pass
+
+    def _read(self, length):
+        """Read the given number of bytes."""
+        data = self._stream.read(length)
+        if data is None or len(data)<length:
+            raise ConnectionError("xplra_sim.PushChannel: channel closed")
+        return data
+
+#------------------------------------------------------------------------------
+
+class XPlane(object):
+    """The connection to the server, with the interface of the class of the
+    same name in the xplra module."""
+    def __init__(self):
+        """Construct the object, which is not connected yet."""
+        self._socket = None
+        self._stream = None
+        self._connectionNumber = 0
+        self._pushChannel = None
+
+    @property
+    def isConnected(self):
+        """Determine if the object is connected."""
+        return self._stream is not None
+
+    def connect(self, address = None):
+        """Connect to the server with the given address.
+
+        The address is either "local" (or None) for the server on the
+        default port of this host, or "tcp:<host>[:<port>]"."""
+        host = "localhost"
+        port = PORT
+        if address is not None and address.startswith("tcp:"):
+            address = address[4:]
+            if ":" in address:
+                (host, port) = address.rsplit(":", 1)
+                port = int(port)
+            else:
+                host = address
+
+        self._socket = socket.create_connection((host, port))
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._stream = self._socket.makefile("rwb")
+        self._connectionNumber += 1
+
+    def openPushChannel(self, callback):
+        """Open the push channel of the connection, which is a second
+        connection to the server.
+
+        The frames pushed are passed to the given callback function in the
+        thread of the channel (see PushChannel)."""
+        self._send(_u8.pack(COMMAND_OPEN_PUSH_CHANNEL))
+        self._checkResult()
+        token = self._readU32()
+
+        pushSocket = socket.create_connection(self._socket.getpeername()[:2])
+        try:
+            pushSocket.sendall(_u8.pack(COMMAND_ATTACH_PUSH_CHANNEL) +
+                               _u32.pack(token))
+            result = pushSocket.recv(1)
+            if result!=_u8.pack(RESULT_OK):
+                raise ProtocolException(result[0] if result
+                                        else RESULT_OTHER_ERROR)
+        except:
+            pushSocket.close()
+            raise
+
+        self._pushChannel = PushChannel(pushSocket, callback)
+        self._pushChannel.start()
+
+    def subscribeHotkeys(self, key = None):
+        """Subscribe to the hotkeys, which are then pushed over the push
+        channel with the given key when any of them is pressed."""
+        if self._pushChannel is None:
+            raise ProtocolException(RESULT_OTHER_ERROR)
+        self._pushChannel.hotkeysKey = key
+        self._send(_u8.pack(COMMAND_SUBSCRIBE_HOTKEYS))
+        self._checkResult()
+
+    def unsubscribeHotkeys(self):
+        """Unsubscribe from the hotkeys."""
+        if self._pushChannel is not None:
+            self._pushChannel.hotkeysKey = None
+            self._send(_u8.pack(COMMAND_UNSUBSCRIBE_HOTKEYS))
+            self._checkResult()
+
+    def disconnect(self):
+        """Disconnect from the server, closing also the push channel, if
+        any."""
+        if self._pushChannel is not None:
+            self._pushChannel.close()
+            self._pushChannel = None
+        if self._stream is not None:
+            try:
+                self._stream.close()
+                self._socket.close()
+            finally:
+                self._stream = None
+                self._socket = None
+
+    def createMultiGetter(self):
+        """Create a new multi-getter."""
+        return MultiGetter(self)
+
+    def createMultiSetter(self):
+        """Create a new multi-setter."""
+        return MultiSetter(self)
+
+    def destroyMultiBuffer(self, multiBuffer):
+        """Destroy the given multi-buffer, i.e. unregister it."""
+        multiBuffer.unregister()
+
+    def getVersions(self):
+        """Get the versions of X-Plane, the XPLM and the plugin as a
+        tuple."""
+        self._send(_u8.pack(COMMAND_GET_VERSIONS))
+        self._checkResult()
+        return (self._readS32(), self._readS32(), self._readS32())
+
+    def reloadPlugins(self):
+        """Reload the plugins."""
+        self._send(_u8.pack(COMMAND_RELOAD_PLUGINS))
+        self._checkResult()
+
+    def saveSituation(self, path):
+        """Save the situation into the given path."""
+        self._send(_u8.pack(COMMAND_SAVE_SITUATION) + _encodeString(path))
+        self._checkResult()
+
+    def getInt(self, name):
+        """Get the value of the given integer dataref."""
+        return self._getSingle(name, TYPE_INT)
+
+    def getFloat(self, name):
+        """Get the value of the given float dataref."""
+        return self._getSingle(name, TYPE_FLOAT)
+
+    def getDouble(self, name):
+        """Get the value of the given double dataref."""
+        return self._getSingle(name, TYPE_DOUBLE)
+
+    def getFloatArray(self, name, length = -1, offset = 0):
+        """Get the value of the given float array dataref."""
+        return self._getSingle(name, TYPE_FLOAT_ARRAY, length, offset)
+
+    def getIntArray(self, name, length = -1, offset = 0):
+        """Get the value of the given integer array dataref."""
+        return self._getSingle(name, TYPE_INT_ARRAY, length, offset)
+
+    def getByteArray(self, name, length = -1, offset = 0):
+        """Get the value of the given byte array dataref."""
+        return self._getSingle(name, TYPE_BYTE_ARRAY, length, offset)
+
+    def getString(self, name, offset = 0):
+        """Get the value of the given byte array dataref as a string."""
+        value = self.getByteArray(name, offset = offset)
+        return value.split(b"\0", 1)[0].decode("utf-8", "replace")
+
+    def setInt(self, name, value):
+        """Set the value of the given integer dataref."""
+        self._setSingle(name, TYPE_INT, value)
+
+    def setFloat(self, name, value):
+        """Set the value of the given float dataref."""
+        self._setSingle(name, TYPE_FLOAT, value)
+
+    def setDouble(self, name, value):
+        """Set the value of the given double dataref."""
+        self._setSingle(name, TYPE_DOUBLE, value)
+
+    def setFloatArray(self, name, value, offset = 0):
+        """Set the value of the given float array dataref."""
+        self._setSingle(name, TYPE_FLOAT_ARRAY, value, offset)
+
+    def setIntArray(self, name, value, offset = 0):
+        """Set the value of the given integer array dataref."""
+        self._setSingle(name, TYPE_INT_ARRAY, value, offset)
+
+    def setByteArray(self, name, value, offset = 0):
+        """Set the value of the given byte array dataref."""
+        self._setSingle(name, TYPE_BYTE_ARRAY, value, offset)
+
+    def showMessage(self, message, duration):
+        """Show the given message for the given number of seconds."""
+        self._send(_u8.pack(COMMAND_SHOW_MESSAGE) + _encodeString(message) +
+                   _float.pack(duration))
+        self._checkResult()
+
+    def registerHotkeys(self, hotkeyCodes):
+        """Register the hotkeys with the given codes."""
+        self._send(_u8.pack(COMMAND_REGISTER_HOTKEYS) +
+                   _u32.pack(len(hotkeyCodes)) +
+                   b"".join([_u16.pack(code) for code in hotkeyCodes]))
+        self._checkResult()
+
+    def queryHotkeys(self):
+        """Query the hotkeys.
+
+        Returns a list of booleans telling if the corresponding hotkey has
+        been pressed since the previous query."""
+        self._send(_u8.pack(COMMAND_QUERY_HOTKEYS))
+        self._checkResult()
+        count = self._readU32()
+        return [state!=0 for state in self._read(count)]
+
+    def unregisterHotkeys(self):
+        """Unregister the hotkeys."""
+        self._send(_u8.pack(COMMAND_UNREGISTER_HOTKEYS))
+        self._checkResult()
+
+    def _getSingle(self, name, type, length = -1, offset = 0):
+        """Get the value of a single dataref."""
+        self._send(_u8.pack(COMMAND_GET_SINGLE) +
+                   _encodeSpec(name, type, length, offset))
+        self._checkResult()
+        return self._readValue(type)
+
+    def _setSingle(self, name, type, value, offset = 0):
+        """Set the value of a single dataref."""
+        value = _coerceValue(type, value)
+        length = len(value) if type in _arrayTypes else -1
+        self._send(_u8.pack(COMMAND_SET_SINGLE) +
+                   _encodeSpec(name, type, length, offset) +
+                   _encodeValue(type, value))
+        self._checkResult()
+
+    def _send(self, data):
+        """Send the given data."""
+        if self._stream is None:
+            raise ProtocolException(RESULT_OTHER_ERROR)
+        self._stream.write(data)
+        self._stream.flush()
+
+    def _read(self, length):
+        """Read the given number of bytes."""
+        data = self._stream.read(length)
+        if data is None or len(data)<length:
+            raise ConnectionError("xplra_sim.XPlane: connection closed")
+        return data
+
+    def _readU32(self):
+        """Read an unsigned 32-bit integer."""
+        return _u32.unpack(self._read(4))[0]
+
+    def _readS32(self):
+        """Read a signed 32-bit integer."""
+        return _s32.unpack(self._read(4))[0]
+
+    def _readValue(self, type):
+        """Read a value of the given type."""
+        return _decodeValue(self._read, type)
+
+    def _checkResult(self, multi = False):
+        """Read the result code and raise an exception if it is an error.
+
+        For the multi-dataref commands the code of an error concerning a
+        dataref is followed by the index of the dataref."""
+        resultCode = self._read(1)[0]
+        if resultCode!=RESULT_OK:
+            parameter = self._readU32() \
+                        if multi and resultCode in _datarefResults else None
+            raise ProtocolException(resultCode, parameter)
+
+#------------------------------------------------------------------------------
+
+def main():
+    """Run a server until interrupted."""
+    parser = argparse.ArgumentParser(description =
+                                     "Stand-in for X-Plane with XPLRA")
+    parser.add_argument("-p", "--port", type = int, default = PORT,
+                        help = "the port to listen on (default: %d)" %
+                        (PORT,))
+    parser.add_argument("-a", "--aircraft",
+                        choices = sorted(DatarefTable.aircraftPresets),
+                        default = "generic",
+                        help = "the aircraft preset (default: generic)")
+    parser.add_argument("-t", "--table",
+                        help = "the JSON file containing the dataref table")
+    parser.add_argument("-l", "--latency", type = float, default = 0.0,
+                        help = "the delay of each reply in seconds")
+    parser.add_argument("-j", "--jitter", type = float, default = 0.0,
+                        help = "the maximal random additional delay of each "
+                        "reply in seconds")
+    parser.add_argument("-x", "--xplra-version", type = int,
+                        default = PUSH_XPLRA_VERSION,
+                        help = "the version of the plugin reported, below %d "
+                        "the data cannot be pushed (default: %d)" %
+                        (PUSH_XPLRA_VERSION, PUSH_XPLRA_VERSION))
+    args = parser.parse_args()
+
+    if args.table is None:
+        table = DatarefTable(aircraft = args.aircraft)
+    else:
+        table = DatarefTable.load(args.table)
+
+    server = Server(table = table, port = args.port, latency = args.latency,
+                    jitter = args.jitter,
+                    xplraVersion = args.xplra_version, verbose = True)
+    server.start()
+    server.waitReady()
+    print("Listening on port %d" % (server.port,))
+    try:
+        while server.is_alive():
+            server.join(1.0)
+    except KeyboardInterrupt:
+        server.stop()
+
+#------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+
+# Benchmark of the debug log
+#
+# A number of lines is printed into the debug log, each line written in two
+# parts as print() does, and the log is processed after every given number
+# of lines, as by the main loop of the GUI. The time taken by the writing and
+# by the processing, with and without the file, is compared to that of the
+# string concatenation and line by line insertion the GUI used earlier,
+# whose view is represented by a list of the inserted pieces of text (so the
+# cost of the insertions into the text buffer is not included). The number
+# of the lines kept in memory is reported, and it is checked that the lines
+# kept and the file written by the debug log match the end and the whole of
+# the earlier view (with the times removed, as those may differ).
+
+import os
+import re
+import sys
+import time
+import argparse
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from mlx.debuglog import DebugLog
+
+#------------------------------------------------------------------------------
+
+## The numbers of lines written between two processings measured by default
+defaultBatchSizes = [1, 100, 5000]
+
+## The regular expression of the time at the beginning of a line
+timeRE = re.compile("^[0-9]{2}:[0-9]{2}:[0-9]{2}: ", re.MULTILINE)
+
+#------------------------------------------------------------------------------
+
+class StringLog(object):
+    """The debug log accumulated by string concatenation and inserted line by
+    line into the view, as the GUI did earlier."""
+    def __init__(self):
+        """Construct the log."""
+        self._stdioLock = threading.Lock()
+        self._stdioText = ""
+        self._stdioStartingLine = True
+        self.view = []
+
+    def write(self, text):
+        """Write the given text."""
+        with self._stdioLock:
+            self._stdioText += text
+
+    def process(self):
+        """Process the text written."""
+        with self._stdioLock:
+            text = self._stdioText
+            self._stdioText = ""
+        if not text: return
+
+        lines = text.splitlines()
+        if text[-1]=="\n":
+            text = ""
+        else:
+            text = lines[-1]
+            lines = lines[:-1]
+
+        now = time.localtime()
+        timeStr = "%02d:%02d:%02d: " % (now.tm_hour, now.tm_min, now.tm_sec)
+
+        for line in lines:
+            if self._stdioStartingLine:
+                self.view.append(timeStr)
+            self.view.append(line + "\n")
+            self._stdioStartingLine = True
+
+        if text:
+            if self._stdioStartingLine:
+                self.view.append(timeStr)
+            self.view.append(text)
+            self._stdioStartingLine = False
+
+#------------------------------------------------------------------------------
+
+def run(log, numLines, batchSize):
+    """Write the given number of lines into the given log, processing the log
+    after every batchSize lines.
+
+    Returns the time taken."""
+    begin = time.perf_counter()
+    for i in range(0, numLines):
+        log.write("Line %d, some value: %.3f" % (i, i * 0.125))
+        log.write("\n")
+        if (i + 1) % batchSize==0:
+            log.process()
+    log.process()
+    return time.perf_counter() - begin
+
+#------------------------------------------------------------------------------
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description =
+                                     "Benchmark the debug log")
+    parser.add_argument("-n", "--num-lines", type = int, default = 100000,
+                        help = "the number of lines (default: 100000)")
+    parser.add_argument("-b", "--batch-size", type = int, action = "append",
+                        help = "the number of lines between two "
+                        "processings (default: 1, 100 and 5000)")
+    parser.add_argument("-m", "--max-lines", type = int,
+                        default = DebugLog.DEFAULT_MAX_LINES,
+                        help = "the maximal number of lines kept (default: "
+                        "%d)" % (DebugLog.DEFAULT_MAX_LINES,))
+    args = parser.parse_args()
+
+    result = 0
+    with tempfile.TemporaryDirectory() as directory:
+        for batchSize in args.batch_size if args.batch_size \
+            else defaultBatchSizes:
+            stringLog = StringLog()
+            stringTime = run(stringLog, args.num_lines, batchSize)
+
+            memoryTime = run(DebugLog(args.max_lines), args.num_lines,
+                             batchSize)
+
+            path = os.path.join(directory, "debug-%d.log" % (batchSize,))
+            debugLog = DebugLog(args.max_lines, path,
+                                maxFileSize = 1 << 40)
+            debugLogTime = run(debugLog, args.num_lines, batchSize)
+            debugLog.close()
+
+            viewText = timeRE.sub("", "".join(stringLog.view))
+            viewLines = viewText.splitlines(True)
+            with open(path, "rt") as f:
+                fileText = timeRE.sub("", f.read())
+            keptLines = [timeRE.sub("", line) for line in debugLog.lines]
+
+            same = fileText==viewText and \
+                keptLines==viewLines[-args.max_lines:]
+            if not same:
+                result = 1
+
+            print("%5d lines per processing: %6.1f ms, with file: %6.1f ms "
+                  "(earlier: %6.1f ms), %d lines kept (earlier: %d), %s" %
+                  (batchSize, memoryTime * 1000.0, debugLogTime * 1000.0,
+                   stringTime * 1000.0, len(keptLines), len(viewLines),
+                   "same text" if same else "DIFFERENT TEXT"))
+
+    return result
+
+#------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    sys.exit(main())
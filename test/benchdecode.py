@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+# Benchmark of the decoding of the FSUIPC monitoring data
+#
+# A sequence of monitoring data frames is generated, in which only the values
+# typically changing in flight (position, attitude, speeds, altitudes, N1)
+# differ between the frames. The frames are decoded by the generic and the
+# PMDG 737 models both from scratch, and by reusing the values decoded from
+# the unchanged items, and the average decoding time per tick (including the
+# calculation of the change mask in the latter case) is reported as the best
+# of a few runs.
+
+import os
+import sys
+import time
+import contextlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+os.environ["FORCE_PYUIPC_SIM"] = "1"
+
+from mlx import const
+from mlx import fsuipc
+from mlx import pyuipc_sim
+
+#------------------------------------------------------------------------------
+
+class Flight(object):
+    """A flight for the benchmark."""
+    stage = const.STAGE_CRUISE
+
+class Aircraft(object):
+    """An aircraft for the benchmark."""
+    type = const.AIRCRAFT_B738
+    flight = Flight()
+
+#------------------------------------------------------------------------------
+
+## The names of the monitoring data items changing in every frame
+changingItems = ["latitude", "longitude", "heading", "pitch", "bank", "ias",
+                 "groundSpeed", "vs", "radioAltitude", "altitude", "gLoad",
+                 "elevatorTrim"]
+
+#------------------------------------------------------------------------------
+
+def readInitialValues(data):
+    """Read the initial values of the given data from the simulator.
+
+    The offsets not known by the simulator are read as zeros."""
+    values = []
+    for item in data:
+        try:
+            values.append(pyuipc_sim.read([item])[0])
+        except pyuipc_sim.FSUIPCException:
+            values.append(0)
+    return values
+
+def generateFrames(model, data, numFrames):
+    """Generate the given number of frames for the given model."""
+    values = readInitialValues(data)
+
+    indices = [getattr(model, "_monidx_" + name) for name in changingItems]
+    engineStartIndex = model._engineStartIndex
+    indices += [engineStartIndex + i * 2 + 1
+                for i in range(0, model._numEngines)]
+
+    frames = []
+    for i in range(0, numFrames):
+        values = values[:]
+        for index in indices:
+            values[index] += 1
+        frames.append(values)
+    return frames
+
+def timeDecoding(decode, aircraft, frames, numRuns = 5):
+    """Time the decoding of the given frames with the given function.
+
+    Returns the best time per tick in microseconds."""
+    bestTime = None
+    for i in range(0, numRuns):
+        startTime = time.perf_counter()
+        for frame in frames:
+            decode(aircraft, 0, frame)
+        runTime = time.perf_counter() - startTime
+        if bestTime is None or runTime<bestTime:
+            bestTime = runTime
+    return bestTime * 1e6 / len(frames)
+
+def runBenchmark(modelClass, fsType, numFrames):
+    """Run the benchmark with the given model class.
+
+    Returns a tuple of the full and of the incremental decoding time per
+    tick in microseconds."""
+    aircraft = Aircraft()
+
+    model = modelClass()
+    model.setFSType(fsType)
+    data = fsuipc.Simulator.normalData[:]
+    with contextlib.redirect_stdout(None), contextlib.redirect_stderr(None):
+        model.addMonitoringData(data, fsType)
+        frames = generateFrames(model, data, numFrames)
+        model.getAircraftState(aircraft, 0, frames[0])
+        model.getNextAircraftState(aircraft, 0, frames[0])
+
+    return (timeDecoding(model.getAircraftState, aircraft, frames),
+            timeDecoding(model.getNextAircraftState, aircraft, frames))
+
+#------------------------------------------------------------------------------
+
+def main():
+    """Run the benchmark."""
+    numFrames = int(sys.argv[1]) if len(sys.argv)>1 else 10000
+
+    pyuipc_sim.open(pyuipc_sim.SIM_FSX)
+
+    for (modelClass, fsType) in [(fsuipc.GenericModel, const.SIM_MSFSX),
+                                 (fsuipc.PMDGBoeing737NGModel,
+                                  const.SIM_MSFSX)]:
+        (fullTime, incrementalTime) = runBenchmark(modelClass, fsType,
+                                                   numFrames)
+        print("%-22s full: %6.1f us/tick, incremental: %6.1f us/tick" %
+              (modelClass.__name__ + ":", fullTime, incrementalTime))
+
+#------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+
+# Benchmark of the update queue of the GUI
+#
+# The logger is fed with 100 log lines per second from a separate thread, as
+# the threads handling the simulator do, with some of the lines updated and
+# some faults reported and upgraded, while aircraft states are passed to the
+# output 10 times per second. The changes are passed to a stand-in of the
+# main loop of the GUI either by scheduling a callback for each change, as
+# the GUI did earlier, or through the update queue (see
+# mlx.gui.updatequeue). The number of the main loop callbacks, the number of
+# the lookups of text buffer iterators and the latency of the log lines and
+# the aircraft states (the time from the change to its application in the
+# main loop) are reported. Each callback may be made to take some time, as
+# redrawing the widgets does in the real main loop. The lines and the faults
+# displayed at the end must be the same as those in the logger.
+
+import os
+import sys
+import time
+import heapq
+import random
+import argparse
+import threading
+import collections
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from mlx.logger import Logger
+from mlx.gui.updatequeue import UpdateQueue
+
+#------------------------------------------------------------------------------
+
+## The number of the different kinds of faults
+numFaultIDs = 10
+
+## The percentiles of the latency reported
+percentiles = [50, 99, 100]
+
+#------------------------------------------------------------------------------
+
+def formatLine(timestampString, text):
+    """Format the given log line as the GUI does."""
+    if timestampString is not None:
+        text = timestampString + ": " + text
+    return text + "\n"
+
+def busyWait(duration):
+    """Wait for the given number of seconds without sleeping."""
+    end = time.perf_counter() + duration
+    while time.perf_counter()<end:
+        pass
+
+def getPercentile(values, percentile):
+    """Get the given percentile of the given values."""
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * percentile / 100.0))]
+
+#------------------------------------------------------------------------------
+
+class MainLoop(object):
+    """A stand-in for the main loop of GLib.
+
+    The functions scheduled with a timeout are called before the ones
+    scheduled for the idle time, if they are due, as in GLib."""
+    def __init__(self, callbackCost):
+        """Construct the main loop, each callback of which takes at least the
+        given number of seconds."""
+        self._callbackCost = callbackCost
+        self._condition = threading.Condition()
+        self._idleCallbacks = collections.deque()
+        self._timeouts = []
+        self._sequenceNumber = 0
+        self.numCallbacks = 0
+
+    def idle_add(self, function, *args):
+        """Schedule the given function to be called when the loop is idle."""
+        with self._condition:
+            self._idleCallbacks.append((function, args))
+            self._condition.notify()
+
+    def timeout_add(self, interval, function, *args):
+        """Schedule the given function to be called after the given number
+        of milliseconds."""
+        with self._condition:
+            self._sequenceNumber += 1
+            heapq.heappush(self._timeouts,
+                           (time.monotonic() + interval / 1000.0,
+                            self._sequenceNumber, function, args))
+            self._condition.notify()
+
+    def run(self, endTime = None):
+        """Run the loop until the given monotonic time, or, if it is None,
+        until no callbacks are pending."""
+        while True:
+            with self._condition:
+                while True:
+                    now = time.monotonic()
+                    if endTime is not None and now>=endTime:
+                        return
+                    if self._timeouts and self._timeouts[0][0]<=now:
+                        (_, _, function, args) = \
+                            heapq.heappop(self._timeouts)
+                        break
+                    if self._idleCallbacks:
+                        (function, args) = self._idleCallbacks.popleft()
+                        break
+                    if endTime is None and not self._timeouts:
+                        return
+                    timeout = None if endTime is None else endTime - now
+                    if self._timeouts:
+                        timeout = self._timeouts[0][0] - now \
+                            if timeout is None \
+                            else min(timeout, self._timeouts[0][0] - now)
+                    self._condition.wait(timeout)
+
+            function(*args)
+            self.numCallbacks += 1
+            if self._callbackCost>0.0:
+                busyWait(self._callbackCost)
+
+#------------------------------------------------------------------------------
+
+class State(object):
+    """An aircraft state remembering when it was produced."""
+    def __init__(self, timestamp):
+        """Construct the state."""
+        self.timestamp = timestamp
+        self.producedAt = time.monotonic()
+
+class View(object):
+    """A stand-in for the widgets of the GUI.
+
+    The lines are kept in a list, and the lookups of the text buffer
+    iterators that the GUI performs are counted."""
+    def __init__(self, producedAt):
+        """Construct the view with the given mapping of the texts of the
+        lines to the time they were produced at."""
+        self._producedAt = producedAt
+        self.lines = []
+        self.faults = {}
+        self.numLookups = 0
+        self.lineLatencies = []
+        self.stateLatencies = []
+
+    def insertLine(self, index, text, isFault):
+        """Insert a line as the GUI did earlier."""
+        self.numLookups += 3
+        self._insertLines(index, [(text, isFault)])
+
+    def removeLine(self, index):
+        """Remove a line as the GUI did earlier."""
+        self.numLookups += 2
+        del self.lines[index]
+
+    def addFault(self, id, text):
+        """Add a fault."""
+        self.faults[id] = text
+
+    def updateFault(self, id, text):
+        """Update a fault."""
+        self.faults[id] = text
+
+    def clearFault(self, id):
+        """Clear a fault."""
+        del self.faults[id]
+
+    def setData(self, state):
+        """Set the data of the given aircraft state."""
+        self.stateLatencies.append(time.monotonic() - state.producedAt)
+
+    def updateTime(self, timestamp):
+        """Update the time in the status bar."""
+        pass
+
+    def setRating(self, rating):
+        """Set the rating."""
+        pass
+
+    def applyUpdates(self, lineChanges, faultChanges, aircraftState):
+        """Apply the updates drained from the update queue as the GUI
+        does."""
+        for (kind, index, data) in lineChanges:
+            if kind==UpdateQueue.INSERT_LINES:
+                self.numLookups += 3 + \
+                    2 * len([isFault for (_, isFault) in data if isFault])
+                self._insertLines(index, data)
+            else:
+                self.numLookups += 2
+                del self.lines[index:index + data]
+
+        for (kind, id, text) in faultChanges:
+            if kind==UpdateQueue.ADD_FAULT:
+                self.addFault(id, text)
+            elif kind==UpdateQueue.UPDATE_FAULT:
+                self.updateFault(id, text)
+            else:
+                self.clearFault(id)
+
+        if aircraftState is not None:
+            self.setData(aircraftState)
+            self.updateTime(aircraftState.timestamp)
+
+    def _insertLines(self, index, lines):
+        """Insert the given lines and record their latencies."""
+        now = time.monotonic()
+        self.lines[index:index] = [text for (text, _) in lines]
+        for (text, _) in lines:
+            self.lineLatencies.append(now - self._producedAt[text])
+
+#------------------------------------------------------------------------------
+
+class DirectOutput(object):
+    """The output of the logger scheduling a main loop callback for each
+    change, as the GUI did earlier."""
+    def __init__(self, loop, view, producedAt):
+        """Construct the output recording the time the lines are produced
+        at into the given mapping."""
+        self._loop = loop
+        self._view = view
+        self._producedAt = producedAt
+
+    def insertFlightLogLine(self, index, timestampString, text, isFault):
+        """Insert a line."""
+        line = formatLine(timestampString, text)
+        self._producedAt[line] = time.monotonic()
+        self._loop.idle_add(self._view.insertLine, index, line, isFault)
+
+    def removeFlightLogLine(self, index):
+        """Remove a line."""
+        self._loop.idle_add(self._view.removeLine, index)
+
+    def addFault(self, id, timestampString, text):
+        """Add a fault."""
+        self._loop.idle_add(self._view.addFault, id,
+                            formatLine(timestampString, text).strip())
+
+    def updateFault(self, id, timestampString, text):
+        """Update a fault."""
+        self._loop.idle_add(self._view.updateFault, id,
+                            formatLine(timestampString, text).strip())
+
+    def clearFault(self, id):
+        """Clear a fault."""
+        self._loop.idle_add(self._view.clearFault, id)
+
+    def setRating(self, rating):
+        """Set the rating."""
+        self._loop.idle_add(self._view.setRating, rating)
+
+    def check(self, state):
+        """Pass the given aircraft state."""
+        self._loop.idle_add(self._view.setData, state)
+        self._loop.idle_add(self._view.updateTime, state.timestamp)
+
+class QueueOutput(object):
+    """The output of the logger passing the changes through the update
+    queue, as the GUI does."""
+    def __init__(self, loop, view, producedAt):
+        """Construct the output recording the time the lines are produced
+        at into the given mapping."""
+        self._loop = loop
+        self._view = view
+        self._producedAt = producedAt
+        self._queue = UpdateQueue(view.applyUpdates, loop.idle_add,
+                                  loop.timeout_add)
+
+    def insertFlightLogLine(self, index, timestampString, text, isFault):
+        """Insert a line."""
+        line = formatLine(timestampString, text)
+        self._producedAt[line] = time.monotonic()
+        self._queue.insertLine(index, line, isFault)
+
+    def removeFlightLogLine(self, index):
+        """Remove a line."""
+        self._queue.removeLine(index)
+
+    def addFault(self, id, timestampString, text):
+        """Add a fault."""
+        self._queue.addFault(id, formatLine(timestampString, text).strip())
+
+    def updateFault(self, id, timestampString, text):
+        """Update a fault."""
+        self._queue.updateFault(id, formatLine(timestampString, text).strip())
+
+    def clearFault(self, id):
+        """Clear a fault."""
+        self._queue.clearFault(id)
+
+    def setRating(self, rating):
+        """Set the rating."""
+        self._loop.idle_add(self._view.setRating, rating)
+
+    def check(self, state):
+        """Pass the given aircraft state."""
+        self._queue.setAircraftState(state)
+
+#------------------------------------------------------------------------------
+
+def produce(logger, output, duration, lineRate, stateRate, seed):
+    """Produce the log lines and the aircraft states for the given number of
+    seconds."""
+    rng = random.Random(seed)
+    begin = time.monotonic()
+    timestamp = 1700000000.0
+    numLines = 0
+    numStates = 0
+    messageIDs = []
+    faultScores = {}
+
+    while True:
+        now = time.monotonic()
+        elapsed = now - begin
+        if elapsed>=duration:
+            break
+
+        while numLines<elapsed * lineRate:
+            numLines += 1
+            timestamp += 1.0 / lineRate
+            r = rng.random()
+            if r<0.1 and messageIDs:
+                logger.updateLine(rng.choice(messageIDs),
+                                  "Updated line %d" % (numLines,))
+            elif r<0.2:
+                faultID = rng.randrange(numFaultIDs)
+                score = faultScores.get(faultID, 0) + 1
+                faultScores[faultID] = score
+                logger.fault(faultID, timestamp,
+                             "Fault %d at line %d" % (faultID, numLines),
+                             score, updatePrevious = True)
+            else:
+                messageIDs.append(logger.message(timestamp,
+                                                 "Line %d" % (numLines,)))
+
+        while numStates<elapsed * stateRate:
+            numStates += 1
+            output.check(State(timestamp))
+
+        time.sleep(min(1.0 / lineRate, 1.0 / stateRate) / 2.0)
+
+def run(outputClass, duration, lineRate, stateRate, callbackCost, seed):
+    """Run the benchmark with the given output class.
+
+    Returns a tuple of the main loop, the view and whether the lines and the
+    faults displayed are the same as in the logger."""
+    loop = MainLoop(callbackCost)
+    producedAt = {}
+    view = View(producedAt)
+    output = outputClass(loop, view, producedAt)
+    logger = Logger(output)
+
+    producer = threading.Thread(target = produce,
+                                args = (logger, output, duration,
+                                        lineRate, stateRate, seed))
+    producer.start()
+    loop.run(time.monotonic() + duration + 0.5)
+    producer.join()
+    loop.run()
+
+    lines = [formatLine(timestampString, text)
+             for (timestampString, text) in logger.lines]
+    faults = {}
+    for (id, entry) in logger._entries.items():
+        if entry.isFault:
+            faults[id] = formatLine(entry.timestampString, entry.text).strip()
+
+    return (loop, view, view.lines==lines and view.faults==faults)
+
+#------------------------------------------------------------------------------
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description =
+                                     "Benchmark the update queue of the GUI")
+    parser.add_argument("-d", "--duration", type = float, default = 5.0,
+                        help = "the duration of a run in seconds "
+                        "(default: 5)")
+    parser.add_argument("-l", "--line-rate", type = float, default = 100.0,
+                        help = "the number of log lines per second "
+                        "(default: 100)")
+    parser.add_argument("-r", "--state-rate", type = float, default = 10.0,
+                        help = "the number of aircraft states per second "
+                        "(default: 10)")
+    parser.add_argument("-c", "--callback-cost", type = float,
+                        action = "append",
+                        help = "the time taken by a main loop callback in "
+                        "milliseconds (default: 0 and 2)")
+    parser.add_argument("-s", "--seed", type = int, default = 1,
+                        help = "the seed of the random numbers")
+    args = parser.parse_args()
+
+    result = 0
+    for callbackCost in args.callback_cost if args.callback_cost \
+        else [0.0, 2.0]:
+        for (name, outputClass) in [("direct", DirectOutput),
+                                    ("queue", QueueOutput)]:
+            (loop, view, same) = run(outputClass, args.duration,
+                                     args.line_rate, args.state_rate,
+                                     callbackCost / 1000.0, args.seed)
+            if not same:
+                result = 1
+            print("%-6s callback cost %.1f ms: %6.1f callbacks/s, "
+                  "%6.1f lookups/s, line latency %s ms, state latency %s ms, "
+                  "%s" %
+                  (name, callbackCost, loop.numCallbacks / args.duration,
+                   view.numLookups / args.duration,
+                   "/".join(["%.1f" %
+                             (getPercentile(view.lineLatencies, p) * 1000.0,)
+                             for p in percentiles]),
+                   "/".join(["%.1f" %
+                             (getPercentile(view.stateLatencies, p) * 1000.0,)
+                             for p in percentiles]),
+                   "same lines and faults" if same else
+                   "DIFFERENT LINES OR FAULTS"))
+    print("(the latencies are the %s percentiles)" %
+          ("/".join(["%d." % (p,) for p in percentiles]),))
+
+    return result
+
+#------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    sys.exit(main())
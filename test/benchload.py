@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+
+# Load benchmark of the checker pipeline with many concurrent flights
+#
+# The frames of monitoring data of a flight are generated once by playing the
+# flight profile profile1.json in the PyUIPC simulator with the generic Boeing
+# 737 model, taking a frame every second of the profile. A number of
+# independent virtual flights, each with its own Flight, Aircraft, Logger (see
+# runscenarios.createFlight()) and aircraft model, are then fed these frames as
+# fast as possible, either in threads of one process or in separate processes.
+# Each frame is decoded into an aircraft state like the FSUIPC handler does,
+# and the state is passed to Aircraft.handleState(), i.e. through the checkers
+# into the logger. Only this latter call is timed as the latency of a tick.
+#
+# For each number of flights the percentiles of the tick latency, the total
+# throughput in ticks per second (including the decoding) and the peak RSS are
+# reported. The results are compared to those tracked in benchload.json, and
+# the exit code is non-zero if the median latency or the throughput of any
+# measurement is worse by more than the tolerance. With --update the results
+# are written into benchload.json instead, which should be done on the
+# reference machine when the pipeline changes intentionally.
+#
+# The peak RSS is that of the benchmark process in the thread mode, and the
+# largest one of the worker processes in the process mode. It never decreases,
+# so it is the peak of all the measurements so far. The total RSS is the same
+# in the thread mode, and the sum of the peak RSS of the worker processes in
+# the process mode, which are started anew for each number of flights, so it
+# shows how the memory grows with the number of flights.
+
+import os
+import sys
+import json
+import time
+import resource
+import argparse
+import threading
+import contextlib
+import multiprocessing
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+os.environ["FORCE_PYUIPC_SIM"] = "1"
+os.environ["PYUIPC_SIM_PORT"] = "0"
+
+from runscenarios import getConfig, createFlight
+
+#------------------------------------------------------------------------------
+
+## The path of the flight profile
+profilePath = os.path.join(os.path.dirname(__file__), "profile1.json")
+
+## The path of the file containing the tracked results
+baselinePath = os.path.join(os.path.dirname(__file__), "benchload.json")
+
+## The time the flight starts at
+startTime = 1700000000.0
+
+## The number of seconds between the frames
+frameInterval = 1.0
+
+## The numbers of the concurrent flights measured by default
+defaultNumFlights = [1, 2, 4, 8, 16]
+
+## The default relative worsening of a result that is a regression
+DEFAULT_TOLERANCE = 0.3
+
+## The percentiles of the latency reported
+percentiles = [50, 90, 99]
+
+#------------------------------------------------------------------------------
+
+class VirtualFlight(object):
+    """A virtual flight fed with the frames of monitoring data."""
+    def __init__(self, config):
+        """Construct the flight with the given configuration."""
+        from mlx import const
+        from mlx import fsuipc
+
+        (self.logger, self.flight) = \
+            createFlight("B738", {"zfw": 46741, "cruiseAltitude": 22000,
+                                  "v1": 140, "vr": 145, "v2": 155,
+                                  "vref": 135}, config)
+
+        self._model = fsuipc.B737Model()
+        self._model.setFSType(const.SIM_MSFSX)
+        with contextlib.redirect_stdout(None):
+            self._model.addMonitoringData(fsuipc.Simulator.normalData[:],
+                                          const.SIM_MSFSX)
+
+    def run(self, frames):
+        """Feed the given frames to the flight.
+
+        Returns the list of the tick latencies in seconds."""
+        aircraft = self.flight.aircraft
+        model = self._model
+
+        (timestamp, values) = frames[0]
+        aircraft.modelChanged(timestamp, str(values[5], "iso-8859-1"),
+                              model.name)
+
+        latencies = []
+        for (timestamp, values) in frames:
+            state = model.getNextAircraftState(aircraft, timestamp, values)
+            begin = time.perf_counter()
+            aircraft.handleState(state)
+            latencies.append(time.perf_counter() - begin)
+        return latencies
+
+#------------------------------------------------------------------------------
+
+def generateFrames():
+    """Generate the frames of the flight by playing the profile.
+
+    Returns a tuple of the monitoring data and the list of the frames, each
+    frame being a tuple of the timestamp and the values."""
+    from mlx import const
+    from mlx import fsuipc
+    from mlx import pyuipc_sim
+    from mlx.clock import VirtualClock, setClock
+
+    clock = VirtualClock(startTime)
+    setClock(clock)
+
+    pyuipc_sim.open(pyuipc_sim.SIM_FSX)
+
+    model = fsuipc.B737Model()
+    model.setFSType(const.SIM_MSFSX)
+    data = fsuipc.Simulator.normalData[:]
+    with contextlib.redirect_stdout(None):
+        model.addMonitoringData(data, const.SIM_MSFSX)
+    preparedData = pyuipc_sim.prepare_data(data)
+
+    player = pyuipc_sim.ProfilePlayer(pyuipc_sim.Profile.load(profilePath),
+                                      pyuipc_sim.values)
+    frames = []
+    elapsed = 0.0
+    while player.advance(elapsed):
+        clock.setTime(startTime + elapsed)
+        values = pyuipc_sim.read(preparedData)
+        frames.append((fsuipc.Simulator._getTimestamp(values), values))
+        elapsed += frameInterval
+
+    return (data, frames)
+
+def runFlight(frames, config):
+    """Run a virtual flight with the given frames.
+
+    Returns a tuple of the latencies, the number of log lines and the
+    rating."""
+    flight = VirtualFlight(config)
+    latencies = flight.run(frames)
+    return (latencies, len(flight.logger.lines), flight.logger.getRating())
+
+#------------------------------------------------------------------------------
+
+## The frames in a worker process
+_workerFrames = None
+
+def initializeWorker(frames):
+    """Initialize a worker process with the given frames."""
+    global _workerFrames
+    sys.stdout = open(os.devnull, "wt")
+    _workerFrames = frames
+
+def runWorkerFlight(index):
+    """Run a virtual flight in a worker process.
+
+    Returns the same as runFlight() along with the peak RSS of the
+    process."""
+    result = runFlight(_workerFrames, getConfig())
+    return result + (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,)
+
+#------------------------------------------------------------------------------
+
+def measureThreads(numFlights, frames):
+    """Run the given number of flights in threads.
+
+    Returns a tuple of the results of runFlight() of each flight, the wall
+    time taken, and the peak and the total RSS in kilobytes, which are the
+    same."""
+    config = getConfig()
+    results = [None] * numFlights
+
+    def run(index):
+        results[index] = runFlight(frames, config)
+
+    threads = [threading.Thread(target = run, args = (i,))
+               for i in range(0, numFlights)]
+    begin = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - begin
+
+    peakRSS = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return (results, duration, peakRSS, peakRSS)
+
+def measureProcesses(numFlights, frames):
+    """Run the given number of flights in separate processes.
+
+    Returns a tuple of the results of runFlight() of each flight, the wall
+    time taken, the largest peak RSS of the workers and the sum of their peak
+    RSS in kilobytes."""
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(numFlights, initializer = initializeWorker,
+                      initargs = (frames,)) as pool:
+        # Let the workers start before measuring
+        pool.map(int, range(0, numFlights), chunksize = 1)
+        begin = time.perf_counter()
+        workerResults = pool.map(runWorkerFlight, range(0, numFlights),
+                                 chunksize = 1)
+        duration = time.perf_counter() - begin
+
+    workerRSS = [result[3] for result in workerResults]
+    return ([result[:3] for result in workerResults], duration,
+            max(workerRSS), sum(workerRSS))
+
+#------------------------------------------------------------------------------
+
+def getPercentile(values, percentile):
+    """Get the given percentile of the given sorted values."""
+    index = min(len(values) - 1, int(len(values) * percentile / 100.0))
+    return values[index]
+
+def summarize(results, duration, peakRSS, totalRSS):
+    """Summarize the given results of a measurement.
+
+    Returns a dictionary with the latencies in microseconds, the throughput
+    in ticks per second, and the peak and the total RSS in megabytes."""
+    latencies = []
+    for (flightLatencies, numLines, rating) in results:
+        latencies += flightLatencies
+    latencies.sort()
+
+    summary = {}
+    for percentile in percentiles:
+        summary["p%d" % (percentile,)] = \
+            round(getPercentile(latencies, percentile) * 1e6, 1)
+    summary["max"] = round(latencies[-1] * 1e6, 1)
+    summary["throughput"] = round(len(latencies) / duration)
+    summary["peakRSS"] = round(peakRSS / 1024.0, 1)
+    summary["totalRSS"] = round(totalRSS / 1024.0, 1)
+    return summary
+
+def compare(mode, numFlights, summary, baseline, tolerance):
+    """Compare the given summary to the baseline.
+
+    Returns the list of the regressions found."""
+    reference = baseline.get(mode, {}).get(str(numFlights))
+    if reference is None:
+        return []
+
+    regressions = []
+    if summary["p50"]>reference["p50"] * (1.0 + tolerance):
+        regressions.append("%s/%d: median latency %.1f us, was %.1f us" %
+                           (mode, numFlights, summary["p50"],
+                            reference["p50"]))
+    if summary["throughput"]<reference["throughput"] * (1.0 - tolerance):
+        regressions.append("%s/%d: throughput %d ticks/s, was %d ticks/s" %
+                           (mode, numFlights, summary["throughput"],
+                            reference["throughput"]))
+    return regressions
+
+#------------------------------------------------------------------------------
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description =
+                                     "Load benchmark of the checker pipeline")
+    parser.add_argument("-m", "--mode", choices = ["threads", "processes"],
+                        action = "append",
+                        help = "run the flights in threads or processes "
+                        "(default: both)")
+    parser.add_argument("-n", "--num-flights", type = int, action = "append",
+                        help = "the number of concurrent flights (default: %s)"
+                        % (", ".join([str(n) for n in defaultNumFlights]),))
+    parser.add_argument("-t", "--tolerance", type = float,
+                        default = DEFAULT_TOLERANCE,
+                        help = "the relative worsening considered a "
+                        "regression (default: %.2f)" % (DEFAULT_TOLERANCE,))
+    parser.add_argument("-u", "--update", action = "store_true",
+                        help = "write the results into the tracked file")
+    args = parser.parse_args()
+
+    modes = args.mode if args.mode else ["threads", "processes"]
+    allNumFlights = args.num_flights if args.num_flights \
+                    else defaultNumFlights
+
+    baseline = {}
+    if os.path.exists(baselinePath):
+        with open(baselinePath, "rt") as f:
+            baseline = json.load(f)
+
+    with contextlib.redirect_stdout(None):
+        (data, frames) = generateFrames()
+    print("%d frames, %d monitoring data items" % (len(frames), len(data)))
+    print("%-10s %4s %9s %9s %9s %9s %10s %8s %10s" %
+          ("mode", "N", "p50 us", "p90 us", "p99 us", "max us", "ticks/s",
+           "RSS MB", "total MB"))
+
+    results = {}
+    regressions = []
+    for mode in modes:
+        measure = measureThreads if mode=="threads" else measureProcesses
+        for numFlights in allNumFlights:
+            with contextlib.redirect_stdout(None):
+                (flightResults, duration, peakRSS, totalRSS) = \
+                    measure(numFlights, frames)
+
+            outcomes = set([(numLines, rating)
+                            for (latencies, numLines, rating)
+                            in flightResults])
+            if len(outcomes)!=1:
+                print("The flights have different outcomes: %s" %
+                      (sorted(outcomes),), file=sys.stderr)
+                return 1
+
+            summary = summarize(flightResults, duration, peakRSS, totalRSS)
+            results.setdefault(mode, {})[str(numFlights)] = summary
+            print("%-10s %4d %9.1f %9.1f %9.1f %9.1f %10d %8.1f %10.1f" %
+                  (mode, numFlights, summary["p50"], summary["p90"],
+                   summary["p99"], summary["max"], summary["throughput"],
+                   summary["peakRSS"], summary["totalRSS"]))
+
+            regressions += compare(mode, numFlights, summary, baseline,
+                                   args.tolerance)
+
+    if args.update:
+        for (mode, summaries) in results.items():
+            baseline.setdefault(mode, {}).update(summaries)
+        with open(baselinePath, "wt") as f:
+            json.dump(baseline, f, indent = 2, sort_keys = True)
+            f.write("\n")
+        print("Results written into %s" % (baselinePath,))
+    elif regressions:
+        print("Regressions:")
+        for regression in regressions:
+            print("  " + regression)
+        return 1
+
+    return 0
+
+#------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+
+# Micro-benchmark of the log store of the logger
+#
+# A log of a given number of lines is built with messages and faults of
+# several kinds, some of the lines inserted before the last one, as when the
+# flare is logged. Then a number of updates typical of a fault-heavy flight
+# are performed: faults are reported again with a higher score and
+# updatePrevious set (like the speed, VS and bank checkers do), lines are
+# updated and faults are cleared, some of them No-Go ones. Finally the indexes
+# of the fault lines are queried a number of times, which necessarily takes
+# time proportional to the number of the faults, and so is the rating. The
+# time taken by the logger is compared to that of the list based log store
+# and rating calculation it used earlier, and the lines, the fault lines, the
+# rating and the calls of the output, including the ones notifying it of the
+# rating, must be the same with both.
+
+import os
+import sys
+import time
+import random
+import bisect
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from mlx.logger import Logger
+
+#------------------------------------------------------------------------------
+
+## The time the log starts at
+startTime = 1700000000.0
+
+## The numbers of the lines measured by default
+defaultNumLines = [5000, 10000, 20000]
+
+## The number of the different kinds of faults
+numFaultIDs = 20
+
+#------------------------------------------------------------------------------
+
+class Output(object):
+    """An output of the logger recording the calls without the IDs, which
+    differ from one run to the other."""
+    def __init__(self):
+        """Construct the output."""
+        self.calls = []
+
+    def insertFlightLogLine(self, index, timestampString, text, isFault):
+        """Called when a line is inserted."""
+        self.calls.append(("insert", index, timestampString, text, isFault))
+
+    def removeFlightLogLine(self, index):
+        """Called when a line is removed."""
+        self.calls.append(("remove", index))
+
+    def addFault(self, id, timestampString, text):
+        """Called when a fault is added."""
+        self.calls.append(("addFault", timestampString, text))
+
+    def updateFault(self, id, timestampString, text):
+        """Called when a fault is updated."""
+        self.calls.append(("updateFault", timestampString, text))
+
+    def clearFault(self, id):
+        """Called when a fault is cleared."""
+        self.calls.append(("clearFault",))
+
+    def setRating(self, rating):
+        """Called when the rating has changed."""
+        self.calls.append(("setRating", rating))
+
+#------------------------------------------------------------------------------
+
+class ListLogger(Logger):
+    """The logger with the lines stored in a plain list and the rating
+    calculated from all the faults, as done earlier."""
+    def __init__(self, output):
+        """Construct the logger."""
+        super(ListLogger, self).__init__(output)
+        self._lines = []
+
+    @property
+    def faultLineIndexes(self):
+        """Get the indexes of the fault lines by checking every line."""
+        return [index for (index, entry) in enumerate(self._lines)
+                if entry.isFault]
+
+    def getRating(self):
+        """Get the rating by summing the scores of all faults."""
+        totalScore = 100
+        for fault in self._faults.values():
+            score = fault.score
+            if score==Logger.NO_GO_SCORE:
+                return -score
+            else:
+                totalScore -= score
+        return totalScore
+
+    def _addEntry(self, entry):
+        """Add the given entry with bisection and an insertion into the
+        list."""
+        self._entries[entry.id] = entry
+
+        if not self._lines or entry>self._lines[-1]:
+            index = len(self._lines)
+            self._lines.append(entry)
+        else:
+            index = bisect.bisect_left(self._lines, entry)
+            self._lines.insert(index, entry)
+
+        if entry.isFault:
+            self._addFault(entry)
+
+        self._output.insertFlightLogLine(index, entry.timestampString,
+                                         entry.text, entry.isFault)
+
+        return entry.id
+
+    def _removeEntry(self, id):
+        """Remove the given entry by searching the list backwards."""
+        entry = self._entries[id]
+        del self._entries[id]
+
+        for index in range(len(self._lines)-1, -1, -1):
+            if self._lines[index] is entry:
+                break
+        del self._lines[index]
+
+        if entry.isFault:
+            faultID = entry.faultID
+            fault = self._faults[faultID]
+            if not fault.removeEntry(entry):
+                del self._faults[faultID]
+
+        self._output.removeFlightLogLine(index)
+
+    def _addFault(self, entry):
+        """Add the given fault entry without maintaining the rating."""
+        faultID = entry.faultID
+        if faultID in self._faults:
+            self._faults[faultID].addEntry(entry)
+        else:
+            self._faults[faultID] = Logger.Fault(entry)
+
+#------------------------------------------------------------------------------
+
+def run(loggerClass, numLines, numUpdates, numQueries, seed):
+    """Build a log of the given number of lines with the given logger class,
+    perform the given number of updates on it and query the fault lines the
+    given number of times.
+
+    Returns a tuple of the times taken to build the log, by the updates and
+    by the queries, the output and the logger."""
+    rng = random.Random(seed)
+    output = Output()
+    logger = loggerClass(output)
+
+    timestamp = startTime
+    messageIDs = []
+    faultScores = {}
+
+    begin = time.perf_counter()
+    for i in range(0, numLines):
+        timestamp += 1.0
+        r = rng.random()
+        if r<0.05:
+            faultID = rng.randrange(numFaultIDs)
+            score = faultScores.get(faultID, 0) + rng.uniform(0.1, 2.0)
+            faultScores[faultID] = score
+            logger.fault(faultID, timestamp, "Fault %d" % (faultID,), score)
+        elif r<0.1:
+            messageIDs.append(logger.message(timestamp -
+                                             rng.uniform(1.0, 60.0),
+                                             "Earlier message %d" % (i,)))
+        else:
+            messageIDs.append(logger.message(timestamp, "Message %d" % (i,)))
+    buildTime = time.perf_counter() - begin
+
+    begin = time.perf_counter()
+    for i in range(0, numUpdates):
+        timestamp += 0.1
+        r = rng.random()
+        if r<0.7:
+            faultID = rng.randrange(numFaultIDs)
+            score = faultScores.get(faultID, 0) + rng.uniform(0.1, 2.0)
+            faultScores[faultID] = score
+            logger.fault(faultID, timestamp, "Fault %d updated" % (faultID,),
+                         score, updatePrevious = True)
+        elif r<0.9:
+            logger.updateLine(rng.choice(messageIDs), "Updated %d" % (i,))
+        else:
+            score = Logger.NO_GO_SCORE if r>0.95 else 1
+            id = logger.fault("late", timestamp, "Late fault %d" % (i,), score)
+            if id>=0:
+                logger.clearFault(id, "Cleared %d" % (i,))
+    updateTime = time.perf_counter() - begin
+
+    begin = time.perf_counter()
+    for i in range(0, numQueries):
+        logger.faultLineIndexes
+        logger.getRating()
+    queryTime = time.perf_counter() - begin
+
+    return (buildTime, updateTime, queryTime, output, logger)
+
+#------------------------------------------------------------------------------
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description =
+                                     "Benchmark the log store of the logger")
+    parser.add_argument("-n", "--num-lines", type = int, action = "append",
+                        help = "the number of the lines (default: 5000, "
+                        "10000 and 20000)")
+    parser.add_argument("-u", "--num-updates", type = int, default = 5000,
+                        help = "the number of the updates (default: 5000)")
+    parser.add_argument("-q", "--num-queries", type = int, default = 100,
+                        help = "the number of the queries of the fault "
+                        "lines (default: 100)")
+    parser.add_argument("-s", "--seed", type = int, default = 1,
+                        help = "the seed of the random numbers")
+    args = parser.parse_args()
+
+    result = 0
+    for numLines in args.num_lines if args.num_lines else defaultNumLines:
+        results = []
+        for loggerClass in [Logger, ListLogger]:
+            results.append(run(loggerClass, numLines, args.num_updates,
+                               args.num_queries, args.seed))
+
+        ((buildTime, updateTime, queryTime, output, logger),
+         (listBuildTime, listUpdateTime, listQueryTime, listOutput,
+          listLogger)) = results
+
+        same = logger.lines==listLogger.lines and \
+               logger.faultLineIndexes==listLogger.faultLineIndexes and \
+               logger.getRating()==listLogger.getRating() and \
+               output.calls==listOutput.calls
+        if not same:
+            result = 1
+
+        print("%5d lines, %4d faults: build %5.1f ms (list: %5.1f ms), "
+              "%d updates %6.1f ms (list: %6.1f ms), "
+              "%d queries %6.1f ms (list: %6.1f ms), %s" %
+              (len(logger.lines), len(logger.faultLineIndexes),
+               buildTime * 1000.0, listBuildTime * 1000.0,
+               args.num_updates, updateTime * 1000.0, listUpdateTime * 1000.0,
+               args.num_queries, queryTime * 1000.0, listQueryTime * 1000.0,
+               "same results" if same else "DIFFERENT RESULTS"))
+
+    return result
+
+#------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    sys.exit(main())
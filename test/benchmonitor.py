@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+
+# Benchmark of the updating of the monitor window
+#
+# Aircraft states of a climbing aircraft are produced at a given number of
+# samples per second and passed to the monitor window in a stand-in of the
+# main loop of the GUI, for a few seconds each. The window is hidden for the
+# middle half of the time in the second run with each rate. The number of the
+# widget updates (the setting of a text, a sensitivity or a markup) is
+# compared to the number the monitor window performed earlier, when it set
+# every widget for every state, whether it was visible or not. The time
+# taken by the formatting and the comparison of the values is also reported
+# (the cost of the widget updates themselves is not included). At the end,
+# the values displayed must be those of the last state.
+
+import os
+import sys
+import time
+import heapq
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from mlx.fs import AircraftState
+from mlx.gui.monitorupdater import MonitorUpdater
+
+#------------------------------------------------------------------------------
+
+## The numbers of samples per second measured by default
+defaultSampleRates = [5, 10, 20, 50]
+
+#------------------------------------------------------------------------------
+
+class MainLoop(object):
+    """A stand-in for the main loop of GLib running in the current thread."""
+    def __init__(self):
+        """Construct the main loop."""
+        self._timeouts = []
+        self._sequenceNumber = 0
+
+    def timeout_add(self, interval, function, *args):
+        """Schedule the given function to be called after the given number of
+        milliseconds."""
+        self._sequenceNumber += 1
+        heapq.heappush(self._timeouts,
+                       (time.monotonic() + interval / 1000.0,
+                        self._sequenceNumber, function, args))
+
+    def runUntil(self, end):
+        """Run the timeouts due until the given time."""
+        while True:
+            now = time.monotonic()
+            if self._timeouts and self._timeouts[0][0]<=now:
+                (_due, _number, function, args) = \
+                    heapq.heappop(self._timeouts)
+                function(*args)
+            elif now>=end:
+                break
+            else:
+                due = self._timeouts[0][0] if self._timeouts else end
+                time.sleep(max(0.0, min(due, end) - now))
+
+#------------------------------------------------------------------------------
+
+class StateGenerator(object):
+    """A generator of the aircraft states of a climbing aircraft."""
+    def __init__(self, seed):
+        """Construct the generator."""
+        self._random = random.Random(seed)
+        self._timestamp = 1700000000.0
+        self._altitude = 3000.0
+        self._heading = 90.0
+        self._fuel = [5000.0, 2000.0, 2000.0]
+
+    def next(self, interval):
+        """Get the next state, the given number of seconds after the previous
+        one."""
+        r = self._random
+        self._timestamp += interval
+        self._altitude += 2000.0 / 60.0 * interval
+        self._heading = (self._heading + 0.5 * interval) % 360.0
+        self._fuel = [fuel - 0.3 * interval for fuel in self._fuel]
+
+        s = AircraftState()
+        s.timestamp = self._timestamp
+        s.paused = False
+        s.trickMode = False
+        s.overspeed = False
+        s.stalled = False
+        s.onTheGround = False
+        s.antiIceOn = False
+        s.zfw = 50000.0
+        s.grossWeight = 50000.0 + sum(self._fuel)
+        s.heading = self._heading
+        s.pitch = 8.0 + r.gauss(0.0, 0.3)
+        s.bank = r.gauss(0.0, 0.5)
+        s.vs = 2000.0 + r.gauss(0.0, 50.0)
+        s.smoothedVS = 2000.0 + r.gauss(0.0, 5.0)
+        s.ias = 250.0 + r.gauss(0.0, 0.8)
+        s.smoothedIAS = 250.0 + r.gauss(0.0, 0.1)
+        s.mach = 0.45
+        s.groundSpeed = 280.0 + r.gauss(0.0, 0.3)
+        s.radioAltitude = self._altitude - 500.0
+        s.altitude = self._altitude
+        s.gLoad = 1.0 + r.gauss(0.0, 0.002)
+        s.flapsSet = 0.0
+        s.flaps = 0.0
+        s.altimeter = self._altitude
+        s.squawk = "2200"
+        s.nav1 = "113.80"
+        s.nav2 = None
+        s.qnh = 1013.0
+        s.fuel = [(tank, fuel) for (tank, fuel) in enumerate(self._fuel)]
+        s.n1 = [92.0 + r.gauss(0.0, 0.2), 92.0 + r.gauss(0.0, 0.2)]
+        s.rpm = None
+        s.reverser = [False, False]
+        s.navLightsOn = True
+        s.antiCollisionLightsOn = True
+        s.strobeLightsOn = True
+        s.landingLightsOn = self._altitude<10000.0
+        s.pitotHeatOn = True
+        s.parking = False
+        s.gearControlDown = False
+        s.gearsDown = False
+        s.spoilersArmed = False
+        s.spoilersExtension = 0.0
+        s.windSpeed = 20.0
+        s.windDirection = 270.0
+        s.latitude = 47.43
+        s.longitude = 19.26 + (self._timestamp - 1700000000.0) / 10000.0
+        s.elevatorTrim = 0.1
+        s.apMaster = True
+        s.apHeadingHold = True
+        s.apHeading = 90.0
+        s.xpdrC = True
+        s.apAltitudeHold = False
+        s.apAltitude = 15000.0
+        s.adf1 = None
+        s.adf2 = None
+        s.cog = 0.25
+        s.ils = None
+        s.nav1_obs = 90
+        s.nav2_obs = None
+        s.ils_obs = None
+        return s
+
+#------------------------------------------------------------------------------
+
+class Widgets(object):
+    """A stand-in for the widgets of the monitor window recording their
+    values."""
+    def __init__(self):
+        """Construct the widgets."""
+        self.values = [None] * len(MonitorUpdater.FIELDS)
+        self.numUpdates = 0
+
+    def apply(self, changes):
+        """Apply the given changes."""
+        for (index, value) in changes:
+            self.values[index] = value
+        self.numUpdates += len(changes)
+
+#------------------------------------------------------------------------------
+
+def run(sampleRate, duration, updateRate, hideWindow, seed):
+    """Produce states at the given rate for the given number of seconds.
+
+    Returns a tuple of the number of the states, the number of the widget
+    updates performed earlier, the number of the renderings and of the widget
+    updates performed by the updater, the time taken earlier and by the
+    updater, and whether the values displayed at the end are right."""
+    mainLoop = MainLoop()
+    widgets = Widgets()
+    updater = MonitorUpdater(widgets.apply, mainLoop.timeout_add, updateRate)
+    updater.setVisible(True)
+    generator = StateGenerator(seed)
+
+    numFields = len(MonitorUpdater.FIELDS)
+    numStates = int(duration * sampleRate)
+    numOldUpdates = 0
+    oldTime = 0.0
+    newTime = 0.0
+    state = None
+
+    begin = time.monotonic()
+    for i in range(0, numStates):
+        mainLoop.runUntil(begin + i / sampleRate)
+        if hideWindow:
+            updater.setVisible(i<numStates // 4 or i>=numStates * 3 // 4)
+
+        state = generator.next(1.0 / sampleRate)
+
+        t0 = time.perf_counter()
+        MonitorUpdater.getValues(state)
+        oldTime += time.perf_counter() - t0
+        # The landing lights label was set once, then only its sensitivity
+        numOldUpdates += numFields if i==0 else numFields - 1
+
+        t0 = time.perf_counter()
+        updater.setData(state)
+        newTime += time.perf_counter() - t0
+    mainLoop.runUntil(time.monotonic() +
+                      (2.0 / updateRate if updateRate>0 else 0.0))
+
+    right = widgets.values==MonitorUpdater.getValues(state)
+
+    return (numStates, numOldUpdates, updater.numRenders, widgets.numUpdates,
+            oldTime, newTime, right)
+
+#------------------------------------------------------------------------------
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description =
+                                     "Benchmark the updating of the "
+                                     "monitor window")
+    parser.add_argument("-r", "--sample-rate", type = int, action = "append",
+                        help = "the number of states per second (default: "
+                        "5, 10, 20 and 50)")
+    parser.add_argument("-u", "--update-rate", type = int,
+                        default = MonitorUpdater.DEFAULT_RATE,
+                        help = "the maximal number of updates per second "
+                        "(default: %d)" % (MonitorUpdater.DEFAULT_RATE,))
+    parser.add_argument("-d", "--duration", type = float, default = 2.0,
+                        help = "the number of seconds of each run "
+                        "(default: 2)")
+    parser.add_argument("-s", "--seed", type = int, default = 1,
+                        help = "the seed of the random numbers")
+    args = parser.parse_args()
+
+    result = 0
+    for sampleRate in args.sample_rate if args.sample_rate \
+        else defaultSampleRates:
+        for hideWindow in [False, True]:
+            (numStates, numOldUpdates, numRenders, numUpdates,
+             oldTime, newTime, right) = run(sampleRate, args.duration,
+                                            args.update_rate, hideWindow,
+                                            args.seed)
+            if not right:
+                result = 1
+
+            print("%3d states/s%s: %4d states, %3d renderings, "
+                  "%5d widget updates (earlier: %5d), "
+                  "%5.1f ms (earlier: %5.1f ms), %s" %
+                  (sampleRate, ", hidden half of the time" if hideWindow
+                   else "                        ",
+                   numStates, numRenders, numUpdates, numOldUpdates,
+                   newTime * 1000.0, oldTime * 1000.0,
+                   "right values" if right else "WRONG VALUES"))
+
+    return result
+
+#------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+
+# Benchmark counting the FSUIPC round trips of the handler
+#
+# The handler is driven against the pyuipc simulator with a request load
+# similar to that of a flight during the flare: the normal/monitoring data
+# every second, the hotkeys every half a second, the flare data every 0.1
+# seconds and a one-shot read (e.g. fuel or weights) every 2 seconds. The
+# number of reads actually performed and the number of requests served are
+# reported scaled to a minute.
+
+import os
+import sys
+import time
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+os.environ["FORCE_PYUIPC_SIM"] = "1"
+
+from mlx import fs
+from mlx import fsuipc
+from mlx import pyuipc_sim
+from mlx.watchdog import Watchdog
+
+#------------------------------------------------------------------------------
+
+class Counter(object):
+    """Counter of the reads and of the callback calls."""
+    def __init__(self):
+        """Construct the counter."""
+        self._lock = threading.Lock()
+        self.numReads = 0
+        self.numCallbacks = 0
+
+    def read(self, read):
+        """Get a read function counting the calls of the given one."""
+        def countingRead(data, checkOpened = True):
+            with self._lock:
+                self.numReads += 1
+            return read(data, checkOpened = checkOpened)
+        return countingRead
+
+    def callback(self, data, extra):
+        """Callback for the requests."""
+        with self._lock:
+            self.numCallbacks += 1
+
+#------------------------------------------------------------------------------
+
+def main():
+    """Run the benchmark."""
+    duration = float(sys.argv[1]) if len(sys.argv)>1 else 10.0
+
+    counter = Counter()
+    pyuipc_sim.read = counter.read(pyuipc_sim.read)
+
+    Watchdog().start()
+
+    handler = fsuipc.Handler(fs.ConnectionListener())
+    handler.start()
+    handler.connect()
+    while not handler._connected:
+        time.sleep(0.1)
+
+    normalData = fsuipc.Simulator.normalData[:]
+    fsuipc.GenericModel().addMonitoringData(normalData, None)
+    hotkeyData = [(0x3210 + i*4, "u")
+                  for i in range(0, pyuipc_sim.Values.HOTKEY_SIZE)]
+    flareData = fsuipc.Simulator.flareData1
+    oneShotData = [(0x3bfc, "d"), (0x30c0, "f")]
+
+    handler.requestPeriodicRead(1.0, normalData, counter.callback)
+    handler.requestPeriodicRead(0.5, hotkeyData, counter.callback)
+    handler.requestPeriodicRead(0.1, flareData, counter.callback)
+
+    startTime = time.time()
+    while time.time()<(startTime + duration):
+        handler.requestRead(oneShotData, counter.callback)
+        time.sleep(2.0)
+
+    scale = 60.0 / (time.time() - startTime)
+    print("Requests served per minute: %.0f" % (counter.numCallbacks * scale,))
+    print("Round trips per minute:     %.0f" % (counter.numReads * scale,))
+
+    handler.disconnect()
+
+#------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+
+# Benchmark of the recording of the raw telemetry
+#
+# The reads of the monitoring data of a 10-hour flight with the generic Boeing
+# 737 model are simulated: the fast tier is read every second during the
+# first and the last hour and every 4 seconds in cruise, the slow tier every
+# 2 seconds. The values typically changing in flight differ between the
+# frames. The frames are recorded into a telemetry file, and the time taken
+# per record and the size of the file are reported. The file is then read
+# back and the values are compared to the recorded ones.
+
+import os
+import sys
+import time
+import random
+import tempfile
+import contextlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+os.environ["FORCE_PYUIPC_SIM"] = "1"
+
+from mlx import const
+from mlx import fs
+from mlx import fsuipc
+from mlx import telemetry
+
+#------------------------------------------------------------------------------
+
+## The length of the simulated flight in seconds
+flightLength = 10 * 3600
+
+## The names of the monitoring data items changing in every frame
+changingItems = ["latitude", "longitude", "heading", "pitch", "bank", "ias",
+                 "groundSpeed", "vs", "radioAltitude", "altitude", "gLoad",
+                 "elevatorTrim", "zfw", "grossWeight", "mach"]
+
+#------------------------------------------------------------------------------
+
+def getTierData():
+    """Get the monitoring data, the tiers of its items, the data of the
+    tiers and the indices of the items changing in every frame."""
+    model = fsuipc.GenericModel()
+    model.setFSType(const.SIM_MSFSX)
+    data = fsuipc.Simulator.normalData[:]
+    with contextlib.redirect_stdout(None):
+        model.addMonitoringData(data, const.SIM_MSFSX)
+
+    tiers = [model.getMonitoringTier(i) for i in range(0, len(data))]
+    tierData = fs.MonitoringData(data, tiers).tierData
+
+    indices = [getattr(model, "_monidx_" + name) for name in changingItems]
+    indices += [model._engineStartIndex + i * 2 + 1
+                for i in range(0, model._numEngines)]
+
+    return (data, tiers, tierData, indices)
+
+def generateValue(type):
+    """Generate an initial value of the given type."""
+    if isinstance(type, int):
+        return b"x" * (-type)
+    elif type=="f":
+        return 1.5
+    else:
+        return 1000
+
+def runBenchmark(path, compress):
+    """Run the benchmark with the given compression setting.
+
+    Returns a tuple of the time per record in microseconds, the number of
+    records and the size of the file."""
+    (data, tiers, tierData, indices) = getTierData()
+
+    values = [generateValue(type) for (offset, type) in data]
+    fastData = tierData[const.MONITORING_TIER_FAST]
+    slowData = tierData[const.MONITORING_TIER_SLOW]
+
+    fastIndices = [i for i in range(0, len(data))
+                   if tiers[i]==const.MONITORING_TIER_FAST]
+    slowIndices = [i for i in range(0, len(data))
+                   if tiers[i]==const.MONITORING_TIER_SLOW]
+
+    generator = random.Random(42)
+    recorder = telemetry.Recorder(path, "fsuipc", compress = compress)
+
+    numRecords = 0
+    recordTime = 0.0
+    t = 0
+    nextSlow = 0
+    while t<flightLength:
+        for index in indices:
+            if isinstance(values[index], float):
+                values[index] += generator.random()
+            else:
+                values[index] += generator.randrange(-50, 50)
+
+        startTime = time.perf_counter()
+        recorder.simTime = float(t)
+        recorder.record(fastData, [values[i] for i in fastIndices])
+        numRecords += 1
+        if t>=nextSlow:
+            recorder.record(slowData, [values[i] for i in slowIndices])
+            numRecords += 1
+            nextSlow = t + 2
+        recordTime += time.perf_counter() - startTime
+
+        t += 4 if t>=3600 and t<flightLength - 3600 else 1
+
+    startTime = time.perf_counter()
+    recorder.close()
+    recordTime += time.perf_counter() - startTime
+
+    numRead = 0
+    for record in telemetry.Reader(path):
+        numRead += 1
+    assert numRead==numRecords
+
+    return (recordTime * 1e6 / numRecords, numRecords, os.path.getsize(path))
+
+def checkRoundTrip(path):
+    """Check that the values read back from a recording are the same as the
+    recorded ones."""
+    generator = random.Random(1)
+    dataSpec = [(0x1000, "d"), (0x2000, "f"), (0x3000, -8), (0x4000, "L"),
+                ("sim/dataref", 4)]
+    frames = []
+    for i in range(0, 1000):
+        frames.append([generator.randrange(-10, 10),
+                       generator.choice([1.0, 2.5, 3]),
+                       generator.choice([b"abc", b"def"]),
+                       generator.choice([0, 0xffffffffffffffff]),
+                       generator.choice([[1.0, 2.0], [1.0, None], None])])
+
+    recorder = telemetry.Recorder(path, "fsuipc", blockSize = 1024)
+    for frame in frames:
+        recorder.record(dataSpec, frame)
+    recorder.close()
+
+    records = list(telemetry.Reader(path))
+    assert len(records)==len(frames)
+    for (record, frame) in zip(records, frames):
+        assert record.values==frame
+        assert [type(v) for v in record.values]==[type(v) for v in frame]
+        assert record.schema.key==telemetry.Schema.getKey(dataSpec)
+
+#------------------------------------------------------------------------------
+
+def main():
+    """Run the benchmark."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "flight.mlxtlm")
+
+        checkRoundTrip(path)
+
+        for compress in [False, True]:
+            (timePerRecord, numRecords, size) = runBenchmark(path, compress)
+            print("%-14s %6d records, %5.1f us/record, file size: %6.2f MB" %
+                  ("compressed:" if compress else "uncompressed:",
+                   numRecords, timePerRecord, size / 1024.0 / 1024.0))
+
+#------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    main()
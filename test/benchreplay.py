@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+
+# Benchmark and determinism check of the replay of a recorded flight
+#
+# A scenario flight (by default the one of profile1.json with the Boeing
+# 737-800, see runscenarios.py) is performed with its telemetry being
+# recorded (see mlx.telemetry). The recording is then replayed twice
+# through the whole logger via mlx.pyuipc_replay: the FSUIPC handler reads
+# it on the virtual clock of the replay, the aircraft model decodes the
+# states, and the checkers and the logger handle them like in a real
+# flight. Instead of a scenario, an existing FSUIPC telemetry recording can
+# also be given along with the aircraft type it was recorded with.
+#
+# The recording and each replay run in a fresh process, since the backend
+# is selected when the FSUIPC module is imported, and the simulator and the
+# clock are global. The number of the log lines and the faults, the rating,
+# the time spent in handling the states and the wall time of each replay
+# are reported. The log lines, the faults and the rating of the two replays
+# must be the same, and those of the recorded flight as well, otherwise the
+# exit code is non-zero.
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import multiprocessing
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from runscenarios import scenariosDirectory, loadScenarios, runFlight, \
+    replayFlight
+
+#------------------------------------------------------------------------------
+
+## The path of the default scenario
+defaultScenarioPath = os.path.join(scenariosDirectory, "profile1.json")
+
+## The default aircraft type
+defaultAircraftType = "B738"
+
+#------------------------------------------------------------------------------
+
+def recordFlight(path, scenario, aircraftTypeName, recordingPath):
+    """Perform the flight of the given scenario with the given aircraft type
+    and record its telemetry into the given file.
+
+    Returns a tuple of the log lines, the faults and the rating."""
+    sys.stdout = open(os.devnull, "wt")
+    (stages, lines, faults, rating, duration) = \
+        runFlight(path, scenario, aircraftTypeName, recordingPath)
+    return (lines, faults, rating)
+
+def replay(path, aircraftTypeName, flightData):
+    """Replay the recording with the given path.
+
+    Returns a tuple of the log lines, the faults, the rating, the time spent
+    in handling the states and the wall time taken."""
+    sys.stdout = open(os.devnull, "wt")
+    begin = time.perf_counter()
+    (lines, faultLineIndexes, rating, statesTime) = \
+        replayFlight(path, aircraftTypeName, flightData)
+    return (lines, [lines[index] for index in faultLineIndexes], rating,
+            statesTime, time.perf_counter() - begin)
+
+def compare(result, reference):
+    """Compare the given results of a flight to the reference ones.
+
+    Returns the list of the differences."""
+    (lines1, faults1, rating1) = result[:3]
+    (lines2, faults2, rating2) = reference[:3]
+
+    differences = []
+    for (index, (line1, line2)) in enumerate(zip(lines1, lines2)):
+        if line1!=line2:
+            differences.append("line %d: '%s' instead of '%s'" %
+                               (index + 1, line1, line2))
+            break
+    if len(lines1)!=len(lines2):
+        differences.append("%d lines instead of %d" %
+                           (len(lines1), len(lines2)))
+    if faults1!=faults2:
+        differences.append("faults %s instead of %s" %
+                           (faults1, faults2))
+    if rating1!=rating2:
+        differences.append("rating %.1f instead of %.1f" % (rating1, rating2))
+    return differences
+
+#------------------------------------------------------------------------------
+
+def main():
+    """Record the flight and replay it twice."""
+    parser = argparse.ArgumentParser(description =
+                                     "Benchmark and check the replay of a "
+                                     "recorded flight")
+    parser.add_argument("-s", "--scenario", default = defaultScenarioPath,
+                        help = "the scenario of the flight to record "
+                        "(default: %s)" %
+                        (os.path.basename(defaultScenarioPath),))
+    parser.add_argument("-t", "--aircraft-type",
+                        default = defaultAircraftType,
+                        help = "the aircraft type (e.g. B738) of the flight "
+                        "(default: %s)" % (defaultAircraftType,))
+    parser.add_argument("-r", "--recording",
+                        help = "an FSUIPC telemetry recording to replay "
+                        "instead of recording a scenario flight")
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as directory, \
+         context.Pool(processes = 1, maxtasksperchild = 1) as pool:
+        if args.recording:
+            path = args.recording
+            flightData = {}
+            reference = None
+        else:
+            runs = [run for run in loadScenarios([args.scenario])
+                    if run[2]==args.aircraft_type]
+            if not runs:
+                print("The scenario has no flight with %s" %
+                      (args.aircraft_type,), file = sys.stderr)
+                return 1
+            (scenarioPath, scenario, aircraftTypeName) = runs[0]
+            path = os.path.join(directory, "flight.mlxtlm")
+            flightData = scenario.get("flight", {})
+            reference = pool.apply(recordFlight,
+                                   (scenarioPath, scenario,
+                                    aircraftTypeName, path))
+            print("recorded: %d lines, %d faults, rating %.1f, %d kB" %
+                  (len(reference[0]), len(reference[1]), reference[2],
+                   os.path.getsize(path) // 1024))
+
+        results = []
+        for i in range(0, 2):
+            result = pool.apply(replay, (path, args.aircraft_type,
+                                         flightData))
+            print("run %d: %d lines, %d faults, rating %.1f, "
+                  "states: %.0f ms, total: %.2f s" %
+                  (i + 1, len(result[0]), len(result[1]), result[2],
+                   result[3] * 1000.0, result[4]))
+            results.append(result)
+
+    failures = []
+    if not results[0][0]:
+        failures.append("no lines were logged")
+    failures += ["the replays differ: " + difference
+                 for difference in compare(results[1], results[0])]
+    if reference is not None:
+        failures += ["the replay differs from the recorded flight: " +
+                     difference
+                     for difference in compare(results[0], reference)]
+
+    for failure in failures:
+        print(failure)
+    return 1 if failures else 0
+
+#------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+
+# Micro-benchmark of the scheduler of the periodic requests
+#
+# A number of periodic requests with periods between 0.1 and 2 seconds are
+# scheduled for a simulated period of time, while some of the requests are
+# cleared and new ones are added regularly. The time taken by the scheduler is
+# compared to that of the sorted list the handlers used earlier.
+
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from mlx.scheduler import Scheduler, getNextFire
+
+#------------------------------------------------------------------------------
+
+class Request(object):
+    """A periodic request for the benchmark."""
+    def __init__(self, id, period, now):
+        """Construct the request."""
+        self.id = id
+        self._period = period
+        self._firstFire = now
+        self.nextFire = now
+
+    def process(self, now):
+        """Process the request, i.e. calculate the next firing time."""
+        self.nextFire = getNextFire(self._firstFire, self._period, now)
+
+    def __lt__(self, other):
+        """Less-than comparison by the firing times"""
+        return self.nextFire < other.nextFire
+
+#------------------------------------------------------------------------------
+
+class ListScheduler(object):
+    """The scheduling as done by the handlers with a list sorted at every
+    wakeup."""
+    def __init__(self):
+        """Construct the scheduler."""
+        self._requests = []
+
+    @property
+    def nextFire(self):
+        """Get the next firing time."""
+        self._requests.sort()
+        return self._requests[0].nextFire if self._requests else None
+
+    def add(self, request):
+        """Add the given request."""
+        self._requests.append(request)
+
+    def remove(self, id):
+        """Remove the request with the given ID."""
+        for i in range(0, len(self._requests)):
+            if self._requests[i].id==id:
+                del self._requests[i]
+                return True
+        return False
+
+    def run(self, now):
+        """Process the due requests."""
+        while self._requests:
+            self._requests.sort()
+            request = self._requests[0]
+            if request.nextFire>now:
+                break
+            request.process(now)
+
+#------------------------------------------------------------------------------
+
+class HeapScheduler(Scheduler):
+    """The heap-based scheduler with the same interface as the list-based
+    one."""
+    def run(self, now):
+        """Process the due requests."""
+        for request in self.popDue(now):
+            request.process(now)
+            self.reschedule(request)
+
+#------------------------------------------------------------------------------
+
+def runBenchmark(scheduler, numRequests, duration):
+    """Run the benchmark with the given scheduler.
+
+    Returns the time taken in seconds."""
+    random.seed(42)
+
+    now = 0.0
+    nextID = 1
+    ids = []
+    for i in range(0, numRequests):
+        scheduler.add(Request(nextID, random.uniform(0.1, 2.0), now))
+        ids.append(nextID)
+        nextID += 1
+
+    startTime = time.perf_counter()
+    while now<duration:
+        scheduler.run(now)
+
+        if random.random()<0.1:
+            id = ids.pop(random.randrange(0, len(ids)))
+            scheduler.remove(id)
+            scheduler.add(Request(nextID, random.uniform(0.1, 2.0), now))
+            ids.append(nextID)
+            nextID += 1
+
+        now = scheduler.nextFire
+    return time.perf_counter() - startTime
+
+#------------------------------------------------------------------------------
+
+def main():
+    """Run the benchmark."""
+    duration = float(sys.argv[1]) if len(sys.argv)>1 else 60.0
+
+    for numRequests in [10, 100, 500, 1000]:
+        listTime = runBenchmark(ListScheduler(), numRequests, duration)
+        heapTime = runBenchmark(HeapScheduler(), numRequests, duration)
+        print("%5d requests: list: %8.3f s, heap: %8.3f s" %
+              (numRequests, listTime, heapTime))
+
+#------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    main()
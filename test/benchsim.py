@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+
+# Benchmark of the reads from the simulated FSUIPC
+#
+# The monitoring data of the generic Boeing 737 model is read from the
+# PyUIPC simulator in three ways: prepared in advance, as an unprepared list
+# and after writing a few offsets, i.e. with the image refreshed before the
+# read. The time taken per read is reported, along with the number of
+# flights that could be monitored at the fastest monitoring period by one
+# thread when the image is refreshed for every read.
+
+import os
+import sys
+import time
+import contextlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+os.environ["FORCE_PYUIPC_SIM"] = "1"
+
+from mlx import const
+from mlx import fs
+from mlx import fsuipc
+from mlx import pyuipc_sim
+
+#------------------------------------------------------------------------------
+
+## The number of reads to perform for each measurement
+numReads = 20000
+
+#------------------------------------------------------------------------------
+
+def getMonitoringData():
+    """Get the monitoring data of the Boeing 737 model."""
+    model = fsuipc.B737Model()
+    model.setFSType(const.SIM_MSFSX)
+    data = fsuipc.Simulator.normalData[:]
+    with contextlib.redirect_stdout(None):
+        model.addMonitoringData(data, const.SIM_MSFSX)
+    return data
+
+def measure(function):
+    """Call the given function numReads times and return the time per call
+    in microseconds."""
+    startTime = time.perf_counter()
+    for i in range(0, numReads):
+        function(i)
+    return (time.perf_counter() - startTime) * 1e6 / numReads
+
+#------------------------------------------------------------------------------
+
+def main():
+    """Run the benchmark."""
+    pyuipc_sim.open(pyuipc_sim.SIM_FSX)
+
+    data = getMonitoringData()
+    preparedData = pyuipc_sim.prepare_data(data)
+
+    def write(i):
+        pyuipc_sim.write([(0x0560, "l", i * 1000000),
+                          (0x0580, "d", i * 10000),
+                          (0x02bc, "d", i % 40000),
+                          (0x0570, "l", i * 100000000)])
+
+    prepared = measure(lambda i: pyuipc_sim.read(preparedData))
+    unprepared = measure(lambda i: pyuipc_sim.read(data))
+    writeOnly = measure(write)
+    refreshed = measure(lambda i: (write(i), pyuipc_sim.read(preparedData)))
+
+    print("%d offsets read" % (len(data),))
+    print("prepared:       %6.1f us/read" % (prepared,))
+    print("unprepared:     %6.1f us/read" % (unprepared,))
+    print("after a write:  %6.1f us/read" % (refreshed - writeOnly,))
+    print("flights at a period of %.1f s: %d" %
+          (fs.MONITORING_PERIOD_FAST,
+           fs.MONITORING_PERIOD_FAST * 1e6 / refreshed))
+
+#------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    main()
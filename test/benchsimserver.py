@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+
+# Benchmark of the remote control server of the PyUIPC simulator
+#
+# The server is started when the simulator module is imported. A number of
+# clients, each in its own thread, then send requests to it, each request
+# consisting of a batch of calls alternating between reading two offsets and
+# writing one. The throughput in calls per second is reported for different
+# numbers of clients and batch sizes. Since the clients run in the same
+# process as the server, they compete with it for the interpreter.
+
+import os
+import sys
+import time
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+os.environ["FORCE_PYUIPC_SIM"] = "1"
+
+from mlx import pyuipc_sim
+
+#------------------------------------------------------------------------------
+
+## The number of calls each client performs in a measurement
+numCalls = 20000
+
+## The combinations of the number of clients and the batch size to measure
+measurements = [(1, 1), (1, 32), (16, 1), (16, 32)]
+
+#------------------------------------------------------------------------------
+
+def connect():
+    """Connect to the server, retrying until it is started."""
+    for i in range(0, 50):
+        try:
+            return pyuipc_sim.Client("localhost")
+        except OSError:
+            time.sleep(0.1)
+    return pyuipc_sim.Client("localhost")
+
+def runClient(batchSize):
+    """Perform the calls of a client with the given batch size."""
+    client = connect()
+
+    calls = []
+    for i in range(0, batchSize):
+        if i%2==0:
+            calls.append((pyuipc_sim.CALL_READ,
+                          [(0x0560, "l"), (0x02bc, "d")]))
+        else:
+            calls.append((pyuipc_sim.CALL_WRITE, [(0x0366, "H", i%2)]))
+
+    for i in range(0, numCalls // batchSize):
+        client.call(calls)
+
+    client.quit()
+
+def measure(numClients, batchSize):
+    """Measure the throughput with the given number of clients and batch
+    size.
+
+    Returns the number of calls per second."""
+    threads = [threading.Thread(target = runClient, args = (batchSize,))
+               for i in range(0, numClients)]
+
+    startTime = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - startTime
+
+    return numClients * (numCalls // batchSize) * batchSize / duration
+
+#------------------------------------------------------------------------------
+
+def main():
+    """Run the benchmark."""
+    connect().quit()
+    for (numClients, batchSize) in measurements:
+        print("%2d clients, batch size %2d: %8.0f calls/s" %
+              (numClients, batchSize, measure(numClients, batchSize)))
+
+#------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    main()
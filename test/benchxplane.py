@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+
+# Check and load benchmark of the X-Plane backend against the XPLRA stand-in
+#
+# A server of mlx.xplra_sim is started in-process, and the X-Plane simulator
+# interface of the logger (mlx.xplane.Simulator with its Handler) is
+# connected to it through the xplra client of the same module. First, for
+# each aircraft preset of the stand-in, it is checked that the right
+# aircraft model is selected, that the ZFW, the weights and the fuel can be
+# queried, that a message can be shown and that a hotkey press is reported.
+# Then a number of simulators, each with its own connection, monitor the
+# aircraft concurrently on a clock running a given number of times faster
+# than the real one, and the number of aircraft states received per second
+# is reported, with and without the injected latency, along with the number
+# of round trips per state. Finally the flare data is sampled every 0.1
+# seconds of the clock, and the number of samples per second of the clock
+# (ideally 10) and the number of round trips per sample are reported.
+#
+# Everything is done both with the data pushed by the stand-in and with the
+# data polled, as with a plugin not supporting subscriptions.
+
+import os
+import sys
+import time
+import argparse
+import threading
+import contextlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+os.environ["FORCE_XPLRA_SIM"] = "1"
+
+from mlx import const
+from mlx import xplane
+from mlx import xplra_sim
+from mlx.config import Config, Hotkey
+from mlx.watchdog import Watchdog
+from mlx.clock import ScaledClock, getClock, setClock
+
+#------------------------------------------------------------------------------
+
+## The expected model names for the aircraft presets
+expectedModels = { "generic" : "X-Plane/Generic Boeing 737",
+                   "zibo" : "Zibo Boeing 737-800",
+                   "levelup736" : "LevelUp Boeing 737-600",
+                   "levelup737" : "LevelUp Boeing 737-700",
+                   "levelup738" : "LevelUp Boeing 737-800" }
+
+## The maximal number of seconds to wait for a result
+TIMEOUT = 10.0
+
+## The plugin versions reported by the stand-in for the modes
+xplraVersions = { "push" : xplra_sim.PUSH_XPLRA_VERSION,
+                  "poll" : xplra_sim.PUSH_XPLRA_VERSION - 1 }
+
+#------------------------------------------------------------------------------
+
+class ConnectionListener(object):
+    """The connection listener of a simulator."""
+    def __init__(self, port):
+        """Construct the listener for the server on the given port."""
+        self.config = Config()
+        self.config.xplaneRemote = True
+        self.config.xplaneAddress = "localhost:%d" % (port,)
+        self.connectedEvent = threading.Event()
+        self.failed = False
+
+    def connected(self, fsType, descriptor):
+        """Called when the simulator is connected."""
+        self.connectedEvent.set()
+
+    def connectionFailed(self):
+        """Called when the connection has failed."""
+        self.failed = True
+        self.connectedEvent.set()
+
+    def disconnected(self):
+        """Called when the simulator is disconnected."""
+        pass
+
+class Flight(object):
+    """The flight of an aircraft."""
+    def __init__(self):
+        """Construct the flight, which is always taking off, so that it is
+        monitored at the fastest period."""
+        self.stage = const.STAGE_TAKEOFF
+
+class Aircraft(object):
+    """An aircraft counting the states it receives."""
+    def __init__(self):
+        """Construct the aircraft."""
+        self.type = const.AIRCRAFT_B738
+        self.flight = Flight()
+        self.modelName = None
+        self.numStates = 0
+        self.modelEvent = threading.Event()
+
+    def modelChanged(self, timestamp, aircraftName, modelName):
+        """Called when the model of the aircraft has changed."""
+        self.modelName = modelName
+        self.modelEvent.set()
+
+    def handleState(self, aircraftState):
+        """Handle the given state."""
+        self.numStates += 1
+
+#------------------------------------------------------------------------------
+
+def connect(port):
+    """Connect a simulator to the server on the given port.
+
+    Returns the simulator and the aircraft."""
+    listener = ConnectionListener(port)
+    simulator = xplane.Simulator(listener, connectAttempts = 3)
+    aircraft = Aircraft()
+    simulator.connect(aircraft)
+    if not listener.connectedEvent.wait(TIMEOUT) or listener.failed:
+        raise RuntimeError("could not connect to the server")
+    return (simulator, aircraft)
+
+def disconnect(simulator):
+    """Disconnect the given simulator and wait for its handler to have
+    disconnected."""
+    simulator.disconnect()
+    deadline = time.time() + TIMEOUT
+    while simulator._handler._connected and time.time()<deadline:
+        time.sleep(0.01)
+
+def waitResult(request):
+    """Call the given function with a callback, and wait for the callback to
+    be called.
+
+    Returns the arguments of the callback."""
+    result = []
+    event = threading.Event()
+
+    def callback(*args):
+        result.append(args)
+        event.set()
+
+    request(callback)
+    if not event.wait(TIMEOUT):
+        raise RuntimeError("no result")
+    return result[0]
+
+def startServer(table, mode, latency = 0.0):
+    """Start a server for the given table in the given mode with the given
+    latency."""
+    server = xplra_sim.Server(table, port = 0, latency = latency,
+                              xplraVersion = xplraVersions[mode])
+    server.start()
+    server.waitReady()
+    return server
+
+def checkPreset(aircraftPreset, mode):
+    """Check the operation of the simulator with the given aircraft preset
+    in the given mode.
+
+    Returns the list of the failures."""
+    server = startServer(xplra_sim.DatarefTable(aircraft = aircraftPreset),
+                         mode)
+
+    failures = []
+    (simulator, aircraft) = connect(server.port)
+    try:
+        if simulator._handler.pushing!=(mode=="push"):
+            failures.append("data is %s" %
+                            ("pushed" if simulator._handler.pushing
+                             else "polled",))
+        simulator.startMonitoring()
+        aircraft.modelEvent.wait(TIMEOUT)
+        if aircraft.modelName!=expectedModels[aircraftPreset]:
+            failures.append("model is '%s' instead of '%s'" %
+                            (aircraft.modelName,
+                             expectedModels[aircraftPreset]))
+
+        (zfw,) = waitResult(simulator.requestZFW)
+        (dow, payload, zfw2, grossWeight) = \
+            waitResult(simulator.requestWeights)
+        if abs(zfw - zfw2)>0.1:
+            failures.append("ZFW differs: %.1f != %.1f" % (zfw, zfw2))
+        (fuel,) = waitResult(simulator.getFuel)
+        if not fuel:
+            failures.append("no fuel tanks")
+
+        simulator.sendMessage("Hello, stand-in", duration = 3)
+        hotkeys = []
+        simulator.listenHotkeys([Hotkey(ctrl = True, key = "0")],
+                                lambda id, pressed: hotkeys.append(pressed))
+        deadline = time.time() + TIMEOUT
+        while not hotkeys and time.time()<deadline:
+            server.pressHotkey(ord("0") | xplra_sim.HOTKEY_MODIFIER_CONTROL)
+            time.sleep(0.1)
+        if hotkeys!=[[0]]:
+            failures.append("hotkey presses: %s" % (hotkeys,))
+        if ("Hello, stand-in", 3.0) not in \
+           [(text.replace("[MLX] ", ""), duration)
+            for (text, duration) in server.messages]:
+            failures.append("message not shown: %s" % (server.messages,))
+    finally:
+        simulator.stopMonitoring()
+        disconnect(simulator)
+        server.stop()
+
+    return failures
+
+def measure(numFlights, duration, latency, mode):
+    """Monitor the given number of flights concurrently for the given
+    number of seconds with the given latency of the server in the given
+    mode.
+
+    Returns the number of states received per second and the number of
+    round trips per state."""
+    server = startServer(xplra_sim.DatarefTable(aircraft = "zibo"), mode,
+                         latency = latency)
+
+    flights = [connect(server.port) for i in range(0, numFlights)]
+    for (simulator, aircraft) in flights:
+        simulator.startMonitoring()
+    for (simulator, aircraft) in flights:
+        aircraft.modelEvent.wait(TIMEOUT)
+
+    startStates = sum([aircraft.numStates for (_, aircraft) in flights])
+    startCommands = server.numCommands
+    time.sleep(duration)
+    numStates = sum([aircraft.numStates for (_, aircraft) in flights]) - \
+                startStates
+    numCommands = server.numCommands - startCommands
+
+    for (simulator, aircraft) in flights:
+        simulator.stopMonitoring()
+        disconnect(simulator)
+    server.stop()
+
+    return (numStates / duration, numCommands / max(1, numStates))
+
+def measureFlare(duration, latency, mode):
+    """Sample the flare data every 0.1 seconds of the clock for the given
+    number of real seconds with the given latency of the server in the given
+    mode.
+
+    Returns the number of samples per second of the clock and the number of
+    round trips per sample."""
+    server = startServer(xplra_sim.DatarefTable(aircraft = "zibo"), mode,
+                         latency = latency)
+    (simulator, aircraft) = connect(server.port)
+
+    samples = []
+    handler = simulator._handler
+    id = handler.requestPeriodicRead(0.1, xplane.Simulator.flareData1,
+                                     lambda data, extra:
+                                     samples.append(data[0]))
+    begin = getClock().time()
+    startCommands = server.numCommands
+    time.sleep(duration)
+    numSamples = len(samples)
+    numCommands = server.numCommands - startCommands
+    elapsed = getClock().time() - begin
+    handler.clearPeriodic(id)
+
+    disconnect(simulator)
+    server.stop()
+
+    return (numSamples / elapsed, numCommands / max(1, numSamples))
+
+#------------------------------------------------------------------------------
+
+def main():
+    """Run the checks and the benchmark."""
+    parser = argparse.ArgumentParser(description =
+                                     "Check and benchmark the X-Plane "
+                                     "backend against the XPLRA stand-in")
+    parser.add_argument("-n", "--num-flights", type = int, action = "append",
+                        help = "the number of concurrent flights "
+                        "(default: 1, 4 and 16)")
+    parser.add_argument("-s", "--scale", type = float, default = 100.0,
+                        help = "the clock scale (default: 100)")
+    parser.add_argument("-d", "--duration", type = float, default = 3.0,
+                        help = "the duration of a measurement in seconds "
+                        "(default: 3)")
+    parser.add_argument("-l", "--latency", type = float, default = 0.001,
+                        help = "the injected latency in seconds "
+                        "(default: 0.001)")
+    args = parser.parse_args()
+
+    Watchdog()
+
+    result = 0
+    for mode in ["push", "poll"]:
+        for aircraftPreset in sorted(expectedModels):
+            with contextlib.redirect_stdout(None):
+                failures = checkPreset(aircraftPreset, mode)
+            print("%s %-10s %s" % (mode, aircraftPreset,
+                                   "ok" if not failures
+                                   else "; ".join(failures)))
+            if failures:
+                result = 1
+
+    setClock(ScaledClock(args.scale))
+    for numFlights in args.num_flights if args.num_flights else [1, 4, 16]:
+        for latency in [0.0, args.latency]:
+            for mode in ["push", "poll"]:
+                with contextlib.redirect_stdout(None):
+                    (rate, roundTrips) = measure(numFlights, args.duration,
+                                                 latency, mode)
+                print("%s %2d flights, latency %.1f ms: %8.1f states/s, "
+                      "%.2f round trips/state" %
+                      (mode, numFlights, latency * 1000.0, rate, roundTrips))
+
+    for mode in ["push", "poll"]:
+        with contextlib.redirect_stdout(None):
+            (rate, roundTrips) = measureFlare(args.duration, args.latency,
+                                              mode)
+        print("%s flare sampling, latency %.1f ms: %5.2f samples/s, "
+              "%.2f round trips/sample" %
+              (mode, args.latency * 1000.0, rate, roundTrips))
+
+    return result
+
+#------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+
+# Parity check of the FSUIPC aircraft state decoders
+#
+# Pseudo-random, but reproducible monitoring data frames are decoded by every
+# generic and registered special FSUIPC aircraft model for the different
+# simulator types, and the digests of the resulting states are compared to
+# the ones recorded in decoderparity.json. The states must be bit-identical,
+# so any change of the decoders must keep the digests unchanged.
+#
+# Run with "record" as the argument to record the digests with the current
+# decoders.
+
+import os
+import sys
+import json
+import random
+import hashlib
+import contextlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+os.environ["FORCE_PYUIPC_SIM"] = "1"
+
+from mlx import const
+from mlx import fsuipc
+
+#------------------------------------------------------------------------------
+
+## The file containing the recorded digests
+digestsPath = os.path.join(os.path.dirname(__file__), "decoderparity.json")
+
+## The number of frames decoded by each model
+numFrames = 25
+
+## The simulator types the models are checked with
+fsTypes = [const.SIM_MSFS9, const.SIM_MSFSX, const.SIM_P3D,
+           const.SIM_MSFS2020]
+
+## The flight stages cycled through by the frames
+stages = [const.STAGE_BOARDING, const.STAGE_TAKEOFF, const.STAGE_CLIMB,
+          const.STAGE_CRUISE, const.STAGE_DESCENT, const.STAGE_LANDING]
+
+## The ranges of the values of the integer types
+integerRanges = { "b" : (0, 0xff), "c" : (-0x80, 0x7f),
+                  "H" : (0, 0xffff), "h" : (-0x8000, 0x7fff),
+                  "u" : (0, 0xffffffff), "d" : (-0x80000000, 0x7fffffff),
+                  "L" : (0, 0xffffffffffffffff),
+                  "l" : (-0x8000000000000000, 0x7fffffffffffffff) }
+
+#------------------------------------------------------------------------------
+
+class Flight(object):
+    """A flight for the check."""
+    def __init__(self):
+        """Construct the flight."""
+        self.stage = None
+
+class Aircraft(object):
+    """An aircraft for the check."""
+    def __init__(self, type):
+        """Construct the aircraft."""
+        self.type = type
+        self.flight = Flight()
+
+#------------------------------------------------------------------------------
+
+def getModelClasses():
+    """Get the model classes to check along with the aircraft types to check
+    them with."""
+    modelClasses = [(fsuipc.GenericModel, const.AIRCRAFT_B738)]
+    for (type, modelClass) in sorted(fsuipc._genericModels.items()):
+        if modelClass not in [c for (c, t) in modelClasses]:
+            modelClasses.append((modelClass, type))
+
+    specialTypes = { fsuipc.PMDGBoeing737NGModel: const.AIRCRAFT_B738,
+                     fsuipc.DreamwingsDH8DModel: const.AIRCRAFT_DH8D,
+                     fsuipc.MajesticDH8DModel: const.AIRCRAFT_DH8D,
+                     fsuipc.DAF70Model: const.AIRCRAFT_F70,
+                     fsuipc.PTT154Model: const.AIRCRAFT_T154 }
+    for modelClass in fsuipc.AircraftModel.specialModels:
+        modelClasses.append((modelClass, specialTypes[modelClass]))
+
+    return modelClasses
+
+def generateValue(generator, model, index, type):
+    """Generate a value of the given type for the given item."""
+    if isinstance(type, int):
+        return bytes([generator.getrandbits(7) for i in range(0, -type)])
+    elif type=="f":
+        return (generator.random() - 0.5) * 1e5
+    elif index==model._monidx_flapsControl:
+        return generator.getrandbits(14) % 16384
+    else:
+        (minValue, maxValue) = integerRanges[type]
+        return minValue + generator.getrandbits(64) % (maxValue - minValue + 1)
+
+def generateFrames(model, data, seed):
+    """Generate the frames for the given model and monitoring data.
+
+    Each item of a frame changes with a probability of 0.25 compared to the
+    previous frame, so that both the changed and the unchanged items are
+    decoded."""
+    generator = random.Random(seed)
+
+    frames = []
+    values = [None] * len(data)
+    for i in range(0, numFrames):
+        values = values[:]
+        for (index, (offset, type)) in enumerate(data):
+            if values[index] is None or generator.random()<0.25:
+                values[index] = generateValue(generator, model, index, type)
+        frames.append(values)
+    return frames
+
+def getDigest(state):
+    """Get the digest of the given state."""
+    items = sorted([(name, value) for (name, value) in vars(state).items()
+                    if name!="changeMask"])
+    return hashlib.sha1(repr(items).encode("utf-8")).hexdigest()[:16]
+
+def getDigests(modelClass, type, fsType):
+    """Get the digests of the states decoded by the given model class for the
+    given simulator type."""
+    aircraft = Aircraft(type)
+
+    model = modelClass()
+    model.setFSType(fsType)
+    data = fsuipc.Simulator.normalData[:]
+
+    digests = []
+    with contextlib.redirect_stdout(None):
+        model.addMonitoringData(data, fsType)
+        frames = generateFrames(model, data,
+                                "%s/%d" % (modelClass.__name__, fsType))
+        for (i, frame) in enumerate(frames):
+            aircraft.flight.stage = stages[i % len(stages)]
+            state = model.getNextAircraftState(aircraft, i, frame)
+            digests.append(getDigest(state))
+
+    return digests
+
+def getAllDigests():
+    """Get the digests for all model classes and simulator types."""
+    allDigests = {}
+    for (modelClass, type) in getModelClasses():
+        for fsType in fsTypes:
+            key = "%s/%d" % (modelClass.__name__, fsType)
+            allDigests[key] = getDigests(modelClass, type, fsType)
+    return allDigests
+
+#------------------------------------------------------------------------------
+
+def main():
+    """Record or check the digests."""
+    allDigests = getAllDigests()
+
+    if len(sys.argv)>1 and sys.argv[1]=="record":
+        with open(digestsPath, "wt") as f:
+            json.dump(allDigests, f, indent = 0, sort_keys = True)
+        print("Recorded the digests of %d cases" % (len(allDigests),))
+        return 0
+
+    with open(digestsPath, "rt") as f:
+        recordedDigests = json.load(f)
+
+    numFailed = 0
+    for (key, digests) in sorted(allDigests.items()):
+        if key not in recordedDigests:
+            print("%s: no recorded digests" % (key,))
+            numFailed += 1
+            continue
+        for (i, (digest, recordedDigest)) in \
+            enumerate(zip(digests, recordedDigests[key])):
+            if digest!=recordedDigest:
+                print("%s: the state of frame %d differs" % (key, i))
+                numFailed += 1
+                break
+
+    print("%d of %d cases passed" % (len(allDigests) - numFailed,
+                                     len(allDigests)))
+    return 1 if numFailed>0 else 0
+
+#------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+
+# Parity check of the stage-indexed dispatch of the checkers
+#
+# The aircraft calls only those checkers with a state which are interested in
+# the current flight stage (see mlx.acft.Aircraft.dispatchByStage). This
+# should not change the results, so recorded flights are replayed through
+# the whole logger both with the dispatch and with all checkers called for
+# each state, and the log lines, the faults and the rating must be the
+# same.
+#
+# The flights are recorded by running the scenarios (see runscenarios.py)
+# for each of their aircraft types with the telemetry being recorded (see
+# mlx.telemetry). Further FSUIPC telemetry recordings can be given on the
+# command line along with the aircraft type they were recorded with. The
+# recordings are replayed via mlx.pyuipc_replay, i.e. they are read by the
+# FSUIPC handler and decoded by the aircraft model like in a real flight.
+#
+# Each recording and replay runs in a fresh process, since the simulator,
+# the replay and the clock are global. The time spent in handling the
+# states is reported for both replays, and the exit code is non-zero if any
+# of the flights differs.
+
+import os
+import sys
+import argparse
+import tempfile
+import multiprocessing
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from runscenarios import scenariosDirectory, loadScenarios, runFlight, \
+    replayFlight
+
+#------------------------------------------------------------------------------
+
+def runTask(task):
+    """Run the given task in the current process.
+
+    A task is a tuple of the kind ("record" or "replay") and the arguments
+    of the corresponding function."""
+    sys.stdout = open(os.devnull, "wt")
+    (kind, args) = task
+    if kind=="record":
+        runFlight(*args)
+        return None
+    else:
+        return replayFlight(*args)
+
+def runTasks(pool, tasks):
+    """Run the given tasks in the given pool.
+
+    Returns the list of the results."""
+    return pool.map(runTask, tasks, chunksize = 1)
+
+def compare(withDispatch, withoutDispatch):
+    """Compare the results of the replays with and without the dispatch.
+
+    Returns the list of the differences. A replay that logged nothing is
+    also reported, since it cannot prove anything."""
+    (lines1, faults1, rating1, _) = withDispatch
+    (lines2, faults2, rating2, _) = withoutDispatch
+
+    differences = []
+    if not lines1:
+        differences.append("no lines were logged")
+    for (index, (line1, line2)) in enumerate(zip(lines1, lines2)):
+        if line1!=line2:
+            differences.append("line %d: '%s' instead of '%s'" %
+                               (index + 1, line1, line2))
+            break
+    if len(lines1)!=len(lines2):
+        differences.append("%d lines instead of %d" %
+                           (len(lines1), len(lines2)))
+    if faults1!=faults2:
+        differences.append("faults on lines %s instead of %s" %
+                           (faults1, faults2))
+    if rating1!=rating2:
+        differences.append("rating %.1f instead of %.1f" % (rating1, rating2))
+    return differences
+
+#------------------------------------------------------------------------------
+
+def main():
+    """Record the flights and check the parity of their replays."""
+    parser = argparse.ArgumentParser(description =
+                                     "Check the parity of the stage-indexed "
+                                     "dispatch of the checkers")
+    parser.add_argument("-j", "--jobs", type = int,
+                        default = 2 * multiprocessing.cpu_count(),
+                        help = "the number of processes to run in parallel")
+    parser.add_argument("-r", "--recording", nargs = 2, action = "append",
+                        default = [], metavar = ("PATH", "TYPE"),
+                        help = "an FSUIPC telemetry recording to replay as "
+                        "well, and the aircraft type (e.g. B738) it was "
+                        "recorded with")
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as directory, \
+         context.Pool(processes = max(1, args.jobs),
+                      maxtasksperchild = 1) as pool:
+        flights = []
+        recordTasks = []
+        paths = [os.path.join(scenariosDirectory, name)
+                 for name in sorted(os.listdir(scenariosDirectory))
+                 if name.endswith(".json")]
+        for (scenarioPath, scenario, aircraftTypeName) in \
+            loadScenarios(paths):
+            name = os.path.basename(scenarioPath)
+            path = os.path.join(directory, "%s-%s.mlxtlm" %
+                                (name[:-5], aircraftTypeName))
+            recordTasks.append(("record", (scenarioPath, scenario,
+                                           aircraftTypeName, path)))
+            flights.append(("%s/%s" % (name, aircraftTypeName), path,
+                            aircraftTypeName, scenario.get("flight", {})))
+
+        for (path, aircraftTypeName) in args.recording:
+            flights.append(("%s/%s" % (os.path.basename(path),
+                                       aircraftTypeName),
+                            path, aircraftTypeName, {}))
+
+        runTasks(pool, recordTasks)
+
+        replayTasks = []
+        for (_, path, aircraftTypeName, flightData) in flights:
+            for dispatchByStage in [True, False]:
+                replayTasks.append(("replay", (path, aircraftTypeName,
+                                               flightData, dispatchByStage)))
+        results = runTasks(pool, replayTasks)
+
+    numFailed = 0
+    totalWith = totalWithout = 0.0
+    for (index, (name, _, _, _)) in enumerate(flights):
+        withDispatch = results[index * 2]
+        withoutDispatch = results[index * 2 + 1]
+        totalWith += withDispatch[3]
+        totalWithout += withoutDispatch[3]
+
+        differences = compare(withDispatch, withoutDispatch)
+        if differences:
+            numFailed += 1
+            print("FAIL %s" % (name,))
+            for difference in differences:
+                print("    " + difference)
+        else:
+            print("ok   %s: %d lines, %d faults, states: %.0f ms "
+                  "(%.0f ms without dispatch)" %
+                  (name, len(withDispatch[0]), len(withDispatch[1]),
+                   withDispatch[3] * 1000.0, withoutDispatch[3] * 1000.0))
+
+    print("%d of %d flights identical, states: %.0f ms (%.0f ms without "
+          "dispatch)" % (len(flights) - numFailed, len(flights),
+                         totalWith * 1000.0, totalWithout * 1000.0))
+
+    return 1 if numFailed else 0
+
+#------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,544 @@
+#!/usr/bin/env python3
+
+# Non-interactive, time-compressed runner of flight scenarios
+#
+# A scenario is a JSON file describing a flight to be performed with the
+# PyUIPC simulator and the results expected from the logger. The flight is
+# driven either by a flight profile (see mlx.pyuipc_sim.Profile), or by a
+# script of simulator CLI commands like test1.txt, the lines of which are
+# executed at a fixed interval. The simulator, the FSUIPC handler and the
+# whole checker pipeline of the logger run in-process on a virtual clock
+# (see mlx.clock.VirtualClock) driven by the FSUIPC handler: whenever the
+# handler waits for its next request, the time jumps to it and the flight
+# is advanced accordingly. So a run takes only the CPU time of the logger,
+# and its results do not depend on the load of the machine. The GUI is
+# replaced by the output of the headless logger (see mlx.headless)
+# collecting the flight stages and the rating.
+#
+# The scenario file contains an object with the following members:
+# - aircraftTypes: the list of the aircraft types (e.g. "B738") the flight
+#   is performed with, each one being a separate run, or an object mapping
+#   the aircraft types to their overrides of the scenario:
+#   - flight: items of the flight data replacing those of the scenario,
+#   - phases: an object mapping the names of the phases of the profile to
+#     values replacing those of the phase (e.g. the weights in the initial
+#     phase or the pitch at the rotation),
+#   - expect: expectations replacing those of the scenario,
+# - flight: the data the pilot would enter into the GUI (e.g. zfw,
+#   cruiseAltitude, v1, vr, v2, vref),
+# - profile: the path of the flight profile, relative to the scenario, or
+# - script: the path of the CLI script, and interval: the number of seconds
+#   between the lines of the script,
+# - timeout: the maximal real time in seconds the flight may take,
+# - expect: the expectations:
+#   - stages: the names of the stages (see const.stage2string) the flight
+#     should go through in this order,
+#   - rating: the minimal and maximal rating,
+#   - lines: regular expressions each of which should match a log line,
+#   - faults: regular expressions each of which should match a fault,
+#   - allFaults: regular expressions matching all the faults one by one in
+#     their order,
+#   - noFaults: regular expressions none of which may match a fault.
+#
+# The scenarios given on the command line, or all in the scenarios
+# directory, are run in a pool of processes, each run in a fresh process,
+# since the simulator and the clock are global. The exit code is non-zero
+# if any of the runs has failed.
+#
+# The module also provides the flights to the other checks and benchmarks:
+# a scenario flight can be recorded into a telemetry file (see
+# mlx.telemetry), a recording can be replayed through the whole logger via
+# mlx.pyuipc_replay, and a flight without a simulator can be created to be
+# fed with aircraft states directly.
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import traceback
+import multiprocessing
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from mlx.clock import VirtualClock
+
+#------------------------------------------------------------------------------
+
+## The directory of the scenarios
+scenariosDirectory = os.path.join(os.path.dirname(__file__), "scenarios")
+
+## The time of the clock at the start of the flights
+START_TIME = 1700000000.0
+
+## The default timeout in real seconds
+DEFAULT_TIMEOUT = 120.0
+
+## The default interval between the lines of a script in seconds
+DEFAULT_INTERVAL = 10.0
+
+#------------------------------------------------------------------------------
+
+class BookedFlight(object):
+    """The booked flight of a scenario."""
+    def __init__(self, aircraftType, aircraftTypeName):
+        """Construct the booked flight for the given aircraft type."""
+        import datetime
+        from mlx import const
+
+        self.id = None
+        self.callsign = "HA-SCN"
+        self.tailNumber = "HA-SCN"
+        self.aircraftType = aircraftType
+        self.aircraftTypeName = aircraftTypeName
+        self.departureICAO = "LHBP"
+        self.arrivalICAO = "LHDC"
+        self.flightType = const.FLIGHTTYPE_SCHEDULED
+        self.numCockpitCrew = 2
+        self.numCabinCrew = 3
+        self.numPassengers = 80
+        self.numChildren = 0
+        self.numInfants = 0
+        self.bagWeight = 800
+        self.cargoWeight = 0
+        self.mailWeight = 0
+        self.route = "DCT"
+
+        start = datetime.datetime.utcfromtimestamp(START_TIME)
+        self.departureTime = start + datetime.timedelta(minutes = 15)
+        self.arrivalTime = start + datetime.timedelta(minutes = 60)
+
+#------------------------------------------------------------------------------
+
+class Simulator(object):
+    """Stand-in for the simulator of a flight fed with the aircraft states
+    directly."""
+    def startFlare(self):
+        """Start the flare time calculation, which is not performed."""
+        pass
+
+    def cancelFlare(self):
+        """Cancel the flare time calculation."""
+        pass
+
+#------------------------------------------------------------------------------
+
+class ScriptPlayer(object):
+    """Player of a script of simulator CLI commands.
+
+    The lines of the script are executed one by one, interval seconds after
+    each other."""
+    def __init__(self, path, interval):
+        """Construct the player of the script with the given path."""
+        from mlx import pyuipc_sim
+
+        self._cli = pyuipc_sim.CLI(client = pyuipc_sim.LocalClient())
+        self._interval = interval
+        with open(path, "rt") as f:
+            self._lines = [line.strip() for line in f
+                           if line.strip() and
+                           not line.strip().startswith("#")]
+        self._numExecuted = 0
+
+    def advance(self, elapsed):
+        """Execute the lines due by the given number of seconds elapsed
+        since the start of the script.
+
+        Returns whether the script has not finished yet, i.e. the interval
+        after its last line has not elapsed."""
+        while self._numExecuted<len(self._lines) and \
+              self._numExecuted * self._interval<=elapsed:
+            self._cli.onecmd(self._lines[self._numExecuted])
+            self._numExecuted += 1
+        return elapsed<len(self._lines) * self._interval
+
+#------------------------------------------------------------------------------
+
+class ScenarioClock(VirtualClock):
+    """The clock of the flight of a scenario.
+
+    It is a virtual clock, and whenever its driver (the FSUIPC handler)
+    advances the time, the player of the scenario is advanced to it. When the
+    player has finished or the flight has ended, the clock runs for
+    SETTLE_TIME seconds more to let the logger see the final values, and then
+    it stops: the time is not advanced any more, and the sleeps and waits of
+    the driver become short real ones, until the handler is disconnected."""
+    ## The number of seconds the clock runs after the end of the flight
+    SETTLE_TIME = 5.0
+
+    def __init__(self, startTime, player, hasEnded):
+        """Construct the clock starting at the given time.
+
+        player is the player of the profile or of the script, hasEnded is a
+        function returning whether the flight has ended. The player is
+        started immediately, so that the simulator has the initial values
+        when it is connected."""
+        super(ScenarioClock, self).__init__(startTime)
+        self._startTime = startTime
+        self._player = player
+        self._hasEnded = hasEnded
+        self._stopTime = None
+
+        player.advance(0.0)
+
+    @property
+    def stopped(self):
+        """Determine if the clock has stopped."""
+        return self._stopTime is not None and self.time()>=self._stopTime
+
+    def sleep(self, duration):
+        """Sleep for the given duration."""
+        if self.stopped and self._isDriver():
+            time.sleep(self.POLL_INTERVAL)
+        else:
+            super(ScenarioClock, self).sleep(duration)
+            self._advance()
+
+    def wait(self, condition, timeout = None):
+        """Wait for the given condition."""
+        if timeout is not None and self.stopped and self._isDriver():
+            condition.wait(self.POLL_INTERVAL)
+        else:
+            super(ScenarioClock, self).wait(condition, timeout)
+            self._advance()
+
+    def _advance(self):
+        """Advance the player to the current time, if the current thread is
+        the driver, and set the time to stop at when the flight is over."""
+        if self._stopTime is None and self._isDriver():
+            if not self._player.advance(self.time() - self._startTime) or \
+               self._hasEnded():
+                self._stopTime = self.time() + self.SETTLE_TIME
+
+#------------------------------------------------------------------------------
+
+def loadScenarios(paths):
+    """Load the scenarios with the given paths.
+
+    Returns a list of the runs, i.e. of tuples of the path of the scenario,
+    its contents with the overrides of the aircraft type applied, and the
+    aircraft type."""
+    runs = []
+    for path in paths:
+        with open(path, "rt") as f:
+            scenario = json.load(f)
+        aircraftTypes = scenario.get("aircraftTypes", ["B738"])
+        for aircraftType in aircraftTypes:
+            overrides = aircraftTypes[aircraftType] \
+                if isinstance(aircraftTypes, dict) else {}
+            runs.append((path, applyOverrides(scenario, overrides),
+                         aircraftType))
+    return runs
+
+def applyOverrides(scenario, overrides):
+    """Get a copy of the given scenario with the given overrides of an
+    aircraft type applied."""
+    scenario = dict(scenario)
+    for name in ["flight", "phases", "expect"]:
+        if name in overrides:
+            scenario[name] = dict(scenario.get(name, {}))
+            scenario[name].update(overrides[name])
+    return scenario
+
+def loadProfile(path, phases):
+    """Load the flight profile with the given path, replacing the values of
+    its phases with the given ones.
+
+    phases is a dictionary mapping the names of the phases to the values."""
+    from mlx import pyuipc_sim
+
+    with open(path, "rt") as f:
+        data = json.load(f)
+    names = set()
+    for phase in data["phases"]:
+        if phase["name"] in phases:
+            phase["values"] = dict(phase.get("values", {}))
+            phase["values"].update(phases[phase["name"]])
+            names.add(phase["name"])
+    unknown = set(phases) - names
+    if unknown:
+        raise ValueError("Unknown phases: " + ", ".join(sorted(unknown)))
+    return pyuipc_sim.Profile.fromData(data)
+
+def checkResults(expect, stages, lines, faults, rating):
+    """Check the results of a run against the given expectations.
+
+    Returns the list of the failures."""
+    failures = []
+
+    if "stages" in expect:
+        expected = expect["stages"]
+        index = 0
+        for stage in stages:
+            if index<len(expected) and stage==expected[index]:
+                index += 1
+        if index<len(expected):
+            failures.append("stage '%s' not reached, stages: %s" %
+                            (expected[index], ", ".join(stages)))
+
+    if "rating" in expect:
+        (minRating, maxRating) = expect["rating"]
+        if rating<minRating or rating>maxRating:
+            failures.append("rating %.1f not in [%.1f, %.1f]" %
+                            (rating, minRating, maxRating))
+
+    for pattern in expect.get("lines", []):
+        if not any(re.search(pattern, line) for line in lines):
+            failures.append("no line matches '%s'" % (pattern,))
+
+    for pattern in expect.get("faults", []):
+        if not any(re.search(pattern, fault) for fault in faults):
+            failures.append("no fault matches '%s'" % (pattern,))
+
+    if "allFaults" in expect:
+        patterns = expect["allFaults"]
+        for (pattern, fault) in zip(patterns, faults):
+            if not re.search(pattern, fault):
+                failures.append("fault does not match '%s': %s" %
+                                (pattern, fault))
+        for pattern in patterns[len(faults):]:
+            failures.append("missing fault: '%s'" % (pattern,))
+        for fault in faults[len(patterns):]:
+            failures.append("extra fault: %s" % (fault,))
+
+    for pattern in expect.get("noFaults", []):
+        for fault in faults:
+            if re.search(pattern, fault):
+                failures.append("unexpected fault: %s" % (fault,))
+
+    return failures
+
+def getConfig():
+    """Get the configuration of the flights.
+
+    The online services, the sounds and the checklists are turned off."""
+    from mlx.config import Config
+
+    config = Config()
+    config.onlineACARS = False
+    config.onlineGateSystem = False
+    config.enableSounds = False
+    config.enableApproachCallouts = False
+    config.enableChecklists = False
+    return config
+
+def getLines(logger):
+    """Get the lines of the given logger with their timestamps."""
+    return [text if timestampString is None
+            else timestampString + " " + text
+            for (timestampString, text) in logger.lines]
+
+def createOutput(config, aircraftTypeName, flightData):
+    """Create the output of the headless logger for a flight of the given
+    aircraft type with the given data entered by the pilot."""
+    from mlx import const
+    from mlx.headless import Output
+
+    aircraftType = getattr(const, "AIRCRAFT_" + aircraftTypeName)
+    output = Output(config, BookedFlight(aircraftType, aircraftTypeName))
+    output.setFlightData(flightData)
+    return output
+
+def createFlight(aircraftTypeName, flightData, config = None):
+    """Create a flight of the given aircraft type with the given data
+    entered by the pilot. The flight has no simulator, the aircraft states
+    should be passed to its aircraft directly.
+
+    Returns a tuple of the logger and the flight."""
+    from mlx import acft
+    from mlx import flight
+    from mlx import logger
+
+    if config is None:
+        config = getConfig()
+    output = createOutput(config, aircraftTypeName, flightData)
+
+    theLogger = logger.Logger(output)
+    theFlight = flight.Flight(theLogger, output)
+    theFlight.aircraftType = output.bookedFlight.aircraftType
+    theFlight.aircraft = acft.Aircraft.create(theFlight, output.bookedFlight)
+    theFlight.simulator = Simulator()
+
+    return (theLogger, theFlight)
+
+def runFlight(path, scenario, aircraftTypeName, recordingPath = None):
+    """Perform the flight of the given scenario with the given aircraft
+    type.
+
+    If a recording path is given, the telemetry is recorded into that file.
+
+    Returns a tuple of the stages, the log lines, the faults, the rating and
+    the real time taken."""
+    os.environ["FORCE_PYUIPC_SIM"] = "1"
+    os.environ["PYUIPC_SIM_PORT"] = "0"
+
+    from mlx import const
+    from mlx import pyuipc_sim
+    from mlx.headless import Engine
+    from mlx.watchdog import Watchdog
+    from mlx.clock import setClock
+
+    timeout = scenario.get("timeout", DEFAULT_TIMEOUT)
+    directory = os.path.dirname(path)
+
+    Watchdog()
+
+    config = getConfig()
+    output = createOutput(config, aircraftTypeName,
+                          scenario.get("flight", {}))
+    engine = Engine(config, output)
+
+    if "profile" in scenario:
+        profile = loadProfile(os.path.join(directory, scenario["profile"]),
+                              scenario.get("phases", {}))
+        player = pyuipc_sim.ProfilePlayer(profile, pyuipc_sim.values)
+    else:
+        player = ScriptPlayer(os.path.join(directory, scenario["script"]),
+                              scenario.get("interval", DEFAULT_INTERVAL))
+
+    clock = ScenarioClock(START_TIME, player,
+                          lambda: engine.flight.stage==const.STAGE_END)
+    # Until the handler takes over, no other thread may advance the time
+    clock.setDriver()
+    setClock(clock)
+
+    begin = time.perf_counter()
+    engine.connectSimulator(const.SIM_MSFSX, recordingPath = recordingPath)
+
+    while not clock.stopped and time.perf_counter() - begin < timeout:
+        time.sleep(0.01)
+
+    engine.disconnect()
+    duration = time.perf_counter() - begin
+
+    stages = [const.stage2string(stage) for stage in output.stages]
+    lines = getLines(engine.logger)
+    faults = [lines[index] for index in engine.logger.faultLineIndexes]
+
+    return (stages, lines, faults, engine.logger.getRating(), duration)
+
+def replayFlight(path, aircraftTypeName, flightData, dispatchByStage = True,
+                 timeout = DEFAULT_TIMEOUT):
+    """Replay the FSUIPC telemetry recording with the given path through the
+    whole logger with a flight of the given aircraft type and data entered
+    by the pilot.
+
+    The recording is read by the FSUIPC handler via mlx.pyuipc_replay on its
+    virtual clock, so the states are decoded by the aircraft model and
+    handled by the checkers and the logger like in a real flight. If
+    dispatchByStage is False, all checkers are called with each state (see
+    mlx.acft.Aircraft.dispatchByStage). It should be called in a fresh
+    process, since the replay is global.
+
+    Returns a tuple of the log lines, the indexes of the fault lines, the
+    rating and the time spent in handling the states."""
+    os.environ["FORCE_PYUIPC_REPLAY"] = path
+
+    from mlx import const
+    from mlx.headless import Engine
+    from mlx.watchdog import Watchdog
+
+    Watchdog()
+
+    config = getConfig()
+    output = createOutput(config, aircraftTypeName, flightData)
+    engine = Engine(config, output)
+    engine.createFlight()
+    aircraft = engine.flight.aircraft
+    aircraft.dispatchByStage = dispatchByStage
+
+    begin = time.perf_counter()
+    engine.connectSimulator(const.SIM_MSFSX)
+
+    # The handler reports the disconnection when the recording is over
+    while not output.connectionLost and not output.failed and \
+          time.perf_counter() - begin < timeout:
+        time.sleep(0.01)
+
+    engine.disconnect()
+
+    logger = engine.logger
+    return (getLines(logger), list(logger.faultLineIndexes),
+            logger.getRating(),
+            aircraft.profiler.tickStatistics.totalTime / 1e9)
+
+def runScenario(run):
+    """Run the given scenario in the current process.
+
+    Returns a dictionary with the results."""
+    (path, scenario, aircraftTypeName) = run
+
+    result = { "name" : "%s/%s" % (os.path.basename(path), aircraftTypeName),
+               "failures" : [] }
+    # The process runs only this scenario, and the logger's threads may
+    # print even after the flight
+    sys.stdout = open(os.devnull, "wt")
+    try:
+        (stages, lines, faults, rating, duration) = \
+            runFlight(path, scenario, aircraftTypeName)
+        result["failures"] = checkResults(scenario.get("expect", {}),
+                                          stages, lines, faults, rating)
+        result["rating"] = rating
+        result["numLines"] = len(lines)
+        result["faults"] = faults
+        result["duration"] = duration
+    except Exception:
+        result["failures"].append(traceback.format_exc())
+
+    return result
+
+#------------------------------------------------------------------------------
+
+def main():
+    """Run the scenarios."""
+    parser = argparse.ArgumentParser(description = "Run flight scenarios")
+    parser.add_argument("-j", "--jobs", type = int,
+                        default = 2 * multiprocessing.cpu_count(),
+                        help = "the number of scenarios to run in parallel")
+    parser.add_argument("-v", "--verbose", action = "store_true",
+                        help = "print the faults of each run")
+    parser.add_argument("scenarios", nargs = "*",
+                        help = "the scenario files to run (default: all)")
+    args = parser.parse_args()
+
+    paths = args.scenarios
+    if not paths:
+        paths = [os.path.join(scenariosDirectory, name)
+                 for name in sorted(os.listdir(scenariosDirectory))
+                 if name.endswith(".json")]
+
+    runs = loadScenarios(paths)
+
+    begin = time.perf_counter()
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(processes = max(1, min(args.jobs, len(runs))),
+                      maxtasksperchild = 1) as pool:
+        results = pool.map(runScenario, runs, chunksize = 1)
+    duration = time.perf_counter() - begin
+
+    numFailed = 0
+    for result in results:
+        failures = result["failures"]
+        if failures:
+            numFailed += 1
+            print("FAIL %s" % (result["name"],))
+            for failure in failures:
+                print("    " + failure.rstrip().replace("\n", "\n    "))
+        else:
+            print("ok   %s: rating %.1f, %d lines, %.1f s" %
+                  (result["name"], result["rating"], result["numLines"],
+                   result["duration"]))
+        if args.verbose:
+            for fault in result.get("faults", []):
+                print("    " + fault)
+
+    print("%d of %d runs passed in %.1f s" %
+          (len(results) - numFailed, len(results), duration))
+
+    return 1 if numFailed else 0
+
+#------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    sys.exit(main())
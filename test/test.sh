@@ -12,10 +12,15 @@ if test $# -gt 1; then
     host=$2
 fi
 
+coproc simcli { python3 -m "${sim}" "${host}" >/dev/null; }
+
 oldIFS="${IFS}"
 IFS=$'\n'
 for line in `cat $1`; do
     read -p "$line"
-    echo $line | python3 -m "${sim}" "${host}" >/dev/null
+    echo $line >&${simcli[1]}
 done
 IFS="${oldIFS}"
+
+echo quit >&${simcli[1]}
+wait